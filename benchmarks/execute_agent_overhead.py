@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Measure the overhead of the observable notebook runner.
+
+Runs every synthetic scenario from :mod:`synthetic_notebooks` through
+
+- ``nbclient``: plain :class:`nbclient.NotebookClient`, the baseline
+- ``execute_preprocessor``: nbconvert ``ExecutePreprocessor`` as used by
+  ``run_notebooks.py`` and ``tests/test_notebooks.py``
+- ``observable_no_save``: :func:`execute_notebook_observable` with an
+  event-counting observer and a single save at the end
+- ``observable``: the same with ``save_every_cell=True``, the CLI default
+
+Each run happens in a fresh spawned process so peak RSS of the parent
+(the process driving the kernel) is measured per run. Kernel start-up is
+excluded from ``execution_seconds``. A previous result file passed as
+``--compare`` must have been run with the same ``--scale``, ``--repeat`` and
+``--timeout``, or the comparison is refused. Scenarios and runners may
+differ; rows missing from the previous file are shown without a change.
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/execute_agent_overhead.py --output agent-bench.json
+    poetry run python benchmarks/execute_agent_overhead.py --compare agent-bench.json
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import importlib.metadata
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import nbformat
+
+from synthetic_notebooks import SCENARIOS
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: Runner names in reporting order. The first one is the overhead baseline.
+RUNNERS = ("nbclient", "execute_preprocessor", "observable_no_save", "observable")
+
+#: Parameters that must match for ``--compare``.
+COMPARED_PARAMETERS = ("scale", "repeat", "timeout")
+
+
+def _run_nbclient(notebook_path: Path, workdir: Path, timeout: int) -> dict[str, Any]:
+    from nbclient import NotebookClient
+
+    notebook = nbformat.read(notebook_path, as_version=4)
+    marks: dict[str, float] = {}
+    client = NotebookClient(
+        notebook,
+        timeout=timeout,
+        kernel_name="python3",
+        resources={"metadata": {"path": str(workdir)}},
+        on_notebook_start=lambda **_: marks.setdefault("kernel_ready", time.perf_counter()),
+    )
+    client.execute()
+    return {"execution_seconds": time.perf_counter() - marks["kernel_ready"]}
+
+
+def _run_execute_preprocessor(notebook_path: Path, workdir: Path, timeout: int) -> dict[str, Any]:
+    from nbconvert.preprocessors import ExecutePreprocessor
+
+    notebook = nbformat.read(notebook_path, as_version=4)
+    marks: dict[str, float] = {}
+    preprocessor = ExecutePreprocessor(
+        timeout=timeout,
+        kernel_name="python3",
+        on_notebook_start=lambda **_: marks.setdefault("kernel_ready", time.perf_counter()),
+    )
+    preprocessor.preprocess(notebook, {"metadata": {"path": str(workdir)}})
+    return {"execution_seconds": time.perf_counter() - marks["kernel_ready"]}
+
+
+def _run_observable(notebook_path: Path, workdir: Path, timeout: int, save_every_cell: bool) -> dict[str, Any]:
+    from getting_started.jupyter_execute_agent import execute_notebook_observable
+
+    marks: dict[str, float] = {}
+    events = 0
+    save_latencies: list[float] = []
+    last_completed: list[float] = []
+
+    def observer(event) -> None:
+        nonlocal events
+        now = time.perf_counter()
+        events += 1
+        if event.kind == "cell_completed":
+            last_completed[:] = [now]
+        elif event.kind == "notebook_saved" and event.cell_index is not None and last_completed:
+            save_latencies.append(now - last_completed.pop())
+
+    execute_notebook_observable(
+        notebook_path,
+        output_path=workdir / "executed.ipynb",
+        cwd=workdir,
+        timeout=timeout,
+        save_every_cell=save_every_cell,
+        observers=[observer],
+        client_kwargs={"on_notebook_start": lambda **_: marks.setdefault("kernel_ready", time.perf_counter())},
+    )
+    execution_seconds = time.perf_counter() - marks["kernel_ready"]
+    return {
+        "execution_seconds": execution_seconds,
+        "events": events,
+        "events_per_second": events / execution_seconds if execution_seconds else None,
+        "saves": len(save_latencies),
+        "save_latency_ms": _summarise_ms(save_latencies),
+    }
+
+
+def _summarise_ms(samples: list[float]) -> dict[str, float] | None:
+    """Summarise second-valued samples as milliseconds."""
+
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max": ordered[-1] * 1000,
+    }
+
+
+def run_single(scenario: str, runner: str, scale: float, timeout: int) -> dict[str, Any]:
+    """Run one scenario with one runner inside the current process.
+
+    Called in a fresh spawned worker process by :func:`main`.
+
+    :return:
+        Measurement dictionary.
+    """
+
+    # Import the agent in every runner so peak RSS compares like with like.
+    import getting_started.jupyter_execute_agent  # noqa: F401
+
+    with tempfile.TemporaryDirectory(prefix="agent-bench-") as temp_dir:
+        workdir = Path(temp_dir)
+        notebook = SCENARIOS[scenario](scale)
+        notebook_path = workdir / f"{scenario}.ipynb"
+        nbformat.write(notebook, notebook_path)
+        code_cells = sum(1 for cell in notebook.cells if cell.cell_type == "code")
+
+        started = time.perf_counter()
+        if runner == "nbclient":
+            measured = _run_nbclient(notebook_path, workdir, timeout)
+        elif runner == "execute_preprocessor":
+            measured = _run_execute_preprocessor(notebook_path, workdir, timeout)
+        elif runner == "observable_no_save":
+            measured = _run_observable(notebook_path, workdir, timeout, save_every_cell=False)
+        elif runner == "observable":
+            measured = _run_observable(notebook_path, workdir, timeout, save_every_cell=True)
+        else:
+            raise ValueError(f"Unknown runner: {runner}")
+        wall_seconds = time.perf_counter() - started
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+    return {
+        "scenario": scenario,
+        "runner": runner,
+        "code_cells": code_cells,
+        "wall_seconds": wall_seconds,
+        "peak_rss_bytes": peak_rss_bytes,
+        **measured,
+    }
+
+
+def summarise(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Aggregate repeated runs into medians and overhead against ``nbclient``."""
+
+    grouped: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for result in results:
+        grouped.setdefault((result["scenario"], result["runner"]), []).append(result)
+
+    summary = []
+    for (scenario, runner), runs in grouped.items():
+        execution = statistics.median(run["execution_seconds"] for run in runs)
+        baseline_runs = grouped.get((scenario, RUNNERS[0]), [])
+        baseline = statistics.median(run["execution_seconds"] for run in baseline_runs) if baseline_runs else None
+        code_cells = runs[0]["code_cells"]
+        row: dict[str, Any] = {
+            "scenario": scenario,
+            "runner": runner,
+            "runs": len(runs),
+            "code_cells": code_cells,
+            "execution_seconds": execution,
+            "per_cell_overhead_ms": (execution - baseline) / code_cells * 1000 if baseline is not None else None,
+            "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+        }
+        if any("events_per_second" in run for run in runs):
+            row["events_per_second"] = statistics.median(run["events_per_second"] or 0 for run in runs)
+        save_means = [run["save_latency_ms"]["mean"] for run in runs if run.get("save_latency_ms")]
+        if save_means:
+            row["save_latency_ms"] = statistics.median(save_means)
+        summary.append(row)
+    return summary
+
+
+def get_environment() -> dict[str, Any]:
+    """Describe the code and interpreter versions the results belong to."""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+    except Exception:
+        commit = None
+    packages = {}
+    for name in ("nbclient", "nbconvert", "nbformat", "jupyter-client", "ipykernel"):
+        try:
+            packages[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            packages[name] = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": packages,
+    }
+
+
+def print_summary(summary: list[dict[str, Any]], baseline: dict[tuple[str, str], dict[str, Any]] | None) -> None:
+    """Print a compact table, with relative change against a previous run."""
+
+    for row in summary:
+        overhead = row["per_cell_overhead_ms"]
+        line = (
+            f"{row['scenario']:<14} {row['runner']:<22} "
+            f"exec={row['execution_seconds']:8.3f}s "
+            f"overhead/cell={overhead if overhead is not None else float('nan'):8.3f}ms "
+            f"rss={row['peak_rss_bytes'] / 1024 / 1024:7.1f}MiB"
+        )
+        if "events_per_second" in row:
+            line += f" events/s={row['events_per_second']:9.1f}"
+        if "save_latency_ms" in row:
+            line += f" save={row['save_latency_ms']:7.2f}ms"
+        previous = (baseline or {}).get((row["scenario"], row["runner"]))
+        if previous:
+            change = (row["execution_seconds"] - previous["execution_seconds"]) / previous["execution_seconds"] * 100
+            line += f" vs-baseline={change:+.1f}%"
+        print(line)
+
+
+def get_parameter_mismatches(parameters: dict[str, Any], previous: dict[str, Any]) -> list[str]:
+    """Describe how a previous result file was run differently, e.g. ``scale: 0.1 != 1.0``."""
+
+    mismatches = []
+    if previous.get("format_version") != RESULT_FORMAT_VERSION:
+        mismatches.append(f"format_version: {previous.get('format_version')} != {RESULT_FORMAT_VERSION}")
+    previous_parameters = previous.get("parameters", {})
+    for name in COMPARED_PARAMETERS:
+        if previous_parameters.get(name) != parameters[name]:
+            mismatches.append(f"{name}: {previous_parameters.get(name)} != {parameters[name]}")
+    return mismatches
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark jupyter-execute-agent overhead against plain nbclient.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to compare against.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run. Repeat for several. Default: all.")
+    parser.add_argument("--runner", action="append", choices=RUNNERS, help="Runner to measure. Repeat for several. Default: all.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario and runner. Default: 3.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Workload size multiplier. Default: 1.")
+    parser.add_argument("--timeout", type=int, default=600, help="Per-cell timeout in seconds. Default: 600.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark suite."""
+
+    args = parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+    runners = args.runner or list(RUNNERS)
+    if RUNNERS[0] not in runners:
+        runners.insert(0, RUNNERS[0])
+    parameters = {"scale": args.scale, "repeat": args.repeat, "timeout": args.timeout}
+
+    baseline = None
+    if args.compare:
+        # Refuse before spending minutes on runs that cannot be compared.
+        previous = json.loads(args.compare.read_text())
+        mismatches = get_parameter_mismatches(parameters, previous)
+        if mismatches:
+            raise SystemExit(f"{args.compare} was run with different parameters (previous != current): " + ", ".join(mismatches))
+        baseline = {(row["scenario"], row["runner"]): row for row in previous.get("summary", [])}
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenarios:
+        for repeat in range(args.repeat):
+            for runner in runners:
+                # One process per run keeps ru_maxrss meaningful.
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(run_single, scenario, runner, args.scale, args.timeout).result()
+                result["repeat"] = repeat
+                results.append(result)
+                print(f"{scenario} {runner} #{repeat}: {result['execution_seconds']:.3f}s", file=sys.stderr)
+
+    summary = summarise(results)
+    print_summary(summary, baseline)
+
+    if args.output:
+        document = {
+            "suite": "jupyter-execute-agent-overhead",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": parameters,
+            "environment": get_environment(),
+            "summary": summary,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
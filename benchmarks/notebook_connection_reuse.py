@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Measure the latency of loading a notebook page with many asset requests.
+
+Serves a notebook with ``--assets`` image outputs from ``notebook-static-server``
+in-process, with images extracted to ``/asset/`` URLs, and times fetching the
+page and every asset it links:
+
+- ``new-connection``: a new TCP connection per request, as HTTP/1.0 clients
+  and servers without keep-alive do
+- ``keep-alive``: one persistent HTTP/1.1 connection for all requests
+
+Pages and assets are fetched once before measuring, so only transfer and
+request handling are timed. Loopback has no round trip to save; pass
+``--latency-ms`` to route requests through a proxy that delays each
+direction by half of it, like a Tailscale link between phone and server.
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/notebook_connection_reuse.py --output connection-reuse.json
+    poetry run python benchmarks/notebook_connection_reuse.py --latency-ms 40 --assets 100
+"""
+
+import argparse
+import base64
+from datetime import datetime, timezone
+import http.client
+import json
+import re
+import socket
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import zlib
+
+import nbformat
+
+from getting_started.notebook_static_server import NotebookCellCache
+from getting_started.notebook_static_server import NotebookHTTPServer
+from getting_started.notebook_static_server import NotebookIndex
+from getting_started.notebook_static_server import NotebookRenderCache
+from getting_started.notebook_static_server import RenderOptions
+from getting_started.notebook_static_server import server as server_module
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: Connection modes in reporting order. The first one is the baseline.
+MODES = ("new-connection", "keep-alive")
+
+AUTHORIZATION = "Basic " + base64.b64encode(b"viewer:viewer").decode("ascii")
+
+ASSET_LINK_RE = re.compile(rb'src="(/asset/[^"]+)"')
+
+
+def new_png(index: int, size: int = 64) -> bytes:
+    """Return a distinct solid-colour PNG, so every output gets its own asset."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    colour = bytes([index % 256, index // 256 % 256, 128])
+    rows = b"".join(b"\x00" + colour * size for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def write_notebook(path: Path, assets: int) -> None:
+    """Write a notebook with one image output per code cell."""
+
+    cells = [nbformat.v4.new_markdown_cell("# Connection reuse")]
+    for index in range(assets):
+        data = {"image/png": base64.b64encode(new_png(index)).decode("ascii"), "text/plain": "<Figure>"}
+        cells.append(nbformat.v4.new_code_cell(f"plot({index})", outputs=[nbformat.v4.new_output("display_data", data=data)]))
+    nbformat.write(nbformat.v4.new_notebook(cells=cells), path)
+
+
+def start_server(notebook_dir: Path, cache_dir: Path) -> NotebookHTTPServer:
+    """Start a notebook server serving ``notebook_dir`` on a free loopback port."""
+
+    server_module.PROJECT_ROOT = notebook_dir.parent
+    server_module.NOTEBOOK_ROOTS = (notebook_dir,)
+    server = NotebookHTTPServer(("127.0.0.1", 0), server_module.NotebookRequestHandler)
+    server.allow_non_tailnet = False
+    server.render_cache = NotebookRenderCache(cache_dir=cache_dir)
+    server.cell_cache = NotebookCellCache()
+    server.render_options = RenderOptions(extract_images=True)
+    server.notebook_index = NotebookIndex(notebook_dir.parent, (notebook_dir,))
+    threading.Thread(target=server.serve_forever, name="benchmark-server", daemon=True).start()
+    return server
+
+
+def start_latency_proxy(target_port: int, latency_seconds: float) -> int:
+    """Forward loopback connections to ``target_port``, delaying each direction by half the latency.
+
+    The first request of a connection waits one more round trip, for the
+    TCP handshake that loopback connections complete at once.
+
+    :return:
+        Port of the proxy.
+    """
+
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def pump(source: socket.socket, destination: socket.socket, handshake: bool) -> None:
+        try:
+            if handshake:
+                time.sleep(latency_seconds)
+            while data := source.recv(65536):
+                time.sleep(latency_seconds / 2)
+                destination.sendall(data)
+        except OSError:
+            pass
+        finally:
+            destination.close()
+
+    def accept() -> None:
+        while True:
+            client, _address = listener.accept()
+            upstream = socket.create_connection(("127.0.0.1", target_port))
+            threading.Thread(target=pump, args=(client, upstream, True), daemon=True).start()
+            threading.Thread(target=pump, args=(upstream, client, False), daemon=True).start()
+
+    threading.Thread(target=accept, name="latency-proxy", daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def load_page(port: int, view_path: str, keep_alive: bool) -> tuple[float, int]:
+    """Fetch the page and then its assets in order, like a browser with one connection.
+
+    :return:
+        Seconds taken and the number of requests.
+    """
+
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    headers = {"Authorization": AUTHORIZATION} if keep_alive else {"Authorization": AUTHORIZATION, "Connection": "close"}
+
+    def get(path: str) -> bytes:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise SystemExit(f"{path} returned {response.status}: {body[:200]!r}")
+        if not keep_alive:
+            connection.close()
+        return body
+
+    assets = ASSET_LINK_RE.findall(get(view_path))
+    for asset in assets:
+        get(asset.decode())
+    connection.close()
+    return time.perf_counter() - started, len(assets) + 1
+
+
+def measure(port: int, view_path: str, repeat: int) -> dict[str, dict[str, float]]:
+    """Return the median page load time of every mode."""
+
+    load_page(port, view_path, keep_alive=True)
+    results = {}
+    for mode in MODES:
+        samples = [load_page(port, view_path, keep_alive=mode == "keep-alive") for _ in range(repeat)]
+        results[mode] = {
+            "requests": samples[0][1],
+            "seconds": statistics.median(seconds for seconds, _requests in samples),
+        }
+    return results
+
+
+def print_summary(results: dict[str, dict[str, float]]) -> None:
+    """Print a compact table with changes against the new-connection baseline."""
+
+    baseline = results[MODES[0]]
+    for mode in MODES:
+        row = results[mode]
+        line = f"{mode:<15} requests={row['requests']:4d} page_load={row['seconds'] * 1000:9.1f}ms per_request={row['seconds'] / row['requests'] * 1000:7.2f}ms"
+        if mode != MODES[0]:
+            line += f" vs-new-connection={(row['seconds'] - baseline['seconds']) / baseline['seconds'] * 100:+.1f}%"
+        print(line)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark page load latency with and without persistent connections.")
+    parser.add_argument("--assets", type=int, default=50, help="Image outputs in the notebook. Default: 50.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated round-trip time added by a proxy. Default: 0.")
+    parser.add_argument("--repeat", type=int, default=5, help="Page loads per mode. Default: 5.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark."""
+
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        notebook_dir = Path(directory) / "notebooks"
+        notebook_dir.mkdir()
+        write_notebook(notebook_dir / "assets.ipynb", args.assets)
+        server = start_server(notebook_dir, Path(directory) / "cache")
+        try:
+            port = server.server_address[1]
+            if args.latency_ms:
+                port = start_latency_proxy(port, args.latency_ms / 1000)
+            results = measure(port, "/view/notebooks/assets.ipynb", args.repeat)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print_summary(results)
+    if args.output:
+        document = {
+            "suite": "notebook-connection-reuse",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": {"assets": args.assets, "latency_ms": args.latency_ms, "repeat": args.repeat},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Measure the initial page weight of notebook views with and without lazy outputs.
+
+Serves one notebook with ``notebook-static-server`` in-process and measures,
+for ``lazy=0`` (every output inline) and ``lazy=1`` (outputs above the
+threshold loaded on scroll):
+
+- ``bytes``: initial ``/view/`` response size, identity and gzip encoded
+- ``lazy_outputs``: number of outputs deferred to ``/output/`` fragments
+- ``static_bytes``: size of the ``/static/`` stylesheets and scripts the
+  page links, which browsers download once for all pages
+- ``first_contentful_paint_ms``, ``dom_content_loaded_ms``, ``load_ms``:
+  browser timings from headless Chrome, when Selenium and Chrome are
+  available
+
+Defaults to the largest notebook under ``notebooks/`` and ``scratchpad/``.
+Pages are rendered once before measuring, so only transfer and browser
+work is timed. Pass ``--self-contained`` to measure pages with the static
+files inlined, as before they were shared.
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/notebook_page_weight.py --output page-weight.json
+    poetry run python benchmarks/notebook_page_weight.py --self-contained --no-browser
+    poetry run python benchmarks/notebook_page_weight.py --notebook notebooks/single-backtest/liquidity-risk-analysis.ipynb
+"""
+
+import argparse
+import base64
+from datetime import datetime, timezone
+import http.client
+import json
+import re
+import statistics
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+from getting_started.notebook_static_server import NotebookHTTPServer
+from getting_started.notebook_static_server import NotebookIndex
+from getting_started.notebook_static_server import NotebookRenderCache
+from getting_started.notebook_static_server import RenderOptions
+from getting_started.notebook_static_server import server as server_module
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: View modes in reporting order. The first one is the baseline.
+MODES = {"eager": "lazy=0", "lazy": "lazy=1"}
+
+AUTHORIZATION = "Basic " + base64.b64encode(b"viewer:viewer").decode("ascii")
+
+#: Links to shared stylesheets and plotly.js in a rendered page.
+STATIC_LINK_RE = re.compile(rb'(?:href="|plotly: ")(/static/[^"]+?)(?:\.js)?"')
+
+
+def find_largest_notebook(roots: tuple[Path, ...]) -> Path:
+    """Return the largest notebook file under the given roots."""
+
+    notebooks = [path for root in roots if root.exists() for path in root.rglob("*.ipynb") if ".ipynb_checkpoints" not in path.parts]
+    if not notebooks:
+        raise SystemExit("No notebooks found; pass --notebook")
+    return max(notebooks, key=lambda path: path.stat().st_size)
+
+
+def start_server(lazy_output_bytes: int, cache_dir: Path, shared_static: bool) -> NotebookHTTPServer:
+    """Start a notebook server on a free loopback port."""
+
+    server = NotebookHTTPServer(("127.0.0.1", 0), server_module.NotebookRequestHandler)
+    server.allow_non_tailnet = False
+    server.render_cache = NotebookRenderCache(cache_dir=cache_dir)
+    server.render_options = RenderOptions(shared_static=shared_static)
+    server.lazy_output_bytes = lazy_output_bytes
+    server.notebook_index = NotebookIndex(server_module.PROJECT_ROOT, server_module.get_available_roots())
+    threading.Thread(target=server.serve_forever, name="benchmark-server", daemon=True).start()
+    return server
+
+
+def fetch(server: NotebookHTTPServer, path: str, accept_encoding: str | None = None) -> tuple[int, bytes]:
+    """GET a path and return the status and raw body."""
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=600)
+    headers = {"Authorization": AUTHORIZATION}
+    if accept_encoding:
+        headers["Accept-Encoding"] = accept_encoding
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response.status, body
+
+
+def measure_bytes(server: NotebookHTTPServer, view_path: str) -> dict[str, dict[str, Any]]:
+    """Measure the initial response size of every mode."""
+
+    results = {}
+    for mode, query in MODES.items():
+        status, body = fetch(server, f"{view_path}?{query}")
+        if status != 200:
+            raise SystemExit(f"{view_path}?{query} returned {status}: {body[:200]!r}")
+        _status, compressed = fetch(server, f"{view_path}?{query}", accept_encoding="gzip")
+        static_bytes = 0
+        for link in sorted(set(STATIC_LINK_RE.findall(body))):
+            path = link.decode() if link.endswith(b".css") else link.decode() + ".js"
+            _status, static_body = fetch(server, path)
+            static_bytes += len(static_body)
+        results[mode] = {
+            "bytes": len(body),
+            "gzip_bytes": len(compressed),
+            "lazy_outputs": body.count(b'class="notebook-lazy-output"'),
+            "static_bytes": static_bytes,
+        }
+    return results
+
+
+def measure_paint(server: NotebookHTTPServer, view_path: str, repeat: int) -> dict[str, dict[str, float]] | None:
+    """Measure browser timings with headless Chrome, or ``None`` when unavailable."""
+
+    try:
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+    except ImportError:
+        print("Selenium is not installed, skipping browser timings", file=sys.stderr)
+        return None
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    try:
+        driver = webdriver.Chrome(options=options)
+    except WebDriverException as exc:
+        print(f"Chrome is not available, skipping browser timings: {exc.msg}", file=sys.stderr)
+        return None
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setExtraHTTPHeaders", {"headers": {"Authorization": AUTHORIZATION}})
+        driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+        for mode, query in MODES.items():
+            samples: dict[str, list[float]] = {"first_contentful_paint_ms": [], "dom_content_loaded_ms": [], "load_ms": []}
+            for _ in range(repeat):
+                driver.get("about:blank")
+                driver.get(f"{base_url}{view_path}?{query}")
+                timings = driver.execute_script(
+                    """
+                    const navigation = performance.getEntriesByType("navigation")[0];
+                    const paint = performance.getEntriesByName("first-contentful-paint")[0];
+                    return {
+                        first_contentful_paint_ms: paint ? paint.startTime : null,
+                        dom_content_loaded_ms: navigation.domContentLoadedEventEnd,
+                        load_ms: navigation.loadEventEnd,
+                    };
+                    """
+                )
+                for name, value in timings.items():
+                    if value is not None:
+                        samples[name].append(value)
+            results[mode] = {name: statistics.median(values) for name, values in samples.items() if values}
+    finally:
+        driver.quit()
+    return results
+
+
+def print_summary(weights: dict[str, dict[str, Any]], paint: dict[str, dict[str, float]] | None) -> None:
+    """Print a compact table with changes against the eager baseline."""
+
+    baseline_mode = next(iter(MODES))
+    baseline = weights[baseline_mode]
+    for mode in MODES:
+        row = weights[mode]
+        line = (
+            f"{mode:<6} bytes={row['bytes'] / 1024:9.1f}KiB gzip={row['gzip_bytes'] / 1024:9.1f}KiB "
+            f"lazy_outputs={row['lazy_outputs']:4d} static={row['static_bytes'] / 1024:8.1f}KiB"
+        )
+        if mode != baseline_mode:
+            line += f" vs-eager={(row['bytes'] - baseline['bytes']) / baseline['bytes'] * 100:+.1f}%"
+        if paint and mode in paint:
+            timings = paint[mode]
+            line += "".join(f" {name}={value:8.1f}" for name, value in timings.items())
+        print(line)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark notebook view page weight and first paint with lazy outputs.")
+    parser.add_argument("--notebook", type=Path, help="Notebook to serve, relative to the project root. Default: the largest one.")
+    parser.add_argument("--threshold", type=int, default=256, help="Lazy output threshold in KB. Default: 256.")
+    parser.add_argument("--repeat", type=int, default=5, help="Browser page loads per mode. Default: 5.")
+    parser.add_argument("--no-browser", action="store_true", help="Only measure bytes.")
+    parser.add_argument("--self-contained", action="store_true", help="Inline stylesheets and plotly.js instead of linking them from /static/.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark."""
+
+    args = parse_args()
+    notebook_path = (args.notebook or find_largest_notebook(server_module.get_available_roots())).resolve()
+    view_path = server_module.view_path_for(notebook_path.relative_to(server_module.PROJECT_ROOT))
+    print(f"Notebook: {notebook_path} ({notebook_path.stat().st_size / 1024 / 1024:.1f} MiB)", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        server = start_server(args.threshold * 1024, Path(cache_dir), shared_static=not args.self_contained)
+        try:
+            weights = measure_bytes(server, view_path)
+            paint = None if args.no_browser else measure_paint(server, view_path, args.repeat)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print_summary(weights, paint)
+    if args.output:
+        document = {
+            "suite": "notebook-page-weight",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": {"notebook": view_path, "threshold_kb": args.threshold, "repeat": args.repeat, "self_contained": args.self_contained},
+            "weights": weights,
+            "paint": paint,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Measure how ``notebook-static-server`` latency holds up under concurrent viewers.
+
+Generates a corpus of notebooks with saved outputs, starts the server on it
+in a subprocess with its production defaults (render worker pool, disk
+cache, keep-alive) and drives it with concurrent clients over basic auth.
+Every client keeps one persistent connection and sends its next request as
+soon as the previous response is read, like a browser tab refreshing. For
+each concurrency level, three phases are measured:
+
+- ``index``: ``/``, the notebook listing
+- ``view_cold``: ``/view/`` of notebooks whose rendered page is not cached;
+  every round touches all notebooks so their cache keys change
+- ``view_warm``: ``/view/`` of already rendered notebooks, served from the
+  memory cache
+
+and reported as throughput and p50/p95/p99 latency. The corpus is generated
+from a fixed seed, so results of different commits are comparable; pass a
+previous result file as ``--compare``. It must have been run with the same
+parameters apart from the concurrency levels, or the comparison is refused.
+Responses other than 200, e.g. 503 from a full render queue, are counted as
+errors and left out of latencies.
+
+The corpus:
+
+- ``small``: a heading and ten code cells with short stream outputs
+- ``large``: hundreds of code cells with HTML table outputs, a few MB
+- ``image_heavy``: dozens of incompressible PNG outputs, several MB
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/notebook_server_load.py --output load.json
+    poetry run python benchmarks/notebook_server_load.py --compare load.json --concurrency 1,8,32
+    poetry run python benchmarks/notebook_server_load.py --scale 0.1 --requests 10 --cold-rounds 1
+"""
+
+import argparse
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import http.client
+import importlib.metadata
+import json
+import os
+import platform
+import queue
+import random
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+import zlib
+
+import nbformat
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: Phases in reporting order.
+PHASES = ("index", "view_cold", "view_warm")
+
+AUTHORIZATION = "Basic " + base64.b64encode(b"viewer:viewer").decode("ascii")
+
+REPOSITORY_ROOT = Path(__file__).resolve().parents[1]
+
+#: Seed of the corpus generator; change only together with RESULT_FORMAT_VERSION.
+CORPUS_SEED = 20240601
+
+#: Parameters that must match for ``--compare``; results are compared per concurrency level.
+COMPARED_PARAMETERS = ("requests", "cold_rounds", "scale", "render_workers", "corpus_notebooks", "corpus_bytes")
+
+
+def new_noise_png(rng: random.Random, size: int) -> bytes:
+    """Return a PNG of random pixels, which does not compress, like a dense chart."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + rng.randbytes(size * 3) for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def build_small_notebook(rng: random.Random, scale: float) -> nbformat.NotebookNode:
+    """A heading and ten code cells with short stream outputs."""
+
+    cells = [nbformat.v4.new_markdown_cell("# Small notebook\n\n## Results")]
+    for index in range(10):
+        text = "".join(f"step {step}: {rng.random():.6f}\n" for step in range(5))
+        cells.append(nbformat.v4.new_code_cell(f"print_steps({index})", outputs=[nbformat.v4.new_output("stream", name="stdout", text=text)]))
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def build_large_notebook(rng: random.Random, scale: float) -> nbformat.NotebookNode:
+    """Hundreds of code cells with 50-row HTML table outputs."""
+
+    cells = [nbformat.v4.new_markdown_cell("# Large notebook")]
+    for index in range(max(1, int(300 * scale))):
+        if index % 20 == 0:
+            cells.append(nbformat.v4.new_markdown_cell(f"## Section {index // 20}"))
+        rows = "".join(f"<tr><td>{row}</td>{''.join(f'<td>{rng.uniform(-1, 1):.4f}</td>' for _ in range(5))}</tr>" for row in range(50))
+        table = f"<table><thead><tr><th></th><th>a</th><th>b</th><th>c</th><th>d</th><th>e</th></tr></thead><tbody>{rows}</tbody></table>"
+        data = {"text/html": table, "text/plain": f"<DataFrame {index}>"}
+        source = f"df_{index} = compute_table({index})\ndf_{index}"
+        cells.append(nbformat.v4.new_code_cell(source, outputs=[nbformat.v4.new_output("execute_result", data=data, execution_count=index + 1)]))
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def build_image_heavy_notebook(rng: random.Random, scale: float) -> nbformat.NotebookNode:
+    """Dozens of incompressible 192x192 PNG outputs."""
+
+    cells = [nbformat.v4.new_markdown_cell("# Image-heavy notebook")]
+    for index in range(max(1, int(40 * scale))):
+        data = {"image/png": base64.b64encode(new_noise_png(rng, 192)).decode("ascii"), "text/plain": "<Figure size 640x480 with 1 Axes>"}
+        cells.append(nbformat.v4.new_code_cell(f"plot_equity({index})", outputs=[nbformat.v4.new_output("display_data", data=data)]))
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+#: Corpus kind to builder and number of notebooks at scale 1.
+CORPUS: dict[str, tuple[Callable[[random.Random, float], nbformat.NotebookNode], int]] = {
+    "small": (build_small_notebook, 20),
+    "large": (build_large_notebook, 3),
+    "image_heavy": (build_image_heavy_notebook, 3),
+}
+
+
+def write_corpus(notebook_dir: Path, scale: float) -> list[str]:
+    """Write the corpus and return the ``/view/`` paths of its notebooks."""
+
+    rng = random.Random(CORPUS_SEED)
+    view_paths = []
+    for kind, (builder, count) in CORPUS.items():
+        for index in range(count):
+            name = f"{kind}-{index:02d}.ipynb"
+            nbformat.write(builder(rng, scale), notebook_dir / name)
+            view_paths.append(f"/view/notebooks/{name}")
+    return view_paths
+
+
+def get_free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(project_dir: Path, cache_dir: Path, port: int, render_workers: int | None) -> subprocess.Popen:
+    """Start ``notebook-static-server`` serving ``project_dir/notebooks`` and wait until it answers."""
+
+    command = [
+        sys.executable,
+        "-c",
+        "import sys; from getting_started.notebook_static_server import main; sys.exit(main())",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--cache-dir",
+        str(cache_dir),
+        # Background renders and indexing would compete with the measured requests.
+        "--prerender-workers",
+        "0",
+        "--no-search",
+        "--no-live-view",
+    ]
+    if render_workers is not None:
+        command += ["--render-workers", str(render_workers)]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPOSITORY_ROOT), os.environ.get("PYTHONPATH")]))}
+    process = subprocess.Popen(command, cwd=project_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/", headers={"Authorization": AUTHORIZATION})
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("Server did not start within 60 seconds")
+
+
+def run_clients(port: int, paths: list[str], concurrency: int) -> dict[str, Any]:
+    """Fetch ``paths`` with ``concurrency`` clients sharing one work queue.
+
+    :return:
+        Counts, throughput and latency percentiles of the phase.
+    """
+
+    work: queue.SimpleQueue[str] = queue.SimpleQueue()
+    for path in paths:
+        work.put(path)
+
+    def client() -> tuple[list[float], int, int]:
+        latencies: list[float] = []
+        errors = 0
+        received = 0
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+        try:
+            while True:
+                try:
+                    path = work.get_nowait()
+                except queue.Empty:
+                    break
+                started = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers={"Authorization": AUTHORIZATION, "Accept-Encoding": "gzip"})
+                    response = connection.getresponse()
+                    body = response.read()
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    connection.close()
+                    continue
+                if response.status != 200:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                received += len(body)
+        finally:
+            connection.close()
+        return latencies, errors, received
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda _index: client(), range(concurrency)))
+    seconds = time.perf_counter() - started
+
+    latencies = sorted(latency for client_latencies, _errors, _received in outcomes for latency in client_latencies)
+    return summarise(latencies, sum(errors for _latencies, errors, _received in outcomes), sum(received for *_rest, received in outcomes), seconds)
+
+
+def summarise(latencies: list[float], errors: int, received: int, seconds: float) -> dict[str, Any]:
+    """Summarise the successful request latencies of one phase."""
+
+    row: dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds if seconds else None,
+        "bytes_received": received,
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        row.update(p50_ms=cuts[49] * 1000, p95_ms=cuts[94] * 1000, p99_ms=cuts[98] * 1000)
+    elif latencies:
+        row.update(p50_ms=latencies[0] * 1000, p95_ms=latencies[0] * 1000, p99_ms=latencies[0] * 1000)
+    else:
+        row.update(p50_ms=None, p95_ms=None, p99_ms=None)
+    row["max_ms"] = latencies[-1] * 1000 if latencies else None
+    return row
+
+
+def touch_notebooks(notebook_dir: Path) -> None:
+    """Move every notebook's mtime a second forward, so its rendered pages are no longer cached."""
+
+    for notebook_path in notebook_dir.glob("*.ipynb"):
+        stat = notebook_path.stat()
+        os.utime(notebook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def measure(port: int, notebook_dir: Path, view_paths: list[str], concurrency: int, requests: int, cold_rounds: int) -> list[dict[str, Any]]:
+    """Run the three phases at one concurrency level."""
+
+    rng = random.Random(CORPUS_SEED + concurrency)
+    rows = []
+
+    rows.append({"phase": "index", "concurrency": concurrency, **run_clients(port, ["/"] * requests * concurrency, concurrency)})
+
+    cold = []
+    for _round in range(cold_rounds):
+        touch_notebooks(notebook_dir)
+        cold.append(run_clients(port, rng.sample(view_paths, len(view_paths)), concurrency))
+    rows.append({"phase": "view_cold", "concurrency": concurrency, **merge_rounds(cold)})
+
+    # Every notebook was rendered by the last cold round.
+    warm_paths = [rng.choice(view_paths) for _ in range(requests * concurrency)]
+    rows.append({"phase": "view_warm", "concurrency": concurrency, **run_clients(port, warm_paths, concurrency)})
+    return rows
+
+
+def merge_rounds(rounds: list[dict[str, Any]]) -> dict[str, Any]:
+    """Combine cold rounds: summed counts and the median of each latency statistic."""
+
+    merged: dict[str, Any] = {key: sum(row[key] for row in rounds) for key in ("requests", "errors", "seconds", "bytes_received")}
+    merged["requests_per_second"] = merged["requests"] / merged["seconds"] if merged["seconds"] else None
+    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        values = [row[key] for row in rounds if row[key] is not None]
+        merged[key] = statistics.median(values) if values else None
+    return merged
+
+
+def get_environment() -> dict[str, Any]:
+    """Describe the code and interpreter versions the results belong to."""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPOSITORY_ROOT, check=True, capture_output=True, text=True).stdout.strip()
+    except Exception:
+        commit = None
+    packages = {}
+    for name in ("nbconvert", "nbformat", "mistune"):
+        try:
+            packages[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            packages[name] = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def print_summary(results: list[dict[str, Any]], baseline: dict[tuple[str, int], dict[str, Any]] | None) -> None:
+    """Print a compact table, with p99 and throughput changes against a previous run."""
+
+    def format_ms(value: float | None) -> str:
+        return f"{value:9.1f}ms" if value is not None else "        -  "
+
+    # Grouped by phase, so latency across concurrency levels reads down the table.
+    for row in sorted(results, key=lambda row: (PHASES.index(row["phase"]), row["concurrency"])):
+        line = (
+            f"{row['phase']:<10} clients={row['concurrency']:3d} requests={row['requests']:5d} errors={row['errors']:3d} "
+            f"rps={row['requests_per_second'] or 0:8.1f} p50={format_ms(row['p50_ms'])} p95={format_ms(row['p95_ms'])} p99={format_ms(row['p99_ms'])}"
+        )
+        previous = (baseline or {}).get((row["phase"], row["concurrency"]))
+        if previous and previous.get("p99_ms") and row["p99_ms"] is not None:
+            line += f" p99-vs-baseline={(row['p99_ms'] - previous['p99_ms']) / previous['p99_ms'] * 100:+.1f}%"
+        if previous and previous.get("requests_per_second") and row["requests_per_second"]:
+            line += f" rps-vs-baseline={(row['requests_per_second'] - previous['requests_per_second']) / previous['requests_per_second'] * 100:+.1f}%"
+        print(line)
+
+
+def get_parameter_mismatches(parameters: dict[str, Any], previous: dict[str, Any]) -> list[str]:
+    """Describe how a previous result file was run differently, e.g. ``scale: 0.1 != 1.0``."""
+
+    mismatches = []
+    if previous.get("format_version") != RESULT_FORMAT_VERSION:
+        mismatches.append(f"format_version: {previous.get('format_version')} != {RESULT_FORMAT_VERSION}")
+    previous_parameters = previous.get("parameters", {})
+    for name in COMPARED_PARAMETERS:
+        if previous_parameters.get(name) != parameters[name]:
+            mismatches.append(f"{name}: {previous_parameters.get(name)} != {parameters[name]}")
+    return mismatches
+
+
+def parse_concurrency(value: str) -> list[int]:
+    levels = [int(level) for level in value.split(",") if level.strip()]
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError(f"concurrency must be positive integers such as 1,4,16, got {value}")
+    return levels
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Load-test notebook-static-server and report latency percentiles.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to compare against.")
+    parser.add_argument("--concurrency", type=parse_concurrency, default=[1, 4, 16], help="Comma-separated concurrent client counts. Default: 1,4,16.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client in the index and warm view phases. Default: 50.")
+    parser.add_argument("--cold-rounds", type=int, default=2, help="Cold renders of every notebook per concurrency level. Default: 2.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Size multiplier of the large and image-heavy notebooks. Default: 1.")
+    parser.add_argument("--render-workers", type=int, help="Render worker processes of the server. Default: the server default.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark."""
+
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="server-load-") as directory:
+        project_dir = Path(directory)
+        notebook_dir = project_dir / "notebooks"
+        notebook_dir.mkdir()
+        view_paths = write_corpus(notebook_dir, args.scale)
+        corpus_bytes = sum(path.stat().st_size for path in notebook_dir.glob("*.ipynb"))
+        print(f"Corpus: {len(view_paths)} notebooks, {corpus_bytes / 1024 / 1024:.1f} MiB", file=sys.stderr)
+        parameters = {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "cold_rounds": args.cold_rounds,
+            "scale": args.scale,
+            "render_workers": args.render_workers,
+            "corpus_notebooks": len(view_paths),
+            "corpus_bytes": corpus_bytes,
+        }
+
+        baseline = None
+        if args.compare:
+            previous = json.loads(args.compare.read_text())
+            mismatches = get_parameter_mismatches(parameters, previous)
+            if mismatches:
+                raise SystemExit(f"{args.compare} was run with different parameters (previous != current): " + ", ".join(mismatches))
+            baseline = {(row["phase"], row["concurrency"]): row for row in previous.get("results", [])}
+
+        port = get_free_port()
+        server = start_server(project_dir, project_dir / "cache", port, args.render_workers)
+        try:
+            results = []
+            for concurrency in args.concurrency:
+                results += measure(port, notebook_dir, view_paths, concurrency, args.requests, args.cold_rounds)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_summary(results, baseline)
+
+    if args.output:
+        document = {
+            "suite": "notebook-server-load",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": parameters,
+            "environment": get_environment(),
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Measure table of contents generation on a large rendered notebook.
+
+Builds a synthetic notebook whose rendered page is about ``--size-mb``
+megabytes (markdown sections with ``h2``/``h3`` headings, each followed by a
+large HTML table output) and compares two ways of adding the table of
+contents:
+
+- ``post_process``: render the page, then scan the whole HTML for headings
+  and splice the ``<nav>`` in, as :func:`add_table_of_contents` does
+- ``single_pass``: build the ``<nav>`` from the markdown cells before the
+  export and let the exporter template insert it, as
+  :func:`render_notebook_page` does
+
+For each it reports the median of:
+
+- ``toc_seconds``: table of contents work alone
+- ``render_seconds``: the whole page render including the table of contents
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/notebook_toc.py --output toc.json
+    poetry run python benchmarks/notebook_toc.py --size-mb 2 --repeat 1
+"""
+
+import argparse
+from datetime import datetime, timezone
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import nbformat
+from nbformat import NotebookNode
+
+from getting_started.notebook_static_server import RenderOptions
+from getting_started.notebook_static_server import add_table_of_contents
+from getting_started.notebook_static_server import render_notebook_page
+from getting_started.notebook_static_server.render import clean_progress_outputs
+from getting_started.notebook_static_server.render import get_page_resources
+from getting_started.notebook_static_server.render import prepare_table_of_contents
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: Approximate rendered size of one table output.
+TABLE_BYTES = 100 * 1024
+
+
+def build_toc_notebook(size_mb: float) -> NotebookNode:
+    """Build a notebook with headed sections whose page renders to about ``size_mb`` megabytes."""
+
+    row = "<tr>" + "".join(f"<td>{column}.000</td>" for column in range(8)) + "</tr>"
+    table = "<table><tbody>" + row * (TABLE_BYTES // len(row)) + "</tbody></table>"
+    cells = [nbformat.v4.new_markdown_cell("# Synthetic table of contents benchmark\n\nIntro.")]
+    for section in range(max(1, int(size_mb * 1024 * 1024 / TABLE_BYTES))):
+        cells.append(nbformat.v4.new_markdown_cell(f"## Section {section}\n\nSome text.\n\n### Details of {section}"))
+        output = nbformat.v4.new_output("display_data", data={"text/html": table, "text/plain": "<table>"})
+        cells.append(nbformat.v4.new_code_cell(f"display(table_{section})", outputs=[output]))
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def render_post_process(notebook_path: Path, options: RenderOptions) -> tuple[str, float]:
+    """Render without a table of contents and add it by scanning the HTML."""
+
+    notebook = clean_progress_outputs(nbformat.read(notebook_path, as_version=4))
+    body, _resources = options.create_exporter().from_notebook_node(notebook, resources=get_page_resources(None, False))
+    started = time.perf_counter()
+    body = add_table_of_contents(body)
+    return body, time.perf_counter() - started
+
+
+def render_single_pass(notebook_path: Path, options: RenderOptions) -> tuple[str, float]:
+    """Render with the table of contents built from markdown cells."""
+
+    notebook = nbformat.read(notebook_path, as_version=4)
+    started = time.perf_counter()
+    prepare_table_of_contents(notebook, options.create_exporter())
+    toc_seconds = time.perf_counter() - started
+    return render_notebook_page(notebook_path, options).html, toc_seconds
+
+
+def measure(notebook_path: Path, repeat: int) -> dict[str, dict[str, Any]]:
+    """Time both approaches."""
+
+    options = RenderOptions()
+    results = {}
+    for name, render in {"post_process": render_post_process, "single_pass": render_single_pass}.items():
+        toc_samples, render_samples = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body, toc_seconds = render(notebook_path, options)
+            render_samples.append(time.perf_counter() - started)
+            toc_samples.append(toc_seconds)
+        results[name] = {
+            "page_bytes": len(body.encode("utf-8")),
+            "toc_entries": body.count("<li", body.find("notebook-toc"), body.find("</nav>")),
+            "toc_seconds": statistics.median(toc_samples),
+            "render_seconds": statistics.median(render_samples),
+        }
+    return results
+
+
+def print_summary(results: dict[str, dict[str, Any]]) -> None:
+    """Print a compact table with changes against the post-processing baseline."""
+
+    baseline = results["post_process"]
+    for name, row in results.items():
+        line = (
+            f"{name:<12} page={row['page_bytes'] / 1024 / 1024:6.1f}MiB toc_entries={row['toc_entries']:4d} "
+            f"toc={row['toc_seconds'] * 1000:8.1f}ms render={row['render_seconds']:6.2f}s"
+        )
+        if row is not baseline:
+            line += f" toc-vs-post-process={(row['toc_seconds'] - baseline['toc_seconds']) / baseline['toc_seconds'] * 100:+.1f}%"
+        print(line)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark table of contents generation on a large rendered notebook.")
+    parser.add_argument("--size-mb", type=float, default=20, help="Approximate rendered page size in MB. Default: 20.")
+    parser.add_argument("--repeat", type=int, default=3, help="Renders per approach. Default: 3.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark."""
+
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        notebook_path = Path(work_dir) / "toc.ipynb"
+        nbformat.write(build_toc_notebook(args.size_mb), notebook_path)
+        print(f"Notebook: {notebook_path.stat().st_size / 1024 / 1024:.1f} MiB", file=sys.stderr)
+        results = measure(notebook_path, args.repeat)
+
+    print_summary(results)
+    if args.output:
+        document = {
+            "suite": "notebook-toc",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": {"size_mb": args.size_mb, "repeat": args.repeat},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Measure progress output cleanup on a notebook with large image outputs.
+
+Builds an in-memory notebook with about ``--image-mb`` megabytes of
+base64 PNG outputs and a few cells with tqdm-style progress output, then
+compares:
+
+- ``deepcopy``: copy the whole notebook before rewriting progress outputs,
+  as ``clean_progress_outputs`` did before
+- ``copy_on_write``: :func:`clean_progress_outputs`, which copies only the
+  cells whose outputs change
+
+For each it reports the median ``seconds`` and the ``peak_kib`` of Python
+allocations during the cleanup, measured with :mod:`tracemalloc`.
+
+Usage:
+
+.. code-block:: shell
+
+    poetry run python benchmarks/progress_cleanup.py --output cleanup.json
+    poetry run python benchmarks/progress_cleanup.py --image-mb 10 --repeat 1
+"""
+
+import argparse
+import base64
+import copy
+from datetime import datetime, timezone
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import nbformat
+from nbformat import NotebookNode
+
+from getting_started.notebook_static_server import clean_progress_outputs
+
+
+#: Version of the result document layout.
+RESULT_FORMAT_VERSION = 1
+
+#: Raw bytes of one synthetic image before base64 encoding.
+IMAGE_BYTES = 256 * 1024
+
+#: Progress output lines of one backtest cell.
+PROGRESS_TEXT = "".join(f"\rBacktesting strategy: {step}%| | {step}/100 [00:01<00:00, 90.00it/s]" for step in range(101))
+
+
+def build_image_notebook(image_mb: float, progress_cells: int) -> NotebookNode:
+    """Build a notebook with large image outputs and a few progress cells."""
+
+    images = max(1, int(image_mb * 1024 * 1024 / (IMAGE_BYTES * 4 / 3)))
+    cells = []
+    for index in range(images):
+        png = base64.b64encode(os.urandom(IMAGE_BYTES)).decode("ascii")
+        output = nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"})
+        cells.append(nbformat.v4.new_code_cell(f"figure_{index}.show()", outputs=[output]))
+    for index in range(progress_cells):
+        output = nbformat.v4.new_output("stream", name="stderr", text=PROGRESS_TEXT)
+        cells.insert(index * len(cells) // progress_cells, nbformat.v4.new_code_cell("run_backtest()", outputs=[output]))
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def clean_with_deepcopy(notebook: NotebookNode) -> NotebookNode:
+    """Baseline: deep copy the notebook, then clean it."""
+
+    return clean_progress_outputs(copy.deepcopy(notebook))
+
+
+def measure(notebook: NotebookNode, repeat: int) -> dict[str, dict[str, Any]]:
+    """Time both approaches and record their peak allocations."""
+
+    approaches: dict[str, Callable[[NotebookNode], NotebookNode]] = {
+        "deepcopy": clean_with_deepcopy,
+        "copy_on_write": clean_progress_outputs,
+    }
+    results = {}
+    for name, clean in approaches.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            clean(notebook)
+            samples.append(time.perf_counter() - started)
+        tracemalloc.start()
+        clean(notebook)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"seconds": statistics.median(samples), "peak_kib": peak / 1024}
+    return results
+
+
+def print_summary(results: dict[str, dict[str, Any]]) -> None:
+    """Print a compact table with changes against the deepcopy baseline."""
+
+    baseline = results["deepcopy"]
+    for name, row in results.items():
+        line = f"{name:<14} time={row['seconds'] * 1000:9.2f}ms peak={row['peak_kib']:10.1f}KiB"
+        if row is not baseline:
+            line += (
+                f" time-vs-deepcopy={(row['seconds'] - baseline['seconds']) / baseline['seconds'] * 100:+.1f}%"
+                f" peak-vs-deepcopy={(row['peak_kib'] - baseline['peak_kib']) / baseline['peak_kib'] * 100:+.1f}%"
+            )
+        print(line)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark progress output cleanup on a notebook with large image outputs.")
+    parser.add_argument("--image-mb", type=float, default=100, help="Image output size in MB. Default: 100.")
+    parser.add_argument("--progress-cells", type=int, default=3, help="Cells with progress output. Default: 3.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per approach. Default: 5.")
+    parser.add_argument("--output", type=Path, help="Write machine-readable JSON results to this file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark."""
+
+    args = parse_args()
+    notebook = build_image_notebook(args.image_mb, args.progress_cells)
+    print(f"Notebook: {len(notebook.cells)} cells, {args.image_mb:.0f} MB of images", file=sys.stderr)
+    results = measure(notebook, args.repeat)
+
+    print_summary(results)
+    if args.output:
+        document = {
+            "suite": "progress-cleanup",
+            "format_version": RESULT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": {"image_mb": args.image_mb, "progress_cells": args.progress_cells, "repeat": args.repeat},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Synthetic notebooks used by the benchmark scripts.
+
+Every builder returns an unexecuted ``NotebookNode`` that only needs the
+standard ``python3`` kernel, so the benchmarks run without market data or API
+keys. The ``scale`` argument multiplies the workload size so the same
+scenario can be used for quick smoke runs and longer regression runs.
+"""
+
+from typing import Callable
+
+import nbformat
+from nbformat import NotebookNode
+
+
+#: Kernel metadata written to every synthetic notebook.
+KERNEL_METADATA = {
+    "kernelspec": {
+        "display_name": "Python 3",
+        "language": "python",
+        "name": "python3",
+    },
+    "language_info": {"name": "python"},
+}
+
+#: Kernel-side helper that drives a tqdm-like ipywidgets progress bar through
+#: raw comm messages, so the flood does not depend on ipywidgets being installed.
+_WIDGET_FLOOD_SOURCE = """\
+from comm import create_comm
+
+def _widget(state):
+    state = {{"_model_module": "@jupyter-widgets/controls", **state}}
+    return create_comm(target_name="jupyter.widget", data={{"state": state, "buffer_paths": []}})
+
+total = {updates}
+bar = _widget({{"_model_name": "FloatProgressModel", "value": 0, "max": total}})
+label = _widget({{"_model_name": "HTMLModel", "value": ""}})
+box = _widget({{"_model_name": "HBoxModel", "children": ["IPY_MODEL_" + bar.comm_id, "IPY_MODEL_" + label.comm_id]}})
+for step in range(1, total + 1):
+    bar.send({{"method": "update", "state": {{"value": step}}, "buffer_paths": []}})
+    label.send({{"method": "update", "state": {{"value": f"{{step}}/{{total}} [00:00<00:00]"}}, "buffer_paths": []}})
+"""
+
+
+def new_synthetic_notebook(sources: list[str]) -> NotebookNode:
+    """Create an unexecuted notebook from code cell sources.
+
+    :param sources:
+        Code cell sources in notebook order.
+    :return:
+        Notebook document using the ``python3`` kernel.
+    """
+
+    return nbformat.v4.new_notebook(
+        cells=[nbformat.v4.new_code_cell(source) for source in sources],
+        metadata=KERNEL_METADATA,
+    )
+
+
+def build_tiny_cells_notebook(scale: float = 1.0) -> NotebookNode:
+    """Many trivial cells, measuring fixed per-cell overhead."""
+
+    count = max(1, int(200 * scale))
+    return new_synthetic_notebook([f"value_{index} = {index}" for index in range(count)])
+
+
+def build_stream_flood_notebook(scale: float = 1.0) -> NotebookNode:
+    """A few cells printing many flushed lines, measuring stream handling."""
+
+    lines = max(1, int(5_000 * scale))
+    source = f"for line in range({lines}):\n    print(f'stream line {{line}}', flush=True)"
+    return new_synthetic_notebook([source] * 4)
+
+
+def build_widget_flood_notebook(scale: float = 1.0) -> NotebookNode:
+    """Cells emitting a flood of tqdm-style widget progress updates."""
+
+    updates = max(1, int(2_000 * scale))
+    return new_synthetic_notebook([_WIDGET_FLOOD_SOURCE.format(updates=updates)] * 2)
+
+
+def build_large_image_notebook(scale: float = 1.0) -> NotebookNode:
+    """Cells displaying large PNG payloads, measuring save and copy costs."""
+
+    image_bytes = max(1024, int(2 * 1024 * 1024 * scale))
+    source = (
+        "import base64, os\n"
+        "from IPython.display import display\n"
+        f"display({{'image/png': base64.b64encode(os.urandom({image_bytes})).decode('ascii'), 'text/plain': '<image>'}}, raw=True)"
+    )
+    return new_synthetic_notebook([source] * 8)
+
+
+#: Scenario name to notebook builder.
+SCENARIOS: dict[str, Callable[[float], NotebookNode]] = {
+    "tiny_cells": build_tiny_cells_notebook,
+    "stream_flood": build_stream_flood_notebook,
+    "widget_flood": build_widget_flood_notebook,
+    "large_images": build_large_image_notebook,
+}
@@ -2,7 +2,7 @@
 
 This package provides a small reusable execution agent for running notebooks
 cell-by-cell with explicit progress events, partial-save support, and logging
-extensions suitable for long-running research workflows.
+and live-channel extensions suitable for long-running research workflows.
 """
 
 from .core import NotebookCellRecord
@@ -14,25 +14,49 @@ from .core import execute_notebook_observable
 from .core import iter_code_cells
 from .core import load_notebook_document
 from .core import save_notebook_document
+from .job_queue import NotebookJob
+from .job_queue import NotebookJobQueue
+from .sections import NotebookSectionPlan
+from .sections import execute_notebook_sections
+from .sections import plan_notebook_sections
+from .timeouts import AdaptiveTimeoutPolicy
+from .timeouts import CellRuntimeHistory
+from .timeouts import resolve_cell_timeout
 from .cli import build_argument_parser
 from .cli import main
+from .worker import NotebookQueueWorker
 from .extension import build_logging_observer
 from .extension import format_execution_event
 from .extension import log_execution_event
+from .live import DEFAULT_LIVE_CHANNEL_DIR
+from .live import LiveChannelPublisher
+from .live import get_live_channel_path
 
 __all__ = [
+    "AdaptiveTimeoutPolicy",
+    "CellRuntimeHistory",
+    "LiveChannelPublisher",
     "NotebookCellRecord",
     "NotebookExecutionEvent",
     "NotebookExecutionResult",
+    "NotebookJob",
+    "NotebookJobQueue",
+    "NotebookQueueWorker",
+    "NotebookSectionPlan",
     "DEFAULT_KERNEL_MEMORY_LIMIT_BYTES",
+    "DEFAULT_LIVE_CHANNEL_DIR",
     "build_argument_parser",
     "build_cell_label",
     "build_logging_observer",
     "execute_notebook_observable",
+    "execute_notebook_sections",
     "format_execution_event",
+    "get_live_channel_path",
     "iter_code_cells",
     "load_notebook_document",
     "log_execution_event",
     "main",
+    "plan_notebook_sections",
+    "resolve_cell_timeout",
     "save_notebook_document",
 ]
@@ -2,16 +2,36 @@
 
 This module exposes a small Poetry script wrapper around
 ``execute_notebook_observable()`` so notebook runs can use the same
-high-observability execution flow from the shell.
+high-observability execution flow from the shell. The ``submit``,
+``worker``, ``queue`` and ``cancel`` subcommands run notebooks through the
+shared job queue instead of starting a kernel directly.
 """
 
 import argparse
+import json
 from pathlib import Path
 import logging
 import sys
+from typing import Any, Callable, Sequence
 
+from .core import DEFAULT_KERNEL_MEMORY_LIMIT_BYTES
+from .core import NotebookExecutionObserver
+from .core import NotebookExecutionResult
 from .core import execute_notebook_observable
+from .core import load_notebook_document
 from .extension import build_logging_observer
+from .job_queue import DEFAULT_QUEUE_PATH
+from .job_queue import NotebookJobQueue
+from .job_queue import get_host_memory_bytes
+from .live import DEFAULT_LIVE_CHANNEL_DIR
+from .live import LiveChannelPublisher
+from .sections import execute_notebook_sections
+from .sections import plan_notebook_sections
+from .timeouts import DEFAULT_RUNTIME_HISTORY_DIR
+from .timeouts import AdaptiveTimeoutPolicy
+
+#: First arguments that select a job-queue subcommand instead of a direct run.
+QUEUE_COMMANDS = ("submit", "worker", "queue", "cancel")
 
 
 def build_argument_parser() -> argparse.ArgumentParser:
@@ -37,6 +57,23 @@ def build_argument_parser() -> argparse.ArgumentParser:
         type=Path,
         help="Notebook file to execute.",
     )
+    add_execution_arguments(parser)
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging level for progress events. Default: INFO.",
+    )
+    return parser
+
+
+def add_execution_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the notebook execution options shared by ``run`` and ``submit``.
+
+    :param parser:
+        Parser to extend.
+    """
+
     parser.add_argument(
         "--output",
         dest="output_path",
@@ -53,12 +90,55 @@ def build_argument_parser() -> argparse.ArgumentParser:
         default="python3",
         help="Jupyter kernel name to use. Default: python3.",
     )
+    parser.add_argument(
+        "--kernel-memory-limit",
+        type=float,
+        default=DEFAULT_KERNEL_MEMORY_LIMIT_BYTES / 1024**3,
+        help=(
+            "Kernel address-space cap in GiB. Use 0 to disable. "
+            f"Default: {DEFAULT_KERNEL_MEMORY_LIMIT_BYTES // 1024**3}."
+        ),
+    )
     parser.add_argument(
         "--timeout",
         type=int,
         default=None,
         help="Per-cell timeout in seconds. Default: nbclient default.",
     )
+    parser.add_argument(
+        "--adaptive-timeout",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=(
+            "Derive each cell's timeout from its stored runtime history "
+            "(median x factor, clamped to floor/ceiling). Cells without "
+            "history use --timeout. Default: false."
+        ),
+    )
+    parser.add_argument(
+        "--timeout-history-dir",
+        type=Path,
+        default=DEFAULT_RUNTIME_HISTORY_DIR,
+        help=f"Directory for stored cell runtimes. Default: {DEFAULT_RUNTIME_HISTORY_DIR}.",
+    )
+    parser.add_argument(
+        "--timeout-factor",
+        type=float,
+        default=3.0,
+        help="Multiplier applied to the median historical cell runtime. Default: 3.",
+    )
+    parser.add_argument(
+        "--timeout-floor",
+        type=float,
+        default=60.0,
+        help="Smallest adaptive per-cell timeout in seconds. Default: 60.",
+    )
+    parser.add_argument(
+        "--timeout-ceiling",
+        type=float,
+        default=6 * 60 * 60,
+        help="Largest adaptive per-cell timeout in seconds. Default: 21600.",
+    )
     parser.add_argument(
         "--allow-errors",
         action="store_true",
@@ -71,10 +151,19 @@ def build_argument_parser() -> argparse.ArgumentParser:
         help="Save the notebook after every completed code cell. Default: true.",
     )
     parser.add_argument(
-        "--log-level",
-        default="INFO",
-        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
-        help="Logging level for progress events. Default: INFO.",
+        "--parallel-sections",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=(
+            "Run the setup prefix once, then run cells tagged section:<name> "
+            "in parallel kernels that replay the prefix. Default: false."
+        ),
+    )
+    parser.add_argument(
+        "--max-parallel-sections",
+        type=int,
+        default=None,
+        help="Maximum number of section kernels running at once. Default: one per section.",
     )
     parser.add_argument(
         "--stream-cell-outputs",
@@ -82,12 +171,306 @@ def build_argument_parser() -> argparse.ArgumentParser:
         default=True,
         help="Log cell stdout/stderr/result payloads as they arrive. Default: true.",
     )
+    parser.add_argument(
+        "--live-channel",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=(
+            "Publish execution events to a live channel file that the notebook "
+            "viewer pushes to open pages. Channels are deleted a week after "
+            "their last event. Default: true."
+        ),
+    )
+    parser.add_argument(
+        "--live-channel-dir",
+        type=Path,
+        default=DEFAULT_LIVE_CHANNEL_DIR,
+        help=f"Directory for live channel files. Default: {DEFAULT_LIVE_CHANNEL_DIR}.",
+    )
+
+
+def execute_from_arguments(
+    args: argparse.Namespace,
+    *,
+    observers: Sequence[NotebookExecutionObserver] | None = None,
+) -> NotebookExecutionResult:
+    """Execute a notebook from parsed run arguments.
+
+    Shared by the direct CLI run and queued jobs executed by workers.
+
+    :param args:
+        Namespace produced by :func:`build_argument_parser`.
+    :param observers:
+        Event observers. Defaults to a logging observer honouring
+        ``--stream-cell-outputs`` and, with ``--live-channel``, a
+        :class:`~.live.LiveChannelPublisher`.
+    :return:
+        Execution summary result.
+    :raise ValueError:
+        When the execution options are inconsistent, see
+        :func:`validate_run_arguments`.
+    """
+
+    execute, execute_kwargs = _build_execution(args)
+    publisher = None
+    if observers is None:
+        observers = [
+            build_logging_observer(
+                logger=logging.getLogger(__name__),
+                stream_cell_outputs=args.stream_cell_outputs,
+            )
+        ]
+        if args.live_channel:
+            publisher = LiveChannelPublisher(args.live_channel_dir)
+            observers.append(publisher)
+
+    try:
+        return execute(args.notebook_path, observers=observers, **execute_kwargs)
+    finally:
+        if publisher is not None:
+            publisher.close()
+
+
+def validate_run_arguments(args: argparse.Namespace) -> None:
+    """Check the run options argparse cannot, before a notebook is executed.
+
+    :param args:
+        Namespace produced by :func:`build_argument_parser`.
+    :raise ValueError:
+        When the execution options are inconsistent.
+    """
+
+    _build_execution(args)
+
+
+def _build_execution(args: argparse.Namespace) -> tuple[Callable[..., NotebookExecutionResult], dict[str, Any]]:
+    """Return the executor of a run and its keyword arguments, validating the options."""
+
+    timeout_policy = None
+    if args.adaptive_timeout:
+        timeout_policy = AdaptiveTimeoutPolicy(
+            history_dir=args.timeout_history_dir,
+            factor=args.timeout_factor,
+            floor_seconds=args.timeout_floor,
+            ceiling_seconds=args.timeout_ceiling,
+        )
+
+    execute = execute_notebook_observable
+    execute_kwargs = {
+        "output_path": args.output_path,
+        "cwd": args.cwd,
+        "kernel_name": args.kernel_name,
+        "kernel_memory_limit_bytes": _gib_to_bytes(args.kernel_memory_limit),
+        "timeout": args.timeout,
+        "timeout_policy": timeout_policy,
+        "allow_errors": args.allow_errors,
+        "save_every_cell": args.save_every_cell,
+    }
+    if args.parallel_sections:
+        if args.max_parallel_sections is not None and args.max_parallel_sections <= 0:
+            raise ValueError("--max-parallel-sections must be positive")
+        execute = execute_notebook_sections
+        execute_kwargs["max_parallel_sections"] = args.max_parallel_sections
+    return execute, execute_kwargs
+
+
+def build_queue_argument_parser() -> argparse.ArgumentParser:
+    """Create the parser for the job-queue subcommands.
+
+    Example:
+
+    .. code-block:: shell
+
+        poetry run jupyter-execute-agent submit notebooks/demo.ipynb --priority 10 --timeout 600
+        poetry run jupyter-execute-agent worker --concurrency 2 --memory-budget 48
+        poetry run jupyter-execute-agent queue --json
+        poetry run jupyter-execute-agent cancel 42
+
+    :return:
+        Configured argument parser.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="jupyter-execute-agent",
+        description="Queue notebook runs and execute them with worker daemons.",
+    )
+    parser.add_argument(
+        "--queue",
+        dest="queue_path",
+        type=Path,
+        default=DEFAULT_QUEUE_PATH,
+        help=f"Queue database path. Default: {DEFAULT_QUEUE_PATH}.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit = subparsers.add_parser(
+        "submit",
+        help="Add a notebook run to the queue.",
+        description="Add a notebook run to the queue. Accepts every notebook run option.",
+    )
+    submit.add_argument("notebook_path", type=Path, help="Notebook file to execute.")
+    submit.add_argument("--priority", type=int, default=0, help="Larger values run first. Default: 0.")
+    submit.add_argument(
+        "--preemptible",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Allow higher-priority jobs to stop and requeue this job. Default: true.",
+    )
+    add_execution_arguments(submit)
+    submit.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging level for the job's progress events. Default: INFO.",
+    )
+
+    worker = subparsers.add_parser("worker", help="Run a worker daemon that executes queued jobs.")
+    worker.add_argument("--concurrency", type=int, default=1, help="Jobs run at once by this worker. Default: 1.")
+    worker.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        help=(
+            "Host-wide GiB of kernel memory that running jobs of all workers may "
+            "reserve. Use 0 for no limit. Default: physical memory."
+        ),
+    )
+    worker.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between queue polls. Default: 2.")
+    worker.add_argument(
+        "--stop-grace",
+        type=float,
+        default=30.0,
+        help="Seconds a cancelled or preempted job gets to shut its kernel down. Default: 30.",
+    )
+    worker.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging level for the worker. Default: INFO.",
+    )
+
+    status = subparsers.add_parser("queue", help="Show queued and running jobs with queue metrics.")
+    status.add_argument("--json", action="store_true", help="Print machine-readable JSON.")
+    status.add_argument("--limit", type=int, default=50, help="Maximum number of jobs listed. Default: 50.")
+
+    cancel = subparsers.add_parser("cancel", help="Cancel a queued or running job.")
+    cancel.add_argument("job_ids", type=int, nargs="+", help="Job ids to cancel.")
     return parser
 
 
+def queue_main(argv: list[str]) -> int:
+    """Run one job-queue subcommand.
+
+    :param argv:
+        Argument vector starting with the subcommand name.
+    :return:
+        Process exit code.
+    """
+
+    parser = build_queue_argument_parser()
+    args = parser.parse_args(argv)
+    queue = NotebookJobQueue(args.queue_path)
+
+    if args.command == "submit":
+        run_args = argv[argv.index("submit") + 1 :]
+        run_args = _strip_queue_options(run_args)
+        # Validate the run options now rather than in the worker.
+        run_namespace = build_argument_parser().parse_args(run_args)
+        try:
+            validate_run_arguments(run_namespace)
+        except ValueError as exc:
+            parser.error(str(exc))
+        notebook_path = run_namespace.notebook_path
+        if not notebook_path.is_file():
+            parser.error(f"Notebook not found: {notebook_path}")
+        memory_bytes = _gib_to_bytes(args.kernel_memory_limit) or DEFAULT_KERNEL_MEMORY_LIMIT_BYTES
+        if args.parallel_sections:
+            plan = plan_notebook_sections(load_notebook_document(notebook_path))
+            section_kernels = min(len(plan.sections), args.max_parallel_sections or len(plan.sections))
+            memory_bytes *= 1 + section_kernels
+        job_id = queue.submit(
+            notebook_path,
+            arguments=_remove_first(run_args, notebook_path),
+            priority=args.priority,
+            memory_bytes=memory_bytes,
+            preemptible=args.preemptible,
+        )
+        print(job_id)
+        return 0
+
+    if args.command == "worker":
+        logging.basicConfig(level=getattr(logging, args.log_level), format="%(asctime)s %(message)s")
+        from .worker import NotebookQueueWorker
+
+        if args.memory_budget is None:
+            memory_budget_bytes = get_host_memory_bytes()
+        else:
+            memory_budget_bytes = _gib_to_bytes(args.memory_budget)
+        try:
+            worker = NotebookQueueWorker(
+                queue,
+                concurrency=args.concurrency,
+                memory_budget_bytes=memory_budget_bytes,
+                poll_interval_seconds=args.poll_interval,
+                stop_grace_seconds=args.stop_grace,
+            )
+        except ValueError as exc:
+            parser.error(str(exc))
+        worker.run_forever()
+        return 0
+
+    if args.command == "queue":
+        metrics = queue.get_metrics()
+        jobs = queue.list_jobs(statuses=["running", "queued"], limit=args.limit)
+        if args.json:
+            document = {
+                "metrics": metrics,
+                "jobs": [
+                    {
+                        "job_id": job.job_id,
+                        "status": job.status,
+                        "priority": job.priority,
+                        "notebook_path": str(job.notebook_path),
+                        "enqueued_at": job.enqueued_at.isoformat(),
+                        "started_at": job.started_at.isoformat() if job.started_at else None,
+                        "worker_id": job.worker_id,
+                        "attempts": job.attempts,
+                        "stop_requested": job.stop_requested,
+                    }
+                    for job in jobs
+                ],
+            }
+            print(json.dumps(document, indent=2))
+            return 0
+        wait = metrics["wait_seconds"]
+        print(
+            f"queue_depth={metrics['queue_depth']} running={metrics['running']} "
+            f"wait_p50={_format_seconds(wait['p50'])} wait_p95={_format_seconds(wait['p95'])} "
+            f"oldest_queued={_format_seconds(metrics['oldest_queued_wait_seconds'])}"
+        )
+        for job in jobs:
+            print(f"{job.job_id:>6} {job.status:<8} priority={job.priority:<4} attempts={job.attempts} {job.notebook_path}")
+        return 0
+
+    if args.command == "cancel":
+        exit_code = 0
+        for job_id in args.job_ids:
+            if not queue.request_stop(job_id, "cancel"):
+                print(f"Job {job_id} is not queued or running", file=sys.stderr)
+                exit_code = 1
+        return exit_code
+
+    parser.error(f"Unknown command: {args.command}")
+    return 2
+
+
 def main(argv: list[str] | None = None) -> int:
     """Run the observable notebook CLI.
 
+    The first argument may be a job-queue subcommand (``submit``,
+    ``worker``, ``queue`` or ``cancel``); otherwise the notebook is executed
+    directly.
+
     Example:
 
     .. code-block:: shell
@@ -100,6 +483,11 @@ def main(argv: list[str] | None = None) -> int:
         Process exit code, where ``0`` means success.
     """
 
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and (argv[0] in QUEUE_COMMANDS or argv[0] == "--queue"):
+        return queue_main(argv)
+
     parser = build_argument_parser()
     args = parser.parse_args(argv)
 
@@ -108,23 +496,54 @@ def main(argv: list[str] | None = None) -> int:
         format="%(message)s",
     )
 
-    execute_notebook_observable(
-        args.notebook_path,
-        output_path=args.output_path,
-        cwd=args.cwd,
-        kernel_name=args.kernel_name,
-        timeout=args.timeout,
-        allow_errors=args.allow_errors,
-        save_every_cell=args.save_every_cell,
-        observers=[
-            build_logging_observer(
-                logger=logging.getLogger(__name__),
-                stream_cell_outputs=args.stream_cell_outputs,
-            )
-        ],
-    )
+    try:
+        validate_run_arguments(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+    execute_from_arguments(args)
     return 0
 
 
+def _gib_to_bytes(value: float | None) -> int | None:
+    """Convert a GiB option to bytes, mapping ``0`` and ``None`` to no limit."""
+
+    if not value:
+        return None
+    if value < 0:
+        raise ValueError("Memory sizes must not be negative")
+    return int(value * 1024**3)
+
+
+def _strip_queue_options(arguments: list[str]) -> list[str]:
+    """Remove ``submit``-only options so the rest parse as run arguments."""
+
+    stripped = []
+    skip_next = False
+    for argument in arguments:
+        if skip_next:
+            skip_next = False
+            continue
+        if argument in ("--preemptible", "--no-preemptible") or argument.startswith("--priority="):
+            continue
+        if argument == "--priority":
+            skip_next = True
+            continue
+        stripped.append(argument)
+    return stripped
+
+
+def _remove_first(arguments: list[str], notebook_path: Path) -> list[str]:
+    """Drop the notebook path token; the queue stores it in its own column."""
+
+    for index, argument in enumerate(arguments):
+        if Path(argument) == notebook_path:
+            return arguments[:index] + arguments[index + 1 :]
+    return arguments
+
+
+def _format_seconds(value: float | None) -> str:
+    return f"{value:.0f}s" if value is not None else "-"
+
+
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv[1:]))
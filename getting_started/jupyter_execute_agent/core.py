@@ -15,6 +15,7 @@ import os
 import re
 import subprocess
 import sys
+import threading
 import time
 from pathlib import Path
 from typing import Any, Callable, Iterator, Literal, Sequence
@@ -26,6 +27,11 @@ from nbclient.client import output_from_msg
 from nbclient.exceptions import CellExecutionError
 from nbformat import NotebookNode
 
+from .timeouts import AdaptiveTimeoutPolicy
+from .timeouts import CellRuntimeHistory
+from .timeouts import build_cell_history_key
+from .timeouts import resolve_cell_timeout
+
 
 EventKind = Literal[
     "notebook_started",
@@ -102,6 +108,13 @@ class NotebookExecutionEvent:
         Jupyter error name for failed cells, if available.
     :ivar error_value:
         Jupyter error value for failed cells, if available.
+    :ivar timeout_seconds:
+        Timeout applied to the cell for ``"cell_started"`` events, or ``None``
+        when the cell runs without a timeout.
+    :ivar section:
+        Notebook section the cell belongs to when sections execute in
+        parallel kernels, or ``None`` for the shared setup prefix and
+        sequential runs.
     """
 
     kind: EventKind
@@ -119,6 +132,8 @@ class NotebookExecutionEvent:
     output_type: str | None = None
     error_name: str | None = None
     error_value: str | None = None
+    timeout_seconds: int | None = None
+    section: str | None = None
 
 
 @dataclass(slots=True, frozen=True)
@@ -200,6 +215,7 @@ class ObservableNotebookClient(NotebookClient):
         self._output_observer = output_observer
         self._kernel_memory_limit_bytes = kernel_memory_limit_bytes
         self._widget_progress_tracker = _WidgetProgressTracker()
+        self._output_previews: dict[int, _OutputPreviewBuilder] = {}
 
     def create_kernel_manager(self) -> KernelManager:
         """Create a kernel manager configured for observable execution.
@@ -226,6 +242,8 @@ class ObservableNotebookClient(NotebookClient):
         """Process a kernel message and notify callers about new outputs."""
 
         output = super().process_message(msg, cell, cell_index)
+        if output is not None:
+            self._track_output_preview(output, cell, cell_index)
         if output is not None and self._output_observer is not None:
             self._output_observer(output, cell_index)
         if self._output_observer is not None:
@@ -234,6 +252,38 @@ class ObservableNotebookClient(NotebookClient):
                 self._output_observer(live_output, cell_index)
         return output
 
+    def build_output_preview(self, cell: NotebookNode, cell_index: int) -> str | None:
+        """Return the completion preview of a cell this client executed.
+
+        Uses the preview maintained while the outputs arrived, so the cost
+        does not grow with the number of outputs. The result is identical to
+        :func:`_build_output_preview`.
+
+        :param cell:
+            Executed cell node.
+        :param cell_index:
+            Zero-based absolute cell index.
+        :return:
+            Output preview text or ``None`` if the cell has no text-like outputs.
+        """
+
+        builder = self._output_previews.pop(cell_index, None)
+        if builder is None:
+            return _build_output_preview(cell)
+        return builder.build(cell)
+
+    def _track_output_preview(self, output: NotebookNode, cell: NotebookNode, cell_index: int) -> None:
+        """Feed an output appended by nbclient to the cell's preview builder."""
+
+        outputs = cell.get("outputs")
+        if not isinstance(outputs, list):
+            return
+        builder = self._output_previews.get(cell_index)
+        if builder is None or builder.outputs is not outputs:
+            # nbclient starts every execution with a fresh outputs list.
+            builder = self._output_previews[cell_index] = _OutputPreviewBuilder(outputs)
+        builder.add(output, len(outputs) - 1)
+
     def _build_live_output_from_message(
         self,
         msg: dict[str, Any],
@@ -270,6 +320,87 @@ class ObservableNotebookClient(NotebookClient):
         return None
 
 
+class _OutputPreviewBuilder:
+    """Completion preview of one cell, maintained as its outputs arrive.
+
+    :func:`_build_output_preview` walks every output of a cell, which gets
+    slow for cells printing tens of thousands of stream chunks. The preview
+    only ever shows the head of the joined output text, so once enough
+    fragments are collected to fill ``max_chars`` later outputs only advance
+    a counter.
+
+    Outputs changed behind the builder's back (display updates, stream
+    coalescing, outputs replaced by hooks) are detected in :meth:`build`,
+    which then falls back to a full walk.
+    """
+
+    def __init__(self, outputs: list[NotebookNode], *, max_chars: int = 240) -> None:
+        self.outputs = outputs
+        self.max_chars = max_chars
+        self._tracked: list[tuple[NotebookNode, tuple[object, ...]]] = []
+        self._fragments: list[str] = []
+        self._length = 0
+        self._count = 0
+        self._saturated = False
+        self._valid = True
+
+    def add(self, output: NotebookNode, output_index: int) -> None:
+        """Record an output appended at ``output_index``.
+
+        :param output:
+            Output node appended to :attr:`outputs`.
+        :param output_index:
+            Position of the output in :attr:`outputs`.
+        """
+
+        if output_index != self._count:
+            if output_index != 0:
+                self._valid = False
+            else:
+                # clear_output() emptied the list before this output.
+                self._tracked.clear()
+                self._fragments.clear()
+                self._length = 0
+                self._saturated = False
+                self._valid = True
+        self._count = output_index + 1
+        if self._saturated or not self._valid:
+            return
+
+        self._tracked.append((output, _get_preview_payload(output)))
+        fragment = _build_single_output_preview(output, max_chars=self.max_chars)
+        if fragment is None:
+            return
+        self._length += len(fragment) + (len(_PREVIEW_SEPARATOR) if self._fragments else 0)
+        self._fragments.append(fragment)
+        self._saturated = self._length > self.max_chars
+
+    def build(self, cell: NotebookNode) -> str | None:
+        """Return the preview for the cell's current outputs.
+
+        :param cell:
+            Cell node owning :attr:`outputs`.
+        :return:
+            Output preview text or ``None`` if the cell has no text-like outputs.
+        """
+
+        outputs = cell.get("outputs", [])
+        if not self._is_current(outputs):
+            return _build_output_preview(cell, max_chars=self.max_chars)
+        return _truncate_preview(_PREVIEW_SEPARATOR.join(self._fragments), self.max_chars)
+
+    def _is_current(self, outputs: list[NotebookNode]) -> bool:
+        if not self._valid or outputs is not self.outputs or len(outputs) != self._count:
+            return False
+        for index, (output, payload) in enumerate(self._tracked):
+            current = outputs[index]
+            if current is not output:
+                return False
+            if any(old is not new for old, new in zip(payload, _get_preview_payload(current), strict=True)):
+                return False
+        return True
+
+
 class MemoryLimitedKernelManager(KernelManager):
     """Kernel manager that applies an optional local-process memory cap."""
 
@@ -570,6 +701,7 @@ def execute_notebook_observable(
     kernel_name: str = "python3",
     kernel_memory_limit_bytes: int | None = DEFAULT_KERNEL_MEMORY_LIMIT_BYTES,
     timeout: int | None = None,
+    timeout_policy: AdaptiveTimeoutPolicy | None = None,
     allow_errors: bool = False,
     save_every_cell: bool = True,
     observers: Sequence[NotebookExecutionObserver] = (),
@@ -615,7 +747,13 @@ def execute_notebook_observable(
         starts, when the operating system shell supports virtual-memory
         limits. Defaults to 24 GiB. Use ``None`` to disable the cap.
     :param timeout:
-        Per-cell timeout in seconds. ``None`` uses nbclient defaults.
+        Per-cell timeout in seconds. ``None`` uses nbclient defaults. Used for
+        cells without an adaptive or metadata timeout.
+    :param timeout_policy:
+        Optional adaptive timeout rules. When given, each cell's timeout is
+        derived from its stored runtime history and the history is updated
+        with the runtimes of this run. Explicit ``execution_agent.timeout``
+        cell metadata always takes precedence.
     :param allow_errors:
         Forwarded to nbclient. If ``False``, execution stops on the first cell
         error and re-raises ``CellExecutionError`` after saving the notebook.
@@ -630,219 +768,361 @@ def execute_notebook_observable(
         Execution summary result.
     """
 
-    source_path = notebook_path.resolve()
-    final_output_path = output_path.resolve() if output_path else source_path
-    notebook = load_notebook_document(source_path)
-    total_code_cells = sum(1 for _ in iter_code_cells(notebook))
-    active_cwd = (cwd or source_path.parent).resolve()
-    started_at = _utc_now()
-    start_perf = time.perf_counter()
-    observer_tuple = tuple(observers)
-    _validate_kernel_memory_limit(kernel_memory_limit_bytes)
-
-    _notify(
-        observer_tuple,
-        NotebookExecutionEvent(
-            kind="notebook_started",
-            notebook_path=source_path,
-            output_path=final_output_path,
-            total_code_cells=total_code_cells,
-            started_at=started_at,
-        ),
+    run = _NotebookRun(
+        notebook_path,
+        output_path=output_path,
+        cwd=cwd,
+        kernel_name=kernel_name,
+        kernel_memory_limit_bytes=kernel_memory_limit_bytes,
+        timeout=timeout,
+        timeout_policy=timeout_policy,
+        allow_errors=allow_errors,
+        save_every_cell=save_every_cell,
+        observers=observers,
+        client_kwargs=client_kwargs,
     )
+    run.start()
+    client = run.create_client(run.notebook)
+    try:
+        with client.setup_kernel():
+            for cell_index, code_cell_index, cell in iter_code_cells(run.notebook):
+                run.execute_code_cell(client, cell, cell_index, code_cell_index)
+    finally:
+        run.close()
+    return run.complete()
 
-    cell_labels: dict[int, str] = {}
-    code_cell_indexes: dict[int, int] = {}
-    for cell_index, code_cell_index, cell in iter_code_cells(notebook):
-        cell_labels[cell_index] = build_cell_label(cell, cell_index)
-        code_cell_indexes[cell_index] = code_cell_index
 
-    def _notify_live_output(output: NotebookNode, cell_index: int) -> None:
-        output_preview = _build_single_output_preview(output)
-        if output_preview is None:
-            return
-        _notify(
-            observer_tuple,
+class _NotebookRun:
+    """Shared state and event plumbing for one observable notebook run.
+
+    The sequential runner and the parallel section runner both execute cells
+    through :meth:`execute_code_cell`, so events, timeouts, runtime history
+    and partial saves behave identically. Event dispatch and saves are
+    serialised with locks because section kernels report from worker threads.
+    """
+
+    def __init__(
+        self,
+        notebook_path: Path,
+        *,
+        output_path: Path | None,
+        cwd: Path | None,
+        kernel_name: str,
+        kernel_memory_limit_bytes: int | None,
+        timeout: int | None,
+        timeout_policy: AdaptiveTimeoutPolicy | None,
+        allow_errors: bool,
+        save_every_cell: bool,
+        observers: Sequence[NotebookExecutionObserver],
+        client_kwargs: dict[str, Any] | None,
+    ) -> None:
+        _validate_kernel_memory_limit(kernel_memory_limit_bytes)
+        self.source_path = notebook_path.resolve()
+        self.output_path = output_path.resolve() if output_path else self.source_path
+        self.notebook = load_notebook_document(self.source_path)
+        self.total_code_cells = sum(1 for _ in iter_code_cells(self.notebook))
+        self.cwd = (cwd or self.source_path.parent).resolve()
+        self.kernel_name = kernel_name
+        self.kernel_memory_limit_bytes = kernel_memory_limit_bytes
+        self.timeout = timeout
+        self.timeout_policy = timeout_policy
+        self.allow_errors = allow_errors
+        self.save_every_cell = save_every_cell
+        self.observers = tuple(observers)
+        self.client_kwargs = client_kwargs or {}
+        self.runtime_history = (
+            CellRuntimeHistory.load(
+                timeout_policy.history_path_for(self.source_path),
+                max_samples=timeout_policy.max_samples,
+            )
+            if timeout_policy is not None
+            else None
+        )
+        self.cell_labels: dict[int, str] = {}
+        self.code_cell_indexes: dict[int, int] = {}
+        for cell_index, code_cell_index, cell in iter_code_cells(self.notebook):
+            self.cell_labels[cell_index] = build_cell_label(cell, cell_index)
+            self.code_cell_indexes[cell_index] = code_cell_index
+        self.cell_records: list[NotebookCellRecord] = []
+        self.started_at = _utc_now()
+        self.start_perf = time.perf_counter()
+        self._notify_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def notify(self, event: NotebookExecutionEvent) -> None:
+        """Dispatch one event to all observers, one event at a time."""
+
+        with self._notify_lock:
+            _notify(self.observers, event)
+
+    def start(self) -> None:
+        """Emit the ``notebook_started`` event."""
+
+        self.notify(
             NotebookExecutionEvent(
-                kind="cell_output",
-                notebook_path=source_path,
-                output_path=final_output_path,
+                kind="notebook_started",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
+                total_code_cells=self.total_code_cells,
+                started_at=self.started_at,
+            )
+        )
+
+    def create_client(
+        self,
+        notebook: NotebookNode,
+        *,
+        section: str | None = None,
+        muted_cells: frozenset[int] = frozenset(),
+    ) -> "ObservableNotebookClient":
+        """Create a notebook client whose live outputs become events.
+
+        :param notebook:
+            Document the client executes. Section kernels run on private
+            copies whose finished cells are merged into :attr:`notebook`.
+        :param section:
+            Section name reported on live output events.
+        :param muted_cells:
+            Cell indexes whose live outputs are not reported, used when a
+            section kernel silently replays the setup prefix.
+        :return:
+            Configured client; the kernel is started by ``setup_kernel()``.
+        """
+
+        def _notify_live_output(output: NotebookNode, cell_index: int) -> None:
+            if cell_index in muted_cells:
+                return
+            output_preview = _build_single_output_preview(output)
+            if output_preview is None:
+                return
+            self.notify(
+                NotebookExecutionEvent(
+                    kind="cell_output",
+                    notebook_path=self.source_path,
+                    output_path=self.output_path,
+                    cell_index=cell_index,
+                    code_cell_index=self.code_cell_indexes.get(cell_index),
+                    total_code_cells=self.total_code_cells,
+                    cell_label=self.cell_labels.get(cell_index),
+                    finished_at=_utc_now(),
+                    execution_count=_coerce_execution_count(notebook.cells[cell_index]),
+                    output_preview=output_preview,
+                    output_type=str(output.get("output_type", "")) or None,
+                    section=section,
+                )
+            )
+
+        return ObservableNotebookClient(
+            notebook,
+            timeout=self.timeout,
+            kernel_name=self.kernel_name,
+            allow_errors=self.allow_errors,
+            resources={"metadata": {"path": str(self.cwd)}},
+            output_observer=_notify_live_output,
+            kernel_memory_limit_bytes=self.kernel_memory_limit_bytes,
+            **self.client_kwargs,
+        )
+
+    def resolve_timeout(self, cell: NotebookNode) -> int | None:
+        """Return the timeout applied to one code cell."""
+
+        return resolve_cell_timeout(
+            cell,
+            default_timeout=self.timeout,
+            policy=self.timeout_policy,
+            history=self.runtime_history,
+        )
+
+    def execute_code_cell(
+        self,
+        client: ObservableNotebookClient,
+        cell: NotebookNode,
+        cell_index: int,
+        code_cell_index: int,
+        *,
+        section: str | None = None,
+    ) -> NotebookCellRecord:
+        """Execute one code cell with lifecycle events and partial saves.
+
+        Failed cells are merged and saved before the original
+        ``CellExecutionError`` is re-raised.
+
+        :param client:
+            Client with a running kernel.
+        :param cell:
+            Cell node inside the client's notebook.
+        :param cell_index:
+            Zero-based absolute cell index.
+        :param code_cell_index:
+            One-based code-cell position, also used as the execution count.
+        :param section:
+            Section name reported on events, if any.
+        :return:
+            Record of the completed cell.
+        """
+
+        label = self.cell_labels[cell_index]
+        cell_timeout = self.resolve_timeout(cell)
+        client.timeout = cell_timeout
+        cell_started_at = _utc_now()
+        cell_start_perf = time.perf_counter()
+        self.notify(
+            NotebookExecutionEvent(
+                kind="cell_started",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
+                cell_index=cell_index,
+                code_cell_index=code_cell_index,
+                total_code_cells=self.total_code_cells,
+                cell_label=label,
+                started_at=cell_started_at,
+                timeout_seconds=cell_timeout,
+                section=section,
+            )
+        )
+        try:
+            client.execute_cell(
+                cell,
+                cell_index,
+                execution_count=code_cell_index,
+            )
+        except CellExecutionError:
+            cell_elapsed = time.perf_counter() - cell_start_perf
+            output_preview = client.build_output_preview(cell, cell_index)
+            failure_event = NotebookExecutionEvent(
+                kind="cell_failed",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
                 cell_index=cell_index,
-                code_cell_index=code_cell_indexes.get(cell_index),
-                total_code_cells=total_code_cells,
-                cell_label=cell_labels.get(cell_index),
+                code_cell_index=code_cell_index,
+                total_code_cells=self.total_code_cells,
+                cell_label=label,
+                started_at=cell_started_at,
                 finished_at=_utc_now(),
-                execution_count=_coerce_execution_count(notebook.cells[cell_index]),
+                elapsed_seconds=cell_elapsed,
+                execution_count=_coerce_execution_count(cell),
                 output_preview=output_preview,
-                output_type=str(output.get("output_type", "")) or None,
-            ),
+                error_name=_extract_error_name(cell),
+                error_value=_extract_error_value(cell),
+                section=section,
+            )
+            self.cell_records.append(
+                NotebookCellRecord(
+                    cell_index=cell_index,
+                    code_cell_index=code_cell_index,
+                    label=label,
+                    status="failed",
+                    elapsed_seconds=cell_elapsed,
+                    execution_count=_coerce_execution_count(cell),
+                    output_preview=output_preview,
+                )
+            )
+            self.notebook.cells[cell_index] = cell
+            self.save(section=section)
+            self.notify(failure_event)
+            raise
+
+        cell_elapsed = time.perf_counter() - cell_start_perf
+        if self.runtime_history is not None:
+            self.runtime_history.record(build_cell_history_key(cell), cell_elapsed)
+        output_preview = client.build_output_preview(cell, cell_index)
+        record = NotebookCellRecord(
+            cell_index=cell_index,
+            code_cell_index=code_cell_index,
+            label=label,
+            status="completed",
+            elapsed_seconds=cell_elapsed,
+            execution_count=_coerce_execution_count(cell),
+            output_preview=output_preview,
         )
+        self.cell_records.append(record)
+        self.notebook.cells[cell_index] = cell
+        self.notify(
+            NotebookExecutionEvent(
+                kind="cell_completed",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
+                cell_index=cell_index,
+                code_cell_index=code_cell_index,
+                total_code_cells=self.total_code_cells,
+                cell_label=label,
+                started_at=cell_started_at,
+                finished_at=_utc_now(),
+                elapsed_seconds=cell_elapsed,
+                execution_count=_coerce_execution_count(cell),
+                output_preview=output_preview,
+                section=section,
+            )
+        )
+        if self.save_every_cell:
+            self.save(
+                cell_index=cell_index,
+                code_cell_index=code_cell_index,
+                cell_label=label,
+                section=section,
+            )
+        return record
 
-    client = ObservableNotebookClient(
-        notebook,
-        timeout=timeout,
-        kernel_name=kernel_name,
-        allow_errors=allow_errors,
-        resources={"metadata": {"path": str(active_cwd)}},
-        output_observer=_notify_live_output,
-        kernel_memory_limit_bytes=kernel_memory_limit_bytes,
-        **(client_kwargs or {}),
-    )
-
-    cell_records: list[NotebookCellRecord] = []
-    executed_code_cells = 0
+    def save(
+        self,
+        *,
+        cell_index: int | None = None,
+        code_cell_index: int | None = None,
+        cell_label: str | None = None,
+        section: str | None = None,
+    ) -> None:
+        """Save :attr:`notebook` and emit ``notebook_saved``."""
 
-    try:
-        with client.setup_kernel():
-            for cell_index, code_cell_index, cell in iter_code_cells(notebook):
-                label = cell_labels[cell_index]
-                cell_started_at = _utc_now()
-                cell_start_perf = time.perf_counter()
-                _notify(
-                    observer_tuple,
-                    NotebookExecutionEvent(
-                        kind="cell_started",
-                        notebook_path=source_path,
-                        output_path=final_output_path,
-                        cell_index=cell_index,
-                        code_cell_index=code_cell_index,
-                        total_code_cells=total_code_cells,
-                        cell_label=label,
-                        started_at=cell_started_at,
-                    ),
-                )
-                try:
-                    client.execute_cell(
-                        cell,
-                        cell_index,
-                        execution_count=code_cell_index,
-                    )
-                except CellExecutionError:
-                    cell_elapsed = time.perf_counter() - cell_start_perf
-                    failure_event = NotebookExecutionEvent(
-                        kind="cell_failed",
-                        notebook_path=source_path,
-                        output_path=final_output_path,
-                        cell_index=cell_index,
-                        code_cell_index=code_cell_index,
-                        total_code_cells=total_code_cells,
-                        cell_label=label,
-                        started_at=cell_started_at,
-                        finished_at=_utc_now(),
-                        elapsed_seconds=cell_elapsed,
-                        execution_count=_coerce_execution_count(cell),
-                        output_preview=_build_output_preview(cell),
-                        error_name=_extract_error_name(cell),
-                        error_value=_extract_error_value(cell),
-                    )
-                    cell_records.append(
-                        NotebookCellRecord(
-                            cell_index=cell_index,
-                            code_cell_index=code_cell_index,
-                            label=label,
-                            status="failed",
-                            elapsed_seconds=cell_elapsed,
-                            execution_count=_coerce_execution_count(cell),
-                            output_preview=_build_output_preview(cell),
-                        )
-                    )
-                    save_notebook_document(notebook, final_output_path)
-                    _notify(
-                        observer_tuple,
-                        NotebookExecutionEvent(
-                            kind="notebook_saved",
-                            notebook_path=source_path,
-                            output_path=final_output_path,
-                            total_code_cells=total_code_cells,
-                            finished_at=_utc_now(),
-                        ),
-                    )
-                    _notify(observer_tuple, failure_event)
-                    raise
-
-                cell_elapsed = time.perf_counter() - cell_start_perf
-                executed_code_cells += 1
-                cell_records.append(
-                    NotebookCellRecord(
-                        cell_index=cell_index,
-                        code_cell_index=code_cell_index,
-                        label=label,
-                        status="completed",
-                        elapsed_seconds=cell_elapsed,
-                        execution_count=_coerce_execution_count(cell),
-                        output_preview=_build_output_preview(cell),
-                    )
-                )
-                _notify(
-                    observer_tuple,
-                    NotebookExecutionEvent(
-                        kind="cell_completed",
-                        notebook_path=source_path,
-                        output_path=final_output_path,
-                        cell_index=cell_index,
-                        code_cell_index=code_cell_index,
-                        total_code_cells=total_code_cells,
-                        cell_label=label,
-                        started_at=cell_started_at,
-                        finished_at=_utc_now(),
-                        elapsed_seconds=cell_elapsed,
-                        execution_count=_coerce_execution_count(cell),
-                        output_preview=_build_output_preview(cell),
-                    ),
-                )
-                if save_every_cell:
-                    save_notebook_document(notebook, final_output_path)
-                    _notify(
-                        observer_tuple,
-                        NotebookExecutionEvent(
-                            kind="notebook_saved",
-                            notebook_path=source_path,
-                            output_path=final_output_path,
-                            cell_index=cell_index,
-                            code_cell_index=code_cell_index,
-                            total_code_cells=total_code_cells,
-                            cell_label=label,
-                            finished_at=_utc_now(),
-                        ),
-                    )
-    finally:
-        if not save_every_cell:
-            save_notebook_document(notebook, final_output_path)
-            _notify(
-                observer_tuple,
-                NotebookExecutionEvent(
-                    kind="notebook_saved",
-                    notebook_path=source_path,
-                    output_path=final_output_path,
-                    total_code_cells=total_code_cells,
-                    finished_at=_utc_now(),
-                ),
+        with self._save_lock:
+            save_notebook_document(self.notebook, self.output_path)
+        self.notify(
+            NotebookExecutionEvent(
+                kind="notebook_saved",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
+                cell_index=cell_index,
+                code_cell_index=code_cell_index,
+                total_code_cells=self.total_code_cells,
+                cell_label=cell_label,
+                finished_at=_utc_now(),
+                section=section,
             )
+        )
 
-    finished_at = _utc_now()
-    result = NotebookExecutionResult(
-        notebook_path=source_path,
-        output_path=final_output_path,
-        started_at=started_at,
-        finished_at=finished_at,
-        total_elapsed_seconds=time.perf_counter() - start_perf,
-        total_code_cells=total_code_cells,
-        executed_code_cells=executed_code_cells,
-        cell_records=tuple(cell_records),
-    )
-    _notify(
-        observer_tuple,
-        NotebookExecutionEvent(
-            kind="notebook_completed",
-            notebook_path=source_path,
-            output_path=final_output_path,
-            total_code_cells=total_code_cells,
-            started_at=started_at,
+    def close(self) -> None:
+        """Persist runtime history and the final notebook state."""
+
+        if self.runtime_history is not None:
+            self.runtime_history.save(notebook_path=self.source_path)
+        if not self.save_every_cell:
+            self.save()
+
+    def complete(self) -> NotebookExecutionResult:
+        """Emit ``notebook_completed`` and build the run summary."""
+
+        finished_at = _utc_now()
+        result = NotebookExecutionResult(
+            notebook_path=self.source_path,
+            output_path=self.output_path,
+            started_at=self.started_at,
             finished_at=finished_at,
-            elapsed_seconds=result.total_elapsed_seconds,
-        ),
-    )
-    return result
+            total_elapsed_seconds=time.perf_counter() - self.start_perf,
+            total_code_cells=self.total_code_cells,
+            executed_code_cells=sum(1 for record in self.cell_records if record.status == "completed"),
+            cell_records=tuple(self.cell_records),
+        )
+        self.notify(
+            NotebookExecutionEvent(
+                kind="notebook_completed",
+                notebook_path=self.source_path,
+                output_path=self.output_path,
+                total_code_cells=self.total_code_cells,
+                started_at=self.started_at,
+                finished_at=finished_at,
+                elapsed_seconds=result.total_elapsed_seconds,
+            )
+        )
+        return result
 
 
 def _notify(
@@ -976,6 +1256,10 @@ def _coerce_execution_count(cell: NotebookNode) -> int | None:
     return int(execution_count) if execution_count is not None else None
 
 
+#: Separator between per-output fragments in a cell preview.
+_PREVIEW_SEPARATOR = " | "
+
+
 def _build_output_preview(cell: NotebookNode, *, max_chars: int = 240) -> str | None:
     """Build a compact output preview from a cell's outputs.
 
@@ -992,7 +1276,12 @@ def _build_output_preview(cell: NotebookNode, *, max_chars: int = 240) -> str |
         for output in cell.get("outputs", [])
         if (preview := _build_single_output_preview(output, max_chars=max_chars)) is not None
     ]
-    preview = " | ".join(fragment for fragment in fragments if fragment)
+    return _truncate_preview(_PREVIEW_SEPARATOR.join(fragment for fragment in fragments if fragment), max_chars)
+
+
+def _truncate_preview(preview: str, max_chars: int) -> str | None:
+    """Shorten joined preview text, mapping empty text to ``None``."""
+
     if not preview:
         return None
     if len(preview) <= max_chars:
@@ -1000,6 +1289,26 @@ def _build_output_preview(cell: NotebookNode, *, max_chars: int = 240) -> str |
     return preview[: max_chars - 3] + "..."
 
 
+def _get_preview_payload(output: NotebookNode) -> tuple[object, ...]:
+    """Return the payload objects an output preview is derived from.
+
+    Notebook payload values are replaced rather than mutated when nbclient
+    updates an output, so comparing these objects by identity tells whether
+    a memoised preview fragment is still current.
+    """
+
+    data = output.get("data")
+    text_plain = data.get("text/plain") if isinstance(data, dict) else None
+    return (
+        output.get("output_type"),
+        output.get("text"),
+        data,
+        text_plain,
+        output.get("traceback"),
+        output.get("evalue"),
+    )
+
+
 def _build_single_output_preview(output: NotebookNode, *, max_chars: int = 500) -> str | None:
     """Build a compact preview from one Jupyter output payload.
 
@@ -33,18 +33,29 @@ def format_execution_event(event: NotebookExecutionEvent) -> str:
     :param event:
         Structured notebook execution event.
     :return:
-        Single-line human-readable message.
+        Single-line human-readable message, prefixed with ``[<section>]`` for
+        events from parallel notebook sections.
     """
 
+    message = _format_event_message(event)
+    if event.section:
+        return f"[{event.section}] {message}"
+    return message
+
+
+def _format_event_message(event: NotebookExecutionEvent) -> str:
+    """Format the section-independent part of an execution event."""
+
     if event.kind == "notebook_started":
         return (
             f"Notebook started path={event.notebook_path} "
             f"code_cells={event.total_code_cells}"
         )
     if event.kind == "cell_started":
+        timeout_text = f"{event.timeout_seconds}s" if event.timeout_seconds else "none"
         return (
             f"Cell started {event.code_cell_index}/{event.total_code_cells} "
-            f"index={event.cell_index} label={event.cell_label}"
+            f"index={event.cell_index} timeout={timeout_text} label={event.cell_label}"
         )
     if event.kind == "cell_output":
         output_suffix = f" output={event.output_preview}" if event.output_preview else ""
@@ -0,0 +1,582 @@
+"""SQLite-backed priority queue for notebook execution jobs.
+
+Cron jobs and people trigger notebook runs on the same research machine.
+Instead of starting kernels directly they submit jobs to a local queue that
+one or more ``jupyter-execute-agent worker`` processes drain by priority.
+
+The queue is a single SQLite database in WAL mode. Every state change runs
+in its own short ``BEGIN IMMEDIATE`` transaction, so several worker
+processes on the same host can claim jobs concurrently without running a job
+twice. Running jobs are heart-beaten by their worker; jobs of a worker that
+died are put back in the queue.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Iterator, Literal, Sequence
+
+from .core import DEFAULT_KERNEL_MEMORY_LIMIT_BYTES
+
+
+JobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+StopReason = Literal["cancel", "preempt"]
+
+#: Default queue database shared by all users of one machine account.
+DEFAULT_QUEUE_PATH = Path.home() / ".cache" / "jupyter-execute-agent" / "queue.sqlite"
+
+#: Number of most recently started jobs used for wait-time metrics.
+_WAIT_METRICS_WINDOW = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    notebook_path TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    working_dir TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    memory_bytes INTEGER NOT NULL,
+    preemptible INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'queued',
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker_id TEXT,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stop_requested TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim_order ON jobs (status, priority DESC, job_id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    concurrency INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+#: Heartbeat age after which a worker's slots no longer count as free.
+DEFAULT_STALE_AFTER_SECONDS = 120.0
+
+__all__ = [
+    "DEFAULT_QUEUE_PATH",
+    "DEFAULT_STALE_AFTER_SECONDS",
+    "JobStatus",
+    "NotebookJob",
+    "NotebookJobQueue",
+    "StopReason",
+    "get_host_memory_bytes",
+]
+
+
+@dataclass(slots=True, frozen=True)
+class NotebookJob:
+    """One queued or finished notebook execution job.
+
+    :ivar job_id:
+        Queue-assigned job id.
+    :ivar notebook_path:
+        Resolved notebook path.
+    :ivar arguments:
+        ``jupyter-execute-agent`` run arguments, excluding the notebook path.
+    :ivar working_dir:
+        Directory the job was submitted from; relative arguments resolve here.
+    :ivar priority:
+        Larger values run first.
+    :ivar memory_bytes:
+        Kernel memory the job reserves from the host memory budget.
+    :ivar preemptible:
+        Whether higher-priority jobs may stop and requeue this job.
+    :ivar status:
+        Current job status.
+    :ivar enqueued_at:
+        UTC time the job was (re)queued.
+    :ivar started_at:
+        UTC time the current or last attempt started.
+    :ivar finished_at:
+        UTC time the job reached a final status.
+    :ivar worker_id:
+        Worker running or last running the job.
+    :ivar attempts:
+        Number of times the job has been started.
+    :ivar stop_requested:
+        Pending ``"cancel"`` or ``"preempt"`` request for a running job.
+    :ivar error:
+        Failure description for failed jobs.
+    """
+
+    job_id: int
+    notebook_path: Path
+    arguments: tuple[str, ...]
+    working_dir: Path
+    priority: int
+    memory_bytes: int
+    preemptible: bool
+    status: JobStatus
+    enqueued_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    worker_id: str | None = None
+    attempts: int = 0
+    stop_requested: StopReason | None = None
+    error: str | None = None
+
+    @property
+    def wait_seconds(self) -> float | None:
+        """Seconds between queueing and the start of the current attempt."""
+
+        if self.started_at is None:
+            return None
+        return (self.started_at - self.enqueued_at).total_seconds()
+
+
+class NotebookJobQueue:
+    """Priority queue of notebook jobs stored in a SQLite database.
+
+    Example:
+
+    .. code-block:: python
+
+        from pathlib import Path
+        from getting_started.jupyter_execute_agent.job_queue import NotebookJobQueue
+
+        queue = NotebookJobQueue()
+        job_id = queue.submit(Path("notebooks/demo.ipynb"), priority=10, arguments=["--timeout", "600"])
+        print(queue.get_metrics()["queue_depth"])
+    """
+
+    def __init__(self, path: Path = DEFAULT_QUEUE_PATH, *, busy_timeout_seconds: float = 30.0) -> None:
+        self.path = path
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived autocommit connection."""
+
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout_seconds, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction that excludes other workers."""
+
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def submit(
+        self,
+        notebook_path: Path,
+        *,
+        arguments: Sequence[str] = (),
+        working_dir: Path | None = None,
+        priority: int = 0,
+        memory_bytes: int = DEFAULT_KERNEL_MEMORY_LIMIT_BYTES,
+        preemptible: bool = True,
+    ) -> int:
+        """Add a notebook job to the queue.
+
+        :param notebook_path:
+            Notebook to execute.
+        :param arguments:
+            Extra ``jupyter-execute-agent`` run arguments.
+        :param working_dir:
+            Directory relative arguments resolve against. Defaults to the
+            current directory.
+        :param priority:
+            Larger values run first.
+        :param memory_bytes:
+            Memory reserved from the host budget while the job runs.
+        :param preemptible:
+            Whether higher-priority jobs may stop and requeue this job.
+        :return:
+            New job id.
+        """
+
+        if memory_bytes <= 0:
+            raise ValueError("memory_bytes must be positive")
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                """
+                INSERT INTO jobs (notebook_path, arguments, working_dir, priority, memory_bytes, preemptible, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    str(notebook_path.resolve()),
+                    json.dumps(list(arguments)),
+                    str((working_dir or Path.cwd()).resolve()),
+                    int(priority),
+                    int(memory_bytes),
+                    int(preemptible),
+                    time.time(),
+                ),
+            )
+            return int(cursor.lastrowid)
+
+    def claim(self, worker_id: str, *, memory_budget_bytes: int | None = None) -> NotebookJob | None:
+        """Atomically take the highest-priority job that fits the memory budget.
+
+        The budget is host-wide: memory reserved by jobs running in any worker
+        counts against it. A job larger than the whole budget may still run
+        when nothing else is running, so it cannot starve. While the
+        highest-priority job waits for memory, only jobs of the same priority
+        may start past it; lower-priority jobs would keep the memory it needs
+        reserved.
+
+        :param worker_id:
+            Id of the claiming worker.
+        :param memory_budget_bytes:
+            Host memory available to running jobs, or ``None`` for no limit.
+        :return:
+            Claimed job, or ``None`` when nothing can start now.
+        """
+
+        now = time.time()
+        with self._transaction() as connection:
+            head = connection.execute("SELECT job_id, priority FROM jobs WHERE status = 'queued' ORDER BY priority DESC, job_id LIMIT 1").fetchone()
+            if head is None:
+                return None
+            running_count, reserved = connection.execute("SELECT COUNT(*), COALESCE(SUM(memory_bytes), 0) FROM jobs WHERE status = 'running'").fetchone()
+            parameters: list[Any] = [head["priority"]]
+            memory_clause = ""
+            if memory_budget_bytes is not None and running_count:
+                memory_clause = "AND memory_bytes <= ?"
+                parameters.append(memory_budget_bytes - reserved)
+            row = connection.execute(
+                f"SELECT job_id FROM jobs WHERE status = 'queued' AND priority >= ? {memory_clause} ORDER BY priority DESC, job_id LIMIT 1",
+                parameters,
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', started_at = ?, heartbeat_at = ?, worker_id = ?,
+                    attempts = attempts + 1, stop_requested = NULL, error = NULL
+                WHERE job_id = ?
+                """,
+                (now, now, worker_id, row["job_id"]),
+            )
+            return self._fetch(connection, row["job_id"])
+
+    def finish(self, job_id: int, status: JobStatus, *, error: str | None = None) -> None:
+        """Record the final status of a job.
+
+        :param job_id:
+            Job id.
+        :param status:
+            ``"completed"``, ``"failed"`` or ``"cancelled"``.
+        :param error:
+            Failure description.
+        """
+
+        if status not in ("completed", "failed", "cancelled"):
+            raise ValueError(f"Not a final job status: {status}")
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, stop_requested = NULL, error = ? WHERE job_id = ?",
+                (status, time.time(), error, job_id),
+            )
+
+    def requeue(self, job_id: int) -> None:
+        """Put a running job back in the queue, e.g. after preemption."""
+
+        with self._transaction() as connection:
+            connection.execute(
+                """
+                UPDATE jobs
+                SET status = 'queued', enqueued_at = ?, started_at = NULL, worker_id = NULL,
+                    heartbeat_at = NULL, stop_requested = NULL
+                WHERE job_id = ? AND status = 'running'
+                """,
+                (time.time(), job_id),
+            )
+
+    def request_stop(self, job_id: int, reason: StopReason) -> bool:
+        """Ask for a job to be cancelled or preempted.
+
+        Queued jobs are cancelled immediately. Running jobs are flagged and
+        stopped by their worker on its next poll.
+
+        :param job_id:
+            Job id.
+        :param reason:
+            ``"cancel"`` or ``"preempt"``.
+        :return:
+            ``True`` when the job was queued or running.
+        """
+
+        with self._transaction() as connection:
+            job = self._fetch(connection, job_id)
+            if job is None:
+                return False
+            if job.status == "queued":
+                if reason == "cancel":
+                    connection.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ?", (time.time(), job_id))
+                return True
+            if job.status == "running":
+                # A cancel always wins over a pending preemption.
+                if job.stop_requested != "cancel":
+                    connection.execute("UPDATE jobs SET stop_requested = ? WHERE job_id = ?", (reason, job_id))
+                return True
+            return False
+
+    def heartbeat(self, worker_id: str, *, concurrency: int | None = None) -> None:
+        """Mark every running job of a worker as alive.
+
+        :param concurrency:
+            Job slots of the worker. When given, the worker is registered so
+            :meth:`find_preemption_victim` knows about its free slots.
+        """
+
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND worker_id = ?", (now, worker_id))
+            if concurrency is not None:
+                connection.execute(
+                    "INSERT INTO workers (worker_id, concurrency, heartbeat_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (worker_id) DO UPDATE SET concurrency = excluded.concurrency, heartbeat_at = excluded.heartbeat_at",
+                    (worker_id, concurrency, now),
+                )
+
+    def unregister_worker(self, worker_id: str) -> None:
+        """Forget a stopping worker, so its slots no longer count as free."""
+
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def requeue_stale(self, stale_after_seconds: float) -> list[int]:
+        """Requeue running jobs whose worker stopped sending heartbeats.
+
+        :param stale_after_seconds:
+            Heartbeat age after which a worker is presumed dead.
+        :return:
+            Ids of requeued jobs.
+        """
+
+        now = time.time()
+        with self._transaction() as connection:
+            rows = connection.execute("SELECT job_id FROM jobs WHERE status = 'running' AND heartbeat_at < ?", (now - stale_after_seconds,)).fetchall()
+            job_ids = [row["job_id"] for row in rows]
+            for job_id in job_ids:
+                connection.execute(
+                    """
+                    UPDATE jobs
+                    SET status = 'queued', enqueued_at = ?, started_at = NULL, worker_id = NULL, heartbeat_at = NULL, stop_requested = NULL
+                    WHERE job_id = ?
+                    """,
+                    (now, job_id),
+                )
+            return job_ids
+
+    def get_stop_requests(self, job_ids: Sequence[int]) -> dict[int, StopReason]:
+        """Return pending stop requests for the given running jobs."""
+
+        if not job_ids:
+            return {}
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT job_id, stop_requested FROM jobs WHERE job_id IN ({placeholders}) AND stop_requested IS NOT NULL",
+                list(job_ids),
+            ).fetchall()
+        return {row["job_id"]: row["stop_requested"] for row in rows}
+
+    def find_preemption_victim(
+        self,
+        *,
+        memory_budget_bytes: int | None = None,
+        stale_after_seconds: float = DEFAULT_STALE_AFTER_SECONDS,
+    ) -> NotebookJob | None:
+        """Pick a running job to preempt for the best waiting job.
+
+        A job is only preempted when the waiting job cannot start as things
+        are, and could once the victim has stopped: either no registered
+        worker has a free slot, or the waiting job does not fit the memory
+        budget next to the running jobs but would without the victim.
+
+        :param memory_budget_bytes:
+            Host memory available to running jobs, as passed to :meth:`claim`.
+        :param stale_after_seconds:
+            Heartbeat age after which a worker's free slots are ignored.
+        :return:
+            The lowest-priority preemptible running job whose priority is below
+            the highest queued priority and whose stop lets the waiting job
+            start, or ``None``. Nothing is chosen while another preemption is
+            still pending.
+        """
+
+        with self._connect() as connection:
+            if connection.execute("SELECT 1 FROM jobs WHERE status = 'running' AND stop_requested = 'preempt'").fetchone():
+                return None
+            waiting = connection.execute("SELECT priority, memory_bytes FROM jobs WHERE status = 'queued' ORDER BY priority DESC, job_id LIMIT 1").fetchone()
+            if waiting is None:
+                return None
+            running_count, reserved = connection.execute("SELECT COUNT(*), COALESCE(SUM(memory_bytes), 0) FROM jobs WHERE status = 'running'").fetchone()
+            free_slots = connection.execute(
+                """
+                SELECT COALESCE(SUM(MAX(workers.concurrency - (SELECT COUNT(*) FROM jobs WHERE status = 'running' AND jobs.worker_id = workers.worker_id), 0)), 0)
+                FROM workers WHERE heartbeat_at >= ?
+                """,
+                (time.time() - stale_after_seconds,),
+            ).fetchone()[0]
+            fits_memory = memory_budget_bytes is None or not running_count or waiting["memory_bytes"] <= memory_budget_bytes - reserved
+            if free_slots and fits_memory:
+                # A free slot claims it on its next poll.
+                return None
+
+            parameters: list[Any] = [waiting["priority"]]
+            memory_clause = ""
+            if not fits_memory and running_count > 1:
+                # Stopping the victim must free enough memory; a lone victim always does.
+                memory_clause = "AND memory_bytes >= ?"
+                parameters.append(waiting["memory_bytes"] - (memory_budget_bytes - reserved))
+            row = connection.execute(
+                f"""
+                SELECT job_id FROM jobs
+                WHERE status = 'running' AND preemptible = 1 AND stop_requested IS NULL AND priority < ? {memory_clause}
+                ORDER BY priority, started_at DESC LIMIT 1
+                """,
+                parameters,
+            ).fetchone()
+            return self._fetch(connection, row["job_id"]) if row else None
+
+    def get_job(self, job_id: int) -> NotebookJob | None:
+        """Return one job by id."""
+
+        with self._connect() as connection:
+            return self._fetch(connection, job_id)
+
+    def list_jobs(self, *, statuses: Sequence[JobStatus] | None = None, limit: int = 100) -> list[NotebookJob]:
+        """List jobs, running and queued first in claim order.
+
+        :param statuses:
+            Only include these statuses. Defaults to all.
+        :param limit:
+            Maximum number of jobs returned.
+        :return:
+            Jobs.
+        """
+
+        where = ""
+        parameters: list[Any] = []
+        if statuses:
+            where = f"WHERE status IN ({','.join('?' for _ in statuses)})"
+            parameters.extend(statuses)
+        parameters.append(limit)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"""
+                SELECT * FROM jobs {where}
+                ORDER BY CASE status WHEN 'running' THEN 0 WHEN 'queued' THEN 1 ELSE 2 END,
+                         priority DESC, job_id DESC
+                LIMIT ?
+                """,
+                parameters,
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Return queue depth and wait-time metrics.
+
+        :return:
+            JSON-serialisable dictionary with ``queue_depth``, job counts by
+            status and by queued priority, reserved memory, the age of the
+            oldest queued job and wait-time percentiles of recently started
+            jobs.
+        """
+
+        now = time.time()
+        with self._connect() as connection:
+            by_status = {row[0]: row[1] for row in connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+            queued_by_priority = {str(row[0]): row[1] for row in connection.execute("SELECT priority, COUNT(*) FROM jobs WHERE status = 'queued' GROUP BY priority ORDER BY priority DESC")}
+            reserved = connection.execute("SELECT COALESCE(SUM(memory_bytes), 0) FROM jobs WHERE status = 'running'").fetchone()[0]
+            oldest = connection.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            waits = sorted(
+                row[0]
+                for row in connection.execute(
+                    "SELECT started_at - enqueued_at FROM jobs WHERE started_at IS NOT NULL ORDER BY started_at DESC LIMIT ?",
+                    (_WAIT_METRICS_WINDOW,),
+                )
+            )
+            workers = Counter(row[0] for row in connection.execute("SELECT worker_id FROM jobs WHERE status = 'running'"))
+        return {
+            "queue_depth": by_status.get("queued", 0),
+            "running": by_status.get("running", 0),
+            "jobs_by_status": by_status,
+            "queued_by_priority": queued_by_priority,
+            "running_by_worker": dict(workers),
+            "reserved_memory_bytes": reserved,
+            "oldest_queued_wait_seconds": now - oldest if oldest is not None else None,
+            "wait_seconds": {
+                "samples": len(waits),
+                "p50": _percentile(waits, 0.50),
+                "p95": _percentile(waits, 0.95),
+                "max": waits[-1] if waits else None,
+            },
+        }
+
+    def _fetch(self, connection: sqlite3.Connection, job_id: int) -> NotebookJob | None:
+        row = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+
+def get_host_memory_bytes() -> int | None:
+    """Return the physical memory of this host, if the OS reports it."""
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _percentile(ordered: list[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _timestamp(value: float | None) -> datetime | None:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _row_to_job(row: sqlite3.Row) -> NotebookJob:
+    return NotebookJob(
+        job_id=row["job_id"],
+        notebook_path=Path(row["notebook_path"]),
+        arguments=tuple(json.loads(row["arguments"])),
+        working_dir=Path(row["working_dir"]),
+        priority=row["priority"],
+        memory_bytes=row["memory_bytes"],
+        preemptible=bool(row["preemptible"]),
+        status=row["status"],
+        enqueued_at=_timestamp(row["enqueued_at"]),
+        started_at=_timestamp(row["started_at"]),
+        finished_at=_timestamp(row["finished_at"]),
+        worker_id=row["worker_id"],
+        attempts=row["attempts"],
+        stop_requested=row["stop_requested"],
+        error=row["error"],
+    )
@@ -0,0 +1,229 @@
+"""Publish execution events to a local live channel.
+
+The channel of a run is an append-only JSON-lines file, one per output
+notebook, so viewers such as the notebook static server can follow a
+multi-hour run without re-reading the partially saved notebook after every
+event. Each line is one :class:`~.core.NotebookExecutionEvent` plus the pid
+of the publishing process, which lets readers notice runs that died without
+a ``notebook_completed`` event. Abridged:
+
+.. code-block:: json
+
+    {"pid": 4242, "kind": "cell_completed", "cell_index": 7, "finished_at": "2026-01-01T12:00:00+00:00"}
+
+A new run replaces the channel file rather than truncating it, so readers
+holding the previous file open detect the new run by its inode. Channels are
+kept after their run completes so pages opened during the run still get its
+last cells; publishers delete channels untouched for
+:data:`DEFAULT_LIVE_CHANNEL_RETENTION_SECONDS` when they start a run.
+"""
+
+from dataclasses import asdict
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Any, TextIO
+
+from .core import NotebookExecutionEvent
+
+
+#: Default directory for live channel files.
+DEFAULT_LIVE_CHANNEL_DIR = Path.home() / ".cache" / "jupyter-execute-agent" / "live"
+
+#: Minimum seconds between published ``cell_output`` events of one cell.
+DEFAULT_LIVE_OUTPUT_INTERVAL_SECONDS = 0.25
+
+#: Seconds after their last event that channel files are deleted.
+DEFAULT_LIVE_CHANNEL_RETENTION_SECONDS = 7 * 24 * 3600
+
+__all__ = [
+    "DEFAULT_LIVE_CHANNEL_DIR",
+    "DEFAULT_LIVE_CHANNEL_RETENTION_SECONDS",
+    "DEFAULT_LIVE_OUTPUT_INTERVAL_SECONDS",
+    "LiveChannelPublisher",
+    "get_live_channel_path",
+    "prune_live_channels",
+    "serialise_execution_event",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_live_channel_path(notebook_path: Path, channel_dir: Path = DEFAULT_LIVE_CHANNEL_DIR) -> Path:
+    """Return the live channel file of a notebook.
+
+    Runs publish to the channel of their output notebook, so a viewer of a
+    notebook finds the run that is writing it.
+
+    :param notebook_path:
+        Output notebook path.
+    :param channel_dir:
+        Directory holding the channel files.
+    :return:
+        JSON-lines channel path inside ``channel_dir``.
+    """
+
+    resolved = notebook_path.resolve()
+    digest = hashlib.sha256(str(resolved).encode("utf-8")).hexdigest()[:16]
+    return channel_dir / f"{resolved.stem}-{digest}.jsonl"
+
+
+def prune_live_channels(channel_dir: Path = DEFAULT_LIVE_CHANNEL_DIR, retention_seconds: float = DEFAULT_LIVE_CHANNEL_RETENTION_SECONDS) -> int:
+    """Delete channel files without events for ``retention_seconds``.
+
+    Leftover temporary files of interrupted channel replacements are
+    deleted too.
+
+    :param channel_dir:
+        Directory holding the channel files.
+    :param retention_seconds:
+        Seconds since the last modification after which a file is deleted.
+    :return:
+        Number of deleted files.
+    """
+
+    cutoff = time.time() - retention_seconds
+    deleted = 0
+    for path in [*channel_dir.glob("*.jsonl"), *channel_dir.glob(".*.jsonl.*.tmp")]:
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                deleted += 1
+        except FileNotFoundError:
+            # Deleted by a concurrent publisher.
+            continue
+    return deleted
+
+
+def serialise_execution_event(event: NotebookExecutionEvent) -> dict[str, Any]:
+    """Convert an execution event to a JSON-compatible dictionary.
+
+    :param event:
+        Structured notebook execution event.
+    :return:
+        Event fields with paths as strings and timestamps in ISO 8601.
+    """
+
+    document = asdict(event)
+    for name, value in document.items():
+        if isinstance(value, Path):
+            document[name] = str(value)
+        elif isinstance(value, datetime):
+            document[name] = value.isoformat()
+    return document
+
+
+class LiveChannelPublisher:
+    """Observer that appends execution events to live channel files.
+
+    Live ``cell_output`` events are throttled per cell to one every
+    ``output_interval_seconds``: progress bars refresh many times a second
+    and viewers only show the latest output anyway. Publishing never fails a
+    run; when a channel cannot be written the publisher logs a warning and
+    stops publishing that notebook.
+
+    Example:
+
+    .. code-block:: python
+
+        from pathlib import Path
+
+        from getting_started.jupyter_execute_agent import LiveChannelPublisher
+        from getting_started.jupyter_execute_agent import execute_notebook_observable
+
+        publisher = LiveChannelPublisher()
+        try:
+            execute_notebook_observable(Path("notebooks/demo.ipynb"), observers=[publisher])
+        finally:
+            publisher.close()
+
+    :param channel_dir:
+        Directory holding the channel files.
+    :param output_interval_seconds:
+        Minimum seconds between published ``cell_output`` events of one cell.
+    :param retention_seconds:
+        Seconds after their last event that channel files are deleted, see
+        :func:`prune_live_channels`. Pruning runs once, before the first run
+        this publisher starts.
+    """
+
+    def __init__(
+        self,
+        channel_dir: Path = DEFAULT_LIVE_CHANNEL_DIR,
+        *,
+        output_interval_seconds: float = DEFAULT_LIVE_OUTPUT_INTERVAL_SECONDS,
+        retention_seconds: float = DEFAULT_LIVE_CHANNEL_RETENTION_SECONDS,
+    ) -> None:
+        self.channel_dir = channel_dir
+        self.output_interval_seconds = output_interval_seconds
+        self.retention_seconds = retention_seconds
+        self._pruned = False
+        self._handles: dict[Path, TextIO] = {}
+        self._failed: set[Path] = set()
+        self._last_output_at: dict[tuple[Path, int | None], float] = {}
+
+    def __call__(self, event: NotebookExecutionEvent) -> None:
+        """Publish one event to the channel of its output notebook."""
+
+        output_path = event.output_path
+        if event.kind == "notebook_started":
+            self._close_channel(output_path)
+            self._failed.discard(output_path)
+        if output_path in self._failed:
+            return
+        if event.kind == "cell_output" and self._is_throttled(event):
+            return
+
+        record = {"pid": os.getpid(), **serialise_execution_event(event)}
+        try:
+            handle = self._handles.get(output_path)
+            if handle is None:
+                handle = self._handles[output_path] = self._open_channel(output_path, new_run=event.kind == "notebook_started")
+            handle.write(json.dumps(record) + "\n")
+            handle.flush()
+        except OSError as exc:
+            logger.warning("Cannot publish live events of %s: %s", output_path, exc)
+            self._failed.add(output_path)
+            self._close_channel(output_path)
+            return
+        if event.kind == "notebook_completed":
+            self._close_channel(output_path)
+
+    def close(self) -> None:
+        """Close all open channel files."""
+
+        for output_path in list(self._handles):
+            self._close_channel(output_path)
+
+    def _is_throttled(self, event: NotebookExecutionEvent) -> bool:
+        key = (event.output_path, event.cell_index)
+        now = time.monotonic()
+        if now - self._last_output_at.get(key, -self.output_interval_seconds) < self.output_interval_seconds:
+            return True
+        self._last_output_at[key] = now
+        return False
+
+    def _open_channel(self, output_path: Path, *, new_run: bool) -> TextIO:
+        """Open the channel for appending, replacing the previous run's file on a new run."""
+
+        path = get_live_channel_path(output_path, self.channel_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if new_run and not self._pruned:
+            self._pruned = True
+            prune_live_channels(self.channel_dir, self.retention_seconds)
+        if new_run:
+            descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            os.close(descriptor)
+            os.replace(temporary_path, path)
+        return path.open("a", encoding="utf-8")
+
+    def _close_channel(self, output_path: Path) -> None:
+        handle = self._handles.pop(output_path, None)
+        if handle is not None:
+            handle.close()
+        self._last_output_at = {key: value for key, value in self._last_output_at.items() if key[0] != output_path}
@@ -0,0 +1,231 @@
+"""Parallel execution of independent notebook sections.
+
+Research notebooks often run one backtest per chain or per strategy variant
+after a shared setup prefix. When those sections do not depend on each other
+they can run in separate kernels at the same time.
+
+A code cell starts a section with a ``section:<name>`` cell tag (or
+``execution_agent.section`` cell metadata). Following untagged code cells
+belong to the same section. Code cells before the first section cell form the
+setup prefix. The prefix runs once in the main kernel with normal events and
+outputs; every section kernel then silently replays the prefix source to
+rebuild the same state before executing its own cells. Finished cells are
+merged back into the one output notebook in their original positions.
+
+Every section kernel gets its own memory cap, so budget for
+``sections x kernel_memory_limit_bytes`` when running many sections.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+from nbformat import NotebookNode
+
+from .core import DEFAULT_KERNEL_MEMORY_LIMIT_BYTES
+from .core import NotebookExecutionObserver
+from .core import NotebookExecutionResult
+from .core import _NotebookRun
+from .core import iter_code_cells
+from .timeouts import CELL_METADATA_KEY
+from .timeouts import AdaptiveTimeoutPolicy
+
+#: Cell tag prefix that assigns a code cell to a named section.
+SECTION_TAG_PREFIX = "section:"
+
+__all__ = [
+    "SECTION_TAG_PREFIX",
+    "NotebookSectionPlan",
+    "execute_notebook_sections",
+    "get_cell_section",
+    "plan_notebook_sections",
+]
+
+
+@dataclass(slots=True, frozen=True)
+class NotebookSectionPlan:
+    """Split of a notebook's code cells into a setup prefix and sections.
+
+    :ivar prefix:
+        Absolute indexes of the setup-prefix code cells.
+    :ivar sections:
+        Section name to absolute indexes of its code cells, in first-seen
+        section order.
+    """
+
+    prefix: tuple[int, ...]
+    sections: dict[str, tuple[int, ...]]
+
+
+def get_cell_section(cell: NotebookNode) -> str | None:
+    """Return the section name a cell is explicitly tagged with.
+
+    :param cell:
+        Notebook cell node.
+    :return:
+        Section name, or ``None`` for untagged cells.
+    """
+
+    metadata = cell.get("metadata", {})
+    settings = metadata.get(CELL_METADATA_KEY, {})
+    if isinstance(settings, dict) and settings.get("section"):
+        return str(settings["section"])
+    for tag in metadata.get("tags", []):
+        if isinstance(tag, str) and tag.startswith(SECTION_TAG_PREFIX):
+            name = tag[len(SECTION_TAG_PREFIX) :].strip()
+            if name:
+                return name
+    return None
+
+
+def plan_notebook_sections(notebook: NotebookNode) -> NotebookSectionPlan:
+    """Assign every code cell to the setup prefix or a section.
+
+    Example:
+
+    .. code-block:: python
+
+        plan = plan_notebook_sections(notebook)
+        print(plan.prefix, list(plan.sections))
+
+    :param notebook:
+        Notebook document.
+    :return:
+        Section plan. ``sections`` is empty when no cell is tagged.
+    """
+
+    prefix: list[int] = []
+    sections: dict[str, list[int]] = {}
+    current: str | None = None
+    for cell_index, _code_cell_index, cell in iter_code_cells(notebook):
+        current = get_cell_section(cell) or current
+        if current is None:
+            prefix.append(cell_index)
+        else:
+            sections.setdefault(current, []).append(cell_index)
+    return NotebookSectionPlan(
+        prefix=tuple(prefix),
+        sections={name: tuple(indexes) for name, indexes in sections.items()},
+    )
+
+
+def execute_notebook_sections(
+    notebook_path: Path,
+    *,
+    output_path: Path | None = None,
+    cwd: Path | None = None,
+    kernel_name: str = "python3",
+    kernel_memory_limit_bytes: int | None = DEFAULT_KERNEL_MEMORY_LIMIT_BYTES,
+    timeout: int | None = None,
+    timeout_policy: AdaptiveTimeoutPolicy | None = None,
+    allow_errors: bool = False,
+    save_every_cell: bool = True,
+    observers: Sequence[NotebookExecutionObserver] = (),
+    client_kwargs: dict[str, Any] | None = None,
+    max_parallel_sections: int | None = None,
+) -> NotebookExecutionResult:
+    """Execute a notebook with its tagged sections in parallel kernels.
+
+    Accepts the same arguments as
+    :func:`~getting_started.jupyter_execute_agent.core.execute_notebook_observable`.
+    Events from section cells carry the section name. Notebooks without
+    section tags run exactly like the sequential runner.
+
+    A failing section does not stop the other sections; once all sections
+    have finished, the first ``CellExecutionError`` is re-raised.
+
+    Example:
+
+    .. code-block:: python
+
+        from pathlib import Path
+        from getting_started.jupyter_execute_agent import execute_notebook_sections
+
+        execute_notebook_sections(Path("scratchpad/per-chain-backtests.ipynb"), max_parallel_sections=4)
+
+    :param max_parallel_sections:
+        Maximum number of section kernels running at once. Defaults to one
+        kernel per section.
+    :return:
+        Execution summary result. ``cell_records`` are in completion order.
+    """
+
+    run = _NotebookRun(
+        notebook_path,
+        output_path=output_path,
+        cwd=cwd,
+        kernel_name=kernel_name,
+        kernel_memory_limit_bytes=kernel_memory_limit_bytes,
+        timeout=timeout,
+        timeout_policy=timeout_policy,
+        allow_errors=allow_errors,
+        save_every_cell=save_every_cell,
+        observers=observers,
+        client_kwargs=client_kwargs,
+    )
+    plan = plan_notebook_sections(run.notebook)
+    if max_parallel_sections is not None and max_parallel_sections <= 0:
+        raise ValueError("max_parallel_sections must be positive or None")
+
+    run.start()
+    try:
+        client = run.create_client(run.notebook)
+        with client.setup_kernel():
+            for cell_index in plan.prefix:
+                run.execute_code_cell(client, run.notebook.cells[cell_index], cell_index, run.code_cell_indexes[cell_index])
+
+        if plan.sections:
+            workers = max_parallel_sections or len(plan.sections)
+            section_notebooks = {name: _copy_notebook(run.notebook) for name in plan.sections}
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notebook-section") as pool:
+                futures = [
+                    pool.submit(_execute_section, run, section_notebooks[name], plan.prefix, name, indexes)
+                    for name, indexes in plan.sections.items()
+                ]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            if errors:
+                raise errors[0]
+    finally:
+        run.close()
+    return run.complete()
+
+
+def _copy_notebook(notebook: NotebookNode) -> NotebookNode:
+    """Copy a notebook deeply enough for an independent section kernel."""
+
+    copied = copy.copy(notebook)
+    copied.cells = [copy.deepcopy(cell) for cell in notebook.cells]
+    return copied
+
+
+def _execute_section(
+    run: _NotebookRun,
+    notebook: NotebookNode,
+    prefix: tuple[int, ...],
+    section: str,
+    cell_indexes: tuple[int, ...],
+) -> None:
+    """Replay the setup prefix and run one section in its own kernel.
+
+    The section kernel works on a private copy of the notebook so prefix
+    replays never overwrite the outputs recorded by the main kernel. Finished
+    section cells are merged into the shared notebook by
+    :meth:`_NotebookRun.execute_code_cell`.
+    """
+
+    client = run.create_client(notebook, section=section, muted_cells=frozenset(prefix))
+    with client.setup_kernel():
+        for cell_index in prefix:
+            replay_cell = notebook.cells[cell_index]
+            client.timeout = run.resolve_timeout(replay_cell)
+            client.execute_cell(replay_cell, cell_index)
+        for cell_index in cell_indexes:
+            run.execute_code_cell(
+                client,
+                notebook.cells[cell_index],
+                cell_index,
+                run.code_cell_indexes[cell_index],
+                section=section,
+            )
@@ -0,0 +1,263 @@
+"""Adaptive per-cell timeouts for observable notebook execution.
+
+A single ``--timeout`` for the whole notebook is either too generous for the
+hundreds of quick cells or too tight for the one long backtest cell. The
+helpers in this module remember how long every code cell took on previous
+runs and derive a per-cell timeout from that history, so a hung cell releases
+its worker slot after a small multiple of its usual runtime.
+
+Cells can always pin their own timeout through notebook metadata:
+
+.. code-block:: json
+
+    {"metadata": {"execution_agent": {"timeout": 7200}}}
+"""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import statistics
+import tempfile
+from typing import Any
+
+from nbformat import NotebookNode
+
+
+#: Cell metadata namespace used for execution-agent settings.
+CELL_METADATA_KEY = "execution_agent"
+
+#: Default location for stored cell runtime histories.
+DEFAULT_RUNTIME_HISTORY_DIR = Path.home() / ".cache" / "jupyter-execute-agent" / "runtimes"
+
+__all__ = [
+    "CELL_METADATA_KEY",
+    "DEFAULT_RUNTIME_HISTORY_DIR",
+    "AdaptiveTimeoutPolicy",
+    "CellRuntimeHistory",
+    "build_cell_history_key",
+    "get_cell_metadata_timeout",
+    "resolve_cell_timeout",
+]
+
+
+@dataclass(slots=True, frozen=True)
+class AdaptiveTimeoutPolicy:
+    """Rules for deriving per-cell timeouts from runtime history.
+
+    :ivar history_dir:
+        Directory holding one runtime-history JSON file per notebook.
+    :ivar factor:
+        Multiplier applied to the median historical runtime.
+    :ivar floor_seconds:
+        Smallest timeout ever derived from history.
+    :ivar ceiling_seconds:
+        Largest timeout ever derived from history, or ``None`` for no cap.
+    :ivar max_samples:
+        Number of most recent runtimes kept per cell.
+    """
+
+    history_dir: Path = DEFAULT_RUNTIME_HISTORY_DIR
+    factor: float = 3.0
+    floor_seconds: float = 60.0
+    ceiling_seconds: float | None = 6 * 60 * 60
+    max_samples: int = 20
+
+    def __post_init__(self) -> None:
+        if self.factor <= 0:
+            raise ValueError("factor must be positive")
+        if self.floor_seconds < 0:
+            raise ValueError("floor_seconds must not be negative")
+        if self.ceiling_seconds is not None and self.ceiling_seconds < self.floor_seconds:
+            raise ValueError("ceiling_seconds must not be smaller than floor_seconds")
+        if self.max_samples <= 0:
+            raise ValueError("max_samples must be positive")
+
+    def history_path_for(self, notebook_path: Path) -> Path:
+        """Return the runtime-history file used for one notebook.
+
+        :param notebook_path:
+            Source notebook path.
+        :return:
+            JSON history file path inside :attr:`history_dir`.
+        """
+
+        resolved = notebook_path.resolve()
+        digest = hashlib.sha256(str(resolved).encode("utf-8")).hexdigest()[:16]
+        return self.history_dir / f"{resolved.stem}-{digest}.json"
+
+    def timeout_from_samples(self, samples: list[float]) -> int | None:
+        """Derive a timeout from historical runtimes.
+
+        :param samples:
+            Previous runtimes of the cell in seconds.
+        :return:
+            Timeout in whole seconds, or ``None`` when there is no history.
+        """
+
+        if not samples:
+            return None
+        timeout = statistics.median(samples) * self.factor
+        timeout = max(timeout, self.floor_seconds)
+        if self.ceiling_seconds is not None:
+            timeout = min(timeout, self.ceiling_seconds)
+        return max(1, math.ceil(timeout))
+
+
+class CellRuntimeHistory:
+    """Stored runtimes of the code cells of one notebook.
+
+    The history is a small JSON document mapping
+    :func:`build_cell_history_key` keys to the most recent runtimes. It is
+    written atomically so a crashed run never leaves a truncated file behind.
+    """
+
+    def __init__(self, path: Path, *, max_samples: int = 20) -> None:
+        self.path = path
+        self.max_samples = max_samples
+        self._samples: dict[str, list[float]] = {}
+
+    @classmethod
+    def load(cls, path: Path, *, max_samples: int = 20) -> "CellRuntimeHistory":
+        """Load a history file, starting empty when it is missing or unreadable.
+
+        :param path:
+            History JSON file.
+        :param max_samples:
+            Number of most recent runtimes kept per cell.
+        :return:
+            Loaded history.
+        """
+
+        history = cls(path, max_samples=max_samples)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return history
+        cells = data.get("cells", {}) if isinstance(data, dict) else {}
+        if isinstance(cells, dict):
+            for key, samples in cells.items():
+                if isinstance(samples, list):
+                    history._samples[str(key)] = [float(value) for value in samples if isinstance(value, (int, float))][-max_samples:]
+        return history
+
+    def samples(self, key: str) -> list[float]:
+        """Return recorded runtimes for one cell key, oldest first."""
+
+        return list(self._samples.get(key, ()))
+
+    def record(self, key: str, elapsed_seconds: float) -> None:
+        """Append one runtime for a cell key.
+
+        :param key:
+            Cell key from :func:`build_cell_history_key`.
+        :param elapsed_seconds:
+            Observed cell runtime in seconds.
+        """
+
+        samples = self._samples.setdefault(key, [])
+        samples.append(round(float(elapsed_seconds), 3))
+        del samples[: -self.max_samples]
+
+    def save(self, *, notebook_path: Path | None = None) -> Path:
+        """Write the history atomically.
+
+        :param notebook_path:
+            Optional notebook path stored for humans inspecting the file.
+        :return:
+            The written history path.
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        document: dict[str, Any] = {"cells": self._samples}
+        if notebook_path is not None:
+            document["notebook_path"] = str(notebook_path)
+        fd, temp_name = tempfile.mkstemp(prefix=self.path.name, suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(document, handle, indent=2, sort_keys=True)
+            os.replace(temp_name, self.path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        return self.path
+
+
+def build_cell_history_key(cell: NotebookNode) -> str:
+    """Build the runtime-history key for one code cell.
+
+    The key is derived from the cell source, so editing a cell starts a fresh
+    history instead of inheriting the runtimes of unrelated code.
+
+    :param cell:
+        Notebook code cell.
+    :return:
+        Stable hexadecimal key.
+    """
+
+    source = cell.get("source", "")
+    if isinstance(source, list):
+        source = "".join(source)
+    return hashlib.sha256(str(source).encode("utf-8")).hexdigest()[:24]
+
+
+def get_cell_metadata_timeout(cell: NotebookNode) -> int | None:
+    """Return an explicit timeout pinned in cell metadata.
+
+    :param cell:
+        Notebook code cell.
+    :return:
+        Timeout in seconds, ``0`` when the cell disables its timeout with a
+        null or non-positive value, or ``None`` when the cell has no override.
+    """
+
+    settings = cell.get("metadata", {}).get(CELL_METADATA_KEY, {})
+    if not isinstance(settings, dict) or "timeout" not in settings:
+        return None
+    value = settings["timeout"]
+    if value is None:
+        return 0
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid {CELL_METADATA_KEY}.timeout cell metadata: {value!r}") from exc
+    if timeout <= 0:
+        return 0
+    return math.ceil(timeout)
+
+
+def resolve_cell_timeout(
+    cell: NotebookNode,
+    *,
+    default_timeout: int | None = None,
+    policy: AdaptiveTimeoutPolicy | None = None,
+    history: CellRuntimeHistory | None = None,
+) -> int | None:
+    """Pick the timeout applied to one code cell.
+
+    Precedence is cell metadata, then the adaptive history, then the
+    notebook-wide default.
+
+    :param cell:
+        Notebook code cell.
+    :param default_timeout:
+        Notebook-wide timeout in seconds, or ``None`` for the nbclient default.
+    :param policy:
+        Adaptive timeout rules, or ``None`` to disable history-derived timeouts.
+    :param history:
+        Runtime history for the notebook.
+    :return:
+        Timeout in seconds, or ``None`` when the cell runs without a timeout.
+    """
+
+    metadata_timeout = get_cell_metadata_timeout(cell)
+    if metadata_timeout is not None:
+        return metadata_timeout or None
+    if policy is not None and history is not None:
+        adaptive_timeout = policy.timeout_from_samples(history.samples(build_cell_history_key(cell)))
+        if adaptive_timeout is not None:
+            return adaptive_timeout
+    return default_timeout
@@ -0,0 +1,284 @@
+"""Worker daemon that executes notebook jobs from the shared queue.
+
+A worker polls :class:`~getting_started.jupyter_execute_agent.job_queue.NotebookJobQueue`,
+claims jobs by priority while it has free slots and the host memory budget
+allows, and runs each job in its own child process with the regular
+observable executor. Several workers may share one queue.
+
+Cancelling or preempting a running job sends ``SIGTERM`` to its child; the
+child turns that into ``SystemExit`` so nbclient shuts the kernel down
+cleanly. Children that do not exit within the grace period are killed
+together with their process group. Preempted jobs go back to the queue and
+restart from the first cell.
+
+Each child runs in its own session and is killed when the worker dies, even
+by ``SIGKILL``, so a job requeued from a dead worker never keeps running next
+to its retry. The child is killed rather than stopped: nbclient's kernel
+shutdown can wait for the interrupted cell, and nobody is left to enforce the
+grace period. Kernels live in sessions of their own and exit when their job
+process does, see ``JPY_PARENT_PID`` in ipykernel.
+"""
+
+from dataclasses import dataclass
+import ctypes
+import ctypes.util
+import logging
+import multiprocessing
+from multiprocessing.process import BaseProcess
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Sequence
+
+from .cli import build_argument_parser
+from .cli import execute_from_arguments
+from .job_queue import DEFAULT_STALE_AFTER_SECONDS
+from .job_queue import NotebookJob
+from .job_queue import NotebookJobQueue
+from .job_queue import StopReason
+
+logger = logging.getLogger(__name__)
+
+#: ``prctl`` option that signals a process when its parent exits, from ``<linux/prctl.h>``.
+_PR_SET_PDEATHSIG = 1
+
+__all__ = [
+    "NotebookQueueWorker",
+]
+
+
+@dataclass(slots=True)
+class _RunningJob:
+    """Bookkeeping for one child process."""
+
+    job: NotebookJob
+    process: BaseProcess
+    stop_reason: StopReason | None = None
+    stop_sent_at: float | None = None
+
+
+class NotebookQueueWorker:
+    """Run queued notebook jobs with concurrency and memory limits.
+
+    Example:
+
+    .. code-block:: python
+
+        from getting_started.jupyter_execute_agent.job_queue import NotebookJobQueue
+        from getting_started.jupyter_execute_agent.worker import NotebookQueueWorker
+
+        NotebookQueueWorker(NotebookJobQueue(), concurrency=2).run_forever()
+    """
+
+    def __init__(
+        self,
+        queue: NotebookJobQueue,
+        *,
+        concurrency: int = 1,
+        memory_budget_bytes: int | None = None,
+        poll_interval_seconds: float = 2.0,
+        stale_after_seconds: float = DEFAULT_STALE_AFTER_SECONDS,
+        stop_grace_seconds: float = 30.0,
+        worker_id: str | None = None,
+    ) -> None:
+        if concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        self.queue = queue
+        self.concurrency = concurrency
+        self.memory_budget_bytes = memory_budget_bytes
+        self.poll_interval_seconds = poll_interval_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.stop_grace_seconds = stop_grace_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._running: dict[int, _RunningJob] = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._shutdown = threading.Event()
+
+    def run_forever(self) -> None:
+        """Poll the queue until :meth:`shutdown` is called or a signal arrives.
+
+        ``SIGTERM`` and ``SIGINT`` stop claiming new jobs and stop running
+        children; their jobs are requeued for another worker.
+        """
+
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: self.shutdown())
+        logger.info("Worker %s started queue=%s concurrency=%d", self.worker_id, self.queue.path, self.concurrency)
+        try:
+            while not self._shutdown.is_set():
+                self.run_once()
+                self._shutdown.wait(self.poll_interval_seconds)
+        finally:
+            self.queue.unregister_worker(self.worker_id)
+            self._stop_all()
+        logger.info("Worker %s stopped", self.worker_id)
+
+    def shutdown(self) -> None:
+        """Ask :meth:`run_forever` to exit after the current poll."""
+
+        self._shutdown.set()
+
+    def run_once(self) -> None:
+        """Run one scheduling round: reap, stop, preempt and start jobs."""
+
+        self.queue.heartbeat(self.worker_id, concurrency=self.concurrency)
+        for job_id in self.queue.requeue_stale(self.stale_after_seconds):
+            logger.warning("Requeued job %d from an unresponsive worker", job_id)
+        self._reap_finished()
+        self._apply_stop_requests()
+        self._start_jobs()
+        # Anything still queued now is blocked by slots or memory.
+        self._preempt_for_waiting_jobs()
+
+    @property
+    def running_job_ids(self) -> list[int]:
+        """Ids of jobs currently running in this worker."""
+
+        return list(self._running)
+
+    def _start_jobs(self) -> None:
+        while len(self._running) < self.concurrency and not self._shutdown.is_set():
+            job = self.queue.claim(self.worker_id, memory_budget_bytes=self.memory_budget_bytes)
+            if job is None:
+                return
+            process = self._context.Process(
+                target=_run_job_process,
+                args=(job.job_id, str(job.notebook_path), job.arguments, str(job.working_dir), os.getpid()),
+                name=f"notebook-job-{job.job_id}",
+            )
+            process.start()
+            self._running[job.job_id] = _RunningJob(job=job, process=process)
+            logger.info(
+                "Started job %d priority=%d wait=%.1fs notebook=%s",
+                job.job_id,
+                job.priority,
+                job.wait_seconds or 0.0,
+                job.notebook_path,
+            )
+
+    def _reap_finished(self) -> None:
+        for job_id, running in list(self._running.items()):
+            exitcode = running.process.exitcode
+            if exitcode is None:
+                continue
+            running.process.join()
+            del self._running[job_id]
+            if running.stop_reason == "preempt" or (running.stop_reason is None and self._shutdown.is_set()):
+                self.queue.requeue(job_id)
+                logger.info("Requeued job %d", job_id)
+            elif running.stop_reason == "cancel":
+                self.queue.finish(job_id, "cancelled")
+                logger.info("Cancelled job %d", job_id)
+            elif exitcode == 0:
+                self.queue.finish(job_id, "completed")
+                logger.info("Completed job %d", job_id)
+            else:
+                self.queue.finish(job_id, "failed", error=f"Notebook process exited with code {exitcode}")
+                logger.warning("Failed job %d exitcode=%d", job_id, exitcode)
+
+    def _apply_stop_requests(self) -> None:
+        for job_id, reason in self.queue.get_stop_requests(self.running_job_ids).items():
+            running = self._running[job_id]
+            if running.stop_reason != "cancel":
+                running.stop_reason = reason
+            self._signal_stop(running)
+        now = time.monotonic()
+        for running in self._running.values():
+            if running.stop_sent_at is not None and now - running.stop_sent_at > self.stop_grace_seconds and running.process.is_alive():
+                logger.warning("Killing job %d after %.0fs grace period", running.job.job_id, self.stop_grace_seconds)
+                _kill_job_process(running.process)
+
+    def _preempt_for_waiting_jobs(self) -> None:
+        victim = self.queue.find_preemption_victim(memory_budget_bytes=self.memory_budget_bytes, stale_after_seconds=self.stale_after_seconds)
+        if victim is not None and self.queue.request_stop(victim.job_id, "preempt"):
+            logger.info("Preempting job %d priority=%d for a higher-priority job", victim.job_id, victim.priority)
+
+    def _signal_stop(self, running: _RunningJob) -> None:
+        if running.stop_sent_at is None and running.process.is_alive():
+            running.process.terminate()
+            running.stop_sent_at = time.monotonic()
+
+    def _stop_all(self) -> None:
+        """Stop running children on shutdown and requeue their jobs."""
+
+        for running in self._running.values():
+            self._signal_stop(running)
+        deadline = time.monotonic() + self.stop_grace_seconds
+        for running in self._running.values():
+            running.process.join(max(0.0, deadline - time.monotonic()))
+            if running.process.is_alive():
+                _kill_job_process(running.process)
+                running.process.join()
+        self._reap_finished()
+
+
+def _kill_job_process(process: BaseProcess) -> None:
+    """Kill a job child and every process left in its process group."""
+
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # The child has not created its session yet.
+            pass
+    process.kill()
+
+
+def _exit_with_parent(parent_pid: int) -> None:
+    """Kill this process when the worker ``parent_pid`` exits.
+
+    Uses ``prctl(PR_SET_PDEATHSIG)`` on Linux and polls the parent pid
+    elsewhere.
+    """
+
+    libc_name = ctypes.util.find_library("c") if sys.platform.startswith("linux") else None
+    if libc_name is not None:
+        ctypes.CDLL(libc_name, use_errno=True).prctl(_PR_SET_PDEATHSIG, signal.SIGKILL)
+    else:
+
+        def _watch_parent() -> None:
+            while os.getppid() == parent_pid:
+                time.sleep(1.0)
+            os.kill(os.getpid(), signal.SIGKILL)
+
+        threading.Thread(target=_watch_parent, name="notebook-job-parent-watch", daemon=True).start()
+    # The worker may have died before the death signal was armed.
+    if os.getppid() != parent_pid:
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _run_job_process(job_id: int, notebook_path: str, arguments: Sequence[str], working_dir: str, worker_pid: int) -> None:
+    """Child-process entry point executing one job.
+
+    :param job_id:
+        Job id used as the log prefix.
+    :param notebook_path:
+        Resolved notebook path.
+    :param arguments:
+        ``jupyter-execute-agent`` run arguments.
+    :param working_dir:
+        Directory relative arguments resolve against.
+    :param worker_pid:
+        Pid of the worker; the job stops when that process exits.
+    """
+
+    def _raise_exit(signum: int, _frame: object) -> None:
+        raise SystemExit(128 + signum)
+
+    if hasattr(os, "setsid"):
+        os.setsid()
+    signal.signal(signal.SIGTERM, _raise_exit)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _exit_with_parent(worker_pid)
+    os.chdir(working_dir)
+    args = build_argument_parser().parse_args([notebook_path, *arguments])
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format=f"[job {job_id}] %(message)s",
+        stream=sys.stdout,
+    )
+    execute_from_arguments(args)
@@ -0,0 +1,124 @@
+"""Serve saved Jupyter notebook outputs as static HTML.
+
+Run with ``poetry run notebook-static-server``. Modules:
+
+- :mod:`.render` renders notebooks, :mod:`.fast` is the lightweight
+  preview renderer and :mod:`.partial` renders cell range views.
+- :mod:`.cache` caches rendered pages, :mod:`.pool` renders requests in
+  worker processes.
+- :mod:`.reader` reads notebooks without oversized outputs.
+- :mod:`.index` keeps the index page's notebook metadata and
+  :mod:`.search` the full-text search.
+- :mod:`.watcher` and :mod:`.prerender` pre-render changed notebooks in
+  the background.
+- :mod:`.live` pushes per-cell updates of running notebooks.
+- :mod:`.export` exports a static site.
+- :mod:`.metrics` collects request and render metrics.
+- :mod:`.server` is the HTTP server.
+"""
+
+from .cache import NotebookRenderCache
+from .cache import RenderedNotebook
+from .cache import get_render_cache_key
+from .export import ExportResult
+from .export import export_site
+from .fast import render_fast_notebook
+from .index import NotebookIndex
+from .index import NotebookIndexEntry
+from .live import LiveNotebookView
+from .metrics import ServerMetrics
+from .partial import CellSelection
+from .partial import NotebookCellCache
+from .partial import render_partial_page
+from .pool import NotebookRenderPool
+from .pool import RenderPoolError
+from .pool import RenderQueueFull
+from .pool import RenderTimeout
+from .pool import RenderWorkerError
+from .prerender import NotebookPrerenderer
+from .reader import find_output_span
+from .reader import load_notebook_text
+from .reader import read_notebook
+from .render import PROGRESS_OUTPUT_MESSAGE
+from .render import NotebookPageStream
+from .render import NotebookRenderResult
+from .render import RenderOptions
+from .render import add_table_of_contents
+from .render import clean_progress_outputs
+from .render import extract_image_outputs
+from .render import extract_plotly_bundles
+from .render import is_progress_stream_text
+from .render import render_notebook
+from .render import render_notebook_cell
+from .render import render_notebook_page
+from .render import split_progress_stream_text
+from .search import NotebookSearchIndex
+from .search import NotebookSearchResult
+from .server import NOTEBOOK_ROOTS
+from .server import PROJECT_ROOT
+from .server import Forbidden
+from .server import NotebookHTTPServer
+from .server import NotebookRequestHandler
+from .server import NotebookServerError
+from .server import NotFound
+from .server import list_notebooks
+from .server import main
+from .server import notebook_url_for
+from .server import render_index
+from .server import validate_notebook_path
+from .server import view_path_for
+from .watcher import NotebookChangeWatcher
+
+__all__ = [
+    "CellSelection",
+    "ExportResult",
+    "NOTEBOOK_ROOTS",
+    "PROGRESS_OUTPUT_MESSAGE",
+    "PROJECT_ROOT",
+    "Forbidden",
+    "NotFound",
+    "LiveNotebookView",
+    "NotebookCellCache",
+    "NotebookChangeWatcher",
+    "NotebookHTTPServer",
+    "NotebookIndex",
+    "NotebookIndexEntry",
+    "NotebookPageStream",
+    "NotebookPrerenderer",
+    "NotebookRenderCache",
+    "NotebookRenderPool",
+    "NotebookRenderResult",
+    "NotebookRequestHandler",
+    "NotebookSearchIndex",
+    "NotebookSearchResult",
+    "NotebookServerError",
+    "RenderOptions",
+    "RenderPoolError",
+    "RenderQueueFull",
+    "RenderTimeout",
+    "RenderWorkerError",
+    "RenderedNotebook",
+    "ServerMetrics",
+    "add_table_of_contents",
+    "clean_progress_outputs",
+    "export_site",
+    "extract_image_outputs",
+    "extract_plotly_bundles",
+    "find_output_span",
+    "get_render_cache_key",
+    "is_progress_stream_text",
+    "list_notebooks",
+    "load_notebook_text",
+    "main",
+    "notebook_url_for",
+    "read_notebook",
+    "render_fast_notebook",
+    "render_index",
+    "render_notebook",
+    "render_notebook_cell",
+    "render_notebook_page",
+    "render_partial_page",
+    "split_progress_stream_text",
+    "validate_notebook_path",
+    "view_path_for",
+]
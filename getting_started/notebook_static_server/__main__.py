@@ -0,0 +1,7 @@
+"""Allow ``python -m getting_started.notebook_static_server``."""
+
+import sys
+
+from .server import main
+
+sys.exit(main())
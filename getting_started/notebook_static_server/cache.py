@@ -0,0 +1,675 @@
+"""Rendered-HTML cache for the notebook viewer.
+
+Rendering a large backtest notebook takes seconds, and viewers refresh often.
+Rendered pages are cached in memory (LRU, bounded by bytes) and on disk, so
+the cache survives server restarts. Entries are keyed by the resolved
+notebook path, its mtime and size, the render options and the nbconvert
+version; a saved notebook therefore gets a new key and stale pages are never
+served.
+
+Very large pages can be streamed instead: :meth:`NotebookRenderCache.stream`
+yields the page chunk by chunk while writing it to the disk tier.
+
+Images and scripts extracted from pages are stored once per content hash, in
+the ``assets/`` directory of the disk tier and with the pages in memory.
+
+The disk tier keeps a running total of its size and is only listed when it
+grows past ``max_disk_bytes``; reads refresh file mtimes, so pruning then
+removes the least recently used files.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cache
+import gzip
+import hashlib
+import importlib.metadata
+import itertools
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import IO, Any, Callable, Iterator
+
+from .metrics import LatencyHistogram
+from .render import NotebookPageStream
+from .render import NotebookRenderResult
+from .render import RenderOptions
+from .render import render_notebook_page
+
+
+#: Bump when rendering changes so cached pages from older code are ignored.
+RENDER_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "notebook-static-server" / "html"
+DEFAULT_MEMORY_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+#: Disk tier subdirectory of extracted images.
+ASSET_DIR_NAME = "assets"
+
+type NotebookRenderer = Callable[[Path, RenderOptions], str | NotebookRenderResult]
+type NotebookStreamer = Callable[[Path, RenderOptions], NotebookPageStream]
+
+
+@dataclass(slots=True, frozen=True)
+class RenderedNotebook:
+    """Rendered HTML page of one notebook version.
+
+    :ivar key:
+        Cache key; changes whenever the notebook file or render options change.
+    :ivar body:
+        UTF-8 encoded HTML.
+    :ivar source_mtime:
+        Notebook modification time the page was rendered from.
+    :ivar render_seconds:
+        Time the render took, ``0`` for pages loaded from the disk tier.
+    :ivar cache_status:
+        ``"memory"``, ``"disk"``, ``"miss"`` or ``"coalesced"`` for the lookup
+        that returned it.
+    :ivar fragments:
+        UTF-8 encoded lazily loaded outputs by output id, see
+        :class:`~.render.NotebookRenderResult`.
+    :ivar assets:
+        Extracted images and scripts by file name, see
+        :class:`~.render.NotebookRenderResult`.
+    """
+
+    key: str
+    body: bytes
+    source_mtime: float
+    render_seconds: float = 0.0
+    cache_status: str = "miss"
+    fragments: dict[str, bytes] = field(default_factory=dict)
+    assets: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        """Bytes held in memory by the page, its fragments and its images."""
+
+        return (
+            len(self.body)
+            + sum(len(fragment) for fragment in self.fragments.values())
+            + sum(len(asset) for asset in self.assets.values())
+        )
+
+
+def get_render_signature(options: RenderOptions) -> str:
+    """Identify everything besides the notebook that changes a rendered page, e.g. for export manifests."""
+
+    document = {"options": asdict(options), "nbconvert": _get_nbconvert_version(), "format": RENDER_FORMAT_VERSION}
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_render_cache_key(notebook_path: Path, options: RenderOptions) -> str:
+    """Build the cache key for the current version of a notebook file."""
+
+    stat = notebook_path.stat()
+    document = {
+        "path": str(notebook_path.resolve()),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "options": asdict(options),
+        "nbconvert": _get_nbconvert_version(),
+        "format": RENDER_FORMAT_VERSION,
+    }
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class NotebookRenderCache:
+    """Two-tier cache of rendered notebook pages.
+
+    Thread-safe; the threading HTTP server shares one instance between
+    request threads. Concurrent misses for the same page share one render.
+
+    .. code-block:: python
+
+        cache = NotebookRenderCache(max_memory_bytes=128 * 1024 * 1024, cache_dir=Path("/tmp/html"))
+        page = cache.get(validate_notebook_path("notebooks/demo.ipynb"))
+        print(page.cache_status, cache.get_stats())
+    """
+
+    def __init__(
+        self,
+        *,
+        max_memory_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+        cache_dir: Path | None = DEFAULT_CACHE_DIR,
+        max_disk_bytes: int = DEFAULT_DISK_CACHE_BYTES,
+        renderer: NotebookRenderer = render_notebook_page,
+        streamer: NotebookStreamer = NotebookPageStream,
+    ) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.renderer = renderer
+        self.streamer = streamer
+        self._entries: OrderedDict[str, RenderedNotebook] = OrderedDict()
+        self._gzip_bodies: dict[str, bytes] = {}
+        self._key_by_path: dict[Path, str] = {}
+        self._pending: dict[str, Future] = {}
+        self._memory_bytes = 0
+        # Bytes in the disk tier, ``None`` until the first write lists it.
+        self._disk_bytes: int | None = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "render_errors": 0,
+            "gzip_hits": 0,
+            "gzip_compressions": 0,
+        }
+        self._render_seconds_total = 0.0
+        self._render_seconds_max = 0.0
+        self._last_render_seconds: float | None = None
+        self._renders = 0
+        #: Latency of every render stored or streamed, for ``/metrics``.
+        self.render_latency = LatencyHistogram()
+
+    def get(self, notebook_path: Path, options: RenderOptions | None = None) -> RenderedNotebook:
+        """Return the rendered page for a notebook, rendering it on a miss.
+
+        :param notebook_path:
+            Validated notebook path.
+        :param options:
+            Render options. Defaults to :class:`RenderOptions`.
+        :return:
+            Rendered page. ``cache_status`` tells where it came from;
+            ``"coalesced"`` when it was rendered for a concurrent request.
+        """
+
+        options = options or RenderOptions()
+        notebook_path = notebook_path.resolve()
+        page = self.lookup(notebook_path, options)
+        if page is not None:
+            return page
+
+        key = get_render_cache_key(notebook_path, options)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self._counters["coalesced"] += 1
+            else:
+                self._pending[key] = Future()
+        if pending is not None:
+            # Another request is rendering this version; share its result.
+            return _with_status(pending.result(), "coalesced")
+
+        started = time.perf_counter()
+        try:
+            html = self.renderer(notebook_path, options)
+            with self._lock:
+                self._counters["misses"] += 1
+            page = self.put(notebook_path, options, key, html, time.perf_counter() - started)
+        except BaseException as exc:
+            with self._lock:
+                if isinstance(exc, Exception):
+                    self._counters["render_errors"] += 1
+                self._pending.pop(key).set_exception(exc)
+            raise
+        with self._lock:
+            self._pending.pop(key).set_result(page)
+        return page
+
+    def lookup(self, notebook_path: Path, options: RenderOptions | None = None) -> RenderedNotebook | None:
+        """Return the cached page for the current version of a notebook without rendering.
+
+        :return:
+            Page from the memory or disk tier, or ``None`` on a miss.
+        """
+
+        options = options or RenderOptions()
+        notebook_path = notebook_path.resolve()
+        key = get_render_cache_key(notebook_path, options)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return _with_status(entry, "memory")
+
+        body = self._read_disk(f"{key}.html")
+        if body is None:
+            return None
+        assets = self._read_disk_assets(key)
+        if assets is None:
+            # An extracted file was pruned; render the page again to restore it.
+            return None
+        entry = RenderedNotebook(
+            key=key,
+            body=body,
+            source_mtime=notebook_path.stat().st_mtime,
+            fragments=self._read_disk_fragments(key),
+            assets=assets,
+        )
+        self._store(notebook_path, entry)
+        with self._lock:
+            self._counters["disk_hits"] += 1
+        return _with_status(entry, "disk")
+
+    def stream(self, notebook_path: Path, options: RenderOptions | None = None) -> Iterator[bytes]:
+        """Render a page chunk by chunk, writing it to the disk tier as it goes.
+
+        The page is never held in memory as a whole. It becomes a disk-tier
+        entry once the last chunk has been produced and the notebook is
+        unchanged; a stream closed early, e.g. by a disconnected client,
+        leaves nothing behind. Without a disk tier the page is not cached.
+
+        :return:
+            UTF-8 encoded chunks of the page.
+        """
+
+        options = options or RenderOptions()
+        notebook_path = notebook_path.resolve()
+        key = get_render_cache_key(notebook_path, options)
+        with self._lock:
+            self._counters["misses"] += 1
+
+        started = time.perf_counter()
+        handle = None
+        committed = False
+        try:
+            page_stream = self.streamer(notebook_path, options)
+            handle = self._open_disk_temp()
+            for chunk in page_stream:
+                data = chunk.encode("utf-8")
+                if handle is not None:
+                    try:
+                        handle.write(data)
+                    except OSError:
+                        # The disk tier is an optimisation; keep serving.
+                        _discard_temp(handle)
+                        handle = None
+                yield data
+            if handle is not None:
+                committed = self._commit_stream(notebook_path, options, key, handle, page_stream.fragments, page_stream.assets)
+        except GeneratorExit:
+            raise
+        except Exception:
+            with self._lock:
+                self._counters["render_errors"] += 1
+            raise
+        finally:
+            if handle is not None and not committed:
+                _discard_temp(handle)
+
+        self._record_render(time.perf_counter() - started)
+
+    def put(
+        self,
+        notebook_path: Path,
+        options: RenderOptions,
+        key: str,
+        html: str | NotebookRenderResult,
+        render_seconds: float,
+    ) -> RenderedNotebook:
+        """Store a page rendered elsewhere, e.g. by the background pre-renderer.
+
+        The page is only cached when the notebook still has the version
+        ``key`` was computed from; a notebook saved while it was rendering
+        is left for the next render.
+
+        :param key:
+            Cache key taken with :func:`get_render_cache_key` before rendering.
+        :param html:
+            Rendered page, or a page with lazily loaded output fragments.
+        :return:
+            The rendered page.
+        """
+
+        notebook_path = notebook_path.resolve()
+        if isinstance(html, NotebookRenderResult):
+            fragments = {output_id: fragment.encode("utf-8") for output_id, fragment in html.fragments.items()}
+            assets = html.assets
+            html = html.html
+        else:
+            fragments = {}
+            assets = {}
+        body = html.encode("utf-8")
+        entry = RenderedNotebook(
+            key=key,
+            body=body,
+            source_mtime=notebook_path.stat().st_mtime,
+            render_seconds=render_seconds,
+            fragments=fragments,
+            assets=assets,
+        )
+        self._record_render(render_seconds)
+
+        if get_render_cache_key(notebook_path, options) == key:
+            self._store(notebook_path, entry)
+            self._write_disk_assets(key, assets)
+            if fragments:
+                # Written before the page so a page on disk always has its fragments.
+                document = {output_id: fragment.decode("utf-8") for output_id, fragment in fragments.items()}
+                self._write_disk(f"{key}.fragments.json", json.dumps(document).encode("utf-8"))
+            self._write_disk(f"{key}.html", body)
+        return entry
+
+    def get_gzip_body(self, page: RenderedNotebook) -> bytes:
+        """Return the gzip-compressed body of a page, compressing it only once.
+
+        Compressed variants are kept next to the page in both cache tiers.
+        Compression is deterministic, so the variant has a stable ETag.
+
+        :param page:
+            Page returned by :meth:`get`.
+        :return:
+            gzip-compressed HTML.
+        """
+
+        with self._lock:
+            compressed = self._gzip_bodies.get(page.key)
+            if compressed is not None:
+                self._counters["gzip_hits"] += 1
+                return compressed
+
+        compressed = self._read_disk(f"{page.key}.html.gz")
+        if compressed is None:
+            compressed = gzip.compress(page.body, compresslevel=6, mtime=0)
+            self._write_disk(f"{page.key}.html.gz", compressed)
+            with self._lock:
+                self._counters["gzip_compressions"] += 1
+        else:
+            with self._lock:
+                self._counters["gzip_hits"] += 1
+
+        with self._lock:
+            # Only keep the variant while its page is cached in memory.
+            if page.key in self._entries and page.key not in self._gzip_bodies:
+                self._gzip_bodies[page.key] = compressed
+                self._memory_bytes += len(compressed)
+                self._evict_over_budget()
+        return compressed
+
+    def get_asset(self, name: str) -> bytes | None:
+        """Return an extracted image or script of any cached page.
+
+        :param name:
+            File name, e.g. ``<sha256>.png``, checked by the caller.
+        :return:
+            File content, or ``None`` when no cached page has the file.
+        """
+
+        with self._lock:
+            for entry in reversed(self._entries.values()):
+                asset = entry.assets.get(name)
+                if asset is not None:
+                    return asset
+        return self._read_disk(f"{ASSET_DIR_NAME}/{name}")
+
+    def contains(self, notebook_path: Path, options: RenderOptions | None = None) -> bool:
+        """Check whether the current version of a notebook is cached in either tier."""
+
+        key = get_render_cache_key(notebook_path.resolve(), options or RenderOptions())
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.cache_dir is not None and self._disk_path(f"{key}.html").exists()
+
+    def invalidate(self, notebook_path: Path) -> None:
+        """Drop the in-memory page of a notebook."""
+
+        with self._lock:
+            key = self._key_by_path.pop(notebook_path.resolve(), None)
+            if key is not None:
+                self._drop(key)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return hit/miss counters, cache size and render latency.
+
+        :return:
+            JSON-serialisable dictionary.
+        """
+
+        with self._lock:
+            renders = self._renders
+            misses = self._counters["misses"]
+            lookups = misses + self._counters["memory_hits"] + self._counters["disk_hits"]
+            hits = lookups - misses
+            return {
+                **self._counters,
+                "hit_ratio": hits / lookups if lookups else None,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_enabled": self.cache_dir is not None,
+                "render_seconds": {
+                    "count": renders,
+                    "total": self._render_seconds_total,
+                    "mean": self._render_seconds_total / renders if renders else None,
+                    "max": self._render_seconds_max if renders else None,
+                    "last": self._last_render_seconds,
+                },
+            }
+
+    def _record_render(self, render_seconds: float) -> None:
+        with self._lock:
+            self._render_seconds_total += render_seconds
+            self._render_seconds_max = max(self._render_seconds_max, render_seconds)
+            self._last_render_seconds = render_seconds
+            self._renders += 1
+        self.render_latency.observe(render_seconds)
+
+    def _store(self, notebook_path: Path, entry: RenderedNotebook) -> None:
+        size = entry.size
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            # Only the newest version of a notebook is worth keeping.
+            previous = self._key_by_path.get(notebook_path)
+            if previous is not None and previous != entry.key:
+                self._drop(previous)
+            self._drop(entry.key)
+            self._entries[entry.key] = entry
+            self._key_by_path[notebook_path] = entry.key
+            self._memory_bytes += size
+            self._evict_over_budget()
+
+    def _drop(self, key: str) -> None:
+        """Remove a page and its compressed variant from memory. Caller holds the lock."""
+
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+        compressed = self._gzip_bodies.pop(key, None)
+        if compressed is not None:
+            self._memory_bytes -= len(compressed)
+
+    def _evict_over_budget(self) -> None:
+        """Evict least recently used pages until within budget. Caller holds the lock."""
+
+        while self._memory_bytes > self.max_memory_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self._counters["evictions"] += 1
+
+    def _disk_path(self, name: str) -> Path:
+        return self.cache_dir / name
+
+    def _read_disk(self, name: str) -> bytes | None:
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(name)
+        try:
+            body = path.read_bytes()
+        except OSError:
+            return None
+        # Refresh the mtime so disk pruning evicts least recently used pages.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return body
+
+    def _read_disk_fragments(self, key: str) -> dict[str, bytes]:
+        document = self._read_disk(f"{key}.fragments.json")
+        if document is None:
+            return {}
+        try:
+            fragments = json.loads(document)
+        except ValueError:
+            return {}
+        return {output_id: fragment.encode("utf-8") for output_id, fragment in fragments.items()}
+
+    def _read_disk_assets(self, key: str) -> dict[str, bytes] | None:
+        """Read the extracted files of a page from the disk tier, ``None`` if one is missing."""
+
+        document = self._read_disk(f"{key}.assets.json")
+        if document is None:
+            return {}
+        try:
+            names = json.loads(document)
+        except ValueError:
+            return None
+        assets = {}
+        for name in names:
+            asset = self._read_disk(f"{ASSET_DIR_NAME}/{name}")
+            if asset is None:
+                return None
+            assets[name] = asset
+        return assets
+
+    def _write_disk_assets(self, key: str, assets: dict[str, bytes]) -> None:
+        """Write the extracted files of a page, and their list, before the page itself."""
+
+        if not assets or self.cache_dir is None:
+            return
+        for name, asset in assets.items():
+            path = self._disk_path(f"{ASSET_DIR_NAME}/{name}")
+            try:
+                # Content-addressed: an existing file only needs its mtime refreshed.
+                os.utime(path)
+            except OSError:
+                self._write_disk(f"{ASSET_DIR_NAME}/{name}", asset, prune=False)
+        self._write_disk(f"{key}.assets.json", json.dumps(sorted(assets)).encode("utf-8"))
+
+    def _commit_stream(
+        self,
+        notebook_path: Path,
+        options: RenderOptions,
+        key: str,
+        handle: IO[bytes],
+        fragments: dict[str, str],
+        assets: dict[str, bytes],
+    ) -> bool:
+        """Move a completely streamed page into the disk tier."""
+
+        try:
+            handle.close()
+            if get_render_cache_key(notebook_path, options) != key:
+                return False
+            self._write_disk_assets(key, assets)
+            if fragments:
+                # Written before the page so a page on disk always has its fragments.
+                self._write_disk(f"{key}.fragments.json", json.dumps(fragments).encode("utf-8"))
+            path = self._disk_path(f"{key}.html")
+            size = os.stat(handle.name).st_size - _get_file_size(path)
+            os.replace(handle.name, path)
+            self._add_disk_bytes(size)
+        except OSError:
+            return False
+        return True
+
+    def _open_disk_temp(self) -> IO[bytes] | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            return tempfile.NamedTemporaryFile("wb", dir=self.cache_dir, suffix=".tmp", delete=False)
+        except OSError:
+            return None
+
+    def _write_disk(self, name: str, body: bytes, prune: bool = True) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            path = self._disk_path(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("wb", dir=self.cache_dir, suffix=".tmp", delete=False) as handle:
+                handle.write(body)
+                temp_path = Path(handle.name)
+            size = len(body) - _get_file_size(path)
+            os.replace(temp_path, path)
+            self._add_disk_bytes(size, prune)
+        except OSError:
+            # The disk tier is an optimisation; a full or read-only disk must not break serving.
+            pass
+
+    def _add_disk_bytes(self, size: int, prune: bool = True) -> None:
+        """Count bytes written to the disk tier and prune it once over ``max_disk_bytes``."""
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if prune and over_budget:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Remove the least recently used files until within budget and recount the disk tier."""
+
+        with self._lock:
+            counted = self._disk_bytes or 0
+        files = []
+        asset_dir = self.cache_dir / ASSET_DIR_NAME
+        paths = itertools.chain(self.cache_dir.iterdir(), asset_dir.iterdir() if asset_dir.is_dir() else ())
+        for path in paths:
+            if path.parent != asset_dir and not path.name.endswith((".html", ".html.gz", ".fragments.json", ".assets.json")):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _mtime, size, _path in files)
+        for _mtime, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        with self._lock:
+            # Writes while listing may be counted twice, which only prunes again sooner.
+            self._disk_bytes = total + (self._disk_bytes or 0) - counted
+
+
+def _get_file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _discard_temp(handle: IO[bytes]) -> None:
+    try:
+        handle.close()
+    except OSError:
+        pass
+    Path(handle.name).unlink(missing_ok=True)
+
+
+def _with_status(entry: RenderedNotebook, cache_status: str) -> RenderedNotebook:
+    return RenderedNotebook(
+        key=entry.key,
+        body=entry.body,
+        source_mtime=entry.source_mtime,
+        render_seconds=entry.render_seconds if cache_status == "miss" else 0.0,
+        cache_status=cache_status,
+        fragments=entry.fragments,
+        assets=entry.assets,
+    )
+
+
+@cache
+def _get_nbconvert_version() -> str:
+    # Scanning the installed distributions costs more than hashing the key it goes into.
+    try:
+        return importlib.metadata.version("nbconvert")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
@@ -0,0 +1,328 @@
+"""Export rendered notebooks as a static site.
+
+``notebook-static-server export --out DIR`` renders every served notebook
+into a mirror directory that any static web server can publish, with a
+generated ``index.html`` and precompressed ``.gz`` siblings for nginx
+``gzip_static``. ``notebooks/demo/run.ipynb`` becomes ``DIR/notebooks/demo/run.html``.
+
+Exports are incremental: ``DIR/.export-manifest.json`` records the stat,
+content hash and index metadata of every exported notebook, so a re-run only
+renders notebooks whose content changed and an unchanged tree costs one
+``stat`` per notebook. Notebooks removed from the tree are removed from the
+mirror.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from datetime import datetime
+from functools import cache
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+from typing import Any, Iterable
+from urllib.parse import quote
+
+from .cache import get_render_signature
+from .index import NotebookIndexEntry
+from .index import read_notebook_index_entry
+from .render import RenderOptions
+from .render import render_notebook
+from .server import PROJECT_ROOT
+from .server import format_index_page
+from .server import format_index_table
+from .server import list_notebooks
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".export-manifest.json"
+#: Bump when the manifest layout changes.
+MANIFEST_FORMAT_VERSION = 1
+
+
+@dataclass(slots=True)
+class ExportResult:
+    """Outcome of one :func:`export_site` run.
+
+    :ivar rendered:
+        Notebooks rendered in this run.
+    :ivar skipped:
+        Notebooks whose export was already current.
+    :ivar removed:
+        Notebooks that no longer exist and were removed from the mirror.
+    :ivar failed:
+        Notebook to error message, including earlier failures of notebooks
+        that have not changed since. Those are only retried with ``force``.
+    :ivar seconds:
+        Wall-clock duration of the run.
+    """
+
+    rendered: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def get_export_path(out_dir: Path, notebook: str) -> Path:
+    """Return the page path of a notebook in the mirror."""
+
+    return out_dir / Path(notebook).with_suffix(".html")
+
+
+def hash_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_with_gzip(path: Path, body: bytes) -> None:
+    """Atomically write a file and its precompressed ``.gz`` sibling."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The .gz goes first so a published page always has a current sibling.
+    _write_atomic(path.with_name(path.name + ".gz"), gzip.compress(body, compresslevel=9, mtime=0))
+    _write_atomic(path, body)
+
+
+def render_export_index(entries: Iterable[NotebookIndexEntry]) -> str:
+    """Render the static index page linking to every exported notebook."""
+
+    entries = sorted(entries, key=lambda entry: entry.path)
+    table = format_index_table(entries, lambda entry: quote(Path(entry.path).with_suffix(".html").as_posix(), safe="/"))
+    return format_index_page(f"""<p>Static saved outputs from notebooks/ and scratchpad/, {len(entries)} notebooks.</p>
+  {table}""")
+
+
+def export_site(
+    out_dir: Path,
+    notebooks: Iterable[str],
+    *,
+    project_root: Path,
+    jobs: int = 1,
+    options: RenderOptions | None = None,
+    force: bool = False,
+) -> ExportResult:
+    """Render notebooks into a static mirror directory.
+
+    Lazily loaded outputs, extracted images and shared static files need the
+    server's ``/output/``, ``/asset/`` and ``/static/`` routes, so pages are
+    always exported as self-contained HTML.
+
+    .. code-block:: python
+
+        result = export_site(Path("site"), list_notebooks(), project_root=PROJECT_ROOT, jobs=4)
+        print(len(result.rendered), "rendered", len(result.skipped), "unchanged")
+
+    :param notebooks:
+        Notebook paths relative to ``project_root``, e.g. from :func:`~.server.list_notebooks`.
+    :param jobs:
+        Render processes. ``1`` renders in this process.
+    :param force:
+        Render every notebook even when its export is current.
+    """
+
+    started = time.perf_counter()
+    options = replace(options or RenderOptions(), lazy_output_bytes=0, extract_images=False, shared_static=False, max_output_bytes=0, fast=False)
+    out_dir = out_dir.resolve()
+    signature = get_render_signature(options)
+    manifest = _read_manifest(out_dir)
+    previous = manifest["notebooks"] if manifest.get("signature") == signature and not force else {}
+
+    result = ExportResult()
+    records: dict[str, dict[str, Any]] = {}
+    pending: dict[str, dict[str, Any]] = {}
+    for notebook in notebooks:
+        source = project_root / notebook
+        try:
+            stat = source.stat()
+        except OSError as exc:
+            result.failed[notebook] = str(exc)
+            continue
+        record = previous.get(notebook)
+        current = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        # Records with an index entry have a published page; failed renders may not.
+        if record is not None and ("entry" not in record or get_export_path(out_dir, notebook).exists()):
+            if record["mtime_ns"] != current["mtime_ns"] or record["size"] != current["size"]:
+                current["sha256"] = hash_file(source)
+                if record["sha256"] != current["sha256"]:
+                    pending[notebook] = current
+                    continue
+                # Touched but unchanged; only the index needs the new mtime.
+                record = {**record, **current}
+                if "entry" in record:
+                    record["entry"] = {**record["entry"], "modified_at": datetime.fromtimestamp(stat.st_mtime).astimezone().isoformat()}
+            records[notebook] = record
+            if "error" in record:
+                result.failed[notebook] = record["error"]
+            else:
+                result.skipped.append(notebook)
+            continue
+        pending[notebook] = current
+
+    for notebook, outcome in _render_all(out_dir, project_root, pending, options, jobs):
+        if isinstance(outcome, str):
+            result.failed[notebook] = outcome
+            logger.warning("Exporting %s failed: %s", notebook, outcome)
+            # Not retried until the notebook changes; an earlier export of it stays published.
+            earlier = manifest["notebooks"].get(notebook, {})
+            sha256 = pending[notebook].get("sha256") or hash_file(project_root / notebook)
+            records[notebook] = {**earlier, **pending[notebook], "sha256": sha256, "error": outcome}
+        else:
+            records[notebook] = {**pending[notebook], **outcome}
+            result.rendered.append(notebook)
+
+    for notebook in manifest["notebooks"].keys() - records.keys():
+        page = get_export_path(out_dir, notebook)
+        page.unlink(missing_ok=True)
+        page.with_name(page.name + ".gz").unlink(missing_ok=True)
+        result.removed.append(notebook)
+
+    if result.rendered or result.removed or records != manifest["notebooks"] or not (out_dir / "index.html").exists():
+        entries = [_entry_from_record(notebook, record) for notebook, record in records.items() if "entry" in record]
+        write_with_gzip(out_dir / "index.html", render_export_index(entries).encode("utf-8"))
+        document = {"format": MANIFEST_FORMAT_VERSION, "signature": signature, "notebooks": records}
+        _write_atomic(out_dir / MANIFEST_NAME, json.dumps(document, indent=1, sort_keys=True).encode("utf-8"))
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def parse_export_args(argv: list[str]) -> argparse.Namespace:
+    """Parse ``export`` subcommand arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="notebook-static-server export",
+        description="Render every notebook under notebooks/ and scratchpad/ into a static site directory.",
+    )
+    parser.add_argument("--out", required=True, type=Path, help="Mirror directory to write.")
+    parser.add_argument("--jobs", default=os.cpu_count() or 1, type=int, help="Parallel render processes. Defaults to the CPU count.")
+    parser.add_argument("--no-input", action="store_true", help="Hide code cell inputs.")
+    parser.add_argument("--force", action="store_true", help="Render every notebook, even when its export is current.")
+    return parser.parse_args(argv)
+
+
+def export_main(argv: list[str]) -> int:
+    """Run the ``export`` subcommand.
+
+    .. code-block:: shell
+
+        poetry run notebook-static-server export --out /srv/www/notebooks --jobs 8
+
+    :return:
+        Process exit code; ``1`` when any notebook failed to render.
+    """
+
+    args = parse_export_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = export_site(
+        args.out,
+        list_notebooks(),
+        project_root=PROJECT_ROOT,
+        jobs=args.jobs,
+        options=RenderOptions(exclude_input=args.no_input),
+        force=args.force,
+    )
+    print(
+        f"Exported {len(result.rendered)}, unchanged {len(result.skipped)}, removed {len(result.removed)}, "
+        f"failed {len(result.failed)} notebooks to {args.out} in {result.seconds:.2f}s"
+    )
+    for notebook, message in sorted(result.failed.items()):
+        print(f"- {notebook}: {message}", file=sys.stderr)
+    return 1 if result.failed else 0
+
+
+def _render_all(
+    out_dir: Path,
+    project_root: Path,
+    pending: dict[str, dict[str, Any]],
+    options: RenderOptions,
+    jobs: int,
+) -> Iterable[tuple[str, dict[str, Any] | str]]:
+    """Yield each notebook with its manifest fields, or an error message."""
+
+    if not pending:
+        return
+    tasks = {notebook: (project_root / notebook, get_export_path(out_dir, notebook), notebook) for notebook in pending}
+    if jobs <= 1:
+        for notebook, task in tasks.items():
+            yield notebook, _export_notebook(*task, options)
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), mp_context=context) as pool:
+        futures = {pool.submit(_export_notebook, *task, options): notebook for notebook, task in tasks.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as exc:
+                yield futures[future], f"{type(exc).__name__}: {exc}"
+
+
+def _export_notebook(source: Path, target: Path, notebook: str, options: RenderOptions) -> dict[str, Any] | str:
+    """Render one notebook into the mirror; runs in a worker process when ``jobs > 1``."""
+
+    try:
+        sha256 = hash_file(source)
+        entry = read_notebook_index_entry(source, notebook)
+        write_with_gzip(target, render_notebook(source, options).encode("utf-8"))
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+    document = asdict(entry)
+    del document["path"], document["size"]
+    document["modified_at"] = entry.modified_at.isoformat()
+    document["executed_at"] = entry.executed_at.isoformat() if entry.executed_at else None
+    return {"sha256": sha256, "entry": document}
+
+
+def _entry_from_record(notebook: str, record: dict[str, Any]) -> NotebookIndexEntry:
+    entry = record["entry"]
+    return NotebookIndexEntry(
+        path=notebook,
+        size=record["size"],
+        modified_at=datetime.fromisoformat(entry["modified_at"]),
+        code_cells=entry["code_cells"],
+        executed_at=datetime.fromisoformat(entry["executed_at"]) if entry["executed_at"] else None,
+        error_count=entry["error_count"],
+        readable=entry["readable"],
+    )
+
+
+def _read_manifest(out_dir: Path) -> dict[str, Any]:
+    try:
+        document = json.loads((out_dir / MANIFEST_NAME).read_bytes())
+    except (OSError, ValueError):
+        return {"notebooks": {}}
+    if document.get("format") != MANIFEST_FORMAT_VERSION:
+        return {"notebooks": {}}
+    return document
+
+
+def _write_atomic(path: Path, body: bytes) -> None:
+    with tempfile.NamedTemporaryFile("wb", dir=path.parent, prefix=".", suffix=".tmp", delete=False) as handle:
+        handle.write(body)
+    # Temporary files are private; published pages must be readable by the web server's user.
+    os.chmod(handle.name, 0o666 & ~_get_umask())
+    os.replace(handle.name, path)
+
+
+@cache
+def _get_umask() -> int:
+    # The umask can only be read by setting it.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
@@ -0,0 +1,200 @@
+"""Lightweight notebook renderer for previews.
+
+nbconvert's ``HTMLExporter`` spends most of a render in Jinja templates,
+Pygments highlighting and per-cell filter plumbing. :func:`render_fast_notebook`
+writes a minimal page straight from the cells instead: escaped code,
+markdown rendered once per source and outputs as HTML, images or text.
+It is enabled with :attr:`~.render.RenderOptions.fast`, e.g. ``?fast=1``.
+
+Fast pages differ from full ones: code is not highlighted on the server
+(pass ``fast_highlight_url`` to highlight it in the browser once the page
+is idle), ANSI colours are dropped, math is shown as TeX and widgets fall
+back to their text. Cell ids and heading anchors are the same, so links
+into a notebook work on both.
+"""
+
+from functools import lru_cache
+import html
+import json
+import re
+from typing import Any
+
+from nbconvert import HTMLExporter
+from nbconvert.filters.markdown_mistune import IPythonRenderer
+from nbconvert.filters.markdown_mistune import MarkdownWithMath
+from nbformat import NotebookNode
+
+from .render import HEADING_RE
+from .render import TOC_STYLE
+from .render import RenderOptions
+from .render import format_table_of_contents
+from .render import get_heading_id
+from .render import get_heading_label
+from .render import insert_table_of_contents
+
+#: Output types in order of preference, as in nbconvert's HTML exporter without widgets and LaTeX.
+FAST_MIME_PRIORITY = ("application/javascript", "text/html", "text/markdown", "image/svg+xml", "image/png", "image/jpeg", "text/plain")
+FAST_PAGE_STYLE = """
+<style>
+body { margin: 0 auto; max-width: 1200px; padding: 1rem; font-family: system-ui, sans-serif; line-height: 1.5; color: #222; }
+pre { overflow-x: auto; margin: 0; padding: 0.5rem; font-size: 0.85rem; white-space: pre-wrap; word-break: break-word; }
+.notebook-cell { margin: 0.75rem 0; }
+.notebook-input { background: #f7f7f7; border-left: 3px solid #ccc; }
+.notebook-error { background: #fdd; }
+.notebook-output { overflow-x: auto; }
+.notebook-output img { max-width: 100%; height: auto; }
+.notebook-output table { border-collapse: collapse; font-size: 0.85rem; }
+.notebook-output th, .notebook-output td { border: 1px solid #ddd; padding: 0.2rem 0.5rem; text-align: right; }
+.notebook-fast-note { font-size: 0.85rem; color: #666; }
+</style>
+"""
+#: Loads a highlight.js build from ``fast_highlight_url`` when the browser is idle.
+FAST_HIGHLIGHT_LOADER = """
+<script>
+(function () {
+  function load() {
+    var script = document.createElement("script");
+    script.src = %s;
+    script.onload = function () { window.hljs.highlightAll(); };
+    document.head.appendChild(script);
+  }
+  (window.requestIdleCallback || window.setTimeout)(load);
+})();
+</script>
+"""
+ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+@lru_cache(maxsize=4096)
+def render_markdown_source(source: str) -> str:
+    """Render markdown like nbconvert's ``markdown2html`` filter, once per distinct source.
+
+    Keyed by the source itself, so unchanged cells of a re-saved notebook
+    are not rendered again.
+    """
+
+    return MarkdownWithMath(renderer=IPythonRenderer(escape=False)).render(source)
+
+
+def render_markdown_cell(cell: NotebookNode) -> str:
+    """Render a markdown cell; cells with attachments are not cached."""
+
+    if cell.get("attachments"):
+        return MarkdownWithMath(renderer=IPythonRenderer(escape=False, attachments=cell.attachments)).render(cell.source)
+    return render_markdown_source(cell.source)
+
+
+def _join_text(value: Any) -> str:
+    return "".join(value) if isinstance(value, list) else str(value)
+
+
+def _pre(text: str, css_class: str = "notebook-output") -> str:
+    return f'<pre class="{css_class}">{html.escape(ANSI_ESCAPE_RE.sub("", text))}</pre>'
+
+
+def render_fast_output(output: NotebookNode) -> str:
+    """Render one output: HTML and SVG as is, images by URL or data URI, anything else as text."""
+
+    output_type = output.get("output_type")
+    if output_type == "stream":
+        return _pre(_join_text(output.get("text", "")))
+    if output_type == "error":
+        return _pre("\n".join(output.get("traceback", [])) or f"{output.get('ename')}: {output.get('evalue')}", "notebook-output notebook-error")
+
+    data = output.get("data", {})
+    filenames = output.get("metadata", {}).get("filenames", {})
+    for mime_type in FAST_MIME_PRIORITY:
+        if mime_type not in data:
+            continue
+        value = _join_text(data[mime_type])
+        if mime_type == "application/javascript":
+            return f"<script>{value}</script>"
+        if mime_type in ("text/html", "image/svg+xml"):
+            return f'<div class="notebook-output">{value}</div>'
+        if mime_type == "text/markdown":
+            return f'<div class="notebook-output">{render_markdown_source(value)}</div>'
+        if mime_type in ("image/png", "image/jpeg"):
+            src = filenames.get(mime_type) or f"data:{mime_type};base64,{value.strip()}"
+            return f'<div class="notebook-output"><img src="{html.escape(src, quote=True)}" alt="Output image"></div>'
+        return _pre(value)
+    return ""
+
+
+def render_fast_notebook(notebook: NotebookNode, options: RenderOptions, title: str) -> str:
+    """Render a notebook page without nbconvert.
+
+    The notebook is prepared as for the full page: progress output cleaned
+    and images and plotly.js optionally extracted. Lazy outputs and the
+    live view are not supported and are ignored.
+
+    :param title:
+        Page title when the notebook metadata has none, e.g. the file stem.
+    """
+
+    language = notebook.metadata.get("language_info", {}).get("name") or "python"
+    markdown = {index: render_markdown_cell(cell) for index, cell in enumerate(notebook.cells) if cell.cell_type == "markdown"}
+
+    # Same rule as prepare_table_of_contents: h2 and h3 after the first h1 of the markdown cells.
+    first_h1_index = None
+    headings = []
+    for index, rendered in markdown.items():
+        for heading in HEADING_RE.finditer(rendered):
+            if first_h1_index is None:
+                if heading.group(1) == "1":
+                    first_h1_index = index
+                continue
+            headings.append((heading.group(1), get_heading_id(heading.group(2)), get_heading_label(heading.group(3))))
+    toc = format_table_of_contents(headings) if first_h1_index is not None else None
+    if toc:
+        markdown[first_h1_index] = insert_table_of_contents(markdown[first_h1_index], toc) or markdown[first_h1_index]
+
+    parts = []
+    uses_require = False
+    for index, cell in enumerate(notebook.cells):
+        cell_id = f' id="{html.escape("cell-id=" + cell.id, quote=True)}"' if cell.get("id") else ""
+        if cell.cell_type == "markdown":
+            parts.append(f'<div class="notebook-cell notebook-markdown-cell"{cell_id}>{markdown[index]}</div>')
+            continue
+        if cell.cell_type != "code":
+            continue
+        body = []
+        if not options.exclude_input and cell.source.strip():
+            body.append(f'<pre class="notebook-input"><code class="language-{html.escape(language, quote=True)}">{html.escape(cell.source)}</code></pre>')
+        for output in cell.get("outputs", []):
+            rendered = render_fast_output(output)
+            uses_require = uses_require or "require(" in rendered or "requirejs(" in rendered
+            body.append(rendered)
+        if body:
+            parts.append(f'<div class="notebook-cell notebook-code-cell"{cell_id}>{"".join(body)}</div>')
+
+    head = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        '<meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>{html.escape(notebook.metadata.get('title') or title)}</title>",
+        FAST_PAGE_STYLE,
+        TOC_STYLE if toc else "",
+        # Chart outputs such as plotly load their libraries with RequireJS, which the nbconvert templates provide.
+        f'<script src="{html.escape(HTMLExporter.require_js_url.default_value, quote=True)}"></script>' if uses_require else "",
+        "</head>",
+        '<body class="notebook-fast">',
+        "<main>",
+        '<p class="notebook-fast-note">Fast preview. <a href="?fast=0">Full rendering</a></p>',
+    ]
+    tail = [
+        "</main>",
+        FAST_HIGHLIGHT_LOADER % _format_script_string(options.fast_highlight_url) if options.fast_highlight_url else "",
+        "</body>",
+        "</html>",
+        "",
+    ]
+    return "\n".join(head + parts + tail)
+
+
+def _format_script_string(value: str) -> str:
+    """Format a JavaScript string literal that cannot end its ``<script>`` element."""
+
+    # Script contents are not HTML-escaped, so only "</" needs care.
+    return json.dumps(value).replace("</", "<\\/")
@@ -0,0 +1,233 @@
+"""In-memory index of served notebooks for the index page.
+
+Walking ``notebooks/`` and ``scratchpad/`` on every index request gets slow
+with thousands of executed notebooks. The index is populated once at start
+up and then kept current from watcher events, so listing costs only the
+entries shown.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Iterable, Literal
+
+from .reader import load_notebook_text
+from .watcher import is_watched_notebook
+
+logger = logging.getLogger(__name__)
+
+type IndexSortKey = Literal["path", "modified", "size", "cells", "executed"]
+
+#: Sort keys accepted by :meth:`NotebookIndex.query`.
+INDEX_SORT_KEYS: tuple[IndexSortKey, ...] = ("path", "modified", "size", "cells", "executed")
+
+
+@dataclass(slots=True, frozen=True)
+class NotebookIndexEntry:
+    """Metadata of one notebook file.
+
+    :ivar path:
+        Path relative to the project root, as used in ``/view/`` URLs.
+    :ivar size:
+        File size in bytes.
+    :ivar modified_at:
+        File modification time.
+    :ivar code_cells:
+        Number of code cells.
+    :ivar executed_at:
+        Latest cell execution time recorded by nbclient, if any.
+    :ivar error_count:
+        Number of code cells with an error output.
+    :ivar readable:
+        ``False`` when the file could not be parsed as a notebook.
+    """
+
+    path: str
+    size: int
+    modified_at: datetime
+    code_cells: int = 0
+    executed_at: datetime | None = None
+    error_count: int = 0
+    readable: bool = True
+
+    @property
+    def root(self) -> str:
+        """Top-level notebook root, e.g. ``notebooks``."""
+
+        return self.path.split("/", 1)[0]
+
+    @property
+    def has_errors(self) -> bool:
+        """Whether any code cell has an error output."""
+
+        return self.error_count > 0
+
+
+def read_notebook_index_entry(notebook_path: Path, relative_path: str) -> NotebookIndexEntry:
+    """Read index metadata from a notebook file.
+
+    Uses :func:`~.reader.load_notebook_text`, which skips images and other
+    output payloads; nbformat validation is not needed for metadata and is
+    much slower on large notebooks.
+    """
+
+    stat = notebook_path.stat()
+    modified_at = datetime.fromtimestamp(stat.st_mtime).astimezone()
+    try:
+        cells = load_notebook_text(notebook_path).get("cells", [])
+    except (OSError, ValueError, AttributeError):
+        return NotebookIndexEntry(path=relative_path, size=stat.st_size, modified_at=modified_at, readable=False)
+
+    code_cells = 0
+    error_count = 0
+    executed_at: datetime | None = None
+    for cell in cells:
+        if not isinstance(cell, dict) or cell.get("cell_type") != "code":
+            continue
+        code_cells += 1
+        if any(isinstance(output, dict) and output.get("output_type") == "error" for output in cell.get("outputs", [])):
+            error_count += 1
+        execution = cell.get("metadata", {}).get("execution", {})
+        finished = execution.get("iopub.status.idle") or execution.get("shell.execute_reply") if isinstance(execution, dict) else None
+        if isinstance(finished, str):
+            try:
+                timestamp = datetime.fromisoformat(finished.replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.astimezone()
+            if executed_at is None or timestamp > executed_at:
+                executed_at = timestamp
+    return NotebookIndexEntry(
+        path=relative_path,
+        size=stat.st_size,
+        modified_at=modified_at,
+        code_cells=code_cells,
+        executed_at=executed_at,
+        error_count=error_count,
+    )
+
+
+class NotebookIndex:
+    """Thread-safe index of the notebooks under the served roots.
+
+    .. code-block:: python
+
+        index = NotebookIndex(PROJECT_ROOT, get_available_roots())
+        index.start_scan()
+        entries = index.query(sort="modified", descending=True, status="error")
+    """
+
+    def __init__(self, project_root: Path, roots: Iterable[Path]) -> None:
+        self.project_root = project_root.resolve()
+        self.roots = tuple(Path(root).resolve() for root in roots)
+        self._entries: dict[str, NotebookIndexEntry] = {}
+        self._lock = threading.Lock()
+        self._scan_done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the initial scan has finished."""
+
+        return self._scan_done.is_set()
+
+    def scan(self) -> None:
+        """Walk the roots once and index every notebook."""
+
+        for root in self.roots:
+            for directory, dirnames, filenames in os.walk(root):
+                dirnames[:] = [name for name in dirnames if name != ".ipynb_checkpoints"]
+                for filename in filenames:
+                    if filename.endswith(".ipynb"):
+                        self.update(Path(directory) / filename)
+        self._scan_done.set()
+
+    def start_scan(self) -> threading.Thread:
+        """Run :meth:`scan` in a background thread so serving starts at once."""
+
+        thread = threading.Thread(target=self.scan, name="notebook-index-scan", daemon=True)
+        thread.start()
+        return thread
+
+    def update(self, notebook_path: Path) -> None:
+        """Re-read one notebook, or drop it when it no longer exists."""
+
+        notebook_path = notebook_path.resolve()
+        relative_path = self._relative_path(notebook_path)
+        if relative_path is None or not is_watched_notebook(notebook_path):
+            return
+        try:
+            entry = read_notebook_index_entry(notebook_path, relative_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(relative_path, None)
+            return
+        except OSError as exc:
+            logger.warning("Could not index %s: %s", notebook_path, exc)
+            return
+        with self._lock:
+            self._entries[relative_path] = entry
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def query(
+        self,
+        *,
+        sort: IndexSortKey = "path",
+        descending: bool = False,
+        text: str | None = None,
+        root: str | None = None,
+        status: Literal["error", "ok"] | None = None,
+        limit: int | None = None,
+    ) -> list[NotebookIndexEntry]:
+        """Return filtered and sorted index entries.
+
+        :param sort:
+            One of :data:`INDEX_SORT_KEYS`.
+        :param text:
+            Case-insensitive substring the path must contain.
+        :param root:
+            Only notebooks under this root, e.g. ``scratchpad``.
+        :param status:
+            ``"error"`` for notebooks with error outputs, ``"ok"`` for the rest.
+        :param limit:
+            Maximum number of entries returned.
+        """
+
+        if sort not in INDEX_SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        with self._lock:
+            entries = list(self._entries.values())
+        if text:
+            needle = text.lower()
+            entries = [entry for entry in entries if needle in entry.path.lower()]
+        if root:
+            entries = [entry for entry in entries if entry.root == root]
+        if status == "error":
+            entries = [entry for entry in entries if entry.has_errors]
+        elif status == "ok":
+            entries = [entry for entry in entries if not entry.has_errors]
+        entries.sort(key=_SORT_FUNCTIONS[sort], reverse=descending)
+        return entries[:limit] if limit is not None else entries
+
+    def _relative_path(self, notebook_path: Path) -> str | None:
+        for root in self.roots:
+            if notebook_path.is_relative_to(root):
+                return notebook_path.relative_to(self.project_root).as_posix()
+        return None
+
+
+_EPOCH = datetime.fromtimestamp(0).astimezone()
+
+_SORT_FUNCTIONS = {
+    "path": lambda entry: entry.path,
+    "modified": lambda entry: (entry.modified_at, entry.path),
+    "size": lambda entry: (entry.size, entry.path),
+    "cells": lambda entry: (entry.code_cells, entry.path),
+    "executed": lambda entry: (entry.executed_at or _EPOCH, entry.path),
+}
@@ -0,0 +1,358 @@
+"""Push cell updates of running notebooks to open pages with server-sent events.
+
+The execution agent publishes its events to a live channel file, see
+:mod:`getting_started.jupyter_execute_agent.live`. A :class:`LiveNotebookView`
+tails the channel of one notebook and turns it into an event stream for
+``/live/``: cells are re-rendered one at a time from the partially saved
+notebook once the agent has saved them, and running cells get their latest
+output preview, so an open page follows a run without reloading and
+re-rendering the whole notebook after every cell.
+"""
+
+from datetime import datetime
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Any, BinaryIO, Iterator
+
+from getting_started.jupyter_execute_agent.live import DEFAULT_LIVE_CHANNEL_DIR
+from getting_started.jupyter_execute_agent.live import get_live_channel_path
+
+from .partial import NotebookCellCache
+from .partial import get_notebook_version
+from .partial import read_cached_notebook
+from .partial import render_cached_cell
+from .pool import NotebookRenderPool
+from .render import RenderOptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIVE_POLL_SECONDS = 0.5
+DEFAULT_LIVE_HEARTBEAT_SECONDS = 15.0
+# Pages of notebooks that are not running check again this often.
+LIVE_IDLE_RETRY_MILLISECONDS = 60_000
+# Beyond this many cells to update, one page reload is cheaper than per-cell renders.
+LIVE_MAX_CELL_UPDATES = 50
+_TAIL_BYTES = 64 * 1024
+
+
+def format_sse_event(event: str, data: dict[str, Any], event_id: str | None = None) -> str:
+    """Format one server-sent event."""
+
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def is_process_alive(pid: int) -> bool:
+    """Check whether a local process exists."""
+
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_last_live_record(channel_path: Path) -> dict[str, Any] | None:
+    """Return the last complete record of a live channel, or ``None``."""
+
+    try:
+        with channel_path.open("rb") as handle:
+            size = handle.seek(0, os.SEEK_END)
+            start = max(0, size - _TAIL_BYTES)
+            handle.seek(start)
+            lines = handle.read().split(b"\n")
+            if start and len(lines) < 3:
+                handle.seek(0)
+                lines = handle.read().split(b"\n")
+                start = 0
+    except OSError:
+        return None
+    # The last element is empty or a line still being written, the first may be cut.
+    for line in reversed(lines[1 if start else 0 : -1]):
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+    return None
+
+
+def is_notebook_running(notebook_path: Path, channel_dir: Path = DEFAULT_LIVE_CHANNEL_DIR) -> bool:
+    """Check whether a live execution agent run is writing a notebook."""
+
+    record = read_last_live_record(get_live_channel_path(notebook_path, channel_dir))
+    return record is not None and record.get("kind") != "notebook_completed" and is_process_alive(int(record.get("pid", 0)))
+
+
+class LiveNotebookView:
+    """Server-sent event stream following the execution agent run of one notebook.
+
+    Iterating yields formatted events until the run completes, the agent
+    process dies or the client disconnects. On connect the channel is
+    replayed without sending events; cells saved after the page's notebook
+    version (``since``, or the ``Last-Event-ID`` of a reconnecting client)
+    are then pushed, followed by the cells that are still running. Without a
+    running notebook a single ``idle`` event tells the client when to check
+    again.
+
+    .. code-block:: python
+
+        view = LiveNotebookView(notebook_path, RenderOptions(), since=page_mtime)
+        for message in view:
+            wfile.write(message.encode("utf-8"))
+            wfile.flush()
+
+    :param since:
+        Unix time of the notebook version the page shows.
+    :param last_event_id:
+        ``Last-Event-ID`` header of a reconnecting client.
+    :param cell_cache:
+        Cache of saved notebook versions and their rendered cells; share one
+        so all viewers of a run parse and render each save once.
+    :param render_pool:
+        Render cells in worker processes of this pool instead of the
+        streaming thread.
+    """
+
+    def __init__(
+        self,
+        notebook_path: Path,
+        options: RenderOptions,
+        *,
+        channel_dir: Path = DEFAULT_LIVE_CHANNEL_DIR,
+        since: float | None = None,
+        last_event_id: str | None = None,
+        poll_seconds: float = DEFAULT_LIVE_POLL_SECONDS,
+        heartbeat_seconds: float = DEFAULT_LIVE_HEARTBEAT_SECONDS,
+        cell_cache: NotebookCellCache | None = None,
+        render_pool: NotebookRenderPool | None = None,
+    ) -> None:
+        self.notebook_path = notebook_path
+        self.options = options
+        self.channel_path = get_live_channel_path(notebook_path, channel_dir)
+        self.since = since
+        self.last_event_id = last_event_id
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.cell_cache = cell_cache or NotebookCellCache()
+        self.render_pool = render_pool
+        self._reset()
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            handle = self.channel_path.open("rb")
+        except FileNotFoundError:
+            yield self._idle()
+            return
+        try:
+            yield from self._follow(handle)
+        finally:
+            handle.close()
+
+    def _reset(self) -> None:
+        self._pid = 0
+        # "completed", or "stopped" when the agent process died mid-run.
+        self._outcome: str | None = None
+        self._running: dict[int, dict[str, Any]] = {}
+        self._previews: dict[int, str] = {}
+        # Finished cells the agent has not saved yet.
+        self._unsaved: set[int] = set()
+        # Saved cells to push once the replay is done.
+        self._replayed: set[int] = set()
+
+    def _follow(self, handle: BinaryIO) -> Iterator[str]:
+        inode = os.fstat(handle.fileno()).st_ino
+        resume_offset = self._get_resume_offset(inode)
+        offset, buffer = 0, b""
+        replaying = True
+        last_sent = time.monotonic()
+        while True:
+            data = handle.read()
+            messages: list[str] = []
+            if data:
+                *lines, buffer = (buffer + data).split(b"\n")
+                for line in lines:
+                    offset += len(line) + 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if replaying:
+                        self._replay(record, offset, resume_offset)
+                    else:
+                        messages.extend(self._apply(record, f"{inode}:{offset}"))
+
+            if (replaying or not data) and self._outcome is None and not self._is_writer_alive():
+                self._outcome = "stopped"
+            if replaying:
+                replaying = False
+                if self._outcome is not None and not self._replayed:
+                    yield self._idle()
+                    return
+                event_id = f"{inode}:{offset}"
+                messages.extend(self._render_cells(sorted(self._replayed), event_id))
+                if self._outcome is None:
+                    messages.extend(self._get_running_events(event_id))
+            if self._outcome is not None:
+                messages.append(format_sse_event("completed", {"state": self._outcome}))
+
+            if messages:
+                yield "".join(messages)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= self.heartbeat_seconds:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            if self._outcome is not None:
+                return
+            if not data:
+                time.sleep(self.poll_seconds)
+                if self._get_channel_inode() not in (None, inode):
+                    # A new run replaced the channel; the page starts over from its first save.
+                    yield format_sse_event("reload", {})
+                    return
+
+    def _replay(self, record: dict[str, Any], offset: int, resume_offset: int | None) -> None:
+        """Update the run state from a record written before the client connected."""
+
+        if record.get("kind") == "notebook_saved":
+            if resume_offset is not None:
+                saved_after_page = offset > resume_offset
+            else:
+                saved_after_page = self.since is not None and _parse_timestamp(record.get("finished_at")) > self.since
+            if saved_after_page:
+                self._replayed.update(self._unsaved)
+                if record.get("cell_index") is not None:
+                    self._replayed.add(record["cell_index"])
+        self._apply(record, None)
+
+    def _apply(self, record: dict[str, Any], event_id: str | None) -> list[str]:
+        """Update the run state from a record.
+
+        :param event_id:
+            Id for the events to push, or ``None`` while replaying.
+        :return:
+            Events to push.
+        """
+
+        kind = record.get("kind")
+        cell_index = record.get("cell_index")
+        live = event_id is not None
+        if kind == "notebook_started":
+            self._reset()
+        self._pid = int(record.get("pid", self._pid))
+        if kind == "cell_started" and cell_index is not None:
+            self._running[cell_index] = record
+            self._previews.pop(cell_index, None)
+            return [self._format_cell_started(record, event_id)] if live else []
+        if kind == "cell_output" and cell_index is not None:
+            self._previews[cell_index] = record.get("output_preview") or ""
+            return [self._format_cell_output(cell_index, event_id)] if live else []
+        if kind in ("cell_completed", "cell_failed") and cell_index is not None:
+            self._running.pop(cell_index, None)
+            self._previews.pop(cell_index, None)
+            self._unsaved.add(cell_index)
+            if not live:
+                return []
+            status = "completed" if kind == "cell_completed" else "failed"
+            return [format_sse_event("cell-finished", {"cell_index": cell_index, "cell_id": self._get_cell_id(cell_index), "status": status}, event_id)]
+        if kind == "notebook_saved":
+            if cell_index is not None:
+                self._unsaved.add(cell_index)
+            if not live:
+                self._unsaved.clear()
+                return []
+            return self._render_cells(sorted(self._unsaved), event_id)
+        if kind == "notebook_completed":
+            self._outcome = "completed"
+        return []
+
+    def _render_cells(self, cell_indexes: list[int], event_id: str) -> list[str]:
+        """Render saved cells for the page; unreadable saves are retried on the next save."""
+
+        if len(cell_indexes) > LIVE_MAX_CELL_UPDATES:
+            self._unsaved.clear()
+            return [format_sse_event("reload", {}, event_id)]
+        try:
+            version = get_notebook_version(self.notebook_path)
+            notebook = read_cached_notebook(version, self.options.max_output_bytes, self.cell_cache)
+            updates = [(cell_index, render_cached_cell(notebook, version, cell_index, self.options, self.cell_cache, self.render_pool)) for cell_index in cell_indexes]
+        except Exception as exc:
+            # Most likely the agent is writing the next save right now.
+            logger.debug("Cannot render saved cells of %s: %s", self.notebook_path, exc)
+            self._unsaved.update(cell_indexes)
+            return []
+        self._unsaved.difference_update(cell_indexes)
+        return [
+            format_sse_event("cell", {"cell_index": cell_index, "cell_id": self._get_cell_id(cell_index), "html": cell_html}, event_id)
+            for cell_index, cell_html in updates
+        ]
+
+    def _get_running_events(self, event_id: str) -> list[str]:
+        messages = []
+        for cell_index, record in self._running.items():
+            messages.append(self._format_cell_started(record, event_id))
+            if self._previews.get(cell_index):
+                messages.append(self._format_cell_output(cell_index, event_id))
+        return messages
+
+    def _format_cell_output(self, cell_index: int, event_id: str | None) -> str:
+        return format_sse_event("cell-output", {"cell_index": cell_index, "cell_id": self._get_cell_id(cell_index), "preview": self._previews[cell_index]}, event_id)
+
+    def _format_cell_started(self, record: dict[str, Any], event_id: str | None) -> str:
+        cell_index = record["cell_index"]
+        return format_sse_event(
+            "cell-started",
+            {
+                "cell_index": cell_index,
+                "cell_id": self._get_cell_id(cell_index),
+                "code_cell_index": record.get("code_cell_index"),
+                "total_code_cells": record.get("total_code_cells"),
+                "label": record.get("cell_label") or "",
+            },
+            event_id,
+        )
+
+    def _get_cell_id(self, cell_index: int) -> str | None:
+        """Return the id of a cell in the latest saved notebook; pages use it as the cell's element id."""
+
+        try:
+            cell = read_cached_notebook(get_notebook_version(self.notebook_path), self.options.max_output_bytes, self.cell_cache).cells[cell_index]
+        except Exception:
+            return None
+        return cell.get("id")
+
+    def _get_resume_offset(self, inode: int) -> int | None:
+        channel_inode, _, offset = (self.last_event_id or "").partition(":")
+        if channel_inode == str(inode) and offset.isdigit():
+            return int(offset)
+        return None
+
+    def _is_writer_alive(self) -> bool:
+        # Before the first record the run is just starting.
+        return not self._pid or is_process_alive(self._pid)
+
+    def _get_channel_inode(self) -> int | None:
+        try:
+            return self.channel_path.stat().st_ino
+        except OSError:
+            return None
+
+    def _idle(self) -> str:
+        return f"retry: {LIVE_IDLE_RETRY_MILLISECONDS}\n" + format_sse_event("idle", {})
+
+
+def _parse_timestamp(value: str | None) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
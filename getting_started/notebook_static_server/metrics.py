@@ -0,0 +1,203 @@
+"""Request and render metrics for ``/metrics``.
+
+Slow page reports can come from rendering, the disk tier or the network.
+Request counts, response bytes and latencies per route are collected by
+the request handler, render latencies by the render cache, and the rest is
+read from the existing statistics when ``/metrics`` is scraped. The page is
+in the Prometheus text format, so it can be scraped or read with ``curl``.
+
+Recording is a few integer updates under one lock per request; nothing is
+computed until scraped.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+import threading
+from typing import Iterable, Mapping
+
+#: Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+type MetricLabels = tuple[tuple[str, str], ...]
+
+
+@dataclass(slots=True, frozen=True)
+class MetricFamily:
+    """Counter or gauge samples read from other statistics when scraped.
+
+    :ivar kind:
+        ``"counter"`` or ``"gauge"``.
+    :ivar samples:
+        Labels and value of every sample. Samples without a value, e.g.
+        a hit ratio before the first lookup, are left out.
+    """
+
+    name: str
+    kind: str
+    help: str
+    samples: tuple[tuple[MetricLabels, float | None], ...]
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of durations with fixed buckets."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # One count per bucket plus one for durations above the last bound.
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Return the cumulative count of every bucket, ending with ``+Inf``, and the sum."""
+
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class ServerMetrics:
+    """Per-route request counters of the HTTP server.
+
+    .. code-block:: python
+
+        metrics = ServerMetrics()
+        metrics.request_started()
+        metrics.request_finished("/view/", 200, seconds=0.12, bytes_sent=48213)
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        #: Latency of ``?cells=`` and ``?outputs_only=`` page renders, which bypass the render cache.
+        self.partial_render_seconds = LatencyHistogram(buckets)
+        self._lock = threading.Lock()
+        self._requests: Counter[tuple[str, int]] = Counter()
+        self._bytes_sent: Counter[str] = Counter()
+        self._request_seconds: dict[str, LatencyHistogram] = {}
+        self._active_requests = 0
+        self._rejected_connections = 0
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._active_requests += 1
+
+    def request_finished(self, route: str, status: int | None, seconds: float, bytes_sent: int) -> None:
+        """Count a handled request.
+
+        :param status:
+            Response status, or ``None`` when no response was sent, e.g. a
+            request line that could not be read. Only ``active_requests`` is
+            updated then.
+        """
+
+        with self._lock:
+            self._active_requests -= 1
+            if status is None:
+                return
+            self._requests[route, status] += 1
+            self._bytes_sent[route] += bytes_sent
+            histogram = self._request_seconds.get(route)
+            if histogram is None:
+                histogram = self._request_seconds[route] = LatencyHistogram(self.buckets)
+        histogram.observe(seconds)
+
+    def connection_rejected(self) -> None:
+        with self._lock:
+            self._rejected_connections += 1
+
+    def format(self, families: Iterable[MetricFamily], render_seconds: Mapping[str, LatencyHistogram]) -> str:
+        """Format the metrics page.
+
+        :param families:
+            Metrics read from other statistics, e.g. render pool queue depth.
+        :param render_seconds:
+            Render latency histograms by kind of render, e.g. ``"page"``.
+        """
+
+        with self._lock:
+            requests = dict(self._requests)
+            bytes_sent = dict(self._bytes_sent)
+            request_seconds = dict(self._request_seconds)
+            active_requests = self._active_requests
+            rejected_connections = self._rejected_connections
+
+        lines: list[str] = []
+        _add_family(
+            lines,
+            MetricFamily(
+                "notebook_server_requests_total",
+                "counter",
+                "Requests handled by route and response status.",
+                tuple((labels(route=route, status=str(status)), count) for (route, status), count in sorted(requests.items())),
+            ),
+        )
+        _add_family(
+            lines,
+            MetricFamily(
+                "notebook_server_response_bytes_total",
+                "counter",
+                "Bytes written to clients by route, headers included.",
+                tuple((labels(route=route), count) for route, count in sorted(bytes_sent.items())),
+            ),
+        )
+        _add_histogram(lines, "notebook_server_request_seconds", "Time from reading a request to sending the last byte, by route.", "route", request_seconds)
+        _add_histogram(lines, "notebook_server_render_seconds", "Notebook render latency by kind of render.", "kind", {**render_seconds, "partial": self.partial_render_seconds})
+        _add_family(lines, MetricFamily("notebook_server_active_requests", "gauge", "Requests being handled.", (((), active_requests),)))
+        _add_family(lines, MetricFamily("notebook_server_rejected_connections_total", "counter", "Connections refused over the per-client limit.", (((), rejected_connections),)))
+        for family in families:
+            _add_family(lines, family)
+        return "\n".join(lines) + "\n"
+
+
+def labels(**values: str) -> MetricLabels:
+    """Return sample labels, e.g. ``labels(route="/view/")``."""
+
+    return tuple(values.items())
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(sample_labels: MetricLabels) -> str:
+    if not sample_labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in sample_labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _add_family(lines: list[str], family: MetricFamily) -> None:
+    lines.append(f"# HELP {family.name} {family.help}")
+    lines.append(f"# TYPE {family.name} {family.kind}")
+    for sample_labels, value in family.samples:
+        if value is not None:
+            lines.append(f"{family.name}{_format_labels(sample_labels)} {_format_value(value)}")
+
+
+def _add_histogram(lines: list[str], name: str, help_text: str, label: str, histograms: Mapping[str, LatencyHistogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for value, histogram in sorted(histograms.items()):
+        counts, total = histogram.snapshot()
+        bounds = [*(repr(bound) for bound in histogram.buckets), "+Inf"]
+        for bound, count in zip(bounds, counts):
+            lines.append(f"{name}_bucket{_format_labels(labels(**{label: value, 'le': bound}))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels(**{label: value}))} {total!r}")
+        lines.append(f"{name}_count{_format_labels(labels(**{label: value}))} {counts[-1]}")
@@ -0,0 +1,276 @@
+"""Render selected cells of a notebook.
+
+``/view/<notebook>?cells=120-140`` and ``?outputs_only=1`` show part of a
+notebook, e.g. only the final performance tables on a phone. Cells are
+rendered one at a time and kept in a :class:`NotebookCellCache` per notebook
+version, so a partial page costs in proportion to the cells shown rather
+than to the notebook, and overlapping selections share renders. The parsed
+notebook is kept in the same cache, counted as its file size, so the
+``--cell-cache-size`` limit covers it too.
+
+Given a :class:`~.pool.NotebookRenderPool`, pages and cells render in its
+worker processes under the pool's timeout, memory limit and queue bound.
+Each worker then keeps a cell cache of its own, and the caller's cache
+holds the finished pages and cells.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import replace
+from functools import partial
+import html
+from pathlib import Path
+import threading
+from typing import Any, Callable, Hashable
+
+from nbformat import NotebookNode
+
+from .pool import NotebookRenderPool
+from .reader import read_notebook
+from .render import HEADING_RE
+from .render import MARKDOWN_HEADING_RE
+from .render import STREAM_CELLS_MARKER
+from .render import STREAM_CELLS_TEMPLATE
+from .render import STREAM_SHELL_TEMPLATE
+from .render import RenderOptions
+from .render import borrow_exporter
+from .render import format_table_of_contents
+from .render import get_heading_id
+from .render import get_heading_label
+from .render import get_page_resources
+from .render import render_notebook_cell
+from .render import with_cells
+
+DEFAULT_CELL_CACHE_BYTES = 64 * 1024 * 1024
+PARTIAL_NOTE_STYLE = "margin: 1rem 0; padding: 0.5rem 1rem; background: #f6f6f6; font-family: sans-serif;"
+
+
+@dataclass(slots=True, frozen=True)
+class CellSelection:
+    """Cells shown by a partial page.
+
+    :ivar start:
+        First cell index, zero-based like ``/output/`` ids and search results.
+    :ivar stop:
+        Last cell index, inclusive; ``None`` for the end of the notebook.
+    :ivar outputs_only:
+        Hide code sources and code cells without outputs. Markdown cells
+        stay for their headings.
+    """
+
+    start: int = 0
+    stop: int | None = None
+    outputs_only: bool = False
+
+    def select(self, notebook: NotebookNode) -> list[int]:
+        """Return the indices of the selected cells that exist in ``notebook``."""
+
+        last = len(notebook.cells) - 1 if self.stop is None else min(self.stop, len(notebook.cells) - 1)
+        indices = range(self.start, last + 1)
+        if not self.outputs_only:
+            return list(indices)
+        return [index for index in indices if notebook.cells[index].cell_type == "markdown" or notebook.cells[index].get("outputs")]
+
+    def describe(self, total_cells: int) -> str:
+        """Describe the selection for the note above the cells, e.g. ``cells 120-140 of 300, outputs only``."""
+
+        parts = []
+        if self.start or self.stop is not None:
+            parts.append(f"cells {self.start}-{self.stop if self.stop is not None else total_cells - 1} of {total_cells}")
+        if self.outputs_only:
+            parts.append("outputs only")
+        return ", ".join(parts)
+
+
+class NotebookCellCache:
+    """Byte-bounded LRU cache of rendered cells and page parts.
+
+    Keys include the notebook path, mtime and size, so a saved notebook
+    never gets stale cells. Besides HTML it holds parsed notebooks, see
+    :func:`read_cached_notebook`. Thread-safe; concurrent misses for the
+    same cell may both render it.
+
+    .. code-block:: python
+
+        cell_cache = NotebookCellCache(max_bytes=32 * 1024 * 1024)
+        page = render_partial_page(notebook_path, CellSelection(120, 140), RenderOptions(), cell_cache)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CELL_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable, render: Callable[[], Any], size: int | None = None) -> Any:
+        """Return the cached HTML for ``key``, calling ``render`` on a miss.
+
+        :param size:
+            Bytes to count for values other than HTML; defaults to the length
+            of the rendered value.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[0]
+            self._counters["misses"] += 1
+
+        value = render()
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _key, (_value, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+        return value
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and cache size."""
+
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+def render_partial_page(
+    notebook_path: Path,
+    selection: CellSelection,
+    options: RenderOptions,
+    cell_cache: NotebookCellCache,
+    full_page_url: str | None = None,
+    render_pool: NotebookRenderPool | None = None,
+) -> str:
+    """Render a page with only the selected cells.
+
+    The table of contents lists the headings of the selected markdown cells
+    and goes above the cells. Outputs are always inline, cells are rendered
+    by nbconvert and the page does not follow live runs; the selected cells
+    would not line up with the notebook's.
+
+    :param full_page_url:
+        Link to the whole notebook shown in the note above the cells.
+    :param render_pool:
+        Render the page in a worker process of this pool instead of the
+        calling thread.
+    :raise RenderPoolError:
+        With ``render_pool``, when the pool cannot render the page.
+    """
+
+    version = get_notebook_version(notebook_path)
+    if render_pool is not None:
+        renderer = partial(_render_partial_page_in_worker, selection=selection, full_page_url=full_page_url, cache_bytes=cell_cache.max_bytes)
+        return cell_cache.get((*version, options, selection, full_page_url, "page"), lambda: render_pool.render(notebook_path, options, renderer))
+
+    notebook = read_cached_notebook(version, options.max_output_bytes, cell_cache)
+    options = replace(options, lazy_output_bytes=0, live_view=False, fast=False, exclude_input=options.exclude_input or selection.outputs_only)
+    indices = selection.select(notebook)
+
+    cells = [render_cached_cell(notebook, version, index, options, cell_cache) + "\n" for index in indices]
+    toc = cell_cache.get((*version, options, "toc", tuple(indices)), lambda: _render_toc(notebook, indices, options))
+    shell = cell_cache.get((*version, options, "shell", bool(toc)), lambda: _render_shell(notebook, options, toc))
+    head, _marker, tail = shell.partition(STREAM_CELLS_MARKER)
+
+    description = selection.describe(len(notebook.cells)) or "all cells"
+    link = f' <a href="{html.escape(full_page_url, quote=True)}">Show the whole notebook</a>' if full_page_url else ""
+    note = f'<p class="notebook-partial-note" style="{PARTIAL_NOTE_STYLE}">Showing {html.escape(description)}.{link}</p>\n'
+    return "".join([head, note, toc, *cells, tail])
+
+
+def get_notebook_version(notebook_path: Path) -> tuple[str, int, int]:
+    """Return the resolved path, mtime and size that identify a saved notebook version."""
+
+    stat = notebook_path.stat()
+    return (str(notebook_path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def read_cached_notebook(version: tuple[str, int, int], max_output_bytes: int, cell_cache: NotebookCellCache) -> NotebookNode:
+    """Parse a notebook version once for all partial and live views of it.
+
+    :param version:
+        From :func:`get_notebook_version`; the file size is what counts
+        against the cache limit.
+    """
+
+    return cell_cache.get((*version, max_output_bytes, "notebook"), lambda: read_notebook(Path(version[0]), max_output_bytes), size=version[2])
+
+
+def render_cached_cell(
+    notebook: NotebookNode,
+    version: tuple[str, int, int],
+    cell_index: int,
+    options: RenderOptions,
+    cell_cache: NotebookCellCache,
+    render_pool: NotebookRenderPool | None = None,
+) -> str:
+    """Render one cell of a notebook version, or return it from ``cell_cache``.
+
+    :param render_pool:
+        Render the cell in a worker process of this pool instead of the
+        calling thread.
+    """
+
+    def render() -> str:
+        if render_pool is not None:
+            renderer = partial(_render_cell_in_worker, cell_index=cell_index, cache_bytes=cell_cache.max_bytes)
+            return render_pool.render(Path(version[0]), options, renderer)
+        with borrow_exporter(options, STREAM_CELLS_TEMPLATE) as exporter:
+            return render_notebook_cell(notebook, cell_index, options, exporter)
+
+    return cell_cache.get((*version, options, "cell", cell_index), render)
+
+
+_worker_cell_cache: NotebookCellCache | None = None
+
+
+def _get_worker_cell_cache(max_bytes: int) -> NotebookCellCache:
+    """Return the cell cache of this render worker process."""
+
+    global _worker_cell_cache
+    if _worker_cell_cache is None:
+        _worker_cell_cache = NotebookCellCache(max_bytes)
+    return _worker_cell_cache
+
+
+def _render_partial_page_in_worker(notebook_path: Path, options: RenderOptions, *, selection: CellSelection, full_page_url: str | None, cache_bytes: int) -> str:
+    return render_partial_page(notebook_path, selection, options, _get_worker_cell_cache(cache_bytes), full_page_url)
+
+
+def _render_cell_in_worker(notebook_path: Path, options: RenderOptions, *, cell_index: int, cache_bytes: int) -> str:
+    cell_cache = _get_worker_cell_cache(cache_bytes)
+    version = get_notebook_version(notebook_path)
+    notebook = read_cached_notebook(version, options.max_output_bytes, cell_cache)
+    return render_cached_cell(notebook, version, cell_index, options, cell_cache)
+
+
+def _render_toc(notebook: NotebookNode, indices: list[int], options: RenderOptions) -> str:
+    """Build the table of contents from the ``h2`` and ``h3`` headings of the selected markdown cells."""
+
+    headings = []
+    with borrow_exporter(options, STREAM_CELLS_TEMPLATE) as exporter:
+        for index in indices:
+            cell = notebook.cells[index]
+            if cell.cell_type != "markdown" or not MARKDOWN_HEADING_RE.search(cell.source):
+                continue
+            for heading in HEADING_RE.finditer(exporter.render_markdown(cell)):
+                headings.append((heading.group(1), get_heading_id(heading.group(2)), get_heading_label(heading.group(3))))
+    return format_table_of_contents(headings) or ""
+
+
+def _render_shell(notebook: NotebookNode, options: RenderOptions, toc: str) -> str:
+    """Render the page head and tail around :data:`STREAM_CELLS_MARKER`."""
+
+    with borrow_exporter(options, STREAM_SHELL_TEMPLATE) as exporter:
+        shell, _resources = exporter.from_notebook_node(with_cells(notebook, []), resources=get_page_resources(toc or None, False))
+    if STREAM_CELLS_MARKER not in shell:
+        raise ValueError(f"Template {options.template_name} does not support partial pages")
+    return shell
@@ -0,0 +1,373 @@
+"""Render notebooks for requests in a bounded pool of worker processes.
+
+Renders run in separate processes, so concurrent requests do not contend for
+the GIL and a pathological notebook cannot tie up the server: every render
+has a timeout after which its worker process is killed and replaced, and an
+address-space limit turns runaway memory use into a failed render. Requests
+beyond the number of workers wait in a bounded queue; when it is full,
+:class:`RenderQueueFull` tells the server to answer ``503 Service Unavailable``.
+"""
+
+import logging
+import math
+import multiprocessing
+from multiprocessing.connection import Connection
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Iterator
+
+from .cache import NotebookRenderer
+from .cache import NotebookStreamer
+from .render import NotebookPageStream
+from .render import NotebookRenderResult
+from .render import RenderOptions
+from .render import render_notebook_page
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_RENDER_TIMEOUT_SECONDS = 300.0
+DEFAULT_RENDER_QUEUE = 16
+DEFAULT_RENDER_MEMORY_BYTES = 4 * 1024 * 1024 * 1024
+# Suggested by RenderQueueFull before any render has finished.
+DEFAULT_RETRY_AFTER_SECONDS = 5
+
+
+class RenderPoolError(Exception):
+    """Base class for renders the pool could not complete."""
+
+
+class RenderQueueFull(RenderPoolError):
+    """All workers are busy and the queue is full.
+
+    :ivar retry_after:
+        Suggested seconds to wait before retrying.
+    """
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RenderTimeout(RenderPoolError):
+    """A render did not finish in time; its worker process was killed."""
+
+
+class RenderWorkerError(RenderPoolError):
+    """A render failed in its worker process, or the worker process died."""
+
+
+class NotebookRenderPool:
+    """Bounded pool of render worker processes with per-render timeouts.
+
+    :meth:`render` and :meth:`stream` fit the ``renderer`` and ``streamer``
+    arguments of :class:`~.cache.NotebookRenderCache`; the cache coalesces
+    concurrent requests for the same page before they reach the pool.
+
+    .. code-block:: python
+
+        pool = NotebookRenderPool(workers=2, timeout_seconds=120, max_queue=8)
+        cache = NotebookRenderCache(renderer=pool.render, streamer=pool.stream)
+        try:
+            page = cache.get(notebook_path)
+        except RenderQueueFull as exc:
+            print(f"Busy, retry in {exc.retry_after}s")
+
+    :param niceness:
+        CPU niceness added to the worker processes.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = DEFAULT_RENDER_WORKERS,
+        timeout_seconds: float = DEFAULT_RENDER_TIMEOUT_SECONDS,
+        max_queue: int = DEFAULT_RENDER_QUEUE,
+        memory_limit_bytes: int | None = DEFAULT_RENDER_MEMORY_BYTES,
+        renderer: NotebookRenderer = render_notebook_page,
+        streamer: NotebookStreamer = NotebookPageStream,
+        niceness: int = 0,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.max_queue = max_queue
+        self.memory_limit_bytes = memory_limit_bytes
+        self.niceness = niceness
+        self.renderer = renderer
+        self.streamer = streamer
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._waiting = 0
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._render_seconds_total = 0.0
+        self._started = time.monotonic()
+        self._counters = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "worker_restarts": 0}
+        for _ in range(workers):
+            self._idle.put(self._start_worker())
+
+    def render(self, notebook_path: Path, options: RenderOptions, renderer: NotebookRenderer | None = None) -> str | NotebookRenderResult:
+        """Render a notebook in a worker process.
+
+        :param renderer:
+            Function to run instead of :attr:`renderer`, e.g. a
+            :func:`functools.partial` of a module-level function for renders
+            that need more than the path and options. Must be picklable.
+        :raise RenderQueueFull:
+            All workers are busy and ``max_queue`` renders are already waiting.
+        :raise RenderTimeout:
+            The render took longer than ``timeout_seconds``.
+        :raise RenderWorkerError:
+            The render raised, ran out of memory or crashed its worker.
+        """
+
+        worker = self._acquire()
+        started = time.monotonic()
+        # Anything but a clean reply leaves the worker in an unknown state.
+        outcome = "crashed"
+        try:
+            worker.send(("render", renderer or self.renderer, notebook_path, options))
+            kind, value = worker.receive(started + self.timeout_seconds)
+            if kind == "result":
+                outcome = "completed"
+                return value
+            outcome = "failed" if kind == "error" else "crashed"
+            raise self._get_error(kind, value, notebook_path)
+        except RenderTimeout:
+            outcome = "timeouts"
+            raise
+        finally:
+            self._release(worker, outcome, time.monotonic() - started)
+
+    def stream(self, notebook_path: Path, options: RenderOptions) -> "PooledPageStream":
+        """Stream a notebook page rendered chunk by chunk in a worker process.
+
+        The render starts on the first iteration. See :meth:`render` for errors.
+        """
+
+        return PooledPageStream(self, notebook_path, options)
+
+    def shutdown(self) -> None:
+        """Stop idle workers now and busy ones when their render finishes."""
+
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return queue depth, worker utilisation and render outcome counters."""
+
+        with self._lock:
+            finished = self._counters["completed"]
+            return {
+                **self._counters,
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "queue_depth": self._waiting,
+                "max_queue": self.max_queue,
+                "utilisation": self._busy_seconds / (self.workers * max(time.monotonic() - self._started, 1e-9)),
+                "mean_render_seconds": self._render_seconds_total / finished if finished else None,
+                "timeout_seconds": self.timeout_seconds,
+                "memory_limit_bytes": self.memory_limit_bytes,
+            }
+
+    def _start_worker(self) -> "_Worker":
+        return _Worker(self._context, self.memory_limit_bytes, self.niceness)
+
+    def _acquire(self) -> "_Worker":
+        with self._lock:
+            if self._closed:
+                raise RenderPoolError("Render pool is shut down")
+            if self._idle.empty() and self._waiting >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise RenderQueueFull(f"All {self.workers} render workers are busy and {self._waiting} renders are queued", self._get_retry_after())
+            self._waiting += 1
+        try:
+            worker = self._idle.get(timeout=self.timeout_seconds)
+        except queue.Empty:
+            with self._lock:
+                self._waiting -= 1
+                self._counters["rejected"] += 1
+                retry_after = self._get_retry_after()
+            raise RenderQueueFull(f"No render worker became free in {self.timeout_seconds:.0f}s", retry_after) from None
+        with self._lock:
+            self._waiting -= 1
+            self._busy += 1
+        return worker
+
+    def _release(self, worker: "_Worker", outcome: str, seconds: float) -> None:
+        """Return a worker after a render, replacing it unless it finished the render cleanly."""
+
+        if outcome not in ("completed", "failed"):
+            logger.warning("Replacing render worker %s, render outcome: %s", worker.process.pid, outcome)
+            worker.stop(kill=True)
+            worker = self._start_worker()
+        with self._lock:
+            self._busy -= 1
+            self._busy_seconds += seconds
+            if outcome == "crashed":
+                self._counters["failed"] += 1
+            elif outcome != "abandoned":
+                self._counters[outcome] += 1
+            if outcome == "completed":
+                self._render_seconds_total += seconds
+            if outcome not in ("completed", "failed"):
+                self._counters["worker_restarts"] += 1
+            closed = self._closed
+        if closed:
+            worker.stop()
+        else:
+            self._idle.put(worker)
+
+    def _get_retry_after(self) -> int:
+        """Estimate when a worker frees up. Caller holds the lock."""
+
+        finished = self._counters["completed"]
+        if not finished:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        mean = self._render_seconds_total / finished
+        return max(1, min(math.ceil(mean * (self._waiting / self.workers + 1)), math.ceil(self.timeout_seconds)))
+
+    def _get_error(self, kind: str, message: str, notebook_path: Path) -> RenderWorkerError:
+        if kind == "memory":
+            return RenderWorkerError(f"Rendering {notebook_path.name} exceeded the {self.memory_limit_bytes // (1024 * 1024)} MiB memory limit")
+        return RenderWorkerError(f"Rendering {notebook_path.name} failed: {message}")
+
+
+class PooledPageStream:
+    """Page stream rendered in a :class:`NotebookRenderPool` worker.
+
+    Has the interface of :class:`~.render.NotebookPageStream`. Closing the
+    iterator early kills the worker, which is then replaced. The render
+    timeout covers the whole stream, including time spent sending chunks.
+
+    :ivar fragments:
+        Lazily loaded outputs, complete once the last chunk was produced.
+    :ivar assets:
+        Extracted images, complete once the last chunk was produced.
+    """
+
+    def __init__(self, pool: NotebookRenderPool, notebook_path: Path, options: RenderOptions) -> None:
+        self.pool = pool
+        self.notebook_path = notebook_path
+        self.options = options
+        self.fragments: dict[str, str] = {}
+        self.assets: dict[str, bytes] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        worker = self.pool._acquire()
+        started = time.monotonic()
+        outcome = "crashed"
+        try:
+            worker.send(("stream", self.pool.streamer, self.notebook_path, self.options))
+            deadline = started + self.pool.timeout_seconds
+            while True:
+                kind, value = worker.receive(deadline)
+                if kind == "chunk":
+                    yield value
+                    continue
+                if kind == "done":
+                    self.fragments, self.assets = value
+                    outcome = "completed"
+                    return
+                outcome = "failed" if kind == "error" else "crashed"
+                raise self.pool._get_error(kind, value, self.notebook_path)
+        except RenderTimeout:
+            outcome = "timeouts"
+            raise
+        except GeneratorExit:
+            # The worker is still producing chunks nobody will read.
+            outcome = "abandoned"
+            raise
+        finally:
+            self.pool._release(worker, outcome, time.monotonic() - started)
+
+
+class _Worker:
+    """One render process and the parent end of its pipe."""
+
+    def __init__(self, context: multiprocessing.context.BaseContext, memory_limit_bytes: int | None, niceness: int = 0) -> None:
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, memory_limit_bytes, niceness),
+            name="notebook-render-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+
+    def send(self, job: tuple[str, Any, Path, RenderOptions]) -> None:
+        try:
+            self.connection.send(job)
+        except (BrokenPipeError, EOFError, OSError) as exc:
+            raise RenderWorkerError(f"Render worker is not running: {exc}") from exc
+
+    def receive(self, deadline: float) -> tuple[str, Any]:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0 or not self.connection.poll(remaining):
+                raise RenderTimeout(f"Render did not finish in time (pid {self.process.pid})")
+            return self.connection.recv()
+        except (EOFError, OSError) as exc:
+            raise RenderWorkerError(f"Render worker exited with code {self.process.exitcode}") from exc
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+def _worker_main(connection: Connection, memory_limit_bytes: int | None, niceness: int = 0) -> None:
+    if memory_limit_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        kind, function, notebook_path, options = job
+        try:
+            if kind == "stream":
+                page_stream = function(notebook_path, options)
+                for chunk in page_stream:
+                    connection.send(("chunk", chunk))
+                connection.send(("done", (page_stream.fragments, page_stream.assets)))
+            else:
+                connection.send(("result", function(notebook_path, options)))
+        except MemoryError:
+            # The heap may be in any state; report and let the parent replace this process.
+            try:
+                connection.send(("memory", "out of memory"))
+            except Exception:
+                pass
+            return
+        except Exception as exc:
+            connection.send(("error", f"{type(exc).__name__}: {exc}"))
@@ -0,0 +1,152 @@
+"""Background pre-rendering of changed notebooks.
+
+Renders run in a dedicated :class:`~.pool.NotebookRenderPool`, so they
+neither block request threads nor compete with them for the GIL, and get the
+same per-render timeout and memory limit as request renders: a pathological
+notebook costs one replaced worker process, not the pre-renderer. Worker
+processes run at a lower CPU priority (``niceness``) so a burst of saved
+notebooks does not slow down notebook kernels running on the same machine.
+"""
+
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+from .cache import NotebookRenderCache
+from .cache import NotebookRenderer
+from .cache import get_render_cache_key
+from .pool import DEFAULT_RENDER_MEMORY_BYTES
+from .pool import DEFAULT_RENDER_TIMEOUT_SECONDS
+from .pool import NotebookRenderPool
+from .render import NotebookRenderResult
+from .render import RenderOptions
+from .render import render_notebook_page
+
+logger = logging.getLogger(__name__)
+
+
+class NotebookPrerenderer:
+    """Render notebooks into a :class:`NotebookRenderCache` in the background.
+
+    A notebook submitted again while it is rendering is rendered once more
+    after the current render finishes, so the cache ends up with its latest
+    version.
+
+    .. code-block:: python
+
+        prerenderer = NotebookPrerenderer(cache, RenderOptions(), workers=2, niceness=10)
+        watcher = NotebookChangeWatcher(get_available_roots(), prerenderer.submit)
+
+    :param timeout_seconds:
+        Seconds after which a render is killed.
+    :param memory_limit_bytes:
+        Address space limit of a render process, ``None`` for no limit.
+    """
+
+    def __init__(
+        self,
+        cache: NotebookRenderCache,
+        options: RenderOptions,
+        *,
+        workers: int = 1,
+        niceness: int = 10,
+        timeout_seconds: float = DEFAULT_RENDER_TIMEOUT_SECONDS,
+        memory_limit_bytes: int | None = DEFAULT_RENDER_MEMORY_BYTES,
+        renderer: NotebookRenderer = render_notebook_page,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.cache = cache
+        self.options = options
+        self.workers = workers
+        self.niceness = niceness
+        self.renderer = renderer
+        self._render_pool = NotebookRenderPool(
+            workers=workers,
+            timeout_seconds=timeout_seconds,
+            max_queue=workers,
+            memory_limit_bytes=memory_limit_bytes,
+            renderer=renderer,
+            niceness=niceness,
+        )
+        # One thread per worker process waits for its render; further submissions queue here.
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notebook-prerender")
+        self._lock = threading.Lock()
+        self._in_flight: set[Path] = set()
+        self._resubmit: set[Path] = set()
+        self._counters = {"submitted": 0, "skipped": 0, "completed": 0, "failed": 0}
+
+    def submit(self, notebook_path: Path) -> bool:
+        """Schedule a render of the current version of a notebook.
+
+        :return:
+            ``True`` when a render was scheduled now.
+        """
+
+        notebook_path = notebook_path.resolve()
+        with self._lock:
+            if notebook_path in self._in_flight:
+                self._resubmit.add(notebook_path)
+                return False
+            try:
+                if self.cache.contains(notebook_path, self.options):
+                    self._counters["skipped"] += 1
+                    return False
+                key = get_render_cache_key(notebook_path, self.options)
+            except FileNotFoundError:
+                return False
+            future = self._pool.submit(self._render, notebook_path)
+            self._in_flight.add(notebook_path)
+            self._counters["submitted"] += 1
+        future.add_done_callback(partial(self._on_done, notebook_path, key))
+        return True
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, abandoning queued renders."""
+
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._render_pool.shutdown()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return pre-render counters."""
+
+        with self._lock:
+            return {
+                **self._counters,
+                "in_flight": len(self._in_flight),
+                "workers": self.workers,
+                "niceness": self.niceness,
+                "worker_restarts": self._render_pool.get_stats()["worker_restarts"],
+            }
+
+    def _render(self, notebook_path: Path) -> tuple[str | NotebookRenderResult, float]:
+        started = time.perf_counter()
+        html = self._render_pool.render(notebook_path, self.options)
+        return html, time.perf_counter() - started
+
+    def _on_done(self, notebook_path: Path, key: str, future: Future) -> None:
+        try:
+            html, render_seconds = future.result()
+            self.cache.put(notebook_path, self.options, key, html, render_seconds)
+            counter = "completed"
+            logger.info("Pre-rendered %s in %.2fs", notebook_path, render_seconds)
+        except Exception as exc:
+            counter = "failed"
+            logger.warning("Pre-rendering %s failed: %s", notebook_path, exc)
+        with self._lock:
+            self._counters[counter] += 1
+            self._in_flight.discard(notebook_path)
+            resubmit = notebook_path in self._resubmit
+            self._resubmit.discard(notebook_path)
+        if resubmit:
+            try:
+                self.submit(notebook_path)
+            except RuntimeError:
+                # The pool was shut down in the meantime.
+                pass
+
@@ -0,0 +1,371 @@
+"""Read notebooks without loading oversized outputs.
+
+:func:`nbformat.read` parses the whole file at once, so a 500 MB executed
+notebook needs gigabytes of memory in every render. :func:`read_notebook`
+scans the file in chunks instead and never keeps outputs whose JSON is
+larger than a limit. They are replaced by a placeholder with a link to
+download the original output, see :func:`find_output_span`. Notebooks
+without oversized outputs give the same :class:`~nbformat.NotebookNode` as
+:func:`nbformat.read`, so they render to identical HTML. Indexes that only
+need the text of a notebook read it with :func:`load_notebook_text`.
+
+Only nbformat 4 notebooks are scanned per output; older formats keep cells
+in worksheets and are read whole.
+"""
+
+import html
+import json
+from pathlib import Path
+import re
+from typing import Any, BinaryIO, Callable, Iterator
+
+import nbformat
+from nbformat import NotebookNode
+from nbformat import versions
+from nbformat.reader import get_version
+
+#: Bytes read from the notebook file at a time.
+READ_CHUNK_SIZE = 1024 * 1024
+#: Output metadata key of placeholders for outputs that were not read.
+TRUNCATED_OUTPUT_METADATA = "notebook_static_server_truncated"
+#: Output data kept by :func:`load_notebook_text`.
+TEXT_OUTPUT_MIME_TYPES = ("text/plain",)
+
+_BACKSLASH = ord("\\")
+# Characters of an array or object up to the next string or bracket.
+_CONTAINER_BODY_RE = re.compile(rb'[^"{}\[\]]*')
+_SCALAR_RE = re.compile(rb"[^,}\]\s]*")
+_WHITESPACE_RE = re.compile(rb"\s*")
+
+
+class _JSONStream:
+    """Minimal pull parser over a JSON file.
+
+    Objects and arrays can be walked key by key, and any value can be either
+    parsed or skipped. Skipped values are scanned without being kept, so
+    memory is bounded by :data:`READ_CHUNK_SIZE` however large they are.
+    """
+
+    def __init__(self, handle: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> None:
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+        #: File offset of ``buffer[0]``.
+        self.offset = 0
+        self._pieces: list[bytes] | None = None
+        self._mark = 0
+
+    @property
+    def position(self) -> int:
+        """File offset of the next unread byte."""
+
+        return self.offset + self.pos
+
+    def peek(self) -> bytes:
+        """Skip whitespace and return the next byte without consuming it."""
+
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos : self.pos + 1]
+            self._fill()
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char.decode()!r} at byte {self.position}, got {self.peek().decode(errors='replace')!r}")
+        self.pos += 1
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of an object; the caller must read or skip each value."""
+
+        self.expect(b"{")
+        if self.peek() == b"}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key at byte {self.position}")
+            self.expect(b":")
+            yield key
+            if self.peek() == b",":
+                self.pos += 1
+                continue
+            self.expect(b"}")
+            return
+
+    def iter_array(self) -> Iterator[int]:
+        """Yield the indices of an array; the caller must read or skip each item."""
+
+        self.expect(b"[")
+        if self.peek() == b"]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == b",":
+                self.pos += 1
+                continue
+            self.expect(b"]")
+            return
+
+    def read_value(self) -> Any:
+        """Parse the next value."""
+
+        self.peek()
+        self._pieces = []
+        self._mark = self.pos
+        self._scan_value()
+        self._pieces.append(self.buffer[self._mark : self.pos])
+        document = b"".join(self._pieces)
+        self._pieces = None
+        return json.loads(document)
+
+    def skip_value(self) -> tuple[int, int]:
+        """Skip the next value and return its file offset and size in bytes."""
+
+        self.peek()
+        start = self.position
+        self._scan_value()
+        return start, self.position - start
+
+    def parse_span(self, start: int) -> Any:
+        """Parse the already scanned value from file offset ``start`` to the current position."""
+
+        if start >= self.offset:
+            return json.loads(self.buffer[start - self.offset : self.pos])
+        position = self.handle.tell()
+        self.handle.seek(start)
+        data = self.handle.read(self.position - start)
+        self.handle.seek(position)
+        return json.loads(data)
+
+    def _fill(self) -> None:
+        """Read the next chunk, keeping the unread part of the buffer and any value being read."""
+
+        chunk = self.handle.read(self.chunk_size)
+        if not chunk:
+            raise ValueError(f"Unexpected end of notebook JSON at byte {self.position}")
+        if self._pieces is not None:
+            self._pieces.append(self.buffer[self._mark : self.pos])
+            self._mark = 0
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+    def _scan_value(self) -> None:
+        first = self.buffer[self.pos : self.pos + 1]
+        if first == b'"':
+            self._scan_string()
+        elif first in (b"{", b"["):
+            self.pos += 1
+            depth = 1
+            while depth:
+                self.pos = _CONTAINER_BODY_RE.match(self.buffer, self.pos).end()
+                if self.pos == len(self.buffer):
+                    self._fill()
+                    continue
+                char = self.buffer[self.pos : self.pos + 1]
+                if char == b'"':
+                    self._scan_string()
+                    continue
+                depth += 1 if char in (b"{", b"[") else -1
+                self.pos += 1
+        else:
+            while True:
+                self.pos = _SCALAR_RE.match(self.buffer, self.pos).end()
+                if self.pos < len(self.buffer):
+                    return
+                try:
+                    self._fill()
+                except ValueError:
+                    # A scalar may end the document.
+                    return
+
+    def _scan_string(self) -> None:
+        # bytes.find runs at memory speed over base64 images, a regex does not.
+        self.pos += 1
+        while True:
+            quote = self.buffer.find(b'"', self.pos)
+            if quote == -1:
+                end = len(self.buffer)
+                # Leave trailing backslashes unread; they may escape a quote in the next chunk.
+                while end > self.pos and self.buffer[end - 1] == _BACKSLASH:
+                    end -= 1
+                self.pos = end
+                self._fill()
+                continue
+            run_start = quote
+            while run_start > self.pos and self.buffer[run_start - 1] == _BACKSLASH:
+                run_start -= 1
+            self.pos = quote + 1
+            if (quote - run_start) % 2 == 0:
+                return
+
+
+def format_output_size(size: int) -> str:
+    """Format a byte count for placeholders, e.g. ``412.3 MiB``."""
+
+    if size < 1024:
+        return f"{size} bytes"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+
+def new_truncated_output(cell_index: int, output_index: int, size: int) -> dict[str, Any]:
+    """Create the placeholder for an output that was not read.
+
+    The download link is relative to the page, so it works for every view
+    URL of the notebook; the server answers ``?raw_output=<cell>/<output>``
+    with the original output JSON.
+    """
+
+    href = f"?raw_output={cell_index}/{output_index}"
+    message = f"Output of {format_output_size(size)} not shown."
+    return {
+        "output_type": "display_data",
+        "metadata": {TRUNCATED_OUTPUT_METADATA: {"bytes": size}},
+        "data": {
+            "text/html": (
+                f'<div class="notebook-truncated-output"><p>{html.escape(message)}</p>'
+                f'<p><a href="{html.escape(href, quote=True)}" download>Download full output</a></p></div>'
+            ),
+            "text/plain": message,
+        },
+    }
+
+
+type _OutputReader = Callable[[_JSONStream, int, int], Any]
+
+
+def _read_cell(stream: _JSONStream, cell_index: int, read_output: _OutputReader) -> Any:
+    if stream.peek() != b"{":
+        return stream.read_value()
+    cell: dict[str, Any] = {}
+    for key in stream.iter_object():
+        if key != "outputs" or stream.peek() != b"[":
+            cell[key] = stream.read_value()
+            continue
+        cell[key] = [read_output(stream, cell_index, output_index) for output_index in stream.iter_array()]
+    return cell
+
+
+def _load_document(notebook_path: Path, read_output: _OutputReader) -> dict[str, Any]:
+    with notebook_path.open("rb") as handle:
+        stream = _JSONStream(handle)
+        document: dict[str, Any] = {}
+        for key in stream.iter_object():
+            if key == "cells" and stream.peek() == b"[":
+                document[key] = [_read_cell(stream, cell_index, read_output) for cell_index in stream.iter_array()]
+            else:
+                document[key] = stream.read_value()
+        return document
+
+
+def load_notebook_json(notebook_path: Path, max_output_bytes: int) -> dict[str, Any]:
+    """Parse notebook JSON, replacing outputs larger than ``max_output_bytes`` by placeholders.
+
+    :return:
+        The notebook document as :func:`json.load` would return it, apart
+        from the placeholders.
+    """
+
+    def read_output(stream: _JSONStream, cell_index: int, output_index: int) -> Any:
+        # Scan first so that oversized outputs are never held in memory.
+        start, size = stream.skip_value()
+        if size > max_output_bytes:
+            return new_truncated_output(cell_index, output_index, size)
+        return stream.parse_span(start)
+
+    return _load_document(notebook_path, read_output)
+
+
+def _read_text_output(stream: _JSONStream, cell_index: int, output_index: int) -> Any:
+    if stream.peek() != b"{":
+        return stream.read_value()
+    output: dict[str, Any] = {}
+    for key in stream.iter_object():
+        if key != "data" or stream.peek() != b"{":
+            output[key] = stream.read_value()
+            continue
+        data = {}
+        for mime_type in stream.iter_object():
+            if mime_type in TEXT_OUTPUT_MIME_TYPES:
+                data[mime_type] = stream.read_value()
+            else:
+                stream.skip_value()
+        output[key] = data
+    return output
+
+
+def load_notebook_text(notebook_path: Path) -> dict[str, Any]:
+    """Parse notebook JSON without rich output data, e.g. for search and index metadata.
+
+    Output ``data`` keeps only :data:`TEXT_OUTPUT_MIME_TYPES`; images, HTML
+    and other payloads are scanned past without being kept, so memory use
+    follows the text of the notebook rather than its file size.
+
+    :return:
+        The notebook document as :func:`json.load` would return it, apart
+        from the skipped output data.
+    """
+
+    return _load_document(notebook_path, _read_text_output)
+
+
+def read_notebook(notebook_path: Path, max_output_bytes: int = 0) -> NotebookNode:
+    """Read a notebook as nbformat 4 like :func:`nbformat.read`, without outputs above a size.
+
+    :param max_output_bytes:
+        Outputs whose JSON is larger than this are replaced by a placeholder
+        with a download link. ``0`` reads everything with :func:`nbformat.read`.
+    """
+
+    if not max_output_bytes:
+        return nbformat.read(notebook_path, as_version=4)
+
+    document = load_notebook_json(notebook_path, max_output_bytes)
+    major, minor = get_version(document)
+    if major not in versions:
+        raise nbformat.NBFormatError(f"Unsupported nbformat version {major}")
+    notebook = nbformat.convert(versions[major].to_notebook_json(document, minor=minor), 4)
+    try:
+        nbformat.validate(notebook)
+    except nbformat.ValidationError as exc:
+        # nbformat.read logs invalid notebooks and renders them anyway.
+        nbformat.get_logger().error("Notebook JSON is invalid: %s", exc)
+    return notebook
+
+
+def find_output_span(notebook_path: Path, cell_index: int, output_index: int) -> tuple[int, int]:
+    """Locate the JSON of one output in a notebook file without parsing the rest.
+
+    :return:
+        File offset and size in bytes of the output.
+    :raise KeyError:
+        The notebook has no such output.
+    """
+
+    with notebook_path.open("rb") as handle:
+        stream = _JSONStream(handle)
+        for key in stream.iter_object():
+            if key != "cells" or stream.peek() != b"[":
+                stream.skip_value()
+                continue
+            for index in stream.iter_array():
+                if index != cell_index or stream.peek() != b"{":
+                    stream.skip_value()
+                    continue
+                for cell_key in stream.iter_object():
+                    if cell_key != "outputs" or stream.peek() != b"[":
+                        stream.skip_value()
+                        continue
+                    for current_output_index in stream.iter_array():
+                        span = stream.skip_value()
+                        if current_output_index == output_index:
+                            return span
+    raise KeyError(f"Notebook has no output {cell_index}/{output_index}")
@@ -0,0 +1,1007 @@
+"""Render saved notebooks to static HTML.
+
+Rendering never executes notebooks. Progress-bar noise is collapsed and a
+table of contents, built from the markdown cells before export, is added
+after the first heading. Optionally, heavy rich
+outputs (interactive charts, large tables) are split off into fragments the
+browser loads when they are scrolled into view, and PNG and JPEG images can
+be extracted to content-addressed ``/asset/`` URLs the browser caches. The
+nbconvert stylesheets and inlined plotly.js bundles can likewise be linked
+from ``/static/`` instead of being repeated in every page.
+
+Very large notebooks can be rendered as a :class:`NotebookPageStream`, which
+yields the page in chunks of a few cells so the first bytes reach the
+browser before the whole notebook is exported. :func:`render_notebook_cell`
+renders a single cell for updating an open page.
+"""
+
+import base64
+import binascii
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+import hashlib
+import html
+import json
+import re
+from pathlib import Path
+import threading
+from typing import Any, Iterable, Iterator
+from urllib.parse import quote
+
+from jinja2 import pass_context
+from markupsafe import Markup
+import nbformat
+from nbformat import NotebookNode
+from nbconvert import HTMLExporter
+from traitlets import Bool
+
+from .reader import read_notebook
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+PAGE_TEMPLATE = "notebook_page.html.j2"
+STREAM_SHELL_TEMPLATE = "stream_shell.html.j2"
+STREAM_CELLS_TEMPLATE = "stream_cells.html.j2"
+STREAM_CELLS_MARKER = "<!-- notebook-static-server:cells -->"
+STREAM_CELLS_WRAPPER = ('<div class="jp-Notebook notebook-stream-cells">', "</div>")
+#: Approximate cell source and output characters rendered per streamed chunk.
+STREAM_BATCH_SIZE = 256 * 1024
+PROGRESS_OUTPUT_MESSAGE = "Backtest progress output hidden in preview. Re-run the notebook in a terminal to see live progress.\n"
+TOC_STYLE = """
+<style>
+.notebook-toc {
+  border: 1px solid #ddd;
+  padding: 0.75rem 1rem;
+  margin: 1rem 0 2rem;
+}
+.notebook-toc h2 {
+  font-size: 1rem;
+  margin-top: 0;
+}
+.notebook-toc-level-3 {
+  margin-left: 1rem;
+}
+</style>
+"""
+#: Runs the scripts of HTML inserted with ``innerHTML``, in order, e.g. chart outputs.
+RUN_SCRIPTS_FUNCTION = """
+  function runScripts(container) {
+    var chain = Promise.resolve();
+    Array.prototype.forEach.call(container.querySelectorAll("script"), function (original) {
+      chain = chain.then(function () {
+        return new Promise(function (resolve) {
+          var script = document.createElement("script");
+          Array.prototype.forEach.call(original.attributes, function (attribute) {
+            script.setAttribute(attribute.name, attribute.value);
+          });
+          if (original.src) {
+            script.onload = script.onerror = resolve;
+          } else {
+            script.text = original.text;
+          }
+          original.parentNode.replaceChild(script, original);
+          if (!original.src) {
+            resolve();
+          }
+        });
+      });
+    });
+  }
+"""
+LAZY_OUTPUT_LOADER = (
+    """
+<style>
+.notebook-lazy-output { min-height: 4rem; }
+.notebook-lazy-output > .jp-Cell { padding: 0; }
+</style>
+<script>
+(function () {"""
+    + RUN_SCRIPTS_FUNCTION
+    + """  function load(container) {
+    var url = window.location.pathname.replace(/^\\/view\\//, "/output/") + "/" + container.dataset.output + "?h=" + container.dataset.hash;
+    fetch(url, { credentials: "same-origin" })
+      .then(function (response) { return response.ok ? response.text() : Promise.reject(response.status); })
+      .then(function (html) { container.innerHTML = html; runScripts(container); })
+      .catch(function () { container.textContent = "Could not load this output. Reload the page to try again."; });
+  }
+  var containers = document.querySelectorAll(".notebook-lazy-output");
+  if (!("IntersectionObserver" in window)) {
+    Array.prototype.forEach.call(containers, load);
+    return;
+  }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        load(entry.target);
+      }
+    });
+  }, { rootMargin: "800px 0px" });
+  Array.prototype.forEach.call(containers, function (container) { observer.observe(container); });
+})();
+</script>
+"""
+)
+LIVE_VIEW_CLIENT = (
+    """
+<style>
+.notebook-live-status { position: fixed; right: 1rem; bottom: 1rem; padding: 0.4rem 0.8rem; background: #fff8d6; border: 1px solid #e0c96b; font: 0.85rem sans-serif; z-index: 1000; }
+.notebook-live-status:empty { display: none; }
+.notebook-live-running { outline: 2px solid #e0c96b; outline-offset: 2px; }
+.notebook-live-preview { margin: 0.25rem 0 0; padding: 0.25rem 0.5rem; color: #555; font-size: 0.85rem; white-space: pre-wrap; }
+</style>
+<script>
+(function () {"""
+    + RUN_SCRIPTS_FUNCTION
+    + """  if (!("EventSource" in window)) {
+    return;
+  }
+  var status = document.createElement("div");
+  status.className = "notebook-live-status";
+  document.body.appendChild(status);
+  // Cells saved after the page's notebook version are pushed on connect.
+  var since = Math.floor(new Date(document.lastModified).getTime() / 1000);
+  var url = window.location.pathname.replace(/^\\/view\\//, "/live/") + (isNaN(since) ? "" : "?since=" + since);
+  var source = new EventSource(url);
+  function findCell(data) {
+    var cell = data.cell_id ? document.getElementById("cell-id=" + data.cell_id) : null;
+    return cell || document.querySelectorAll(".jp-Notebook-cell")[data.cell_index] || null;
+  }
+  function listen(name, handler) {
+    source.addEventListener(name, function (event) { handler(JSON.parse(event.data)); });
+  }
+  listen("cell-started", function (data) {
+    var cell = findCell(data);
+    if (cell) {
+      cell.classList.add("notebook-live-running");
+    }
+    status.textContent = "Running cell " + data.code_cell_index + "/" + data.total_code_cells + ": " + data.label;
+  });
+  listen("cell-output", function (data) {
+    var cell = findCell(data);
+    if (!cell) {
+      return;
+    }
+    var preview = cell.querySelector(".notebook-live-preview");
+    if (!preview) {
+      preview = document.createElement("pre");
+      preview.className = "notebook-live-preview";
+      cell.appendChild(preview);
+    }
+    preview.textContent = data.preview;
+  });
+  listen("cell-finished", function (data) {
+    var cell = findCell(data);
+    if (cell) {
+      cell.classList.remove("notebook-live-running");
+    }
+  });
+  listen("cell", function (data) {
+    var cell = findCell(data);
+    var container = document.createElement("div");
+    container.innerHTML = data.html;
+    var replacement = container.firstElementChild;
+    if (!cell || !replacement) {
+      return;
+    }
+    cell.parentNode.replaceChild(replacement, cell);
+    runScripts(replacement);
+  });
+  listen("reload", function () {
+    source.close();
+    window.location.reload();
+  });
+  listen("completed", function (data) {
+    source.close();
+    Array.prototype.forEach.call(document.querySelectorAll(".notebook-live-running"), function (cell) {
+      cell.classList.remove("notebook-live-running");
+    });
+    status.textContent = data.state === "stopped" ? "Run stopped" : "Run finished";
+  });
+})();
+</script>
+"""
+)
+HEADING_RE = re.compile(r"<h([1-3])\b([^>]*)>(.*?)</h\1>", re.IGNORECASE | re.DOTALL)
+ID_RE = re.compile(r"\bid\s*=\s*([\"'])(.*?)\1", re.IGNORECASE | re.DOTALL)
+ANCHOR_LINK_RE = re.compile(
+    r"<a\b[^>]*class\s*=\s*([\"'])[^\"']*\banchor-link\b[^\"']*\1[^>]*>.*?</a>",
+    re.IGNORECASE | re.DOTALL,
+)
+TAG_RE = re.compile(r"<[^>]+>")
+#: Markdown sources that may contain an h1-h3 heading: ATX, setext or inline HTML.
+MARKDOWN_HEADING_RE = re.compile(r"^ {0,3}#{1,3}(?:[ \t]|$)|^ {0,3}(?:=+|-+)[ \t]*$|<h[1-3]\b", re.MULTILINE | re.IGNORECASE)
+#: Cell metadata flag of the markdown cell the table of contents is inserted into.
+TOC_CELL_METADATA = "notebook_static_server_toc"
+#: URL path of extracted images, see :func:`extract_image_outputs`.
+ASSET_URL_PREFIX = "/asset/"
+#: Image output MIME types that are extracted, with their asset file extension.
+EXTRACTED_IMAGE_TYPES = {"image/png": "png", "image/jpeg": "jpg"}
+#: URL path of stylesheets and scripts shared between pages, see :attr:`RenderOptions.shared_static`.
+STATIC_URL_PREFIX = "/static/"
+#: Start of the plotly.js bundle that plotly's ``notebook`` renderer inlines in the first figure output.
+PLOTLY_DEFINE_START = "define('plotly', function(require, exports, module) {"
+PLOTLY_DEFINE_END_RE = re.compile(r"\}\);\s*require\(\['plotly'\]")
+PLOTLY_VERSION_RE = re.compile(r"plotly\.js v([0-9][0-9A-Za-z.-]*)")
+#: Idle exporters kept per options and template by :func:`borrow_exporter`.
+EXPORTER_POOL_SIZE = 4
+
+
+def get_heading_id(attributes: str) -> str | None:
+    """Extract a heading id attribute from rendered HTML."""
+
+    match = ID_RE.search(attributes)
+    if not match:
+        return None
+    return html.unescape(match.group(2))
+
+
+def get_heading_label(content: str) -> str:
+    """Extract visible heading text from rendered HTML."""
+
+    without_anchor = ANCHOR_LINK_RE.sub("", content)
+    without_tags = TAG_RE.sub("", without_anchor)
+    return html.unescape(without_tags).strip()
+
+
+def inject_toc_style(body: str) -> str:
+    """Inject table-of-contents CSS into a full HTML document."""
+
+    match = re.search(r"</head\s*>", body, re.IGNORECASE)
+    if not match:
+        return body
+    return body[: match.start()] + TOC_STYLE + body[match.start() :]
+
+
+def format_table_of_contents(headings: Iterable[tuple[str, str | None, str]]) -> str | None:
+    """Format the table of contents from ``(level, id, label)`` of the headings after the first ``h1``.
+
+    :return:
+        ``<nav>`` HTML, or ``None`` when there are no usable headings.
+    """
+
+    items: list[str] = []
+    for level, heading_id, label in headings:
+        if level not in {"2", "3"} or not heading_id or not label:
+            continue
+
+        css_class = f' class="notebook-toc-level-{level}"' if level == "3" else ""
+        href = "#" + quote(heading_id, safe="")
+        items.append(f'    <li{css_class}><a href="{html.escape(href, quote=True)}">{html.escape(label)}</a></li>')
+
+    if not items:
+        return None
+
+    return "\n".join(
+        [
+            '<nav class="notebook-toc" aria-label="Table of contents">',
+            "  <h2>Table of contents</h2>",
+            "  <ol>",
+            *items,
+            "  </ol>",
+            "</nav>",
+            "",
+        ]
+    )
+
+
+def build_table_of_contents(body: str) -> str | None:
+    """Build the table of contents for the headings after the first ``h1`` of rendered HTML."""
+
+    headings = list(HEADING_RE.finditer(body))
+    first_h1 = next((heading for heading in headings if heading.group(1) == "1"), None)
+    if not first_h1:
+        return None
+    return format_table_of_contents(
+        (heading.group(1), get_heading_id(heading.group(2)), get_heading_label(heading.group(3)))
+        for heading in headings
+        if heading.start() > first_h1.start()
+    )
+
+
+def prepare_table_of_contents(notebook: NotebookNode, exporter: "NotebookHTMLExporter") -> str | None:
+    """Build the table of contents from markdown cells and flag the cell that gets it.
+
+    Only markdown cells that look like they contain a heading are rendered,
+    with the exporter's own markdown filter so heading ids match the page.
+    Headings in outputs are not listed.
+
+    :param notebook:
+        Notebook about to be exported; the cell with the first ``h1`` gets
+        :data:`TOC_CELL_METADATA` set.
+    :return:
+        ``<nav>`` HTML to pass to the exporter as ``notebook_toc``, or ``None``.
+    """
+
+    first_h1_cell = None
+    headings: list[tuple[str, str | None, str]] = []
+    for cell in notebook.cells:
+        if cell.cell_type != "markdown" or not MARKDOWN_HEADING_RE.search(cell.source):
+            continue
+        rendered = exporter.render_markdown(cell)
+        for heading in HEADING_RE.finditer(rendered):
+            if first_h1_cell is None:
+                if heading.group(1) == "1":
+                    first_h1_cell = cell
+                continue
+            headings.append((heading.group(1), get_heading_id(heading.group(2)), get_heading_label(heading.group(3))))
+    if first_h1_cell is None:
+        return None
+    toc = format_table_of_contents(headings)
+    if toc:
+        first_h1_cell.metadata[TOC_CELL_METADATA] = True
+    return toc
+
+
+def insert_table_of_contents(body: str, toc: str) -> str | None:
+    """Insert a table of contents after the first ``h1``, or return ``None`` without one."""
+
+    first_h1 = next((heading for heading in HEADING_RE.finditer(body) if heading.group(1) == "1"), None)
+    if not first_h1:
+        return None
+    return body[: first_h1.end()] + "\n" + toc + body[first_h1.end() :]
+
+
+def add_table_of_contents(body: str) -> str:
+    """Add a generated table of contents after the first heading."""
+
+    toc = build_table_of_contents(body)
+    if not toc:
+        return body
+    return inject_toc_style(insert_table_of_contents(body, toc))
+
+
+def is_progress_stream_text(text: str) -> bool:
+    """Check whether stream output is a tqdm-style progress update."""
+
+    if "\r" not in text:
+        return False
+
+    stripped = text.lstrip("\r")
+    if stripped.startswith("Backtesting "):
+        return True
+
+    return "%|" in text and "[" in text and "]" in text and ("<" in text or "it/s" in text)
+
+
+def split_progress_stream_text(text: str) -> tuple[list[str | None], bool]:
+    """Split stream text into preserved lines and progress detection status."""
+
+    if "\r" not in text:
+        return [text], False
+
+    chunks = text.split("\r")
+    parts: list[str | None] = [chunks[0]] if chunks[0] else []
+    progress_seen = False
+
+    for chunk in chunks[1:]:
+        lines = chunk.splitlines(keepends=True)
+        first_line = lines[0] if lines else ""
+        candidate = "\r" + first_line
+        if first_line and is_progress_stream_text(candidate):
+            if not progress_seen:
+                parts.append(None)
+            progress_seen = True
+            if lines[1:]:
+                parts.append("".join(lines[1:]))
+        elif chunk:
+            parts.append("\r" + chunk)
+
+    return parts, progress_seen
+
+
+def new_stream_output(name: str, text: str) -> NotebookNode:
+    """Create a notebook stream output."""
+
+    return NotebookNode(
+        {
+            "output_type": "stream",
+            "name": name,
+            "text": text,
+        }
+    )
+
+
+def has_carriage_return(output: NotebookNode) -> bool:
+    """Check whether an output is stream text that may hold progress updates."""
+
+    if output.get("output_type") != "stream":
+        return False
+    text = output.get("text", "")
+    if isinstance(text, list):
+        return any("\r" in line for line in text)
+    return "\r" in text
+
+
+def clean_cell_progress_outputs(outputs: list[NotebookNode]) -> list[NotebookNode] | None:
+    """Collapse repeated progress bar outputs of one cell.
+
+    :return:
+        New output list, or ``None`` when the cell has no progress output.
+        Unchanged outputs are shared with ``outputs``.
+    """
+
+    if not any(has_carriage_return(output) for output in outputs):
+        return None
+
+    new_outputs: list[NotebookNode] = []
+    progress_seen = False
+    progress_message_inserted = False
+    progress_stream_name = "stderr"
+
+    for output in outputs:
+        if output.get("output_type") != "stream":
+            new_outputs.append(output)
+            continue
+
+        text = output.get("text", "")
+        if isinstance(text, list):
+            text = "".join(text)
+
+        stream_parts, output_has_progress = split_progress_stream_text(text)
+        if not output_has_progress:
+            new_outputs.append(output)
+            continue
+
+        progress_seen = True
+        progress_stream_name = output.get("name", progress_stream_name)
+
+        for part in stream_parts:
+            if part is None:
+                if not progress_message_inserted:
+                    new_outputs.append(new_stream_output(progress_stream_name, PROGRESS_OUTPUT_MESSAGE))
+                    progress_message_inserted = True
+            elif part:
+                new_outputs.append(new_stream_output(output.get("name", "stdout"), part))
+
+    return new_outputs if progress_seen else None
+
+
+def clean_progress_outputs(notebook: NotebookNode) -> NotebookNode:
+    """Collapse repeated progress bar outputs for static previews.
+
+    Copy-on-write: the result is a shallow copy of ``notebook`` in which only
+    cells with progress output are copied, so large outputs such as images
+    are shared instead of duplicated. ``notebook`` itself is not modified, but
+    replacing an item of a shared cell or output list changes both notebooks.
+    """
+
+    cells: list[NotebookNode] = []
+    for cell in notebook.cells:
+        outputs = clean_cell_progress_outputs(cell.get("outputs", [])) if cell.cell_type == "code" else None
+        cells.append(cell if outputs is None else NotebookNode(cell, outputs=outputs))
+
+    return NotebookNode(notebook, cells=cells)
+
+
+@dataclass(slots=True, frozen=True)
+class RenderOptions:
+    """Exporter settings that change the rendered HTML.
+
+    Part of the render cache key, so every option that affects the output
+    must live here.
+
+    :ivar template_name:
+        nbconvert HTML template.
+    :ivar theme:
+        JupyterLab theme used by the ``lab`` template.
+    :ivar exclude_input:
+        Hide code cell sources and show outputs only.
+    :ivar lazy_output_bytes:
+        Rich outputs larger than this are replaced by placeholders that the
+        browser loads from ``/output/`` when scrolled into view. ``0``
+        renders every output inline.
+    :ivar live_view:
+        Add the client that follows running notebooks through the server's
+        ``/live/`` event stream.
+    :ivar extract_images:
+        Reference PNG and JPEG outputs by ``/asset/`` URL instead of
+        inlining them as base64, see :func:`extract_image_outputs`.
+    :ivar shared_static:
+        Link the template stylesheets and plotly.js from ``/static/``
+        instead of inlining them, see :func:`get_template_static_files` and
+        :func:`extract_plotly_bundles`. Off for self-contained HTML.
+    :ivar max_output_bytes:
+        Outputs whose JSON is larger than this are not read and show a
+        download link instead, see :func:`~.reader.read_notebook`. ``0``
+        renders every output.
+    :ivar fast:
+        Render with :func:`~.fast.render_fast_notebook` instead of
+        nbconvert: minimal HTML without server-side highlighting, for quick
+        previews. Lazy outputs and the live view are not supported.
+    :ivar fast_highlight_url:
+        highlight.js script that fast pages load in the browser to highlight
+        code once idle. Empty for no highlighting.
+    """
+
+    template_name: str = "lab"
+    theme: str = "light"
+    exclude_input: bool = False
+    lazy_output_bytes: int = 0
+    live_view: bool = False
+    extract_images: bool = False
+    shared_static: bool = False
+    max_output_bytes: int = 0
+    fast: bool = False
+    fast_highlight_url: str = ""
+
+    def create_exporter(self, template_file: str = PAGE_TEMPLATE) -> "NotebookHTMLExporter":
+        """Create an HTML exporter configured with these options.
+
+        :param template_file:
+            Template from :data:`TEMPLATE_DIR` that extends the configured
+            template, e.g. :data:`STREAM_CELLS_TEMPLATE`.
+        """
+
+        return NotebookHTMLExporter(
+            template_name=self.template_name,
+            template_file=template_file,
+            extra_template_paths=[str(TEMPLATE_DIR)],
+            theme=self.theme,
+            exclude_input=self.exclude_input,
+            shared_static=self.shared_static,
+        )
+
+
+def get_static_name(stem: str, suffix: str, content: bytes) -> str:
+    """Return the versioned file name of a shared stylesheet or script, e.g. ``index-<hash>.css``."""
+
+    return f"{stem}-{hashlib.sha256(content).hexdigest()[:16]}{suffix}"
+
+
+class NotebookHTMLExporter(HTMLExporter):
+    """HTML exporter that inserts the table of contents while rendering markdown.
+
+    Pass the table of contents from :func:`prepare_table_of_contents` as the
+    ``notebook_toc`` resource; :data:`PAGE_TEMPLATE` adds its style. With
+    :attr:`shared_static`, template stylesheets are linked from
+    :data:`STATIC_URL_PREFIX` and collected in :attr:`static_files`.
+    """
+
+    shared_static = Bool(False, help="Link template stylesheets from /static/ instead of inlining them.")
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        #: Name to content of the stylesheets linked by the last exports.
+        self.static_files: dict[str, bytes] = {}
+
+    def _init_resources(self, resources: dict[str, Any]) -> dict[str, Any]:
+        resources = super()._init_resources(resources)
+        if self.shared_static:
+            # Not the bound method: resources are deep-copied, which would copy this exporter too.
+            resources["include_css"] = lambda name: self.link_css(name)
+        return resources
+
+    def link_css(self, name: str) -> Markup:
+        """Link a template stylesheet, e.g. ``static/index.css``, instead of inlining it."""
+
+        content = self.environment.loader.get_source(self.environment, name)[0].encode("utf-8")
+        static_name = get_static_name(Path(name).stem, ".css", content)
+        self.static_files[static_name] = content
+        return Markup(f'<link rel="stylesheet" href="{STATIC_URL_PREFIX}{static_name}">')
+
+    def render_markdown(self, cell: NotebookNode) -> str:
+        """Render a markdown cell the way the page template does."""
+
+        return super().markdown2html({"cell": cell, "resources": {}}, cell.source)
+
+    @pass_context
+    def markdown2html(self, context: Any, source: str) -> str:
+        rendered = super().markdown2html(context, source)
+        toc = context.get("resources", {}).get("notebook_toc")
+        if toc and context.get("cell", {}).get("metadata", {}).get(TOC_CELL_METADATA):
+            rendered = insert_table_of_contents(rendered, toc) or rendered
+        return rendered
+
+
+_idle_exporters: dict[tuple[RenderOptions, str], list[NotebookHTMLExporter]] = {}
+_idle_exporters_lock = threading.Lock()
+
+
+@contextmanager
+def borrow_exporter(options: RenderOptions, template_file: str = PAGE_TEMPLATE) -> Iterator[NotebookHTMLExporter]:
+    """Lend an exporter created with :meth:`RenderOptions.create_exporter` to the calling thread.
+
+    Exporters are not safe for concurrent use and slow to create, so each
+    render borrows its own and idle ones are kept for the next render.
+
+    .. code-block:: python
+
+        with borrow_exporter(options, STREAM_CELLS_TEMPLATE) as exporter:
+            cell_html = render_notebook_cell(notebook, 0, options, exporter)
+    """
+
+    key = (options, template_file)
+    with _idle_exporters_lock:
+        idle = _idle_exporters.get(key)
+        exporter = idle.pop() if idle else None
+    if exporter is None:
+        exporter = options.create_exporter(template_file)
+    try:
+        yield exporter
+    finally:
+        with _idle_exporters_lock:
+            idle = _idle_exporters.setdefault(key, [])
+            if len(idle) < EXPORTER_POOL_SIZE:
+                idle.append(exporter)
+
+
+@dataclass(slots=True, frozen=True)
+class NotebookRenderResult:
+    """Rendered page with its lazily loaded output fragments and extracted files.
+
+    :ivar html:
+        Full HTML page.
+    :ivar fragments:
+        ``"<cell index>/<output index>"`` to the HTML of an output that was
+        replaced by a placeholder in :attr:`html`.
+    :ivar assets:
+        File name to content of the images :attr:`html` and the fragments
+        reference under :data:`ASSET_URL_PREFIX`, e.g. ``"<sha256>.png"``,
+        and of the scripts under :data:`STATIC_URL_PREFIX`.
+    """
+
+    html: str
+    fragments: dict[str, str] = field(default_factory=dict)
+    assets: dict[str, bytes] = field(default_factory=dict)
+
+
+def get_asset_name(data: bytes, extension: str) -> str:
+    """Return the content-addressed file name of an extracted image."""
+
+    return f"{hashlib.sha256(data).hexdigest()}.{extension}"
+
+
+def extract_image_outputs(notebook: NotebookNode) -> dict[str, bytes]:
+    """Replace inline base64 images by references to content-addressed assets.
+
+    Extracted outputs get ``filenames`` metadata pointing at
+    ``/asset/<sha256>.<extension>``, which the nbconvert HTML templates use as
+    the ``img`` source instead of a ``data:`` URL, and their base64 payload is
+    dropped. The same image in several cells or notebooks has one URL, so
+    browsers fetch it once.
+
+    :param notebook:
+        Notebook to modify in place; changed outputs are replaced by copies.
+    :return:
+        Asset name to image bytes.
+    """
+
+    assets: dict[str, bytes] = {}
+    for cell in notebook.cells:
+        if cell.cell_type != "code":
+            continue
+        for output_index, output in enumerate(cell.get("outputs", [])):
+            if output.get("output_type") not in ("display_data", "execute_result"):
+                continue
+            data = dict(output.get("data", {}))
+            filenames = {}
+            for mime_type, extension in EXTRACTED_IMAGE_TYPES.items():
+                value = data.get(mime_type)
+                if isinstance(value, list):
+                    value = "".join(value)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    image = base64.b64decode(value)
+                except binascii.Error:
+                    # Leave malformed payloads to the exporter, as without extraction.
+                    continue
+                name = get_asset_name(image, extension)
+                assets[name] = image
+                filenames[mime_type] = ASSET_URL_PREFIX + name
+                data[mime_type] = ""
+            if not filenames:
+                continue
+            metadata = output.get("metadata", {})
+            metadata = NotebookNode(metadata, filenames={**metadata.get("filenames", {}), **filenames})
+            cell.outputs[output_index] = NotebookNode(output, data=NotebookNode(data), metadata=metadata)
+    return assets
+
+
+def extract_plotly_bundles(notebook: NotebookNode) -> dict[str, bytes]:
+    """Replace plotly.js bundles inlined in outputs by a link to a shared script.
+
+    plotly's ``notebook`` renderer puts the whole plotly.js bundle, several
+    megabytes, in the first figure output as an inline AMD
+    ``define('plotly', ...)``. The definition is moved to a versioned
+    ``/static/plotly-<version>-<hash>.js`` script and require.js is pointed
+    at it, so figures load it once per browser instead of once per page.
+
+    :param notebook:
+        Notebook to modify in place; changed outputs are replaced by copies.
+    :return:
+        Script name to content.
+    """
+
+    scripts: dict[str, bytes] = {}
+    for cell in notebook.cells:
+        if cell.cell_type != "code":
+            continue
+        for output_index, output in enumerate(cell.get("outputs", [])):
+            value = output.get("data", {}).get("text/html")
+            if isinstance(value, list):
+                value = "".join(value)
+            if not isinstance(value, str) or PLOTLY_DEFINE_START not in value:
+                continue
+            start = value.index(PLOTLY_DEFINE_START)
+            end = PLOTLY_DEFINE_END_RE.search(value, start)
+            if end is None:
+                continue
+            module = value[start : end.start() + len("});")].encode("utf-8")
+            version = PLOTLY_VERSION_RE.search(value, start, end.start())
+            name = get_static_name(f"plotly-{version.group(1)}" if version else "plotly", ".js", module)
+            scripts[name] = module
+            # require.js appends ".js" to paths.
+            configure = f'require.config({{paths: {{plotly: "{STATIC_URL_PREFIX}{name.removesuffix(".js")}"}}}});'
+            data = NotebookNode(output.data)
+            data["text/html"] = value[:start] + configure + value[end.start() + len("});") :]
+            cell.outputs[output_index] = NotebookNode(output, data=data)
+    return scripts
+
+
+@lru_cache
+def get_template_static_files(options: RenderOptions) -> dict[str, bytes]:
+    """Return the stylesheets pages rendered with ``options`` link from ``/static/``.
+
+    :return:
+        Static file name to content; empty unless :attr:`RenderOptions.shared_static`.
+    """
+
+    if not options.shared_static:
+        return {}
+    exporter = options.create_exporter()
+    exporter.from_notebook_node(nbformat.v4.new_notebook(), resources=get_page_resources(None, False))
+    return exporter.static_files
+
+
+def get_output_size(output: NotebookNode) -> int:
+    """Return the approximate payload size of a rich output in characters."""
+
+    if output.get("output_type") not in ("display_data", "execute_result"):
+        return 0
+    size = 0
+    for value in output.get("data", {}).values():
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, list):
+            size += sum(len(item) for item in value if isinstance(item, str))
+        else:
+            # JSON mime bundles, e.g. application/vnd.plotly.v1+json.
+            size += len(json.dumps(value))
+    return size
+
+
+def get_fragment_hash(fragment: str | bytes) -> str:
+    """Return the content hash used to version lazily loaded outputs."""
+
+    if isinstance(fragment, str):
+        fragment = fragment.encode("utf-8")
+    return hashlib.sha256(fragment).hexdigest()[:16]
+
+
+def new_lazy_output_placeholder(output_id: str, fragment: str, size: int) -> NotebookNode:
+    """Create the display output standing in for a lazily loaded output."""
+
+    placeholder = (
+        f'<div class="notebook-lazy-output" data-output="{output_id}" data-hash="{get_fragment_hash(fragment)}">'
+        f"<p>Loading output ({size / 1024:,.0f} KB)&hellip;</p>"
+        "<noscript>Enable JavaScript to load this output.</noscript>"
+        "</div>"
+    )
+    return NotebookNode(
+        {
+            "output_type": "display_data",
+            "data": {"text/html": placeholder, "text/plain": "Output loads when scrolled into view."},
+            "metadata": {},
+        }
+    )
+
+
+def split_lazy_outputs(notebook: NotebookNode, options: RenderOptions) -> dict[str, str]:
+    """Replace heavy outputs with placeholders and render them separately.
+
+    The heavy outputs are rendered in one extra export, one output per
+    ``exclude_input`` cell, so they get exactly the page's template markup.
+    The export is then cut at the cell boundaries.
+
+    :param notebook:
+        Notebook to modify in place.
+    :return:
+        Output id to fragment HTML.
+    """
+
+    heavy: list[tuple[str, NotebookNode, int]] = []
+    for cell_index, cell in enumerate(notebook.cells):
+        if cell.cell_type != "code":
+            continue
+        for output_index, output in enumerate(cell.get("outputs", [])):
+            size = get_output_size(output)
+            if size > options.lazy_output_bytes:
+                heavy.append((f"{cell_index}/{output_index}", output, size))
+    if not heavy:
+        return {}
+
+    fragment_notebook = nbformat.v4.new_notebook(metadata=notebook.metadata)
+    for number, (_output_id, output, _size) in enumerate(heavy):
+        cell = nbformat.v4.new_code_cell(outputs=[output])
+        cell.id = f"lazy-output-{number}"
+        fragment_notebook.cells.append(cell)
+    exporter = HTMLExporter(template_name=options.template_name, theme=options.theme, exclude_input=True)
+    body, _resources = exporter.from_notebook_node(fragment_notebook)
+
+    starts = []
+    for number in range(len(heavy)):
+        marker = body.index(f'id="cell-id=lazy-output-{number}"')
+        starts.append(body.rindex("<div", 0, marker))
+    ends = starts[1:] + [body.rindex("</main>") if "</main>" in body else body.rindex("</body>")]
+
+    fragments = {}
+    for (output_id, _output, size), start, end in zip(heavy, starts, ends, strict=True):
+        fragment = body[start:end].strip()
+        fragments[output_id] = fragment
+        cell_index, output_index = (int(part) for part in output_id.split("/"))
+        notebook.cells[cell_index].outputs[output_index] = new_lazy_output_placeholder(output_id, fragment, size)
+    return fragments
+
+
+def get_page_resources(toc: str | None, lazy_outputs: bool, live_view: bool = False) -> dict[str, Any]:
+    """Build the exporter resources :data:`PAGE_TEMPLATE` reads."""
+
+    return {
+        "notebook_toc": toc,
+        "notebook_toc_style": TOC_STYLE if toc else "",
+        "notebook_lazy_output_loader": LAZY_OUTPUT_LOADER if lazy_outputs else "",
+        "notebook_live_view_client": LIVE_VIEW_CLIENT if live_view else "",
+    }
+
+
+def with_cells(notebook: NotebookNode, cells: list[NotebookNode]) -> NotebookNode:
+    """Return a notebook with the metadata of ``notebook`` and only ``cells``."""
+
+    return NotebookNode(
+        {
+            "nbformat": notebook.nbformat,
+            "nbformat_minor": notebook.nbformat_minor,
+            "metadata": notebook.metadata,
+            "cells": cells,
+        }
+    )
+
+
+def export_notebook_cells(exporter: HTMLExporter, notebook: NotebookNode, cells: list[NotebookNode], resources: dict[str, Any]) -> str:
+    """Export cells of a notebook without the page head and tail.
+
+    :param exporter:
+        Exporter created with :data:`STREAM_CELLS_TEMPLATE`.
+    :return:
+        The cells' HTML, one top-level element per rendered cell.
+    """
+
+    body, _resources = exporter.from_notebook_node(with_cells(notebook, cells), resources=dict(resources))
+    prefix, suffix = STREAM_CELLS_WRAPPER
+    body = body.strip()
+    if not body.startswith(prefix) or not body.endswith(suffix):
+        raise ValueError(f"Template {exporter.template_name} does not support streaming")
+    return body[len(prefix) : -len(suffix)]
+
+
+def render_notebook_cell(
+    notebook: NotebookNode,
+    cell_index: int,
+    options: RenderOptions | None = None,
+    exporter: HTMLExporter | None = None,
+) -> str:
+    """Render one cell of a notebook the way it appears on the page.
+
+    Used to update a single cell of an open page. Progress output is
+    collapsed as on the page; outputs are always rendered inline.
+
+    :param exporter:
+        Exporter created with :data:`STREAM_CELLS_TEMPLATE` to reuse, which
+        saves compiling the templates again. Not safe for concurrent use.
+    """
+
+    options = options or RenderOptions()
+    cell = notebook.cells[cell_index]
+    outputs = clean_cell_progress_outputs(cell.get("outputs", [])) if cell.cell_type == "code" else None
+    if outputs is not None:
+        cell = NotebookNode(cell, outputs=outputs)
+    exporter = exporter or options.create_exporter(STREAM_CELLS_TEMPLATE)
+    return export_notebook_cells(exporter, notebook, [cell], get_page_resources(None, False)).strip()
+
+
+def render_notebook_page(notebook_path: Path, options: RenderOptions | None = None) -> NotebookRenderResult:
+    """Render a notebook to HTML plus its lazily loaded output fragments."""
+
+    options = options or RenderOptions()
+    notebook = read_notebook(notebook_path, options.max_output_bytes)
+    notebook = clean_progress_outputs(notebook)
+    assets = extract_image_outputs(notebook) if options.extract_images else {}
+    if options.shared_static:
+        assets.update(extract_plotly_bundles(notebook))
+    if options.fast:
+        # Imported here because the fast renderer builds on this module.
+        from .fast import render_fast_notebook
+
+        return NotebookRenderResult(html=render_fast_notebook(notebook, options, notebook_path.stem), assets=assets)
+    fragments = split_lazy_outputs(notebook, options) if options.lazy_output_bytes else {}
+    exporter = options.create_exporter()
+    resources = get_page_resources(prepare_table_of_contents(notebook, exporter), bool(fragments), options.live_view)
+    body, _resources = exporter.from_notebook_node(notebook, resources=resources)
+    return NotebookRenderResult(html=body, fragments=fragments, assets=assets)
+
+
+def render_notebook(notebook_path: Path, options: RenderOptions | None = None) -> str:
+    """Render a notebook to HTML without executing it."""
+
+    return render_notebook_page(notebook_path, options).html
+
+
+class NotebookPageStream:
+    """Render a notebook page in chunks of cells.
+
+    The page head and tail are rendered once from the notebook metadata and
+    the cells in batches of about :data:`STREAM_BATCH_SIZE` characters, so
+    memory per render stays bounded by one batch and the head can be sent
+    before any cell is exported. The table of contents is built up front
+    from markdown cells, see :func:`prepare_table_of_contents`.
+
+    .. code-block:: python
+
+        stream = NotebookPageStream(notebook_path, RenderOptions())
+        for chunk in stream:
+            wfile.write(chunk.encode("utf-8"))
+
+    :ivar fragments:
+        Lazily loaded outputs, see :class:`NotebookRenderResult`. Complete
+        before the first chunk.
+    :ivar assets:
+        Extracted images, see :class:`NotebookRenderResult`. Complete
+        before the first chunk.
+    """
+
+    def __init__(self, notebook_path: Path, options: RenderOptions | None = None, *, batch_size: int = STREAM_BATCH_SIZE) -> None:
+        self.options = options or RenderOptions()
+        self.batch_size = batch_size
+        notebook = read_notebook(notebook_path, self.options.max_output_bytes)
+        self.notebook = clean_progress_outputs(notebook)
+        self.assets = extract_image_outputs(self.notebook) if self.options.extract_images else {}
+        if self.options.shared_static:
+            self.assets.update(extract_plotly_bundles(self.notebook))
+        self.fragments = split_lazy_outputs(self.notebook, self.options) if self.options.lazy_output_bytes and not self.options.fast else {}
+        self.title = notebook_path.stem
+
+    def __iter__(self) -> Iterator[str]:
+        if self.options.fast:
+            # Fast pages render in one go and are small enough to send as one chunk.
+            from .fast import render_fast_notebook
+
+            yield render_fast_notebook(self.notebook, self.options, self.title)
+            return
+
+        cells_exporter = self.options.create_exporter(STREAM_CELLS_TEMPLATE)
+        resources = get_page_resources(prepare_table_of_contents(self.notebook, cells_exporter), bool(self.fragments), self.options.live_view)
+        shell_exporter = self.options.create_exporter(STREAM_SHELL_TEMPLATE)
+        shell, _resources = shell_exporter.from_notebook_node(with_cells(self.notebook, []), resources=dict(resources))
+        head, marker, tail = shell.partition(STREAM_CELLS_MARKER)
+        if not marker:
+            raise ValueError(f"Template {self.options.template_name} does not support streaming")
+
+        yield head
+        for batch in self._iter_batches():
+            yield export_notebook_cells(cells_exporter, self.notebook, batch, resources)
+        yield tail
+
+    def _iter_batches(self) -> Iterator[list[NotebookNode]]:
+        batch: list[NotebookNode] = []
+        size = 0
+        for cell in self.notebook.cells:
+            batch.append(cell)
+            size += len(cell.source) + sum(get_output_size(output) + len(output.get("text", "")) for output in cell.get("outputs", []))
+            if size >= self.batch_size:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
@@ -0,0 +1,353 @@
+"""Full-text search over notebook sources and outputs.
+
+Finding the notebook that printed a given result otherwise means grepping
+multi-megabyte JSON files. Markdown, code and text outputs of every served
+notebook are indexed in an SQLite FTS5 table that survives restarts. The
+index is updated incrementally: notebooks whose mtime and size did not
+change since they were indexed are skipped, and watcher events re-index
+single notebooks.
+
+Notebooks are indexed one at a time, each in its own transaction, and read
+with :func:`~.reader.load_notebook_text`, so building the index holds at
+most the text of one notebook in memory, not its images.
+"""
+
+from dataclasses import dataclass
+import html
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Iterable, Iterator, Literal
+from urllib.parse import quote
+
+from .reader import load_notebook_text
+from .watcher import is_watched_notebook
+
+logger = logging.getLogger(__name__)
+
+type SearchCellKind = Literal["markdown", "code", "output"]
+
+#: Bump when the schema or the indexed text changes; older indexes are rebuilt.
+SEARCH_INDEX_VERSION = 2
+DEFAULT_SEARCH_INDEX_PATH = Path.home() / ".cache" / "notebook-static-server" / "search.sqlite"
+#: Characters of output text indexed per cell; progress logs can be megabytes.
+MAX_OUTPUT_CHARS = 64 * 1024
+#: Words of context around the matches in result snippets.
+SNIPPET_WORDS = 16
+#: Markers for matches in snippets; replaced by ``<mark>`` after escaping.
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notebooks (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+-- FTS5 cannot index its UNINDEXED columns, so deleting the cells of a notebook
+-- by path would scan the whole full-text table. Cells live in a normal table
+-- with a path index instead, and the external-content FTS table only indexes
+-- their text, kept in sync by the triggers.
+CREATE TABLE IF NOT EXISTS cell_rows (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    cell_index INTEGER NOT NULL,
+    cell_id TEXT,
+    kind TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cell_rows_path ON cell_rows (path);
+CREATE VIRTUAL TABLE IF NOT EXISTS cells USING fts5(
+    content,
+    content = 'cell_rows',
+    content_rowid = 'id',
+    tokenize = 'unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS cell_rows_insert AFTER INSERT ON cell_rows BEGIN
+    INSERT INTO cells (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS cell_rows_delete AFTER DELETE ON cell_rows BEGIN
+    INSERT INTO cells (cells, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class NotebookSearchResult:
+    """One matching cell.
+
+    :ivar path:
+        Notebook path relative to the project root, as used in ``/view/`` URLs.
+    :ivar cell_index:
+        Index of the cell in the notebook.
+    :ivar cell_id:
+        nbformat cell id, ``None`` for notebooks older than nbformat 4.5.
+    :ivar kind:
+        ``"markdown"``, ``"code"`` for a code cell source or ``"output"``
+        for its text outputs.
+    :ivar snippet:
+        HTML excerpt with the matches in ``<mark>``.
+    :ivar score:
+        BM25 rank; lower is a better match.
+    """
+
+    path: str
+    cell_index: int
+    cell_id: str | None
+    kind: SearchCellKind
+    snippet: str
+    score: float
+
+    @property
+    def url(self) -> str:
+        """``/view/`` URL of the notebook, anchored at the cell when it has an id."""
+
+        url = "/view/" + quote(self.path, safe="/")
+        if self.cell_id:
+            url += "#" + quote(f"cell-id={self.cell_id}", safe="=")
+        return url
+
+
+def get_output_text(output: dict[str, Any]) -> str:
+    """Return the searchable text of one output: stream text, ``text/plain`` or the error."""
+
+    output_type = output.get("output_type")
+    if output_type == "stream":
+        text = output.get("text", "")
+    elif output_type in ("display_data", "execute_result"):
+        text = output.get("data", {}).get("text/plain", "")
+    elif output_type == "error":
+        text = f"{output.get('ename', '')}: {output.get('evalue', '')}"
+    else:
+        return ""
+    return "".join(text) if isinstance(text, list) else str(text)
+
+
+def iter_notebook_search_rows(document: dict[str, Any]) -> Iterator[tuple[int, str | None, SearchCellKind, str]]:
+    """Yield ``(cell index, cell id, kind, text)`` for the searchable parts of a notebook.
+
+    :param document:
+        Notebook JSON as parsed by :func:`~.reader.load_notebook_text`.
+    """
+
+    for cell_index, cell in enumerate(document.get("cells", [])):
+        if not isinstance(cell, dict):
+            continue
+        cell_id = cell.get("id") if isinstance(cell.get("id"), str) else None
+        source = cell.get("source", "")
+        source = "".join(source) if isinstance(source, list) else str(source)
+        cell_type = cell.get("cell_type")
+        if cell_type == "markdown" and source.strip():
+            yield cell_index, cell_id, "markdown", source
+        elif cell_type == "code":
+            if source.strip():
+                yield cell_index, cell_id, "code", source
+            parts: list[str] = []
+            size = 0
+            for output in cell.get("outputs", []):
+                if size >= MAX_OUTPUT_CHARS:
+                    break
+                text = get_output_text(output) if isinstance(output, dict) else ""
+                if text.strip():
+                    parts.append(text[: MAX_OUTPUT_CHARS - size])
+                    size += len(parts[-1])
+            if parts:
+                yield cell_index, cell_id, "output", "\n".join(parts)
+
+
+def build_match_query(text: str) -> str | None:
+    """Turn free text into an FTS5 query matching cells that contain every word.
+
+    Words are quoted, so FTS5 operators and punctuation in the search box
+    are matched literally. The last word also matches as a prefix.
+
+    :return:
+        FTS5 ``MATCH`` expression, or ``None`` for blank text.
+    """
+
+    words = text.split()
+    if not words:
+        return None
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def format_snippet(snippet: str) -> str:
+    """Escape a raw FTS5 snippet and turn its match markers into ``<mark>``."""
+
+    escaped = html.escape(snippet)
+    return escaped.replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+
+class NotebookSearchIndex:
+    """Persistent full-text index of the notebooks under the served roots.
+
+    Thread-safe; request threads search while the scan and watcher threads
+    update.
+
+    .. code-block:: python
+
+        index = NotebookSearchIndex(DEFAULT_SEARCH_INDEX_PATH, PROJECT_ROOT, get_available_roots())
+        index.start_scan()
+        for result in index.search("vault TVL"):
+            print(result.url, result.snippet)
+
+    :param database_path:
+        SQLite file, created when missing. ``":memory:"`` keeps the index in
+        memory only.
+    """
+
+    def __init__(self, database_path: Path | str, project_root: Path, roots: Iterable[Path]) -> None:
+        self.project_root = project_root.resolve()
+        self.roots = tuple(Path(root).resolve() for root in roots)
+        if str(database_path) != ":memory:":
+            Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._scan_done = threading.Event()
+        with self._lock:
+            self._open_schema()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the initial scan has finished."""
+
+        return self._scan_done.is_set()
+
+    def scan(self) -> None:
+        """Index new and changed notebooks under the roots and drop deleted ones."""
+
+        seen: set[str] = set()
+        for root in self.roots:
+            for directory, dirnames, filenames in os.walk(root):
+                dirnames[:] = [name for name in dirnames if name != ".ipynb_checkpoints"]
+                for filename in filenames:
+                    if filename.endswith(".ipynb"):
+                        relative_path = self.update(Path(directory) / filename)
+                        if relative_path is not None:
+                            seen.add(relative_path)
+        with self._lock:
+            indexed = [row[0] for row in self._connection.execute("SELECT path FROM notebooks")]
+            for relative_path in indexed:
+                if relative_path not in seen:
+                    self._delete(relative_path)
+        self._scan_done.set()
+
+    def start_scan(self) -> threading.Thread:
+        """Run :meth:`scan` in a background thread so serving starts at once."""
+
+        thread = threading.Thread(target=self.scan, name="notebook-search-scan", daemon=True)
+        thread.start()
+        return thread
+
+    def update(self, notebook_path: Path) -> str | None:
+        """Index one notebook if it changed since it was indexed, or drop it when it no longer exists.
+
+        :return:
+            Path relative to the project root, or ``None`` for paths outside
+            the roots.
+        """
+
+        notebook_path = notebook_path.resolve()
+        relative_path = self._relative_path(notebook_path)
+        if relative_path is None or not is_watched_notebook(notebook_path):
+            return None
+        try:
+            stat = notebook_path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._delete(relative_path)
+            return relative_path
+        with self._lock:
+            row = self._connection.execute("SELECT mtime_ns, size FROM notebooks WHERE path = ?", (relative_path,)).fetchone()
+        if row == (stat.st_mtime_ns, stat.st_size):
+            return relative_path
+
+        try:
+            rows = [(relative_path, *row) for row in iter_notebook_search_rows(load_notebook_text(notebook_path))]
+        except (OSError, ValueError, AttributeError) as exc:
+            logger.warning("Could not index %s for search: %s", notebook_path, exc)
+            rows = []
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute("DELETE FROM cell_rows WHERE path = ?", (relative_path,))
+                self._connection.executemany("INSERT INTO cell_rows (path, cell_index, cell_id, kind, content) VALUES (?, ?, ?, ?, ?)", rows)
+                # Unreadable notebooks are recorded too, so they are retried only once changed.
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO notebooks (path, mtime_ns, size) VALUES (?, ?, ?)",
+                    (relative_path, stat.st_mtime_ns, stat.st_size),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return relative_path
+
+    def search(self, text: str, *, limit: int = 50) -> list[NotebookSearchResult]:
+        """Return the cells matching every word of ``text``, best match first.
+
+        :param text:
+            Free text from the search box.
+        :param limit:
+            Maximum number of results.
+        """
+
+        query = build_match_query(text)
+        if query is None:
+            return []
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT cell_rows.path, cell_rows.cell_index, cell_rows.cell_id, cell_rows.kind, snippet(cells, 0, ?, ?, '…', ?), bm25(cells) "
+                "FROM cells JOIN cell_rows ON cell_rows.id = cells.rowid WHERE cells MATCH ? ORDER BY rank LIMIT ?",
+                (_MATCH_START, _MATCH_END, SNIPPET_WORDS, query, limit),
+            ).fetchall()
+        return [
+            NotebookSearchResult(
+                path=path,
+                cell_index=int(cell_index),
+                cell_id=cell_id,
+                kind=kind,
+                snippet=format_snippet(snippet),
+                score=score,
+            )
+            for path, cell_index, cell_id, kind, snippet, score in rows
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM notebooks").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+
+        with self._lock:
+            self._connection.close()
+
+    def _open_schema(self) -> None:
+        """Create the tables, rebuilding indexes written by other versions. Caller holds the lock."""
+
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SEARCH_INDEX_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS cells")
+            self._connection.execute("DROP TABLE IF EXISTS cell_rows")
+            self._connection.execute("DROP TABLE IF EXISTS notebooks")
+        self._connection.executescript(_SCHEMA)
+        self._connection.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+
+    def _delete(self, relative_path: str) -> None:
+        """Drop a notebook from the index. Caller holds the lock."""
+
+        self._connection.execute("BEGIN")
+        self._connection.execute("DELETE FROM cell_rows WHERE path = ?", (relative_path,))
+        self._connection.execute("DELETE FROM notebooks WHERE path = ?", (relative_path,))
+        self._connection.execute("COMMIT")
+
+    def _relative_path(self, notebook_path: Path) -> str | None:
+        for root in self.roots:
+            if notebook_path.is_relative_to(root):
+                return notebook_path.relative_to(self.project_root).as_posix()
+        return None
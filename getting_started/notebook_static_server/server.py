@@ -0,0 +1,1357 @@
+"""Serve saved Jupyter notebook outputs as static HTML."""
+
+import argparse
+import base64
+from dataclasses import replace
+from email.message import Message
+from email.utils import formatdate
+from email.utils import parsedate_to_datetime
+import gzip
+import hmac
+import html
+import ipaddress
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable
+from urllib.parse import parse_qs
+from urllib.parse import quote
+from urllib.parse import unquote
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+from .cache import DEFAULT_CACHE_DIR
+from .cache import NotebookRenderCache
+from .cache import get_render_cache_key
+from .index import INDEX_SORT_KEYS
+from .index import NotebookIndex
+from .index import NotebookIndexEntry
+from .live import DEFAULT_LIVE_CHANNEL_DIR
+from .live import LiveNotebookView
+from .live import is_notebook_running
+from .metrics import METRICS_CONTENT_TYPE
+from .metrics import MetricFamily
+from .metrics import ServerMetrics
+from .metrics import labels
+from .partial import DEFAULT_CELL_CACHE_BYTES
+from .partial import CellSelection
+from .partial import NotebookCellCache
+from .partial import render_partial_page
+from .pool import DEFAULT_RENDER_MEMORY_BYTES
+from .pool import DEFAULT_RENDER_QUEUE
+from .pool import DEFAULT_RENDER_TIMEOUT_SECONDS
+from .pool import DEFAULT_RENDER_WORKERS
+from .pool import NotebookRenderPool
+from .pool import RenderQueueFull
+from .pool import RenderTimeout
+from .prerender import NotebookPrerenderer
+from .reader import find_output_span
+from .render import RenderOptions
+from .render import get_fragment_hash
+from .render import get_template_static_files
+from .search import DEFAULT_SEARCH_INDEX_PATH
+from .search import NotebookSearchIndex
+from .watcher import NotebookChangeWatcher
+
+
+PROJECT_ROOT = Path.cwd().resolve()
+NOTEBOOK_ROOTS = (
+    PROJECT_ROOT / "notebooks",
+    PROJECT_ROOT / "scratchpad",
+)
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8765
+# Assumption: this server is exposed only on an intranet through Tailscale.
+BASIC_AUTH_USER = "viewer"
+BASIC_AUTH_PASSWORD = "viewer"
+TAILSCALE_IPV4_NETWORK = ipaddress.ip_network("100.64.0.0/10")
+DEFAULT_LAZY_OUTPUT_BYTES = 256 * 1024
+DEFAULT_STREAM_MIN_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_OUTPUT_BYTES = 32 * 1024 * 1024
+RAW_OUTPUT_CHUNK_SIZE = 1024 * 1024
+# Pages pull many /asset/ and /static/ files; reusing connections saves a
+# TCP and TLS-over-Tailscale round trip per request.
+DEFAULT_KEEP_ALIVE_TIMEOUT_SECONDS = 60.0
+DEFAULT_MAX_CONNECTIONS_PER_CLIENT = 32
+# Fragment URLs carry the content hash, so a matching response never changes.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+ASSET_NAME_RE = re.compile(r"(?P<hash>[0-9a-f]{64})\.(?P<extension>png|jpg)")
+ASSET_CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg"}
+STATIC_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*-[0-9a-f]{16}\.(?P<extension>css|js)")
+STATIC_CONTENT_TYPES = {"css": "text/css; charset=utf-8", "js": "text/javascript; charset=utf-8"}
+# Routes counted separately in /metrics; notebook and file paths are not labels.
+METRIC_ROUTES = ("/", "/search", "/stats", "/metrics")
+METRIC_ROUTE_PREFIXES = ("/view/", "/output/", "/asset/", "/static/", "/live/")
+
+
+class NotebookServerError(Exception):
+    """Base class for expected notebook server errors."""
+
+    status = HTTPStatus.BAD_REQUEST
+
+
+class NotFound(NotebookServerError):
+    """Requested notebook was not found."""
+
+    status = HTTPStatus.NOT_FOUND
+
+
+class Forbidden(NotebookServerError):
+    """Requested path is outside the allowed notebook roots."""
+
+    status = HTTPStatus.FORBIDDEN
+
+
+def is_allowed_remote(value: str) -> bool:
+    """Check whether a remote address is allowed to access the server."""
+
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return address.is_loopback or address in TAILSCALE_IPV4_NETWORK
+
+
+def get_available_roots() -> tuple[Path, ...]:
+    """Return notebook roots that exist in this checkout."""
+
+    return tuple(root.resolve() for root in NOTEBOOK_ROOTS if root.exists())
+
+
+def relative_notebook_path(path: Path) -> str:
+    """Return the display path for a notebook under an allowed root."""
+
+    resolved = path.resolve()
+    for root in get_available_roots():
+        if os.path.commonpath((resolved, root)) == str(root):
+            return resolved.relative_to(PROJECT_ROOT).as_posix()
+    raise Forbidden(f"Notebook is outside allowed roots: {path}")
+
+
+def validate_notebook_path(raw_path: str | Path) -> Path:
+    """Validate and resolve a notebook path under the allowed roots."""
+
+    raw = Path(str(raw_path))
+    if raw.is_absolute():
+        raise Forbidden("Absolute notebook paths are not allowed")
+    if ".." in raw.parts:
+        raise Forbidden("Notebook paths may not contain parent-directory traversal")
+    if raw.suffix != ".ipynb":
+        raise Forbidden("Only .ipynb files can be rendered")
+
+    target = (PROJECT_ROOT / raw).resolve()
+    roots = get_available_roots()
+    if not roots:
+        raise NotFound("No notebook roots exist in this checkout")
+    if not any(os.path.commonpath((target, root)) == str(root) for root in roots):
+        raise Forbidden("Notebook path is outside notebooks/ and scratchpad/")
+    if not target.exists() or not target.is_file():
+        raise NotFound(f"Notebook not found: {raw}")
+    return target
+
+
+def list_notebooks() -> list[str]:
+    """List all notebooks under the allowed roots."""
+
+    paths: list[str] = []
+    for root in get_available_roots():
+        for path in root.rglob("*.ipynb"):
+            if ".ipynb_checkpoints" in path.parts:
+                continue
+            paths.append(relative_notebook_path(path))
+    return sorted(paths)
+
+
+def view_path_for(notebook_path: str | Path) -> str:
+    """Return the URL path for a notebook."""
+
+    path = validate_notebook_path(notebook_path)
+    return "/view/" + quote(relative_notebook_path(path), safe="/")
+
+
+def get_public_base_url(port: int, public_base_url: str | None) -> str:
+    """Resolve the externally usable base URL."""
+
+    if public_base_url:
+        return public_base_url.rstrip("/")
+
+    try:
+        completed = subprocess.run(
+            ["tailscale", "status", "--json"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        status = json.loads(completed.stdout)
+        dns_name = status.get("Self", {}).get("DNSName", "").rstrip(".")
+        if dns_name.endswith(".ts.net"):
+            return f"http://{dns_name}:{port}"
+    except Exception:
+        pass
+
+    try:
+        completed = subprocess.run(
+            ["tailscale", "ip", "-4"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        ip = completed.stdout.splitlines()[0].strip()
+        if ip:
+            return f"http://{ip}:{port}"
+    except Exception:
+        pass
+
+    return f"http://127.0.0.1:{port}"
+
+
+def notebook_url_for(notebook_path: str | Path, port: int, public_base_url: str | None) -> str:
+    """Return the absolute URL for a notebook."""
+
+    return get_public_base_url(port, public_base_url) + view_path_for(notebook_path)
+
+
+def make_etag(key: str, gzip_encoded: bool = False) -> str:
+    """Return the strong ETag of a rendered page representation."""
+
+    return f'"{key}-gzip"' if gzip_encoded else f'"{key}"'
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an ``Accept-Encoding`` header allows gzip."""
+
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def is_not_modified(headers: Message, key: str, last_modified: float) -> bool:
+    """Evaluate ``If-None-Match`` and ``If-Modified-Since`` for a rendered page.
+
+    ``If-None-Match`` takes precedence and uses weak comparison, so both the
+    identity and the gzip representation ETags match.
+    """
+
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return bool(candidates & {make_etag(key), make_etag(key, gzip_encoded=True)})
+
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP dates have one-second resolution.
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
+def parse_index_query(query: str) -> dict[str, object]:
+    """Parse index page query parameters into :meth:`NotebookIndex.query` arguments."""
+
+    params = {name: values[-1] for name, values in parse_qs(query).items() if values}
+    sort = params.get("sort", "path")
+    if sort not in INDEX_SORT_KEYS:
+        raise NotebookServerError(f"Unknown sort key: {sort}")
+    status = params.get("status") or None
+    if status not in (None, "error", "ok"):
+        raise NotebookServerError(f"Unknown status filter: {status}")
+    try:
+        limit = int(params["limit"]) if params.get("limit") else None
+    except ValueError:
+        raise NotebookServerError("limit must be an integer") from None
+    return {
+        "sort": sort,
+        "descending": params.get("order", "desc" if sort != "path" else "asc") == "desc",
+        "text": params.get("q") or None,
+        "root": params.get("root") or None,
+        "status": status,
+        "limit": limit,
+    }
+
+
+def get_route_label(request_path: str) -> str:
+    """Return the metrics route of a request path, e.g. ``/view/`` for every notebook page."""
+
+    path = urlparse(request_path).path or "/"
+    if path in METRIC_ROUTES:
+        return path
+    return next((prefix for prefix in METRIC_ROUTE_PREFIXES if path.startswith(prefix)), "other")
+
+
+def parse_flag_query(query: str, name: str) -> bool | None:
+    """Parse an on/off view parameter such as ``lazy=1``; ``None`` when it is not given."""
+
+    values = parse_qs(query).get(name)
+    if not values:
+        return None
+    value = values[-1].lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise NotebookServerError(f"{name} must be 0 or 1, got {values[-1]}")
+
+
+def parse_lazy_query(query: str) -> bool | None:
+    """Parse the ``lazy`` view parameter; ``None`` keeps the server default."""
+
+    return parse_flag_query(query, "lazy")
+
+
+def parse_fast_query(query: str) -> bool | None:
+    """Parse the ``fast`` view parameter; ``None`` keeps the server default."""
+
+    return parse_flag_query(query, "fast")
+
+
+def parse_cells_query(query: str) -> CellSelection | None:
+    """Parse the ``cells`` and ``outputs_only`` view parameters; ``None`` shows the whole notebook.
+
+    ``cells`` is a zero-based inclusive range such as ``120-140``, ``120-``,
+    ``-140`` or a single cell ``120``.
+    """
+
+    params = parse_qs(query)
+    cells = params.get("cells", [""])[-1].strip()
+    outputs_only = parse_flag_query(query, "outputs_only")
+    if not cells and outputs_only is None:
+        return None
+
+    start, stop = 0, None
+    if cells:
+        first, separator, last = cells.partition("-")
+        try:
+            start = int(first) if first else 0
+            stop = (int(last) if last else None) if separator else start
+        except ValueError:
+            raise NotebookServerError(f"cells must be a range such as 120-140, got {cells}") from None
+        if start < 0 or (stop is not None and stop < start):
+            raise NotebookServerError(f"cells must be a range such as 120-140, got {cells}")
+    return CellSelection(start=start, stop=stop, outputs_only=bool(outputs_only))
+
+
+def parse_raw_output_query(query: str) -> tuple[int, int] | None:
+    """Parse the ``raw_output=<cell>/<output>`` download parameter of oversized output placeholders."""
+
+    values = parse_qs(query).get("raw_output")
+    if not values:
+        return None
+    cell_index, _, output_index = values[-1].partition("/")
+    if not cell_index.isdigit() or not output_index.isdigit():
+        raise NotebookServerError(f"raw_output must be <cell>/<output>, got {values[-1]}")
+    return int(cell_index), int(output_index)
+
+
+def parse_live_query(query: str) -> float | None:
+    """Parse the ``since`` parameter of the live event stream, the Unix time of the page's notebook version."""
+
+    values = parse_qs(query).get("since")
+    if not values:
+        return None
+    try:
+        return float(values[-1])
+    except ValueError:
+        raise NotebookServerError(f"since must be a Unix timestamp, got {values[-1]}") from None
+
+
+def parse_search_query(query: str) -> str:
+    """Return the ``q`` search text of a ``/search`` request."""
+
+    values = parse_qs(query).get("q")
+    return values[-1] if values else ""
+
+
+def parse_output_path(raw_path: str) -> tuple[str, str]:
+    """Split an ``/output/`` route path into notebook path and output id."""
+
+    notebook_path, _, output_id = raw_path.rpartition("/")
+    notebook_path, _, cell_index = notebook_path.rpartition("/")
+    if not notebook_path or not cell_index.isdigit() or not output_id.isdigit():
+        raise NotFound("Output path must be /output/<notebook>/<cell>/<output>")
+    return notebook_path, f"{int(cell_index)}/{int(output_id)}"
+
+
+def format_size(size: int) -> str:
+    """Format a file size for the index page."""
+
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+#: Sort key and heading of the index table columns; ``None`` for columns that cannot be sorted.
+INDEX_TABLE_COLUMNS = (("path", "Notebook"), ("modified", "Modified"), ("size", "Size"), ("cells", "Code cells"), ("executed", "Executed"), (None, "Status"))
+
+
+def format_index_table(
+    entries: Iterable[NotebookIndexEntry],
+    get_url: Callable[[NotebookIndexEntry], str],
+    format_heading: Callable[[str, str], str] | None = None,
+) -> str:
+    """Format the notebook table of the index page and the exported index.
+
+    :param get_url:
+        URL of a notebook's page.
+    :param format_heading:
+        Heading of a sortable column from its sort key and label, e.g. a
+        sort link. Plain labels by default.
+    """
+
+    headings = "".join(f"<th>{format_heading(key, label) if key and format_heading else label}</th>" for key, label in INDEX_TABLE_COLUMNS)
+    rows = [f"<tr>{headings}</tr>"]
+    for entry in entries:
+        executed = entry.executed_at.strftime("%Y-%m-%d %H:%M") if entry.executed_at else ""
+        status = "unreadable" if not entry.readable else (f"{entry.error_count} error(s)" if entry.has_errors else "ok")
+        rows.append(
+            "<tr>"
+            f'<td><a href="{html.escape(get_url(entry), quote=True)}">{html.escape(entry.path)}</a></td>'
+            f"<td>{entry.modified_at.strftime('%Y-%m-%d %H:%M')}</td>"
+            f'<td class="number">{format_size(entry.size)}</td>'
+            f'<td class="number">{entry.code_cells}</td>'
+            f"<td>{executed}</td>"
+            f'<td class="status-{"error" if entry.has_errors else "ok"}">{status}</td>'
+            "</tr>"
+        )
+    body = "\n    ".join(rows)
+    return f"""<table>
+    {body}
+  </table>"""
+
+
+def format_index_page(content: str) -> str:
+    """Wrap the content of an index page in its head, style and heading."""
+
+    return f"""<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Notebook viewer</title>
+  <style>
+    body {{ font-family: sans-serif; margin: 2rem; line-height: 1.4; }}
+    table {{ border-collapse: collapse; }}
+    th, td {{ padding: 0.2rem 0.6rem; text-align: left; }}
+    .number {{ text-align: right; }}
+    .status-error {{ color: #b00; }}
+  </style>
+</head>
+<body>
+  <h1>Notebook viewer</h1>
+  {content}
+</body>
+</html>
+"""
+
+
+def render_index(index: NotebookIndex | None = None, query: dict[str, object] | None = None, search: bool = False) -> str:
+    """Render the notebook index page.
+
+    Rendering costs only the listed entries; the filesystem is walked only
+    when no maintained index is given.
+
+    :param search:
+        Show the full-text search form.
+    """
+
+    if index is None:
+        index = NotebookIndex(PROJECT_ROOT, get_available_roots())
+        index.scan()
+    query = query or {"sort": "path", "descending": False}
+    entries = index.query(**query)
+
+    def sort_link(key: str, label: str) -> str:
+        descending = not (query.get("sort") == key and query.get("descending"))
+        params = {name: value for name, value in (("q", query.get("text")), ("root", query.get("root")), ("status", query.get("status"))) if value}
+        params.update(sort=key, order="desc" if descending else "asc")
+        return f'<a href="/?{html.escape(urlencode(params))}">{label}</a>'
+
+    def option(value: str, selected: object) -> str:
+        return f'<option value="{value}"{" selected" if value == (selected or "") else ""}>{value or "all"}</option>'
+
+    roots = sorted({root.name for root in get_available_roots()})
+    scanning = "" if index.ready else "<p><em>Indexing notebooks, the list is still incomplete.</em></p>"
+    search_form = (
+        '<form method="get" action="/search">'
+        '<input type="search" name="q" placeholder="Search sources and outputs"> '
+        '<button type="submit">Search</button>'
+        "</form>"
+    ) if search else ""
+    table = format_index_table(entries, lambda entry: "/view/" + quote(entry.path, safe="/"), sort_link)
+    return format_index_page(f"""<p>Static saved outputs from notebooks/ and scratchpad/.</p>
+  {search_form}
+  <form method="get" action="/">
+    <input type="search" name="q" value="{html.escape(str(query.get("text") or ""), quote=True)}" placeholder="Filter by path">
+    <select name="root">{"".join(option(value, query.get("root")) for value in ["", *roots])}</select>
+    <select name="status">{"".join(option(value, query.get("status")) for value in ("", "ok", "error"))}</select>
+    <input type="hidden" name="sort" value="{html.escape(str(query.get("sort", "path")), quote=True)}">
+    <button type="submit">Filter</button>
+  </form>
+  {scanning}
+  <p>{len(entries)} of {len(index)} notebooks</p>
+  {table}""")
+
+
+def render_search(index: NotebookSearchIndex, text: str) -> str:
+    """Render the full-text search results page."""
+
+    results = index.search(text) if text.strip() else []
+    items = []
+    for result in results:
+        label = "output of cell" if result.kind == "output" else f"{result.kind} cell"
+        items.append(
+            "<li>"
+            f'<a href="{html.escape(result.url, quote=True)}">{html.escape(result.path)}</a>'
+            f' <span class="kind">{label} {result.cell_index}</span>'
+            f"<pre>{result.snippet}</pre>"
+            "</li>"
+        )
+    if not text.strip():
+        summary = ""
+    elif results:
+        summary = f"<p>{len(results)} matching cells</p>"
+    else:
+        summary = "<p>No matches.</p>"
+    scanning = "" if index.ready else "<p><em>Indexing notebooks, results are still incomplete.</em></p>"
+    body = "\n    ".join(items)
+    return f"""<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Search notebooks</title>
+  <style>
+    body {{ font-family: sans-serif; margin: 2rem; line-height: 1.4; }}
+    li {{ margin-bottom: 1rem; }}
+    pre {{ white-space: pre-wrap; margin: 0.25rem 0; padding: 0.4rem; background: #f6f6f6; }}
+    .kind {{ color: #666; font-size: 0.85rem; }}
+  </style>
+</head>
+<body>
+  <h1>Search notebooks</h1>
+  <p><a href="/">All notebooks</a></p>
+  <form method="get" action="/search">
+    <input type="search" name="q" value="{html.escape(text, quote=True)}" placeholder="Search sources and outputs" autofocus>
+    <button type="submit">Search</button>
+  </form>
+  {scanning}
+  {summary}
+  <ol>
+    {body}
+  </ol>
+</body>
+</html>
+"""
+
+
+class _CountingWriter:
+    """Response stream that counts the bytes written through it."""
+
+    def __init__(self, stream: object) -> None:
+        self.stream = stream
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        return self.stream.write(data)
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self.stream, name)
+
+
+class NotebookRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for static notebook rendering.
+
+    Connections are persistent: every response is framed by
+    ``Content-Length`` or chunked encoding, and a connection waits up to
+    ``server.keep_alive_timeout`` seconds for its next request.
+
+    Every request is counted in ``server.metrics`` with its route, status,
+    latency and response bytes, see :mod:`.metrics`.
+    """
+
+    server_version = "NotebookStaticServer/0.1"
+    # HTTP/1.1 for persistent connections and chunked transfer encoding of streamed pages.
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle the body of a reused
+    # connection waits for the client's delayed ACK, about 40 ms per request.
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        self.wfile = _CountingWriter(self.wfile)
+
+    def handle_one_request(self) -> None:
+        # Idle persistent connections are closed quietly instead of logging a timed out request.
+        self.connection.settimeout(self.server.keep_alive_timeout)
+        try:
+            self.rfile.peek(1)
+        except TimeoutError:
+            self.close_connection = True
+            return
+
+        self.path = ""
+        self.response_status: int | None = None
+        self.wfile.bytes_written = 0
+        started = time.perf_counter()
+        self.server.metrics.request_started()
+        try:
+            super().handle_one_request()
+        finally:
+            self.server.metrics.request_finished(get_route_label(self.path), self.response_status, time.perf_counter() - started, self.wfile.bytes_written)
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self.response_status = int(code)
+        super().send_response(code, message)
+
+    def parse_request(self) -> bool:
+        if not super().parse_request():
+            return False
+        # The idle timeout must not cut off slow downloads of large pages.
+        self.connection.settimeout(None)
+        content_length = (self.headers.get("Content-Length") or "0").strip()
+        if not (content_length.isascii() and content_length.isdigit()):
+            # The end of the request is unknown, so the connection cannot be reused.
+            self.close_connection = True
+            self.send_error(HTTPStatus.BAD_REQUEST, "Bad Content-Length header")
+            return False
+        if int(content_length) or self.headers.get("Transfer-Encoding"):
+            # Request bodies are never read, so they would be parsed as the next request.
+            self.close_connection = True
+        return True
+
+    def do_HEAD(self) -> None:
+        self.handle_request(send_body=False)
+
+    def do_GET(self) -> None:
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body: bool) -> None:
+        if not self.server.allow_non_tailnet and not is_allowed_remote(self.client_address[0]):
+            self.send_error(HTTPStatus.FORBIDDEN, "Remote address is not loopback or Tailscale")
+            return
+        if not self.is_authorised():
+            self.request_auth()
+            return
+
+        parsed = urlparse(self.path)
+        try:
+            if parsed.path in ("", "/"):
+                page = render_index(self.server.notebook_index, parse_index_query(parsed.query), search=self.server.search_index is not None)
+                self.send_html(page, send_body=send_body)
+                return
+            if parsed.path == "/search":
+                if self.server.search_index is None:
+                    raise NotFound("Search is disabled")
+                self.send_html(render_search(self.server.search_index, parse_search_query(parsed.query)), send_body=send_body)
+                return
+            if parsed.path.startswith("/view/"):
+                relative_path = unquote(parsed.path[len("/view/") :])
+                notebook_path = validate_notebook_path(relative_path)
+                raw_output = parse_raw_output_query(parsed.query)
+                if raw_output is not None:
+                    self.send_raw_output(notebook_path, *raw_output, send_body=send_body)
+                    return
+                options = self.server.get_render_options(lazy=parse_lazy_query(parsed.query), fast=parse_fast_query(parsed.query))
+                selection = parse_cells_query(parsed.query)
+                if selection is not None:
+                    self.send_partial_notebook(notebook_path, selection, options, send_body=send_body)
+                    return
+                self.send_notebook(notebook_path, options, send_body=send_body)
+                return
+            if parsed.path.startswith("/output/"):
+                relative_path, output_id = parse_output_path(unquote(parsed.path[len("/output/") :]))
+                notebook_path = validate_notebook_path(relative_path)
+                expected_hash = parse_qs(parsed.query).get("h", [None])[-1]
+                self.send_output(notebook_path, output_id, expected_hash, send_body=send_body)
+                return
+            if parsed.path.startswith("/asset/"):
+                self.send_asset(parsed.path[len("/asset/") :], send_body=send_body)
+                return
+            if parsed.path.startswith("/static/"):
+                self.send_static(parsed.path[len("/static/") :], send_body=send_body)
+                return
+            if parsed.path.startswith("/live/"):
+                notebook_path = validate_notebook_path(unquote(parsed.path[len("/live/") :]))
+                self.send_live_events(notebook_path, parse_live_query(parsed.query), send_body=send_body)
+                return
+            if parsed.path == "/stats":
+                self.send_json(self.server.get_stats(), send_body=send_body)
+                return
+            if parsed.path == "/metrics":
+                self.send_metrics(send_body=send_body)
+                return
+            self.send_text_error(HTTPStatus.NOT_FOUND, "Route not found", send_body=send_body)
+        except NotebookServerError as exc:
+            self.send_text_error(exc.status, str(exc), send_body=send_body)
+        except RenderQueueFull as exc:
+            self.send_text_error(HTTPStatus.SERVICE_UNAVAILABLE, str(exc), send_body=send_body, headers={"Retry-After": str(exc.retry_after)})
+        except RenderTimeout as exc:
+            self.send_text_error(HTTPStatus.GATEWAY_TIMEOUT, str(exc), send_body=send_body)
+        except Exception as exc:
+            self.send_text_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc), send_body=send_body)
+
+    def send_notebook(self, notebook_path: Path, options: RenderOptions, send_body: bool) -> None:
+        """Send a rendered notebook, honouring conditional and gzip requests.
+
+        The ETag is derived from the render cache key, which only depends on
+        the notebook file stat, so revalidations answer 304 without rendering.
+        GET and HEAD share this path; HEAD renders (once, into the cache) only
+        to report the right Content-Length.
+        """
+
+        key = get_render_cache_key(notebook_path, options)
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        etag = make_etag(key, gzip_encoded=use_gzip)
+        last_modified = notebook_path.stat().st_mtime
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if is_not_modified(self.headers, key, last_modified):
+            self.send_not_modified(headers)
+            return
+
+        page = self.server.render_cache.lookup(notebook_path, options)
+        if page is None and notebook_path.stat().st_size >= self.server.stream_min_bytes:
+            self.send_notebook_stream(notebook_path, options, headers, use_gzip, send_body=send_body)
+            return
+        if page is None:
+            page = self.server.render_cache.get(notebook_path, options)
+        body = page.body
+        if page.key != key:
+            # The notebook was saved between the stat and the render.
+            headers["ETag"] = make_etag(page.key, gzip_encoded=use_gzip)
+            headers["Last-Modified"] = formatdate(page.source_mtime, usegmt=True)
+        if use_gzip:
+            body = self.server.render_cache.get_gzip_body(page)
+            headers["Content-Encoding"] = "gzip"
+        headers["X-Render-Cache"] = page.cache_status
+        headers["Server-Timing"] = f"render;dur={page.render_seconds * 1000:.1f}"
+        self.send_html(body, send_body=send_body, headers=headers)
+
+    def send_partial_notebook(self, notebook_path: Path, selection: CellSelection, options: RenderOptions, send_body: bool) -> None:
+        """Send a page with only the selected cells, rendered from the per-cell cache.
+
+        Renders run in the render pool when there is one, like whole pages.
+
+        Conditional requests work as for whole pages; the ETag adds the
+        selection to the render cache key.
+        """
+
+        stop = "end" if selection.stop is None else selection.stop
+        key = f"{get_render_cache_key(notebook_path, options)}-cells-{selection.start}-{stop}" + ("-outputs" if selection.outputs_only else "")
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        last_modified = notebook_path.stat().st_mtime
+        headers = {
+            "ETag": make_etag(key, gzip_encoded=use_gzip),
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if is_not_modified(self.headers, key, last_modified):
+            self.send_not_modified(headers)
+            return
+
+        full_page_url = "/view/" + quote(relative_notebook_path(notebook_path), safe="/")
+        started = time.perf_counter()
+        body = render_partial_page(notebook_path, selection, options, self.server.cell_cache, full_page_url, self.server.render_pool).encode("utf-8")
+        self.server.metrics.partial_render_seconds.observe(time.perf_counter() - started)
+        if use_gzip:
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        self.send_html(body, send_body=send_body, headers=headers)
+
+    def send_notebook_stream(
+        self,
+        notebook_path: Path,
+        options: RenderOptions,
+        headers: dict[str, str],
+        use_gzip: bool,
+        send_body: bool,
+    ) -> None:
+        """Render a large uncached notebook straight to the client with chunked encoding.
+
+        Only one chunk of cells is held in memory at a time. The page head is
+        rendered before the headers are sent, so unreadable notebooks still get
+        an error status. Later errors cannot be reported; the connection is
+        closed without the final chunk and the client sees a truncated response.
+        """
+
+        chunks = self.server.render_cache.stream(notebook_path, options) if send_body else iter(())
+        first_chunk = next(chunks, b"")
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("X-Render-Cache", "stream")
+        self.end_headers()
+        if not send_body:
+            return
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        try:
+            for chunk in itertools.chain([first_chunk], chunks):
+                self.write_chunk(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                self.write_chunk(compressor.flush())
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as exc:
+            self.close_connection = True
+            self.log_error("Streaming %s failed: %s", notebook_path, exc)
+        finally:
+            chunks.close()
+
+    def write_chunk(self, data: bytes) -> None:
+        """Write one chunk of a chunked response; empty data is skipped as it would end the body."""
+
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def send_output(self, notebook_path: Path, output_id: str, expected_hash: str | None, send_body: bool) -> None:
+        """Send a lazily loaded output fragment from the lazy render of a notebook.
+
+        Requests whose ``h`` parameter matches the fragment hash are cacheable
+        forever; anything else, e.g. a page older than the notebook, is
+        revalidated.
+        """
+
+        page = self.server.render_cache.get(notebook_path, self.server.get_render_options(lazy=True, fast=False))
+        fragment = page.fragments.get(output_id)
+        if fragment is None:
+            raise NotFound(f"Output not found: {output_id}")
+        fragment_hash = get_fragment_hash(fragment)
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": make_etag(fragment_hash, gzip_encoded=use_gzip),
+            "Last-Modified": formatdate(page.source_mtime, usegmt=True),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if expected_hash == fragment_hash else "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if is_not_modified(self.headers, fragment_hash, page.source_mtime):
+            self.send_not_modified(headers)
+            return
+
+        body = fragment
+        if use_gzip:
+            body = gzip.compress(fragment, compresslevel=6, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        headers["X-Render-Cache"] = page.cache_status
+        self.send_html(body, send_body=send_body, headers=headers)
+
+    def send_raw_output(self, notebook_path: Path, cell_index: int, output_index: int, send_body: bool) -> None:
+        """Send the JSON of one output as a download, copied from the notebook file in chunks.
+
+        Pages link here for outputs above ``max_output_bytes``, which are
+        never parsed; see :func:`~.reader.read_notebook`.
+        """
+
+        try:
+            start, size = find_output_span(notebook_path, cell_index, output_index)
+        except KeyError as exc:
+            raise NotFound(str(exc.args[0])) from None
+        # Notebook names may hold characters that are not valid in a header.
+        filename = re.sub(r"[^A-Za-z0-9._-]", "_", f"{notebook_path.stem}-cell{cell_index}-output{output_index}.json")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(size))
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("Cache-Control", "private, no-cache")
+        self.end_headers()
+        if not send_body:
+            return
+        with notebook_path.open("rb") as handle:
+            handle.seek(start)
+            while size:
+                chunk = handle.read(min(size, RAW_OUTPUT_CHUNK_SIZE))
+                if not chunk:
+                    # The notebook was truncated while sending; the response cannot be completed.
+                    self.close_connection = True
+                    return
+                self.wfile.write(chunk)
+                size -= len(chunk)
+
+    def send_asset(self, name: str, send_body: bool) -> None:
+        """Send an image extracted from a rendered page.
+
+        Asset names are content hashes, so responses are cacheable forever.
+        """
+
+        match = ASSET_NAME_RE.fullmatch(name)
+        if not match:
+            raise NotFound("Asset path must be /asset/<sha256>.png or /asset/<sha256>.jpg")
+        headers = {
+            "ETag": make_etag(match["hash"]),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        }
+        # The content never changes, so any If-Modified-Since date is current.
+        if is_not_modified(self.headers, match["hash"], 0):
+            self.send_not_modified(headers)
+            return
+
+        body = self.server.render_cache.get_asset(name)
+        if body is None:
+            raise NotFound(f"Asset not found: {name}")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ASSET_CONTENT_TYPES[match["extension"]])
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_static(self, name: str, send_body: bool) -> None:
+        """Send a stylesheet or script shared between pages.
+
+        Names carry a content hash, so responses are cacheable forever.
+        Template stylesheets come from nbconvert, plotly.js bundles from the
+        render cache.
+        """
+
+        match = STATIC_NAME_RE.fullmatch(name)
+        if not match:
+            raise NotFound("Static path must be /static/<name>-<hash>.css or .js")
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": make_etag(name, gzip_encoded=use_gzip),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        # The content never changes, so any If-Modified-Since date is current.
+        if is_not_modified(self.headers, name, 0):
+            self.send_not_modified(headers)
+            return
+
+        body = get_template_static_files(self.server.render_options).get(name) or self.server.render_cache.get_asset(name)
+        if body is None:
+            raise NotFound(f"Static file not found: {name}")
+        if use_gzip:
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", STATIC_CONTENT_TYPES[match["extension"]])
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_live_events(self, notebook_path: Path, since: float | None, send_body: bool) -> None:
+        """Stream per-cell updates of a running notebook as server-sent events.
+
+        The response has no length and ends the connection when the run
+        completes or the client goes away.
+        """
+
+        if self.server.live_channel_dir is None:
+            raise NotFound("Live view is disabled")
+        view = LiveNotebookView(
+            notebook_path,
+            self.server.get_render_options(lazy=False, fast=False),
+            channel_dir=self.server.live_channel_dir,
+            since=since,
+            last_event_id=self.headers.get("Last-Event-ID"),
+            cell_cache=self.server.cell_cache,
+            render_pool=self.server.render_pool,
+        )
+        self.close_connection = True
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if not send_body:
+            return
+        messages = iter(view)
+        try:
+            for message in messages:
+                self.wfile.write(message.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            messages.close()
+
+    def is_authorised(self) -> bool:
+        """Check HTTP Basic Auth credentials."""
+
+        header = self.headers.get("Authorization", "")
+        prefix = "Basic "
+        if not header.startswith(prefix):
+            return False
+        try:
+            decoded = base64.b64decode(header[len(prefix) :], validate=True).decode("utf-8")
+        except Exception:
+            return False
+        username, separator, password = decoded.partition(":")
+        if not separator:
+            return False
+        return hmac.compare_digest(username, BASIC_AUTH_USER) and hmac.compare_digest(password, BASIC_AUTH_PASSWORD)
+
+    def request_auth(self) -> None:
+        """Request HTTP Basic Auth credentials."""
+
+        self.send_response(HTTPStatus.UNAUTHORIZED)
+        self.send_header("WWW-Authenticate", 'Basic realm="Notebook viewer"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_not_modified(self, headers: dict[str, str]) -> None:
+        """Send a bodyless 304 response with the validators and caching headers of the representation."""
+
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def send_html(self, body: str | bytes, send_body: bool, headers: dict[str, str] | None = None) -> None:
+        """Send an HTML response."""
+
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(payload)
+
+    def send_json(self, document: object, send_body: bool) -> None:
+        """Send a JSON response."""
+
+        payload = json.dumps(document, indent=2).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(payload)
+
+    def send_metrics(self, send_body: bool) -> None:
+        """Send the metrics page in the Prometheus text format."""
+
+        payload = self.server.get_metrics().encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(payload)
+
+    def send_text_error(self, status: HTTPStatus, message: str, send_body: bool, headers: dict[str, str] | None = None) -> None:
+        """Send an error without putting request-derived text in headers."""
+
+        clean_message = "".join(char if char >= " " and char != "\x7f" else " " for char in message)
+        payload = clean_message.encode("utf-8", errors="replace")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(payload)
+
+
+class NotebookHTTPServer(ThreadingHTTPServer):
+    """HTTP server with notebook-specific configuration.
+
+    Each connection gets a thread for as long as it stays open, so clients
+    are limited to ``max_connections_per_client`` concurrent connections;
+    further connections get 503 straight away.
+    """
+
+    allow_non_tailnet: bool
+    render_cache: NotebookRenderCache
+    cell_cache: NotebookCellCache
+    render_options: RenderOptions
+    lazy_output_bytes: int = DEFAULT_LAZY_OUTPUT_BYTES
+    stream_min_bytes: int = DEFAULT_STREAM_MIN_BYTES
+    notebook_index: NotebookIndex | None = None
+    prerenderer: NotebookPrerenderer | None = None
+    render_pool: NotebookRenderPool | None = None
+    live_channel_dir: Path | None = None
+    search_index: NotebookSearchIndex | None = None
+    keep_alive_timeout: float = DEFAULT_KEEP_ALIVE_TIMEOUT_SECONDS
+    max_connections_per_client: int = DEFAULT_MAX_CONNECTIONS_PER_CLIENT
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = ServerMetrics()
+        self._connections: dict[str, int] = {}
+        self._connection_hosts: dict[object, str] = {}
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address) -> None:
+        host = client_address[0]
+        with self._connections_lock:
+            if self._connections.get(host, 0) >= self.max_connections_per_client:
+                host = None
+            else:
+                self._connections[host] = self._connections.get(host, 0) + 1
+                self._connection_hosts[request] = host
+        if host is None:
+            try:
+                self.metrics.connection_rejected()
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request) -> None:
+        super().shutdown_request(request)
+        with self._connections_lock:
+            host = self._connection_hosts.pop(request, None)
+            if host is not None:
+                self._connections[host] -= 1
+                if not self._connections[host]:
+                    del self._connections[host]
+
+    def get_render_options(self, lazy: bool | None = None, fast: bool | None = None) -> RenderOptions:
+        """Return the render options for a view, with lazy outputs and the fast renderer forced on or off."""
+
+        options = self.render_options
+        if lazy is not None:
+            options = replace(options, lazy_output_bytes=self.lazy_output_bytes if lazy else 0)
+        if fast is not None:
+            options = replace(options, fast=fast)
+        if options.fast:
+            # Fast pages have neither, so keep them out of the cache key.
+            options = replace(options, lazy_output_bytes=0, live_view=False)
+        return options
+
+    def get_stats(self) -> dict[str, object]:
+        """Return render cache, cell cache, render pool and pre-render statistics."""
+
+        stats: dict[str, object] = {"render_cache": self.render_cache.get_stats(), "cell_cache": self.cell_cache.get_stats()}
+        if self.render_pool is not None:
+            stats["render_pool"] = self.render_pool.get_stats()
+        if self.prerenderer is not None:
+            stats["prerender"] = self.prerenderer.get_stats()
+        return stats
+
+    def get_metrics(self) -> str:
+        """Return the ``/metrics`` page: request metrics plus cache, pool and thread gauges."""
+
+        render_cache = self.render_cache.get_stats()
+        cell_cache = self.cell_cache.get_stats()
+        cell_lookups = cell_cache["hits"] + cell_cache["misses"]
+        with self._connections_lock:
+            open_connections = sum(self._connections.values())
+        families = [
+            MetricFamily(
+                "notebook_server_render_cache_lookups_total",
+                "counter",
+                "Render cache lookups by result.",
+                tuple(
+                    (labels(result=result), render_cache[counter])
+                    for result, counter in (("memory", "memory_hits"), ("disk", "disk_hits"), ("miss", "misses"), ("coalesced", "coalesced"))
+                ),
+            ),
+            MetricFamily("notebook_server_render_cache_hit_ratio", "gauge", "Share of render cache lookups served from memory or disk.", (((), render_cache["hit_ratio"]),)),
+            MetricFamily("notebook_server_render_cache_bytes", "gauge", "Rendered pages held in memory.", (((), render_cache["memory_bytes"]),)),
+            MetricFamily("notebook_server_render_errors_total", "counter", "Renders that failed.", (((), render_cache["render_errors"]),)),
+            MetricFamily("notebook_server_cell_cache_hit_ratio", "gauge", "Share of cell cache lookups that hit.", (((), cell_cache["hits"] / cell_lookups if cell_lookups else None),)),
+            MetricFamily("notebook_server_cell_cache_bytes", "gauge", "Rendered cells and parsed notebooks held in memory.", (((), cell_cache["bytes"]),)),
+            MetricFamily("notebook_server_threads", "gauge", "Live threads, one per open connection plus workers.", (((), threading.active_count()),)),
+            MetricFamily("notebook_server_open_connections", "gauge", "Client connections being served.", (((), open_connections),)),
+        ]
+        if self.render_pool is not None:
+            render_pool = self.render_pool.get_stats()
+            families += [
+                MetricFamily("notebook_server_render_queue_depth", "gauge", "Renders waiting for a busy worker.", (((), render_pool["queue_depth"]),)),
+                MetricFamily("notebook_server_render_workers_busy", "gauge", "Render workers rendering.", (((), render_pool["busy_workers"]),)),
+                MetricFamily("notebook_server_render_workers", "gauge", "Render worker processes.", (((), render_pool["workers"]),)),
+            ]
+        if self.prerenderer is not None:
+            families.append(MetricFamily("notebook_server_prerender_in_flight", "gauge", "Notebooks being pre-rendered.", (((), self.prerenderer.get_stats()["in_flight"]),)))
+        return self.metrics.format(families, {"page": self.render_cache.render_latency})
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Serve saved Jupyter notebook outputs as static HTML.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Host to bind to. Defaults to 0.0.0.0.")
+    parser.add_argument("--port", default=DEFAULT_PORT, type=int, help="Port to listen on.")
+    parser.add_argument("--allow-non-tailnet", action="store_true", help="Allow clients outside loopback and Tailscale.")
+    parser.add_argument("--public-base-url", help="Public base URL used by --url-for.")
+    parser.add_argument("--url-for", help="Print the viewer URL for a notebook and exit.")
+    parser.add_argument("--cache-size", default=256, type=int, help="In-memory rendered-page cache size in MiB. Defaults to 256.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, type=Path, help=f"On-disk rendered-page cache. Defaults to {DEFAULT_CACHE_DIR}.")
+    parser.add_argument("--cell-cache-size", default=DEFAULT_CELL_CACHE_BYTES // 1024 // 1024, type=int, help=f"In-memory cache in MiB of the notebooks and cells rendered for ?cells=, ?outputs_only= and live views, kept by the server and by each render worker. Defaults to {DEFAULT_CELL_CACHE_BYTES // 1024 // 1024}.")
+    parser.add_argument("--no-disk-cache", action="store_true", help="Keep rendered pages in memory only.")
+    parser.add_argument("--render-workers", default=DEFAULT_RENDER_WORKERS, type=int, help=f"Processes rendering notebooks for requests. 0 renders in the request threads. Defaults to {DEFAULT_RENDER_WORKERS}.")
+    parser.add_argument("--render-timeout", default=DEFAULT_RENDER_TIMEOUT_SECONDS, type=float, help=f"Seconds after which a render or pre-render is killed. Defaults to {DEFAULT_RENDER_TIMEOUT_SECONDS:.0f}.")
+    parser.add_argument("--render-queue", default=DEFAULT_RENDER_QUEUE, type=int, help=f"Renders that may wait for a busy worker before requests get 503. Defaults to {DEFAULT_RENDER_QUEUE}.")
+    parser.add_argument("--render-memory-limit", default=DEFAULT_RENDER_MEMORY_BYTES // 1024 // 1024, type=int, help=f"Address space limit of a render or pre-render process in MiB. 0 disables. Defaults to {DEFAULT_RENDER_MEMORY_BYTES // 1024 // 1024}.")
+    parser.add_argument("--prerender-workers", default=1, type=int, help="Processes re-rendering changed notebooks in the background. 0 disables. Defaults to 1.")
+    parser.add_argument("--prerender-nice", default=10, type=int, help="CPU niceness added to pre-render processes. Defaults to 10.")
+    parser.add_argument("--prerender-debounce", default=2.0, type=float, help="Seconds a notebook must stay unchanged before it is re-indexed and pre-rendered. Defaults to 2.")
+    parser.add_argument("--lazy-outputs", action="store_true", help="Load outputs above --lazy-output-threshold when scrolled into view. Views can override with ?lazy=0 or ?lazy=1.")
+    parser.add_argument("--lazy-output-threshold", default=DEFAULT_LAZY_OUTPUT_BYTES // 1024, type=int, help="Output size in KB above which outputs load lazily. Defaults to 256.")
+    parser.add_argument("--max-output-size", default=DEFAULT_MAX_OUTPUT_BYTES // 1024 // 1024, type=int, help=f"Outputs larger than this many MiB are not rendered and can be downloaded from the page instead. 0 renders every output. Defaults to {DEFAULT_MAX_OUTPUT_BYTES // 1024 // 1024}.")
+    parser.add_argument("--fast", action="store_true", help="Render pages with the lightweight preview renderer instead of nbconvert. Views can override with ?fast=0 or ?fast=1.")
+    parser.add_argument("--fast-highlight-url", default="", help="highlight.js script URL that fast pages load to highlight code in the browser. Defaults to no highlighting.")
+    parser.add_argument("--extract-images", action="store_true", help="Serve PNG and JPEG outputs from cacheable /asset/ URLs instead of inlining them in pages.")
+    parser.add_argument("--self-contained", action="store_true", help="Inline nbconvert stylesheets and plotly.js in every page instead of linking them from /static/.")
+    parser.add_argument("--stream-threshold", default=DEFAULT_STREAM_MIN_BYTES / 1024 / 1024, type=float, help="Notebook file size in MiB from which uncached pages are streamed with chunked encoding. Defaults to 2.")
+    parser.add_argument("--keep-alive-timeout", default=DEFAULT_KEEP_ALIVE_TIMEOUT_SECONDS, type=float, help=f"Seconds an idle persistent connection is kept open. Defaults to {DEFAULT_KEEP_ALIVE_TIMEOUT_SECONDS:.0f}.")
+    parser.add_argument("--max-client-connections", default=DEFAULT_MAX_CONNECTIONS_PER_CLIENT, type=int, help=f"Concurrent connections per client address; more get 503. Defaults to {DEFAULT_MAX_CONNECTIONS_PER_CLIENT}.")
+    parser.add_argument("--watch-polling", action="store_true", help="Poll for notebook changes instead of using inotify.")
+    parser.add_argument("--search-index", default=DEFAULT_SEARCH_INDEX_PATH, type=Path, help=f"SQLite full-text search index. Defaults to {DEFAULT_SEARCH_INDEX_PATH}.")
+    parser.add_argument("--no-search", action="store_true", help="Do not index notebooks for /search.")
+    parser.add_argument("--no-live-view", dest="live_view", action="store_false", help="Do not push cell updates of notebooks run by jupyter-execute-agent to open pages.")
+    parser.add_argument("--live-channel-dir", default=DEFAULT_LIVE_CHANNEL_DIR, type=Path, help=f"Live channel directory of jupyter-execute-agent. Defaults to {DEFAULT_LIVE_CHANNEL_DIR}.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the notebook server, or the ``export`` subcommand."""
+
+    if sys.argv[1:2] == ["export"]:
+        # Imported here because the export module builds on this one.
+        from .export import export_main
+
+        return export_main(sys.argv[2:])
+
+    args = parse_args()
+
+    if args.url_for:
+        try:
+            print(notebook_url_for(args.url_for, args.port, args.public_base_url))
+            return 0
+        except NotebookServerError as exc:
+            print(str(exc), file=sys.stderr)
+            return 2
+
+    server = NotebookHTTPServer((args.host, args.port), NotebookRequestHandler)
+    server.allow_non_tailnet = args.allow_non_tailnet
+    server.keep_alive_timeout = args.keep_alive_timeout
+    server.max_connections_per_client = args.max_client_connections
+    server.render_cache = NotebookRenderCache(
+        max_memory_bytes=args.cache_size * 1024 * 1024,
+        cache_dir=None if args.no_disk_cache else args.cache_dir,
+    )
+    server.cell_cache = NotebookCellCache(max_bytes=args.cell_cache_size * 1024 * 1024)
+    if args.render_workers > 0:
+        server.render_pool = NotebookRenderPool(
+            workers=args.render_workers,
+            timeout_seconds=args.render_timeout,
+            max_queue=args.render_queue,
+            memory_limit_bytes=args.render_memory_limit * 1024 * 1024 or None,
+        )
+        server.render_cache.renderer = server.render_pool.render
+        server.render_cache.streamer = server.render_pool.stream
+    server.lazy_output_bytes = args.lazy_output_threshold * 1024
+    server.stream_min_bytes = int(args.stream_threshold * 1024 * 1024)
+    server.render_options = RenderOptions(
+        lazy_output_bytes=server.lazy_output_bytes if args.lazy_outputs else 0,
+        live_view=args.live_view,
+        extract_images=args.extract_images,
+        shared_static=not args.self_contained,
+        max_output_bytes=args.max_output_size * 1024 * 1024,
+        fast=args.fast,
+        fast_highlight_url=args.fast_highlight_url,
+    )
+    server.live_channel_dir = args.live_channel_dir if args.live_view else None
+    server.notebook_index = NotebookIndex(PROJECT_ROOT, get_available_roots())
+    server.notebook_index.start_scan()
+    if not args.no_search:
+        server.search_index = NotebookSearchIndex(args.search_index, PROJECT_ROOT, get_available_roots())
+        server.search_index.start_scan()
+    if args.prerender_workers > 0:
+        server.prerenderer = NotebookPrerenderer(
+            server.render_cache,
+            server.render_options,
+            workers=args.prerender_workers,
+            niceness=args.prerender_nice,
+            timeout_seconds=args.render_timeout,
+            memory_limit_bytes=args.render_memory_limit * 1024 * 1024 or None,
+        )
+
+    def on_notebook_changed(notebook_path: Path) -> None:
+        server.notebook_index.update(notebook_path)
+        if server.search_index is not None:
+            server.search_index.update(notebook_path)
+        if server.prerenderer is None or not notebook_path.exists():
+            return
+        # Open pages get per-cell updates during a run; render once it has finished.
+        if server.live_channel_dir is not None and is_notebook_running(notebook_path, server.live_channel_dir):
+            return
+        server.prerenderer.submit(notebook_path)
+
+    watcher = NotebookChangeWatcher(
+        get_available_roots(),
+        on_notebook_changed,
+        debounce_seconds=args.prerender_debounce,
+        use_inotify=not args.watch_polling,
+    )
+    watcher.start()
+
+    print(f"Serving notebook viewer on http://{args.host}:{args.port}/")
+    print("Allowed roots:")
+    for root in get_available_roots():
+        print(f"- {root}")
+    print(f"Render cache: {args.cache_size} MiB in memory, disk: {'off' if args.no_disk_cache else args.cache_dir}")
+    print(f"Render workers: {args.render_workers}, timeout {args.render_timeout:.0f}s, queue {args.render_queue}")
+    print(f"Lazy outputs: {f'above {args.lazy_output_threshold} KB' if args.lazy_outputs else 'off'}")
+    print(f"Fast renderer: {'default' if args.fast else 'with ?fast=1'}")
+    print(f"Extracted images: {'on' if args.extract_images else 'off'}, static files: {'inline' if args.self_contained else 'shared'}")
+    print(f"Live view: {args.live_channel_dir if args.live_view else 'off'}")
+    print(f"Search index: {'off' if args.no_search else args.search_index}")
+    print(f"Watching notebooks with {watcher.backend}, pre-render workers: {args.prerender_workers}")
+    print("Username: viewer")
+    print("Password: viewer")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        watcher.stop()
+        if server.prerenderer is not None:
+            server.prerenderer.shutdown()
+        if server.render_pool is not None:
+            server.render_pool.shutdown()
+        if server.search_index is not None:
+            server.search_index.close()
+        server.server_close()
+    return 0
@@ -0,0 +1,277 @@
+"""Watch the notebook roots for saved notebooks.
+
+Uses Linux inotify through ``ctypes`` so no extra dependency is needed, and
+falls back to polling file stats elsewhere or when inotify is unavailable
+(e.g. watch limits reached, network filesystems).
+
+The execution agent saves a notebook after every cell, so changes are
+debounced: a notebook is reported once it has been quiet for
+``debounce_seconds``, or at least every ``max_delay_seconds`` while it keeps
+changing.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+from pathlib import Path
+import select
+import struct
+import threading
+import time
+from typing import Callable, Iterable, Protocol
+
+logger = logging.getLogger(__name__)
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_watched_notebook(path: Path) -> bool:
+    """Check whether a changed path is a notebook the viewer serves."""
+
+    return path.suffix == ".ipynb" and ".ipynb_checkpoints" not in path.parts
+
+
+class _ChangeSource(Protocol):
+    def read_changes(self, timeout: float) -> set[Path]: ...
+
+    def close(self) -> None: ...
+
+
+class _PollingChangeSource:
+    """Detect notebook changes by comparing mtime and size snapshots."""
+
+    def __init__(self, roots: Iterable[Path], interval_seconds: float) -> None:
+        self.roots = tuple(roots)
+        self.interval_seconds = interval_seconds
+        self._snapshot = self._scan()
+
+    def read_changes(self, timeout: float) -> set[Path]:
+        # Scanning is the expensive part, so poll at our own pace.
+        time.sleep(self.interval_seconds)
+        snapshot = self._scan()
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        changed.update(self._snapshot.keys() - snapshot.keys())
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for root in self.roots:
+            for path in root.rglob("*.ipynb"):
+                if not is_watched_notebook(path):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+
+class _InotifyChangeSource:
+    """Detect notebook changes with Linux inotify watches on every directory."""
+
+    def __init__(self, roots: Iterable[Path]) -> None:
+        library_name = ctypes.util.find_library("c")
+        if not library_name or not hasattr(os, "O_CLOEXEC"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = ctypes.CDLL(library_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.roots = tuple(roots)
+        self._directories: dict[int, Path] = {}
+        # Notebooks seen under the watched directories, to report when their directory goes away.
+        self._notebooks: set[Path] = set()
+        try:
+            for root in self.roots:
+                self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def read_changes(self, timeout: float) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode("utf-8", errors="surrogateescape")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rescanning notebook roots")
+                changed.update(self._rescan())
+                continue
+            directory = self._directories.get(wd)
+            if mask & _IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            if directory is not None and mask & _IN_DELETE_SELF:
+                changed.update(self._forget_tree(directory))
+                continue
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed.update(self._watch_tree(path))
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    changed.update(self._forget_tree(path))
+                continue
+            if is_watched_notebook(path):
+                changed.add(path)
+                if mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    self._notebooks.discard(path)
+                else:
+                    self._notebooks.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _watch_tree(self, root: Path) -> set[Path]:
+        """Watch a directory tree and return the notebooks in it."""
+
+        notebooks = set()
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name != ".ipynb_checkpoints"]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._directories[wd] = Path(directory)
+            notebooks.update(Path(directory) / name for name in filenames if is_watched_notebook(Path(directory) / name))
+        self._notebooks.update(notebooks)
+        return notebooks
+
+    def _forget_tree(self, root: Path) -> set[Path]:
+        """Stop watching a deleted or moved directory tree and return the notebooks that were in it."""
+
+        for wd, directory in list(self._directories.items()):
+            if directory.is_relative_to(root):
+                del self._directories[wd]
+                # A directory moved within the roots gets new watches from its IN_MOVED_TO.
+                self._libc.inotify_rm_watch(self._fd, wd)
+        notebooks = {path for path in self._notebooks if path.is_relative_to(root)}
+        self._notebooks.difference_update(notebooks)
+        return notebooks
+
+    def _rescan(self) -> set[Path]:
+        # Notebooks that disappeared while events were lost are reported too.
+        changed = self._notebooks
+        self._notebooks = set()
+        for root in self.roots:
+            changed.update(self._watch_tree(root))
+        return changed
+
+
+class NotebookChangeWatcher:
+    """Report saved notebooks under the given roots to a callback.
+
+    Runs in a daemon thread. The callback is called from that thread with
+    the resolved notebook path, also for deleted notebooks.
+
+    .. code-block:: python
+
+        watcher = NotebookChangeWatcher(get_available_roots(), print, debounce_seconds=2)
+        watcher.start()
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        on_change: Callable[[Path], None],
+        *,
+        debounce_seconds: float = 2.0,
+        max_delay_seconds: float = 30.0,
+        poll_interval_seconds: float = 2.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.roots = tuple(Path(root).resolve() for root in roots)
+        self.on_change = on_change
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.use_inotify = use_inotify
+        self.backend: str | None = None
+        self._source: _ChangeSource | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start watching in a background thread."""
+
+        self._source = self._create_source()
+        self._thread = threading.Thread(target=self._run, name="notebook-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the thread to exit."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _create_source(self) -> _ChangeSource:
+        if self.use_inotify:
+            try:
+                source = _InotifyChangeSource(self.roots)
+                self.backend = "inotify"
+                return source
+            except OSError as exc:
+                logger.warning("Falling back to polling for notebook changes: %s", exc)
+        self.backend = "polling"
+        return _PollingChangeSource(self.roots, self.poll_interval_seconds)
+
+    def _run(self) -> None:
+        # path -> (first change, last change) of changes not yet reported
+        pending: dict[Path, tuple[float, float]] = {}
+        try:
+            while not self._stop.is_set():
+                changed = self._source.read_changes(timeout=min(self.debounce_seconds, 0.5) if pending else 0.5)
+                now = time.monotonic()
+                for path in changed:
+                    first, _last = pending.get(path, (now, now))
+                    pending[path] = (first, now)
+                for path, (first, last) in list(pending.items()):
+                    if now - last >= self.debounce_seconds or now - first >= self.max_delay_seconds:
+                        del pending[path]
+                        self._notify(path)
+        finally:
+            self._source.close()
+
+    def _notify(self, path: Path) -> None:
+        try:
+            self.on_change(path.resolve())
+        except Exception:
+            logger.exception("Notebook change handler failed for %s", path)
@@ -7,11 +7,25 @@ the runner must stream a live cell-output event carrying the printed marker
 runner exists to provide, so if it regresses this test fails.
 """
 
+import os
 from pathlib import Path
+import subprocess
+import sys
+import time
 
 import nbformat
+import pytest
 
+from getting_started.jupyter_execute_agent import AdaptiveTimeoutPolicy
+from getting_started.jupyter_execute_agent import NotebookJobQueue
+from getting_started.jupyter_execute_agent import NotebookQueueWorker
 from getting_started.jupyter_execute_agent import execute_notebook_observable
+from getting_started.jupyter_execute_agent import execute_notebook_sections
+from getting_started.jupyter_execute_agent import get_live_channel_path
+from getting_started.jupyter_execute_agent import main
+from getting_started.jupyter_execute_agent import plan_notebook_sections
+from getting_started.jupyter_execute_agent.core import _OutputPreviewBuilder
+from getting_started.jupyter_execute_agent.core import _build_output_preview
 
 
 def _write_simple_notebook(notebook_path: Path) -> None:
@@ -82,3 +96,287 @@ def test_notebook_run_is_observable(tmp_path: Path) -> None:
         if output.get("output_type") == "stream"
     )
     assert "observable-marker" in stream_text
+
+
+def test_adaptive_timeouts_use_history_and_cell_metadata(tmp_path: Path) -> None:
+    """Cell timeouts come from metadata first, then runtime history, then the default."""
+
+    notebook_path = tmp_path / "timeouts.ipynb"
+    notebook = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell("x = 1"),
+            nbformat.v4.new_code_cell("y = 2", metadata={"execution_agent": {"timeout": 42}}),
+        ],
+        metadata={"kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"}},
+    )
+    nbformat.write(notebook, notebook_path)
+    policy = AdaptiveTimeoutPolicy(history_dir=tmp_path / "history", floor_seconds=7, ceiling_seconds=100)
+
+    def run() -> list[int | None]:
+        started: list[int | None] = []
+
+        def observer(event) -> None:
+            if event.kind == "cell_started":
+                started.append(event.timeout_seconds)
+
+        execute_notebook_observable(notebook_path, timeout=30, timeout_policy=policy, observers=[observer])
+        return started
+
+    # First run has no history, so the notebook-wide default applies.
+    assert run() == [30, 42]
+    # Second run derives the timeout from the recorded runtime, clamped to the floor.
+    assert run() == [7, 42]
+    assert policy.history_path_for(notebook_path).exists()
+
+    # Invalid options are usage errors; errors raised by the run itself are not.
+    with pytest.raises(SystemExit) as usage_error:
+        main([str(notebook_path), "--adaptive-timeout", "--timeout-factor", "0"])
+    assert usage_error.value.code == 2
+    notebook.cells[1].metadata["execution_agent"]["timeout"] = "soon"
+    nbformat.write(notebook, notebook_path)
+    with pytest.raises(ValueError, match="timeout cell metadata"):
+        main([str(notebook_path), "--adaptive-timeout", "--timeout-history-dir", str(tmp_path / "history"), "--no-live-channel"])
+
+
+def test_sections_run_in_parallel_kernels_and_merge_in_order(tmp_path: Path) -> None:
+    """Tagged sections replay the setup prefix and merge outputs back in notebook order."""
+
+    notebook_path = tmp_path / "sections.ipynb"
+    notebook = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell("import os\nbase = 10\nprint('setup', os.getpid())"),
+            nbformat.v4.new_markdown_cell("# Ethereum"),
+            nbformat.v4.new_code_cell("print('eth', base + 1, os.getpid())", metadata={"tags": ["section:eth"]}),
+            nbformat.v4.new_code_cell("print('eth-2', base + 2)"),
+            nbformat.v4.new_code_cell("print('base', base + 3, os.getpid())", metadata={"tags": ["section:base"]}),
+        ],
+        metadata={"kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"}},
+    )
+    nbformat.write(notebook, notebook_path)
+
+    plan = plan_notebook_sections(notebook)
+    assert plan.prefix == (0,)
+    assert plan.sections == {"eth": (2, 3), "base": (4,)}
+
+    completed: dict[int, str | None] = {}
+
+    def observer(event) -> None:
+        if event.kind == "cell_completed":
+            completed[event.cell_index] = event.section
+
+    result = execute_notebook_sections(notebook_path, timeout=60, observers=[observer])
+
+    assert result.executed_code_cells == 4
+    assert completed == {0: None, 2: "eth", 3: "eth", 4: "base"}
+
+    executed = nbformat.read(notebook_path, as_version=4)
+    texts = ["".join(output.get("text", "") for output in cell.get("outputs", [])) for cell in executed.cells]
+    pids = {text.split()[-1] for text in (texts[0], texts[2], texts[4])}
+    assert texts[0].startswith("setup")
+    assert texts[2].startswith("eth 11")
+    assert texts[3] == "eth-2 12\n"
+    assert texts[4].startswith("base 13")
+    # Setup prefix and both sections each ran in their own kernel.
+    assert len(pids) == 3
+    assert [cell.get("execution_count") for cell in executed.cells if cell.cell_type == "code"] == [1, 2, 3, 4]
+
+
+def test_job_queue_orders_by_priority_and_respects_memory_budget(tmp_path: Path) -> None:
+    """Workers claim by priority within the memory budget and preempt low-priority jobs."""
+
+    notebook_path = tmp_path / "queued.ipynb"
+    _write_simple_notebook(notebook_path)
+    queue = NotebookJobQueue(tmp_path / "queue.sqlite")
+    gib = 1024**3
+
+    low = queue.submit(notebook_path, priority=0, memory_bytes=4 * gib)
+    high = queue.submit(notebook_path, priority=10, memory_bytes=4 * gib)
+    cancelled = queue.submit(notebook_path, priority=5, memory_bytes=gib)
+    assert queue.request_stop(cancelled, "cancel")
+    assert queue.get_job(cancelled).status == "cancelled"
+
+    first = queue.claim("worker-a", memory_budget_bytes=6 * gib)
+    assert first.job_id == high
+    # The remaining job does not fit next to the running one.
+    assert queue.claim("worker-b", memory_budget_bytes=6 * gib) is None
+    assert queue.get_metrics()["queue_depth"] == 1
+
+    queue.finish(high, "completed")
+    assert queue.claim("worker-b", memory_budget_bytes=6 * gib).job_id == low
+    urgent = queue.submit(notebook_path, priority=20, memory_bytes=gib, preemptible=False)
+    assert queue.find_preemption_victim().job_id == low
+    assert queue.request_stop(low, "preempt")
+    assert queue.get_stop_requests([low]) == {low: "preempt"}
+    queue.requeue(low)
+    assert queue.claim("worker-b").job_id == urgent
+
+    metrics = queue.get_metrics()
+    assert metrics["running"] == 1
+    assert metrics["queued_by_priority"] == {"0": 1}
+    assert metrics["wait_seconds"]["samples"] == 2
+
+    # A worker executes a real job in a child process.
+    queue.finish(urgent, "completed")
+    queue.request_stop(low, "cancel")
+    output_path = tmp_path / "queued-output.ipynb"
+    channel_dir = tmp_path / "live"
+    channel_dir.mkdir()
+    abandoned_channel = channel_dir / "abandoned-0123456789abcdef.jsonl"
+    abandoned_channel.write_text("{}\n")
+    os.utime(abandoned_channel, (0, 0))
+    job_id = queue.submit(notebook_path, arguments=["--output", str(output_path), "--timeout", "60", "--live-channel-dir", str(channel_dir)])
+    worker = NotebookQueueWorker(queue, poll_interval_seconds=0.1)
+    worker.run_once()
+    assert worker.running_job_ids == [job_id]
+    deadline = time.monotonic() + 120
+    while worker.running_job_ids and time.monotonic() < deadline:
+        time.sleep(0.2)
+        worker.run_once()
+    assert queue.get_job(job_id).status == "completed"
+    executed = nbformat.read(output_path, as_version=4)
+    assert executed.cells[0].outputs[0]["text"] == "observable-marker\n"
+    # The run publishes to the given channel directory and prunes abandoned channels.
+    assert get_live_channel_path(output_path, channel_dir).exists()
+    assert not abandoned_channel.exists()
+
+
+def test_job_queue_preempts_only_when_the_waiting_job_can_then_start(tmp_path: Path) -> None:
+    """A memory-blocked high-priority job is not overtaken and preempts only a job whose stop frees enough."""
+
+    notebook_path = tmp_path / "queued.ipynb"
+    _write_simple_notebook(notebook_path)
+    queue = NotebookJobQueue(tmp_path / "queue.sqlite")
+    gib = 1024**3
+    budget = 48 * gib
+
+    running = queue.submit(notebook_path, priority=0, memory_bytes=8 * gib)
+    queue.heartbeat("worker-a", concurrency=2)
+    assert queue.claim("worker-a", memory_budget_bytes=budget).job_id == running
+    backfill = queue.submit(notebook_path, priority=0, memory_bytes=8 * gib)
+    big = queue.submit(notebook_path, priority=10, memory_bytes=48 * gib)
+
+    for _round in range(4):
+        # The low job must not start past the big one, which waits for memory.
+        assert queue.claim("worker-a", memory_budget_bytes=budget) is None
+        victim = queue.find_preemption_victim(memory_budget_bytes=budget)
+        if victim is None:
+            continue
+        assert victim.job_id == running
+        queue.request_stop(victim.job_id, "preempt")
+        queue.requeue(victim.job_id)
+        break
+    assert queue.claim("worker-a", memory_budget_bytes=budget).job_id == big
+    assert queue.get_job(backfill).attempts == 0
+    assert queue.get_job(running).attempts == 1
+
+    # A free slot that can start the waiting job makes preemption unnecessary.
+    queue.finish(big, "completed")
+    assert queue.claim("worker-a", memory_budget_bytes=budget).job_id == running
+    queue.submit(notebook_path, priority=10, memory_bytes=8 * gib)
+    assert queue.find_preemption_victim(memory_budget_bytes=budget) is None
+    queue.unregister_worker("worker-a")
+    assert queue.find_preemption_victim(memory_budget_bytes=budget).job_id == running
+
+    # No running job frees enough memory on its own, so none is stopped for nothing.
+    queue = NotebookJobQueue(tmp_path / "two-victims.sqlite")
+    for _index in range(2):
+        queue.submit(notebook_path, priority=0, memory_bytes=8 * gib)
+        queue.claim("worker-a", memory_budget_bytes=20 * gib)
+    queue.submit(notebook_path, priority=10, memory_bytes=16 * gib)
+    assert queue.find_preemption_victim(memory_budget_bytes=20 * gib) is None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Finds processes through /proc")
+def test_worker_death_kills_its_jobs_and_kernels(tmp_path: Path) -> None:
+    """A SIGKILLed worker leaves no job process or kernel running next to the requeued job."""
+
+    notebook_path = tmp_path / "sleeping.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("import time\ntime.sleep(300)")]), notebook_path)
+    queue = NotebookJobQueue(tmp_path / "queue.sqlite")
+    queue.submit(notebook_path, arguments=["--output", str(tmp_path / "out.ipynb"), "--timeout", "600", "--no-live-channel"])
+    worker = subprocess.Popen(
+        [sys.executable, "-c", f"from pathlib import Path\nfrom getting_started.jupyter_execute_agent import NotebookJobQueue, NotebookQueueWorker\nNotebookQueueWorker(NotebookJobQueue(Path({str(queue.path)!r})), poll_interval_seconds=0.1).run_forever()"],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    try:
+        deadline = time.monotonic() + 120
+        job_pids: list[int] = []
+        kernel_pids: list[int] = []
+        while not kernel_pids and time.monotonic() < deadline:
+            time.sleep(0.2)
+            job_pids = _get_child_pids(worker.pid)
+            kernel_pids = [pid for job_pid in job_pids for pid in _get_child_pids(job_pid)]
+    finally:
+        worker.kill()
+        worker.wait()
+    assert kernel_pids, "the job did not start a kernel"
+
+    deadline = time.monotonic() + 30
+    while any(_is_process_running(pid) for pid in job_pids + kernel_pids) and time.monotonic() < deadline:
+        time.sleep(0.2)
+    assert not [pid for pid in job_pids + kernel_pids if _is_process_running(pid)]
+
+
+def _get_child_pids(parent_pid: int) -> list[int]:
+    children = []
+    for stat_path in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # The command name in parentheses may contain spaces.
+            fields = stat_path.read_text().rpartition(")")[2].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(stat_path.parent.name))
+    return children
+
+
+def _is_process_running(pid: int) -> bool:
+    try:
+        return Path(f"/proc/{pid}/stat").read_text().rpartition(")")[2].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def test_incremental_output_preview_matches_full_walk() -> None:
+    """The incrementally built preview is identical to the full output walk."""
+
+    new_stream = nbformat.v4.new_output
+    golden_outputs = {
+        "empty": [],
+        "short": [new_stream("stream", name="stdout", text="hello\n")],
+        "blank_chunks": [new_stream("stream", name="stdout", text="  \n") for _ in range(50)],
+        "many_chunks": [new_stream("stream", name="stdout", text=f"step {i}\n") for i in range(20_000)],
+        "list_text": [new_stream("stream", name="stdout", text=["a" * 300, "b\n"])],
+        "mixed": [
+            new_stream("stream", name="stderr", text="warning\n"),
+            new_stream("display_data", data={"image/png": "iVBOR"}),
+            new_stream("execute_result", data={"text/plain": "x" * 100}, execution_count=1),
+            new_stream("error", ename="ValueError", evalue="bad", traceback=["Traceback", "ValueError: bad"]),
+        ],
+        "exact_fit": [new_stream("stream", name="stdout", text="y" * 118), new_stream("stream", name="stdout", text="z" * 119)],
+    }
+
+    for name, outputs in golden_outputs.items():
+        cell = nbformat.v4.new_code_cell("", outputs=[])
+        builder = _OutputPreviewBuilder(cell.outputs)
+        for output in outputs:
+            cell.outputs.append(output)
+            builder.add(output, len(cell.outputs) - 1)
+        assert builder.build(cell) == _build_output_preview(cell), name
+
+    # clear_output(wait=True) followed by new output restarts the preview.
+    cell = nbformat.v4.new_code_cell("", outputs=[])
+    builder = _OutputPreviewBuilder(cell.outputs)
+    for text in ("10%", "20%", "done"):
+        cell.outputs[:] = []
+        cell.outputs.append(new_stream("stream", name="stdout", text=text))
+        builder.add(cell.outputs[-1], 0)
+    assert builder.build(cell) == "done"
+
+    # Display updates replace payloads and fall back to the full walk.
+    cell = nbformat.v4.new_code_cell("", outputs=[])
+    builder = _OutputPreviewBuilder(cell.outputs)
+    cell.outputs.append(new_stream("display_data", data={"text/plain": "old"}))
+    builder.add(cell.outputs[-1], 0)
+    cell.outputs[0]["data"] = {"text/plain": "new"}
+    assert builder.build(cell) == "new"
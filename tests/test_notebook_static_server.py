@@ -1,11 +1,43 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
 import copy
+from datetime import datetime, timezone
+import gzip
+import html
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
 
 import nbformat
+import pytest
 
+from getting_started.jupyter_execute_agent import LiveChannelPublisher
+from getting_started.jupyter_execute_agent import NotebookExecutionEvent
 from getting_started.notebook_static_server import PROGRESS_OUTPUT_MESSAGE
+from getting_started.notebook_static_server import LiveNotebookView
+from getting_started.notebook_static_server import NotebookCellCache
+from getting_started.notebook_static_server import NotebookChangeWatcher
+from getting_started.notebook_static_server import NotebookIndex
+from getting_started.notebook_static_server import NotebookPageStream
+from getting_started.notebook_static_server import NotebookPrerenderer
+from getting_started.notebook_static_server import NotebookRenderCache
+from getting_started.notebook_static_server import NotebookRenderPool
+from getting_started.notebook_static_server import NotebookSearchIndex
+from getting_started.notebook_static_server import RenderOptions
+from getting_started.notebook_static_server import RenderQueueFull
+from getting_started.notebook_static_server import RenderTimeout
+from getting_started.notebook_static_server import RenderWorkerError
 from getting_started.notebook_static_server import add_table_of_contents
 from getting_started.notebook_static_server import clean_progress_outputs
+from getting_started.notebook_static_server import export_site
+from getting_started.notebook_static_server import render_notebook
+from getting_started.notebook_static_server import server as server_module
 from getting_started.notebook_static_server import is_progress_stream_text
+from getting_started.notebook_static_server import load_notebook_text
 
 
 def test_add_table_of_contents_after_first_heading():
@@ -40,6 +72,30 @@ def test_add_table_of_contents_returns_original_without_usable_headings():
     assert add_table_of_contents(body) == body
 
 
+def test_render_notebook_builds_table_of_contents_from_markdown_cells(tmp_path):
+    notebook_path = tmp_path / "toc.ipynb"
+    output = nbformat.v4.new_output("display_data", data={"text/html": "<h2 id='From-output'>From output</h2>"})
+    cells = [
+        nbformat.v4.new_markdown_cell("Preamble\n\n# Main title\n\nIntro"),
+        nbformat.v4.new_code_cell("display()", outputs=[output]),
+        nbformat.v4.new_markdown_cell("## Setup & *run*\n\nText\n\nResults\n-------\n\n### A,B(1)"),
+        nbformat.v4.new_markdown_cell("Plain text"),
+    ]
+    nbformat.write(nbformat.v4.new_notebook(cells=cells), notebook_path)
+
+    rendered = render_notebook(notebook_path)
+
+    toc = re.search(r'<nav [^>]*class="notebook-toc"[^>]*>(.*?)</nav>', rendered, re.DOTALL)
+    assert rendered.index('id="Main-title"') < toc.start() < rendered.index("<p>Intro</p>")
+    links = re.findall(r'<a href="#([^"]+)">(.*?)</a>', toc.group(1))
+    assert links == [("Setup-%26-run", "Setup &amp; run"), ("Results", "Results"), ("A%2CB%281%29", "A,B(1)")]
+    for target, _label in links:
+        assert f'id="{html.escape(urllib.parse.unquote(target), quote=False)}"' in rendered
+    assert "From-output" not in toc.group(1)
+    assert rendered.index(".notebook-toc {") < rendered.index("</head>")
+    assert rendered.count('class="notebook-toc"') == 1
+
+
 def test_is_progress_stream_text_requires_progress_markers():
     assert is_progress_stream_text("\rBacktesting strategy: 0%| | 0/10 [00:00<?, ?it/s]")
     assert is_progress_stream_text("\r  0%|          | 0/10 [00:00<?, ?it/s]")
@@ -124,3 +180,981 @@ def test_clean_progress_outputs_preserves_mixed_stream_text():
     assert outputs[1].text == PROGRESS_OUTPUT_MESSAGE
     assert outputs[2].text == "Done\n"
     assert outputs[3].text == "Throughput\r12 it/s\n"
+
+
+def test_clean_progress_outputs_copies_only_cells_with_progress():
+    image = nbformat.v4.new_output("display_data", data={"image/png": "iVBORw0KGgo=" * 1000})
+    progress = nbformat.v4.new_output("stream", name="stderr", text=["\rBacktesting strategy: 0%| | 0/10 ", "[00:00<?, ?it/s]"])
+    nb = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell(outputs=[image]),
+            nbformat.v4.new_code_cell(outputs=[nbformat.v4.new_output("stream", name="stdout", text="Rate\r12 it/s\n")]),
+            nbformat.v4.new_code_cell(outputs=[image, progress]),
+            nbformat.v4.new_markdown_cell("# Title"),
+        ],
+    )
+    original = copy.deepcopy(nb)
+
+    cleaned = clean_progress_outputs(nb)
+
+    assert nb == original
+    assert cleaned is not nb and cleaned.cells is not nb.cells
+    assert cleaned.cells[0] is nb.cells[0]
+    assert cleaned.cells[1] is nb.cells[1]
+    assert cleaned.cells[3] is nb.cells[3]
+    assert cleaned.cells[2] is not nb.cells[2]
+    assert cleaned.cells[2].outputs[0] is image
+    assert cleaned.cells[2].outputs[1].text == PROGRESS_OUTPUT_MESSAGE
+    assert cleaned.cells[2].source == nb.cells[2].source
+
+
+def test_render_cache_hits_memory_then_disk_and_rerenders_changed_notebooks(tmp_path):
+    notebook_path = tmp_path / "cached.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Cached")]), notebook_path)
+    renders = []
+
+    def renderer(path, options):
+        renders.append((path, options))
+        return f"<html>{len(renders)}</html>"
+
+    cache = NotebookRenderCache(cache_dir=tmp_path / "html", renderer=renderer)
+    first = cache.get(notebook_path)
+    assert first.cache_status == "miss"
+    assert cache.get(notebook_path).cache_status == "memory"
+    assert cache.get(notebook_path, RenderOptions(exclude_input=True)).cache_status == "miss"
+    assert len(renders) == 2
+
+    # A new server process finds the page in the disk tier.
+    restarted = NotebookRenderCache(cache_dir=tmp_path / "html", renderer=renderer)
+    page = restarted.get(notebook_path)
+    assert page.cache_status == "disk"
+    assert page.body == first.body
+
+    # Saving the notebook changes its mtime and size, so the key changes.
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Changed title")]), notebook_path)
+    stat = notebook_path.stat()
+    os.utime(notebook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    changed = restarted.get(notebook_path)
+    assert changed.cache_status == "miss"
+    assert changed.body == b"<html>3</html>"
+
+    stats = restarted.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["render_seconds"]["count"] == 1
+
+
+def test_render_cache_evicts_least_recently_used_pages(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.ipynb"
+        nbformat.write(nbformat.v4.new_notebook(), path)
+        paths.append(path)
+
+    cache = NotebookRenderCache(max_memory_bytes=25, cache_dir=None, renderer=lambda path, options: "x" * 10)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+
+    assert cache.get(paths[0]).cache_status == "memory"
+    assert cache.get(paths[1]).cache_status == "miss"
+    assert cache.get_stats()["evictions"] == 2
+
+    # The disk tier is listed on its first write and then only once over its limit, and evicts by last use.
+    disk = NotebookRenderCache(max_memory_bytes=0, cache_dir=tmp_path / "html", max_disk_bytes=25, renderer=lambda path, options: "x" * 10)
+    prunes = []
+    prune_disk = disk._prune_disk
+    disk._prune_disk = lambda: (prunes.append(True), prune_disk())
+    for path in (paths[0], paths[1], paths[0], paths[2]):
+        disk.get(path)
+        time.sleep(0.05)
+    assert len(prunes) == 2
+    assert disk.get(paths[0]).cache_status == "disk"
+    assert disk.get(paths[1]).cache_status == "miss"
+
+
+def _wait_for(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.05)
+
+
+def test_watcher_debounces_saves_and_prerenders_into_cache(tmp_path):
+    root = tmp_path / "notebooks"
+    (root / "nested").mkdir(parents=True)
+    notebook_path = root / "nested" / "saved.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Saved")]), notebook_path)
+
+    for use_inotify in (True, False):
+        changes = []
+        changed = threading.Event()
+
+        def on_change(path):
+            changes.append(path)
+            changed.set()
+
+        watcher = NotebookChangeWatcher([root], on_change, debounce_seconds=0.3, poll_interval_seconds=0.1, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            # A burst of per-cell saves is reported once.
+            for index in range(5):
+                nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell(f"# Save {index}")]), notebook_path)
+                time.sleep(0.05)
+            (root / "notes.txt").write_text("ignored")
+            assert changed.wait(10), watcher.backend
+            time.sleep(0.5)
+        finally:
+            watcher.stop()
+        assert changes == [notebook_path.resolve()], watcher.backend
+
+    cache = NotebookRenderCache(cache_dir=None)
+    prerenderer = NotebookPrerenderer(cache, RenderOptions(), workers=1, niceness=0)
+    try:
+        assert prerenderer.submit(notebook_path)
+        _wait_for(lambda: prerenderer.get_stats()["completed"] == 1)
+        # Already cached versions are not rendered again.
+        assert not prerenderer.submit(notebook_path)
+        assert prerenderer.get_stats()["skipped"] == 1
+    finally:
+        prerenderer.shutdown()
+    page = cache.get(notebook_path)
+    assert page.cache_status == "memory"
+    assert b"Save 4" in page.body
+
+    # A render that kills its worker process fails alone; later renders get a new worker.
+    crash_path = root / "crash.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(), crash_path)
+    prerenderer = NotebookPrerenderer(cache, RenderOptions(), workers=1, niceness=0, memory_limit_bytes=None, renderer=_pool_renderer)
+    try:
+        assert prerenderer.submit(crash_path)
+        _wait_for(lambda: prerenderer.get_stats()["failed"] == 1)
+        nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Saved again")]), notebook_path)
+        assert prerenderer.submit(notebook_path)
+        _wait_for(lambda: prerenderer.get_stats()["completed"] == 1)
+        assert prerenderer.get_stats()["worker_restarts"] == 1
+    finally:
+        prerenderer.shutdown()
+    assert cache.get(notebook_path).body == b"<html>saved</html>"
+
+
+def test_watcher_reports_notebooks_of_moved_and_deleted_directories(tmp_path):
+    for use_inotify in (True, False):
+        root = tmp_path / f"inotify-{use_inotify}" / "notebooks"
+        for name in ("sub2", "gone", "kept"):
+            (root / name / "deeper").mkdir(parents=True)
+            nbformat.write(nbformat.v4.new_notebook(), root / name / "deeper" / "report.ipynb")
+        index = NotebookIndex(root.parent, (root,))
+        index.scan()
+        watcher = NotebookChangeWatcher([root], index.update, debounce_seconds=0.1, poll_interval_seconds=0.1, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            (root / "sub2").rename(root / "moved")
+            (root / "gone" / "deeper" / "report.ipynb").unlink()
+            (root / "gone" / "deeper").rmdir()
+            (root / "gone").rename(tmp_path / f"outside-{use_inotify}")
+            expected = ["notebooks/kept/deeper/report.ipynb", "notebooks/moved/deeper/report.ipynb"]
+            deadline = time.monotonic() + 10
+            while [entry.path for entry in index.query()] != expected and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert [entry.path for entry in index.query()] == expected, watcher.backend
+
+            # Saves in the moved directory are reported under its new path only.
+            nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("1")]), root / "moved" / "deeper" / "report.ipynb")
+            while index.query(text="moved")[0].code_cells != 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert [entry.code_cells for entry in index.query()] == [0, 1], watcher.backend
+        finally:
+            watcher.stop()
+
+
+def test_export_site_writes_mirror_with_index_and_skips_unchanged_notebooks(tmp_path):
+    (tmp_path / "notebooks" / "sub").mkdir(parents=True)
+    notebooks = ["notebooks/first.ipynb", "notebooks/sub/second.ipynb"]
+    for notebook in notebooks:
+        nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell(f"# {notebook}")]), tmp_path / notebook)
+    out_dir = tmp_path / "site"
+    umask = os.umask(0o022)
+    os.umask(umask)
+
+    first = export_site(out_dir, notebooks, project_root=tmp_path)
+    assert sorted(first.rendered) == notebooks and not first.failed
+    page = out_dir / "notebooks" / "sub" / "second.html"
+    assert b"notebooks/sub/second.ipynb" in page.read_bytes()
+    assert gzip.decompress((out_dir / "notebooks" / "sub" / "second.html.gz").read_bytes()) == page.read_bytes()
+    index = (out_dir / "index.html").read_text()
+    assert 'href="notebooks/first.html"' in index and 'href="notebooks/sub/second.html"' in index
+    assert (out_dir / "index.html.gz").exists()
+    # Published files get the umask's permissions, not the private mode of temporary files.
+    for published in (page, out_dir / "notebooks" / "sub" / "second.html.gz", out_dir / "index.html"):
+        assert published.stat().st_mode & 0o777 == 0o666 & ~umask
+        assert published.stat().st_mode & 0o004 or umask & 0o004
+
+    index_mtime = (out_dir / "index.html").stat().st_mtime_ns
+    unchanged = export_site(out_dir, notebooks, project_root=tmp_path)
+    assert sorted(unchanged.skipped) == notebooks and not unchanged.rendered
+    assert unchanged.seconds < 1
+    assert (out_dir / "index.html").stat().st_mtime_ns == index_mtime
+
+    # Touched without changes: the content hash matches, so nothing is rendered.
+    os.utime(tmp_path / notebooks[0], ns=(0, time.time_ns() + 2_000_000_000))
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Changed")]), tmp_path / notebooks[1])
+    changed = export_site(out_dir, notebooks, project_root=tmp_path)
+    assert changed.rendered == [notebooks[1]]
+    assert changed.skipped == [notebooks[0]]
+    assert b"Changed" in page.read_bytes()
+
+    removed = export_site(out_dir, notebooks[1:], project_root=tmp_path)
+    assert removed.removed == [notebooks[0]]
+    assert not (out_dir / "notebooks" / "first.html").exists()
+    assert not (out_dir / "notebooks" / "first.html.gz").exists()
+    assert "first.html" not in (out_dir / "index.html").read_text()
+
+
+def _pool_renderer(path, options):
+    # Runs in a render worker process, so it must be importable by name.
+    if path.stem == "slow":
+        time.sleep(60)
+    if path.stem == "broken":
+        raise ValueError("cannot render")
+    if path.stem == "crash":
+        os._exit(1)
+    return f"<html>{path.stem}</html>"
+
+
+def test_render_pool_times_out_rejects_when_full_and_replaces_workers(tmp_path):
+    pool = NotebookRenderPool(workers=1, timeout_seconds=60, max_queue=0, memory_limit_bytes=None, renderer=_pool_renderer)
+    try:
+        # The first render also waits for the worker process to start.
+        assert pool.render(tmp_path / "fast.ipynb", RenderOptions()) == "<html>fast</html>"
+        with pytest.raises(RenderWorkerError, match="ValueError: cannot render"):
+            pool.render(tmp_path / "broken.ipynb", RenderOptions())
+
+        pool.timeout_seconds = 2
+        errors = []
+        slow = threading.Thread(target=lambda: errors.append(pytest.raises(RenderTimeout, pool.render, tmp_path / "slow.ipynb", RenderOptions())))
+        slow.start()
+        _wait_for(lambda: pool.get_stats()["busy_workers"] == 1)
+        with pytest.raises(RenderQueueFull) as rejected:
+            pool.render(tmp_path / "fast.ipynb", RenderOptions())
+        assert rejected.value.retry_after >= 1
+        slow.join(30)
+        assert len(errors) == 1
+
+        # The killed worker was replaced.
+        pool.timeout_seconds = 60
+        assert pool.render(tmp_path / "again.ipynb", RenderOptions()) == "<html>again</html>"
+        stats = pool.get_stats()
+        assert stats["completed"] == 2
+        assert stats["failed"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["rejected"] == 1
+        assert stats["worker_restarts"] == 1
+        assert stats["queue_depth"] == 0 and stats["busy_workers"] == 0
+        assert 0 < stats["utilisation"] <= 1
+    finally:
+        pool.shutdown()
+
+
+def test_render_cache_coalesces_concurrent_misses(tmp_path):
+    notebook_path = tmp_path / "shared.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(), notebook_path)
+    release = threading.Event()
+    renders = []
+
+    def renderer(path, options):
+        renders.append(path)
+        release.wait(10)
+        return "<html>shared</html>"
+
+    cache = NotebookRenderCache(cache_dir=None, renderer=renderer)
+    pages = []
+    threads = [threading.Thread(target=lambda: pages.append(cache.get(notebook_path))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.get_stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(renders) == 1
+    assert sorted(page.cache_status for page in pages) == ["coalesced", "coalesced", "miss"]
+    assert {page.body for page in pages} == {b"<html>shared</html>"}
+
+
+@pytest.fixture
+def notebook_server(tmp_path, monkeypatch):
+    """Serve ``tmp_path/notebooks`` on a free loopback port."""
+
+    notebooks = tmp_path / "notebooks"
+    notebooks.mkdir()
+    monkeypatch.setattr(server_module, "PROJECT_ROOT", tmp_path.resolve())
+    monkeypatch.setattr(server_module, "NOTEBOOK_ROOTS", (notebooks,))
+    server = server_module.NotebookHTTPServer(("127.0.0.1", 0), server_module.NotebookRequestHandler)
+    server.allow_non_tailnet = False
+    server.render_cache = NotebookRenderCache(cache_dir=tmp_path / "html-cache")
+    server.cell_cache = NotebookCellCache()
+    server.render_options = RenderOptions()
+    server.notebook_index = NotebookIndex(tmp_path, (notebooks,))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _request(server, path, method="GET", headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=60)
+    credentials = base64.b64encode(b"viewer:viewer").decode("ascii")
+    connection.request(method, path, headers={"Authorization": f"Basic {credentials}", **(headers or {})})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_notebook_view_supports_conditional_get_and_gzip(notebook_server, tmp_path):
+    notebook_path = tmp_path / "notebooks" / "view.ipynb"
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Conditional")]), notebook_path)
+    renders = []
+    original_renderer = notebook_server.render_cache.renderer
+    notebook_server.render_cache.renderer = lambda path, options: renders.append(path) or original_renderer(path, options)
+
+    head, head_body = _request(notebook_server, "/view/notebooks/view.ipynb", method="HEAD")
+    assert head.status == 200
+    assert head_body == b""
+    etag = head.getheader("ETag")
+    assert etag.startswith('"') and not etag.endswith('-gzip"')
+
+    response, body = _request(notebook_server, "/view/notebooks/view.ipynb")
+    assert response.status == 200
+    assert response.getheader("ETag") == etag
+    assert int(head.getheader("Content-Length")) == len(body)
+    assert b"Conditional" in body
+    assert response.getheader("X-Render-Cache") == "memory"
+    assert len(renders) == 1
+
+    compressed, compressed_body = _request(notebook_server, "/view/notebooks/view.ipynb", headers={"Accept-Encoding": "br, gzip;q=0.8"})
+    assert compressed.getheader("Content-Encoding") == "gzip"
+    assert compressed.getheader("Vary") == "Accept-Encoding"
+    assert gzip.decompress(compressed_body) == body
+    gzip_etag = compressed.getheader("ETag")
+    assert gzip_etag != etag
+
+    not_modified, empty = _request(notebook_server, "/view/notebooks/view.ipynb", headers={"If-None-Match": gzip_etag})
+    assert not_modified.status == 304
+    assert empty == b""
+    since, _ = _request(notebook_server, "/view/notebooks/view.ipynb", headers={"If-Modified-Since": response.getheader("Last-Modified")})
+    assert since.status == 304
+
+    # Saving the notebook changes the validators.
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Changed")]), notebook_path)
+    stat = notebook_path.stat()
+    os.utime(notebook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    changed, changed_body = _request(notebook_server, "/view/notebooks/view.ipynb", headers={"If-None-Match": etag})
+    assert changed.status == 200
+    assert b"Changed" in changed_body
+    assert len(renders) == 2
+
+
+def test_connections_persist_across_responses_until_idle_and_are_capped_per_client(notebook_server, tmp_path):
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Persistent")]), tmp_path / "notebooks" / "persistent.ipynb")
+    notebook_server.keep_alive_timeout = 0.5
+    credentials = base64.b64encode(b"viewer:viewer").decode("ascii")
+    connection = http.client.HTTPConnection("127.0.0.1", notebook_server.server_address[1], timeout=60)
+    connection.connect()
+    sock = connection.sock
+
+    def get(path, headers):
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        assert not response.will_close
+        assert connection.sock is sock
+        return response
+
+    authorization = {"Authorization": f"Basic {credentials}"}
+    page = get("/view/notebooks/persistent.ipynb", authorization)
+    assert page.status == 200
+    assert get("/view/notebooks/persistent.ipynb", {**authorization, "If-None-Match": page.getheader("ETag")}).status == 304
+    assert get("/view/notebooks/missing.ipynb", authorization).status == 404
+    assert get("/view/notebooks/persistent.ipynb", {}).status == 401
+
+    time.sleep(1.0)
+    assert sock.recv(1) == b""
+    connection.close()
+
+    # A malformed Content-Length is answered with 400 and ends the connection.
+    malformed = http.client.HTTPConnection("127.0.0.1", notebook_server.server_address[1], timeout=60)
+    malformed.putrequest("GET", "/")
+    malformed.putheader("Content-Length", "12abc")
+    malformed.endheaders()
+    response = malformed.getresponse()
+    response.read()
+    assert response.status == 400
+    assert response.will_close
+    malformed.close()
+
+    notebook_server.max_connections_per_client = 1
+    held = http.client.HTTPConnection("127.0.0.1", notebook_server.server_address[1], timeout=60)
+    held.request("GET", "/", headers=authorization)
+    held.getresponse().read()
+    rejected, _ = _request(notebook_server, "/")
+    assert rejected.status == 503
+    assert rejected.getheader("Retry-After") == "1"
+    held.close()
+    time.sleep(0.2)
+    accepted, _ = _request(notebook_server, "/")
+    assert accepted.status == 200
+
+
+def test_index_page_lists_maintained_metadata_with_sorting_and_filters(notebook_server, tmp_path):
+    notebooks = tmp_path / "notebooks"
+    failed = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell(
+                "1 / 0",
+                outputs=[nbformat.v4.new_output("error", ename="ZeroDivisionError", evalue="division by zero", traceback=[])],
+                metadata={"execution": {"iopub.status.idle": "2026-01-02T03:04:05.000000Z"}},
+            ),
+            nbformat.v4.new_code_cell("2"),
+        ]
+    )
+    nbformat.write(failed, notebooks / "failed.ipynb")
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("1")]), notebooks / "ok.ipynb")
+    index = notebook_server.notebook_index
+    index.scan()
+
+    entries = {entry.path: entry for entry in index.query()}
+    assert entries["notebooks/failed.ipynb"].code_cells == 2
+    assert entries["notebooks/failed.ipynb"].error_count == 1
+    assert entries["notebooks/failed.ipynb"].executed_at.year == 2026
+    assert entries["notebooks/ok.ipynb"].executed_at is None
+
+    # Watcher events update the index without another walk.
+    (notebooks / "ok.ipynb").unlink()
+    index.update(notebooks / "ok.ipynb")
+    nbformat.write(nbformat.v4.new_notebook(), notebooks / "added.ipynb")
+    index.update(notebooks / "added.ipynb")
+    assert [entry.path for entry in index.query(sort="path")] == ["notebooks/added.ipynb", "notebooks/failed.ipynb"]
+    assert [entry.path for entry in index.query(sort="cells", descending=True, limit=1)] == ["notebooks/failed.ipynb"]
+
+    response, body = _request(notebook_server, "/?status=error&sort=modified")
+    assert response.status == 200
+    assert b"notebooks/failed.ipynb" in body
+    assert b"notebooks/added.ipynb" not in body
+    assert b"1 error(s)" in body
+
+    response, body = _request(notebook_server, "/?q=ADD")
+    assert b"notebooks/added.ipynb" in body
+    assert b"notebooks/failed.ipynb" not in body
+
+    response, _ = _request(notebook_server, "/?sort=colour")
+    assert response.status == 400
+
+
+def test_search_index_ranks_sources_and_outputs_and_updates_incrementally(notebook_server, tmp_path):
+    notebooks = tmp_path / "notebooks"
+    vault = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_markdown_cell("# Vault <b>sweep</b>"),
+            nbformat.v4.new_code_cell(
+                "run_backtest()",
+                outputs=[nbformat.v4.new_output("stream", name="stdout", text="Best vault CAGR 42.5% for Polygon\n")],
+            ),
+            nbformat.v4.new_code_cell(
+                "plot_tvl()",
+                outputs=[nbformat.v4.new_output("display_data", data={"image/png": "iVBORw0KGgo" * 1000, "text/plain": "<Figure TVL chart>"})],
+            ),
+        ]
+    )
+    nbformat.write(vault, notebooks / "vault.ipynb")
+    # Indexing reads the text of outputs and skips image payloads.
+    document = load_notebook_text(notebooks / "vault.ipynb")
+    assert document["cells"][2]["outputs"][0]["data"] == {"text/plain": ["<Figure TVL chart>"]}
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("vault = load_vaults()")]), notebooks / "other.ipynb")
+    index = NotebookSearchIndex(tmp_path / "search.sqlite", tmp_path, (notebooks,))
+    index.scan()
+    notebook_server.search_index = index
+
+    results = index.search("vault cagr")
+    assert [(result.path, result.kind, result.cell_index) for result in results] == [("notebooks/vault.ipynb", "output", 1)]
+    assert "<mark>CAGR</mark>" in results[0].snippet
+    assert results[0].url == f"/view/notebooks/vault.ipynb#cell-id={vault.cells[1].id}"
+    assert {result.path for result in index.search("vaul")} == {"notebooks/vault.ipynb", "notebooks/other.ipynb"}
+    assert index.search('sweep" OR "x') == []
+    assert "&lt;b&gt;" in index.search("sweep")[0].snippet
+    assert [(result.kind, result.cell_index) for result in index.search("figure tvl")] == [("output", 2)]
+
+    response, body = _request(notebook_server, "/search?q=polygon")
+    assert response.status == 200
+    assert f'href="/view/notebooks/vault.ipynb#cell-id={vault.cells[1].id}"'.encode() in body
+    assert b"<mark>Polygon</mark>" in body
+    index_page, index_body = _request(notebook_server, "/")
+    assert b'action="/search"' in index_body
+
+    # Unchanged notebooks are skipped, saved and deleted ones are updated.
+    restarted = NotebookSearchIndex(tmp_path / "search.sqlite", tmp_path, (notebooks,))
+    assert len(restarted) == 2
+    vault.cells[1].outputs[0].text = "Best vault CAGR 12.0% for Arbitrum\n"
+    nbformat.write(vault, notebooks / "vault.ipynb")
+    (notebooks / "other.ipynb").unlink()
+    restarted.scan()
+    assert restarted.search("polygon") == []
+    assert [result.path for result in restarted.search("arbitrum")] == ["notebooks/vault.ipynb"]
+    assert [result.path for result in restarted.search("load_vaults")] == []
+    # Updates delete the cells of a notebook through the path index, and leave the full-text index consistent.
+    plan = restarted._connection.execute("EXPLAIN QUERY PLAN DELETE FROM cell_rows WHERE path = ?", ("notebooks/vault.ipynb",)).fetchall()
+    assert "cell_rows_path" in str(plan)
+    restarted._connection.execute("INSERT INTO cells (cells, rank) VALUES ('integrity-check', 1)")
+    restarted.close()
+
+
+def test_lazy_view_defers_heavy_outputs_to_cacheable_fragments(notebook_server, tmp_path):
+    notebook_server.lazy_output_bytes = 10_000
+    heavy_html = "<table>" + "<tr><td>row</td></tr>" * 1000 + "</table>"
+    notebook = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell(
+                "show()",
+                outputs=[
+                    nbformat.v4.new_output("stream", name="stdout", text="small output\n"),
+                    nbformat.v4.new_output("display_data", data={"text/html": heavy_html, "text/plain": "<table>"}),
+                ],
+            )
+        ]
+    )
+    nbformat.write(notebook, tmp_path / "notebooks" / "heavy.ipynb")
+
+    eager, eager_body = _request(notebook_server, "/view/notebooks/heavy.ipynb")
+    assert eager.status == 200
+    assert heavy_html.encode() in eager_body
+
+    lazy, lazy_body = _request(notebook_server, "/view/notebooks/heavy.ipynb?lazy=1")
+    assert lazy.status == 200
+    assert heavy_html.encode() not in lazy_body
+    assert b"small output" in lazy_body
+    assert len(lazy_body) < len(eager_body) - len(heavy_html) // 2
+    assert lazy.getheader("ETag") != eager.getheader("ETag")
+    placeholder = re.search(rb'<div class="notebook-lazy-output"[^>]*>', lazy_body).group(0)
+    assert b'data-output="0/1"' in placeholder
+    fragment_hash = re.search(rb'data-hash="(\w+)"', placeholder).group(1).decode()
+
+    fragment, fragment_body = _request(notebook_server, f"/output/notebooks/heavy.ipynb/0/1?h={fragment_hash}")
+    assert fragment.status == 200
+    assert heavy_html.encode() in fragment_body
+    assert "immutable" in fragment.getheader("Cache-Control")
+    assert fragment.getheader("X-Render-Cache") == "memory"
+
+    stale, _ = _request(notebook_server, "/output/notebooks/heavy.ipynb/0/1?h=outdated")
+    assert stale.getheader("Cache-Control") == "private, no-cache"
+    not_modified, _ = _request(notebook_server, "/output/notebooks/heavy.ipynb/0/1", headers={"If-None-Match": fragment.getheader("ETag")})
+    assert not_modified.status == 304
+    missing, _ = _request(notebook_server, "/output/notebooks/heavy.ipynb/0/0")
+    assert missing.status == 404
+    bad, _ = _request(notebook_server, "/view/notebooks/heavy.ipynb?lazy=maybe")
+    assert bad.status == 400
+
+    # Fragments survive a restart through the disk tier.
+    restarted = NotebookRenderCache(cache_dir=tmp_path / "html-cache")
+    page = restarted.get((tmp_path / "notebooks" / "heavy.ipynb"), notebook_server.get_render_options(lazy=True))
+    assert page.cache_status == "disk"
+    assert heavy_html.encode() in page.fragments["0/1"]
+
+
+def test_cell_range_and_outputs_only_views_render_selected_cells_from_cell_cache(notebook_server, tmp_path):
+    cells = [nbformat.v4.new_markdown_cell("# Report")]
+    for number in range(1, 6):
+        cells.append(nbformat.v4.new_markdown_cell(f"## Section {number}"))
+        cells.append(nbformat.v4.new_code_cell(f"setup_{number}()"))
+        cells.append(
+            nbformat.v4.new_code_cell(
+                f"table_{number}()",
+                outputs=[nbformat.v4.new_output("stream", name="stdout", text=f"result {number}\n")],
+            )
+        )
+    nbformat.write(nbformat.v4.new_notebook(cells=cells), tmp_path / "notebooks" / "report.ipynb")
+
+    # Cells 4-9 are section 2 and section 3.
+    page, body = _request(notebook_server, "/view/notebooks/report.ipynb?cells=4-9")
+    assert page.status == 200
+    text = body.decode()
+    assert "result 2" in text and "result 3" in text
+    assert "result 1" not in text and "result 4" not in text
+    assert "setup_2" in text
+    toc = re.search(r'<nav class="notebook-toc".*?</nav>', text, re.DOTALL).group(0)
+    assert "Section 2" in toc and "Section 3" in toc and "Section 1" not in toc
+    assert "cells 4-9 of 16" in text
+    # Six cells, the table of contents, the page shell and the parsed notebook, which counts towards the cache size.
+    stats = notebook_server.cell_cache.get_stats()
+    assert stats["misses"] == 9
+    assert stats["bytes"] > (tmp_path / "notebooks" / "report.ipynb").stat().st_size
+
+    # Overlapping selections reuse the rendered cells.
+    outputs, outputs_body = _request(notebook_server, "/view/notebooks/report.ipynb?cells=4-12&outputs_only=1")
+    assert outputs.status == 200
+    assert "result 4" in outputs_body.decode()
+    assert "setup_" not in outputs_body.decode() and "table_" not in outputs_body.decode()
+    not_modified, _ = _request(notebook_server, "/view/notebooks/report.ipynb?cells=4-12&outputs_only=1", headers={"If-None-Match": outputs.getheader("ETag")})
+    assert not_modified.status == 304
+    assert outputs.getheader("ETag") != page.getheader("ETag")
+
+    stats = notebook_server.cell_cache.get_stats()
+    _request(notebook_server, "/view/notebooks/report.ipynb?cells=4-9")
+    assert notebook_server.cell_cache.get_stats()["misses"] == stats["misses"]
+    for bad_range in ("9-4", "a-b", "-1-3"):
+        bad, _ = _request(notebook_server, f"/view/notebooks/report.ipynb?cells={bad_range}")
+        assert bad.status == 400
+
+    # Partial renders of different selections run concurrently, each with its own exporter.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pages = list(executor.map(lambda number: _request(notebook_server, f"/view/notebooks/report.ipynb?cells={3 * number + 1}-{3 * number + 3}"), range(5)))
+    for number, (response, response_body) in enumerate(pages, start=1):
+        assert response.status == 200
+        assert f"result {number}" in response_body.decode() and f"result {number % 5 + 1}" not in response_body.decode()
+
+
+def test_oversized_outputs_are_not_read_and_link_to_raw_output_download(notebook_server, tmp_path):
+    big_text = "".join(f"line {number}\n" for number in range(20_000))
+    notebook = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_markdown_cell("# Oversized"),
+            nbformat.v4.new_code_cell(
+                "run()",
+                outputs=[
+                    nbformat.v4.new_output("stream", name="stdout", text="small \\ \"quoted\" output\n"),
+                    nbformat.v4.new_output("stream", name="stdout", text=big_text),
+                ],
+            ),
+        ]
+    )
+    notebook_path = tmp_path / "notebooks" / "oversized.ipynb"
+    nbformat.write(notebook, notebook_path)
+    notebook_server.render_options = RenderOptions(max_output_bytes=100_000)
+
+    page, body = _request(notebook_server, "/view/notebooks/oversized.ipynb")
+    assert page.status == 200
+    text = body.decode()
+    assert "line 19999" not in text
+    assert 'small \\ "quoted" output' in text
+    link = html.unescape(re.search(r'<a [^>]*href="([^"]+)"[^>]*>Download full output</a>', text).group(1))
+    assert link == "?raw_output=1/1"
+
+    download, download_body = _request(notebook_server, "/view/notebooks/oversized.ipynb" + link)
+    assert download.status == 200
+    assert "attachment" in download.getheader("Content-Disposition")
+    assert "".join(json.loads(download_body)["text"]) == big_text
+    missing, _ = _request(notebook_server, "/view/notebooks/oversized.ipynb?raw_output=1/2")
+    assert missing.status == 404
+
+    # Under the limit the page is the same as when reading the whole notebook.
+    notebook.cells[1].outputs.pop()
+    nbformat.write(notebook, notebook_path)
+    assert render_notebook(notebook_path, RenderOptions(max_output_bytes=100_000)) == render_notebook(notebook_path, RenderOptions())
+
+
+def test_fast_view_renders_minimal_html_without_nbconvert(notebook_server, tmp_path):
+    png = base64.b64encode(b"\x89PNG\r\n\x1a\nfast").decode("ascii")
+    cells = [
+        nbformat.v4.new_markdown_cell("# Preview\n\n## Results"),
+        nbformat.v4.new_code_cell(
+            "print('<b>')",
+            outputs=[
+                nbformat.v4.new_output("stream", name="stdout", text="\x1b[31m<b>\x1b[0m\n"),
+                nbformat.v4.new_output("display_data", data={"text/html": "<table><tr><td>1.5</td></tr></table>", "text/plain": "table"}),
+                nbformat.v4.new_output("display_data", data={"image/png": png, "text/plain": "<Figure>"}),
+            ],
+        ),
+    ]
+    nbformat.write(nbformat.v4.new_notebook(cells=cells), tmp_path / "notebooks" / "fast.ipynb")
+
+    fast, fast_body = _request(notebook_server, "/view/notebooks/fast.ipynb?fast=1")
+    assert fast.status == 200
+    text = fast_body.decode()
+    assert "jp-Notebook" not in text
+    assert '<code class="language-python">print(&#x27;&lt;b&gt;&#x27;)</code>' in text
+    assert '<pre class="notebook-output">&lt;b&gt;\n</pre>' in text
+    assert "<table><tr><td>1.5</td></tr></table>" in text
+    assert f'src="data:image/png;base64,{png}"' in text
+    assert re.search(r'<nav class="notebook-toc".*?href="#Results".*?</nav>', text, re.DOTALL)
+    assert f'id="cell-id={cells[1].id}"' in text
+    assert '<a href="?fast=0">' in text
+
+    full, full_body = _request(notebook_server, "/view/notebooks/fast.ipynb?fast=0")
+    assert full.status == 200
+    assert "jp-Notebook" in full_body.decode()
+    assert full.getheader("ETag") != fast.getheader("ETag")
+    bad, _ = _request(notebook_server, "/view/notebooks/fast.ipynb?fast=maybe")
+    assert bad.status == 400
+
+    notebook_server.render_options = RenderOptions(fast=True, fast_highlight_url="/hl.js")
+    default, default_body = _request(notebook_server, "/view/notebooks/fast.ipynb")
+    assert "jp-Notebook" not in default_body.decode()
+    assert 'script.src = "/hl.js";' in default_body.decode()
+    notebook_server.render_options = RenderOptions(fast=True, fast_highlight_url="/hl.js?v=1&x='</script><script>alert(1)//")
+    _response, hostile_body = _request(notebook_server, "/view/notebooks/fast.ipynb")
+    assert """script.src = "/hl.js?v=1&x='<\\/script><script>alert(1)//";""" in hostile_body.decode()
+
+
+def test_metrics_count_requests_by_route_and_status_behind_auth(notebook_server, tmp_path):
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Metrics")]), tmp_path / "notebooks" / "metrics.ipynb")
+    view, view_body = _request(notebook_server, "/view/notebooks/metrics.ipynb")
+    assert view.status == 200
+    _request(notebook_server, "/view/notebooks/metrics.ipynb")
+    _request(notebook_server, "/view/notebooks/metrics.ipynb?cells=0")
+    _request(notebook_server, "/view/notebooks/missing.ipynb")
+
+    connection = http.client.HTTPConnection("127.0.0.1", notebook_server.server_address[1], timeout=60)
+    connection.request("GET", "/metrics")
+    unauthorised = connection.getresponse()
+    unauthorised.read()
+    connection.close()
+    assert unauthorised.status == 401
+
+    def scrape():
+        response, body = _request(notebook_server, "/metrics")
+        assert response.status == 200
+        assert response.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+        samples = {}
+        for line in body.decode().splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    # A request is counted just after its response is sent, so the last ones may not be counted yet.
+    samples = scrape()
+    deadline = time.monotonic() + 10
+    while (samples.get('notebook_server_request_seconds_count{route="/view/"}') != 4 or samples.get('notebook_server_requests_total{route="/metrics",status="401"}') != 1) and time.monotonic() < deadline:
+        time.sleep(0.05)
+        samples = scrape()
+    assert samples['notebook_server_requests_total{route="/view/",status="200"}'] == 3
+    assert samples['notebook_server_requests_total{route="/view/",status="404"}'] == 1
+    assert samples['notebook_server_requests_total{route="/metrics",status="401"}'] == 1
+    assert samples['notebook_server_response_bytes_total{route="/view/"}'] > len(view_body)
+    assert samples['notebook_server_request_seconds_count{route="/view/"}'] == 4
+    assert samples['notebook_server_render_seconds_count{kind="page"}'] == 1
+    assert samples['notebook_server_render_seconds_bucket{kind="page",le="+Inf"}'] == 1
+    assert samples['notebook_server_render_seconds_count{kind="partial"}'] == 1
+    assert samples['notebook_server_render_cache_lookups_total{result="memory"}'] == 1
+    assert samples["notebook_server_render_cache_hit_ratio"] == 0.5
+    # The scrape itself is still being handled.
+    assert samples["notebook_server_active_requests"] == 1
+    assert samples["notebook_server_threads"] >= 2
+
+
+def test_extracted_images_are_served_once_from_content_hash_assets(notebook_server, tmp_path):
+    notebook_server.render_options = RenderOptions(extract_images=True)
+    png = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==")
+    chart = nbformat.v4.new_output("display_data", data={"image/png": base64.b64encode(png).decode(), "text/plain": "<Figure>"})
+    notebook = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("plot()", outputs=[chart]), nbformat.v4.new_code_cell("plot()", outputs=[copy.deepcopy(chart)])])
+    nbformat.write(notebook, tmp_path / "notebooks" / "charts.ipynb")
+
+    response, body = _request(notebook_server, "/view/notebooks/charts.ipynb")
+    assert response.status == 200
+    assert base64.b64encode(png) not in body
+    sources = set(re.findall(rb'<img [^>]*src="(/asset/[0-9a-f]{64}\.png)"', body))
+    assert len(sources) == 1
+    asset_path = sources.pop().decode()
+
+    asset, asset_body = _request(notebook_server, asset_path)
+    assert asset.status == 200
+    assert asset_body == png
+    assert asset.getheader("Content-Type") == "image/png"
+    assert "immutable" in asset.getheader("Cache-Control")
+    head, head_body = _request(notebook_server, asset_path, method="HEAD")
+    assert head.status == 200 and head_body == b""
+    assert head.getheader("Content-Length") == str(len(png))
+    not_modified, _ = _request(notebook_server, asset_path, headers={"If-None-Match": asset.getheader("ETag")})
+    assert not_modified.status == 304
+    missing, _ = _request(notebook_server, "/asset/" + "0" * 64 + ".png")
+    assert missing.status == 404
+    bad, _ = _request(notebook_server, "/asset/../secret.png")
+    assert bad.status == 404
+
+    # Assets survive a restart through the disk tier and are re-rendered when pruned.
+    restarted = NotebookRenderCache(cache_dir=tmp_path / "html-cache")
+    assert restarted.get_asset(asset_path.removeprefix("/asset/")) == png
+    (tmp_path / "html-cache" / "assets" / asset_path.removeprefix("/asset/")).unlink()
+    assert restarted.lookup(tmp_path / "notebooks" / "charts.ipynb", notebook_server.render_options) is None
+    page = restarted.get(tmp_path / "notebooks" / "charts.ipynb", notebook_server.render_options)
+    assert page.cache_status == "miss"
+    assert restarted.get_asset(asset_path.removeprefix("/asset/")) == png
+
+
+def test_shared_static_links_stylesheets_and_plotly_instead_of_inlining(notebook_server, tmp_path):
+    bundle = "/** plotly.js v2.31.1 */ !function(t){module.exports=t}({});"
+    init_script = (
+        '<script type="text/javascript">window.PlotlyConfig = {};\n'
+        'if (typeof require !== "undefined") {\nrequire.undef("plotly");\n'
+        f"define('plotly', function(require, exports, module) {{\n{bundle}\n}});\n"
+        "require(['plotly'], function(Plotly) {\nwindow._Plotly = Plotly;\n});\n}\n</script>"
+    )
+    init = nbformat.v4.new_output("display_data", data={"text/html": init_script, "text/plain": ""})
+    notebook = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("import plotly", outputs=[init])])
+    nbformat.write(notebook, tmp_path / "notebooks" / "plotly.ipynb")
+
+    inline, inline_body = _request(notebook_server, "/view/notebooks/plotly.ipynb")
+    assert bundle.encode() in inline_body
+    assert b"/static/" not in inline_body
+
+    notebook_server.render_options = RenderOptions(shared_static=True)
+    response, body = _request(notebook_server, "/view/notebooks/plotly.ipynb")
+    assert response.status == 200
+    assert bundle.encode() not in body
+    assert len(body) < len(inline_body) - 200_000
+    stylesheets = re.findall(rb'<link href="(/static/[^"]+\.css)" rel="stylesheet"/>', body)
+    assert len(stylesheets) == 2
+    script = re.search(rb'require\.config\(\{paths: \{plotly: "(/static/plotly-2\.31\.1-[0-9a-f]{16})"\}\}\);', body).group(1).decode()
+
+    stylesheet, stylesheet_body = _request(notebook_server, stylesheets[0].decode())
+    assert stylesheet.status == 200
+    assert stylesheet.getheader("Content-Type") == "text/css; charset=utf-8"
+    assert "immutable" in stylesheet.getheader("Cache-Control")
+    assert b".jp-Notebook" in stylesheet_body
+    compressed, compressed_body = _request(notebook_server, script + ".js", headers={"Accept-Encoding": "gzip"})
+    assert compressed.getheader("Content-Type") == "text/javascript; charset=utf-8"
+    assert gzip.decompress(compressed_body) == f"define('plotly', function(require, exports, module) {{\n{bundle}\n}});".encode()
+    not_modified, _ = _request(notebook_server, script + ".js", headers={"If-None-Match": compressed.getheader("ETag")})
+    assert not_modified.status == 304
+    missing, _ = _request(notebook_server, "/static/plotly-0123456789abcdef.js")
+    assert missing.status == 404
+
+
+def test_large_uncached_notebook_streams_chunked_and_fills_disk_cache(notebook_server, tmp_path):
+    notebook_server.stream_min_bytes = 0
+    cells = [nbformat.v4.new_markdown_cell("# Streamed\n\n## Setup")]
+    for index in range(6):
+        cells.append(nbformat.v4.new_code_cell(f"print({index})", outputs=[nbformat.v4.new_output("stream", name="stdout", text=f"cell output {index}\n" * 2000)]))
+    cells.append(nbformat.v4.new_markdown_cell("## Results"))
+    nbformat.write(nbformat.v4.new_notebook(cells=cells), tmp_path / "notebooks" / "big.ipynb")
+    notebook_server.render_cache.streamer = lambda path, options: NotebookPageStream(path, options, batch_size=20_000)
+
+    head, head_body = _request(notebook_server, "/view/notebooks/big.ipynb", method="HEAD")
+    assert head.getheader("Transfer-Encoding") == "chunked"
+    assert head_body == b""
+
+    streamed, streamed_body = _request(notebook_server, "/view/notebooks/big.ipynb")
+    assert streamed.status == 200
+    assert streamed.getheader("Transfer-Encoding") == "chunked"
+    assert streamed.getheader("Content-Length") is None
+    assert streamed.getheader("X-Render-Cache") == "stream"
+    assert streamed_body.count(b"cell output 5") == 2000
+    assert streamed_body.rstrip().endswith(b"</html>")
+    toc = re.search(rb'<nav [^>]*class="notebook-toc"[^>]*>(.*?)</nav>', streamed_body, re.DOTALL)
+    assert b'href="#Setup"' in toc.group(1) and b'href="#Results"' in toc.group(1)
+    assert streamed_body.index(b"</h1>") < toc.start()
+    assert notebook_server.render_cache.get_stats()["misses"] == 1
+
+    cached, cached_body = _request(notebook_server, "/view/notebooks/big.ipynb")
+    assert cached.getheader("X-Render-Cache") == "disk"
+    assert cached.getheader("Content-Length") == str(len(cached_body))
+    assert cached_body == streamed_body
+    assert cached_body.split() == notebook_server.render_cache.renderer(tmp_path / "notebooks" / "big.ipynb", RenderOptions()).html.encode().split()
+
+    os.utime(tmp_path / "notebooks" / "big.ipynb", ns=(0, time.time_ns() + 2_000_000_000))
+    compressed, compressed_body = _request(notebook_server, "/view/notebooks/big.ipynb", headers={"Accept-Encoding": "gzip"})
+    assert compressed.getheader("X-Render-Cache") == "stream"
+    assert compressed.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(compressed_body) == streamed_body
+
+
+def test_view_answers_503_with_retry_after_when_render_queue_is_full(notebook_server, tmp_path):
+    nbformat.write(nbformat.v4.new_notebook(), tmp_path / "notebooks" / "busy.ipynb")
+
+    def renderer(path, options):
+        raise RenderQueueFull("All 2 render workers are busy", retry_after=7)
+
+    notebook_server.render_cache.renderer = renderer
+    response, body = _request(notebook_server, "/view/notebooks/busy.ipynb")
+    assert response.status == 503
+    assert response.getheader("Retry-After") == "7"
+    assert b"busy" in body
+
+
+def test_partial_pages_render_in_the_render_pool(notebook_server, tmp_path):
+    notebook = nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Pooled"), nbformat.v4.new_code_cell("print('pooled')", outputs=[nbformat.v4.new_output("stream", text="pooled-output\n")])])
+    nbformat.write(notebook, tmp_path / "notebooks" / "pooled.ipynb")
+    pool = NotebookRenderPool(workers=1, timeout_seconds=60, max_queue=0, memory_limit_bytes=None, renderer=_pool_renderer)
+    notebook_server.render_pool = pool
+    try:
+        response, body = _request(notebook_server, "/view/notebooks/pooled.ipynb?cells=1")
+        assert response.status == 200
+        assert b"pooled-output" in body and b"Showing cells 1-1 of 2." in body
+        assert pool.get_stats()["completed"] == 1
+        # The finished page is cached by the server.
+        _request(notebook_server, "/view/notebooks/pooled.ipynb?cells=1")
+        assert pool.get_stats()["completed"] == 1
+
+        # Partial pages share the pool's queue bound with whole pages.
+        pool.timeout_seconds = 2
+        slow = threading.Thread(target=lambda: pytest.raises(RenderTimeout, pool.render, tmp_path / "slow.ipynb", RenderOptions()))
+        slow.start()
+        _wait_for(lambda: pool.get_stats()["busy_workers"] == 1)
+        busy, _body = _request(notebook_server, "/view/notebooks/pooled.ipynb?outputs_only=1")
+        assert busy.status == 503
+        assert busy.getheader("Retry-After")
+        slow.join(30)
+    finally:
+        pool.shutdown()
+
+
+def test_live_view_pushes_saved_cells_of_agent_runs(notebook_server, tmp_path):
+    notebook_path = tmp_path / "notebooks" / "run.ipynb"
+    notebook = nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell("# Run"), nbformat.v4.new_code_cell("print('first')"), nbformat.v4.new_code_cell("slow()")])
+    nbformat.write(notebook, notebook_path)
+    notebook_server.live_channel_dir = tmp_path / "live"
+    notebook_server.render_options = RenderOptions(live_view=True)
+    _response, page = _request(notebook_server, "/view/notebooks/run.ipynb")
+    assert b"new EventSource(" in page
+
+    publisher = LiveChannelPublisher(tmp_path / "live")
+
+    def publish(kind, **fields):
+        publisher(NotebookExecutionEvent(kind=kind, notebook_path=notebook_path, output_path=notebook_path, finished_at=datetime.now(timezone.utc), **fields))
+
+    publish("notebook_started", total_code_cells=2)
+    publish("cell_started", cell_index=1, code_cell_index=1, total_code_cells=2, cell_label="print('first')")
+    notebook.cells[1].outputs = [nbformat.v4.new_output("stream", name="stdout", text="first-output\n")]
+    nbformat.write(notebook, notebook_path)
+    publish("cell_completed", cell_index=1)
+    publish("notebook_saved", cell_index=1)
+    publish("cell_started", cell_index=2, code_cell_index=2, total_code_cells=2, cell_label="slow()")
+    publish("cell_output", cell_index=2, output_preview="50%")
+
+    # A page rendered before the save gets the saved cell and the running cell.
+    view = iter(LiveNotebookView(notebook_path, RenderOptions(), channel_dir=tmp_path / "live", since=0, poll_seconds=0.01))
+    events = _parse_sse(next(view))
+    assert [event for event, _data in events] == ["cell", "cell-started", "cell-output"]
+    assert events[0][1]["cell_id"] == notebook.cells[1].id
+    assert 'id="cell-id=' + notebook.cells[1].id + '"' in events[0][1]["html"] and "first-output" in events[0][1]["html"]
+    assert "<html" not in events[0][1]["html"]
+    assert events[2][1]["preview"] == "50%"
+
+    notebook.cells[2].outputs = [nbformat.v4.new_output("execute_result", data={"text/plain": "'done'"}, execution_count=2)]
+    nbformat.write(notebook, notebook_path)
+    publish("cell_completed", cell_index=2)
+    publish("notebook_saved", cell_index=2)
+    publish("notebook_completed")
+    events = [event for message in view for event in _parse_sse(message)]
+    assert [event for event, _data in events] == ["cell-finished", "cell", "completed"]
+    assert events[1][1]["cell_index"] == 2 and "done" in events[1][1]["html"]
+
+    response, body = _request(notebook_server, "/live/notebooks/run.ipynb?since=0")
+    assert response.getheader("Content-Type").startswith("text/event-stream")
+    assert [event for event, _data in _parse_sse(body.decode())] == ["cell", "cell", "completed"]
+    _response, body = _request(notebook_server, f"/live/notebooks/run.ipynb?since={time.time() + 1:.0f}")
+    assert [event for event, _data in _parse_sse(body.decode())] == ["idle"]
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events